@@ -0,0 +1,137 @@
+"""
+JSONコーデックのベンチマークスクリプト
+統計ファイルの書き込み・読み込みにかかる時間とファイルサイズを、従来の書き方
+（標準の json・indent=2）と utils.json_codec（コンパクト形式）で比較する
+
+使い方:
+    python benchmark_json.py                     # 合成した統計データで計測
+    python benchmark_json.py --players 50000     # プレイヤー数を指定
+    python benchmark_json.py data/stats/*.json   # 実際のファイルで計測
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+# カレントディレクトリをモジュール検索パスに追加
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from utils import json_codec
+
+ROLES = ["村人", "人狼", "占い師", "狩人", "霊媒師", "狂人", "妖狐", "背徳者", "猫又", "預言者"]
+
+
+def make_player_stats(players, rng):
+    """player_stats.json と同じ形の合成データ"""
+    stats = {}
+    now = datetime.datetime(2026, 1, 1)
+    for _ in range(players):
+        player_id = str(rng.randrange(10 ** 17, 10 ** 18))
+        total = rng.randint(1, 300)
+        wins = rng.randint(0, total)
+        survival = rng.randint(0, total)
+        stats[player_id] = {
+            "name": f"プレイヤー{player_id[-6:]}",
+            "total_games": total,
+            "wins": wins,
+            "losses": total - wins,
+            "role_count": {role: rng.randint(0, 30) for role in rng.sample(ROLES, rng.randint(1, len(ROLES)))},
+            "survival_rate": survival / total * 100,
+            "voting_accuracy": 0,
+            "votes_received": rng.randint(0, total * 3),
+            "survival_count": survival,
+            "last_updated": (now + datetime.timedelta(seconds=rng.randrange(10 ** 7))).isoformat(),
+        }
+    return stats
+
+
+def make_server_stats(guilds, rng):
+    """server_stats.json と同じ形の合成データ"""
+    stats = {}
+    for _ in range(guilds):
+        guild_id = str(rng.randrange(10 ** 17, 10 ** 18))
+        total = rng.randint(1, 2000)
+        village = rng.randint(0, total)
+        stats[guild_id] = {
+            "name": f"サーバー{guild_id[-4:]}",
+            "total_games": total,
+            "village_wins": village,
+            "werewolf_wins": total - village,
+            "game_history": [
+                {"id": f"game_{rng.randrange(10 ** 9)}", "date": "2026-01-01T21:00:00",
+                 "duration": rng.randint(300, 3600), "player_count": rng.randint(5, 15),
+                 "winner": rng.choice(["village", "werewolf", "fox"])}
+                for _ in range(10)
+            ],
+            "role_stats": {role: {"appearances": rng.randint(0, 5000), "wins": rng.randint(0, 2500)} for role in ROLES},
+            "average_duration": rng.uniform(300, 3600),
+            "last_updated": "2026-01-01T21:00:00",
+        }
+    return stats
+
+
+def best_of(func, repeat):
+    """repeat回実行した最短時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(name, data, repeat):
+    """1つのデータについて各方式の書き込み・読み込み時間とサイズを計測"""
+    methods = [
+        ("json indent=2 (従来)",
+         lambda: json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+         lambda raw: json.loads(raw.decode("utf-8"))),
+        (f"{json_codec.BACKEND} pretty",
+         lambda: json_codec.dumpb(data, pretty=True),
+         json_codec.loads),
+        (f"{json_codec.BACKEND} compact",
+         lambda: json_codec.dumpb(data),
+         json_codec.loads),
+    ]
+
+    print(f"\n== {name}")
+    print(f"{'方式':<24}{'サイズ':>12}{'書き込み':>12}{'読み込み':>12}")
+    baseline = None
+    for label, encode, decode in methods:
+        raw = encode()
+        assert decode(raw) == data
+        encode_time = best_of(encode, repeat)
+        decode_time = best_of(lambda: decode(raw), repeat)
+        if baseline is None:
+            baseline = (len(raw), encode_time, decode_time)
+        print(f"{label:<24}{len(raw) / 1024:>10.1f}KB{encode_time * 1000:>10.2f}ms{decode_time * 1000:>10.2f}ms"
+              f"  ({len(raw) / baseline[0]:.0%} / x{baseline[1] / encode_time:.1f} / x{baseline[2] / decode_time:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONコーデックのベンチマーク")
+    parser.add_argument("files", nargs="*", help="計測するJSONファイル（省略時は合成データ）")
+    parser.add_argument("--players", type=int, default=20000, help="合成するプレイヤー数")
+    parser.add_argument("--guilds", type=int, default=2000, help="合成するサーバー数")
+    parser.add_argument("--repeat", type=int, default=5, help="各計測の繰り返し回数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"バックエンド: {json_codec.BACKEND}")
+    if args.files:
+        for path in args.files:
+            benchmark(path, json_codec.load_file(path), args.repeat)
+        return
+
+    rng = random.Random(args.seed)
+    benchmark(f"player_stats.json ({args.players} players)", make_player_stats(args.players, rng), args.repeat)
+    benchmark(f"server_stats.json ({args.guilds} guilds)", make_server_stats(args.guilds, rng), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +0,0 @@
-"""
-Botのフックシステム（一時的に無効化中）
-"""
-
-def apply_all_hooks():
-    """すべてのフックを適用"""
-    print("フックシステムは一時的に無効化されています。")
-    return False
@@ -11,6 +11,9 @@ from utils.config import ConfigManager
 from utils.embed_creator import EmbedCreator
 from utils.validators import is_admin
 from utils.log_manager import LogManager
+from utils.watchdog import get_watchdog
+from utils.profiler import get_profiler
+from utils.memory_tracker import get_memory_tracker
 
 
 class AdminCommands(commands.Cog):
@@ -19,6 +22,13 @@ class AdminCommands(commands.Cog):
         self.config = ConfigManager()
         self.embed_creator = EmbedCreator()
         self.log_manager = LogManager()
+    
+    def _resolve_game(self, ctx):
+        """コマンドを実行したチャンネル（またはDMでは実行者の参加中のゲーム）からゲームを特定"""
+        game_manager = self.bot.get_cog("GameManagementCog")
+        if not game_manager:
+            return None
+        return game_manager.resolve_game(ctx)
         
     @commands.hybrid_group(name="admin", description="管理者専用コマンド")
     @app_commands.default_permissions(administrator=True)
@@ -33,6 +43,9 @@ class AdminCommands(commands.Cog):
             embed.add_field(name="!admin player", value="プレイヤー管理コマンド", inline=False)
             embed.add_field(name="!admin config", value="設定管理コマンド", inline=False)
             embed.add_field(name="!admin log", value="ログ管理コマンド", inline=False)
+            embed.add_field(name="!admin watchdog", value="イベントループ停止レポートを表示", inline=False)
+            embed.add_field(name="!admin profile", value="コマンドのプロファイリング", inline=False)
+            embed.add_field(name="!admin memory [start [分]|stop]", value="メモリ使用状況とリークの検出（start/stopでtracemallocを切り替え）", inline=False)
             
             await ctx.send(embed=embed, ephemeral=True)
     
@@ -53,7 +66,7 @@ class AdminCommands(commands.Cog):
     
     @admin_game.command(name="status", description="ゲームの現在の状態を表示")
     async def game_status(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -87,11 +100,22 @@ class AdminCommands(commands.Cog):
         dead_info = "\n".join([f"{p.member.display_name}: {p.role.__class__.__name__}" for p in dead_players])
         embed.add_field(name="死亡プレイヤー", value=dead_info or "なし", inline=False)
         
+        # イベント処理の状況
+        if game.actor:
+            stats = game.actor.get_stats()
+            embed.add_field(
+                name="イベント処理",
+                value=f"処理: {stats['processed']}件 ({stats['events_per_minute']:.1f}件/分) / 破棄: {stats['dropped']}件 / 失敗: {stats['failed']}件\n"
+                      f"処理時間: 平均 {stats['avg_ms']:.1f}ms / 最大 {stats['max_ms']:.1f}ms\n"
+                      f"キュー: {stats['queued']}件 (最大 {stats['max_queue_depth']}件)",
+                inline=False
+            )
+        
         await ctx.send(embed=embed, ephemeral=True)
     
     @admin_game.command(name="force_end", description="ゲームを強制終了")
     async def force_end_game(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -112,6 +136,9 @@ class AdminCommands(commands.Cog):
                 
                 # ゲーム終了処理
                 await game.end_game(reason="管理者による強制終了")
+                game_manager = self.bot.get_cog("GameManagementCog")
+                if game_manager:
+                    game_manager.remove_game(game)
                 await ctx.send("ゲームを強制終了しました。", ephemeral=True)
                 
                 # 全体に通知
@@ -129,7 +156,7 @@ class AdminCommands(commands.Cog):
     
     @admin_game.command(name="force_day", description="強制的に昼のフェーズに移行")
     async def force_day(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -148,7 +175,7 @@ class AdminCommands(commands.Cog):
     
     @admin_game.command(name="force_night", description="強制的に夜のフェーズに移行")
     async def force_night(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -167,7 +194,7 @@ class AdminCommands(commands.Cog):
     
     @admin_game.command(name="skip_timer", description="現在のタイマーをスキップ")
     async def skip_timer(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -208,7 +235,7 @@ class AdminCommands(commands.Cog):
     
     @admin_player.command(name="list", description="プレイヤーのリストを表示")
     async def player_list(self, ctx):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -230,7 +257,7 @@ class AdminCommands(commands.Cog):
     
     @admin_player.command(name="kill", description="プレイヤーを強制的に死亡させる")
     async def kill_player(self, ctx, player: discord.Member):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -269,7 +296,7 @@ class AdminCommands(commands.Cog):
     
     @admin_player.command(name="revive", description="死亡したプレイヤーを蘇生させる")
     async def revive_player(self, ctx, player: discord.Member):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -308,7 +335,7 @@ class AdminCommands(commands.Cog):
     
     @admin_player.command(name="role", description="プレイヤーの役職を確認または変更")
     async def player_role(self, ctx, player: discord.Member, new_role: Optional[str] = None):
-        game = Game.get_game(ctx.guild.id)
+        game = self._resolve_game(ctx)
         if not game:
             await ctx.send("現在アクティブなゲームはありません。", ephemeral=True)
             return
@@ -584,6 +611,153 @@ class AdminCommands(commands.Cog):
             except asyncio.TimeoutError:
                 await ctx.send("タイムアウトしました。操作はキャンセルされました。", ephemeral=True)
 
+    
+    @admin.command(name="watchdog", description="イベントループ停止レポートを表示")
+    async def watchdog_report(self, ctx, action: Optional[str] = None):
+        watchdog = get_watchdog()
+        
+        if action == "reset":
+            watchdog.reset()
+            await ctx.send("イベントループ停止レポートをリセットしました。", ephemeral=True)
+            return
+        
+        report = watchdog.get_report()
+        embed = self.embed_creator.create_info_embed(
+            title="イベントループ停止レポート",
+            description=f"停止回数: {report['stall_count']}\n"
+                      f"合計停止時間: {report['total_stall_time']:.2f}秒\n"
+                      f"最大停止時間: {report['max_stall']:.2f}秒\n"
+                      f"採取サンプル数: {report['total_samples']}\n"
+                      f"しきい値: {watchdog.threshold}秒"
+        )
+        
+        top_frames = "\n".join([f"{count}回: `{frame}`" for frame, count in report["top_frames"]])
+        embed.add_field(name="停止中の関数（上位）", value=top_frames[:1024] or "なし", inline=False)
+        
+        recent = "\n".join([
+            f"{datetime.datetime.fromtimestamp(stall['time']).strftime('%m-%d %H:%M:%S')} "
+            f"{stall['duration']:.2f}秒 `{stall['top']}`"
+            for stall in report["recent_stalls"]
+        ])
+        embed.add_field(name="最近の停止", value=recent[:1024] or "なし", inline=False)
+        
+        # フレームグラフ用の折りたたみスタックを書き出して添付
+        path = watchdog.write_collapsed()
+        embed.set_footer(text=f"折りたたみスタック: {path}")
+        if report["total_samples"]:
+            await ctx.send(embed=embed, file=discord.File(path), ephemeral=True)
+        else:
+            await ctx.send(embed=embed, ephemeral=True)
+
+    
+    @admin.group(name="profile", description="コマンドのプロファイリング")
+    async def admin_profile(self, ctx):
+        if ctx.invoked_subcommand is None:
+            embed = self.embed_creator.create_info_embed(
+                title="プロファイリングコマンド",
+                description="以下のプロファイリングコマンドが利用可能です："
+            )
+            embed.add_field(name="!admin profile start [コマンド名|all] [サンプリング率]", value="計測を開始（例: `!admin profile start begin 0.5`）", inline=False)
+            embed.add_field(name="!admin profile stop", value="計測を終了して結果を表示", inline=False)
+            
+            await ctx.send(embed=embed, ephemeral=True)
+    
+    @admin_profile.command(name="start", description="コマンドのプロファイリングを開始")
+    async def profile_start(self, ctx, target: str = "all", sample_rate: float = 1.0):
+        if not 0.0 < sample_rate <= 1.0:
+            await ctx.send("サンプリング率は0より大きく1以下の値を指定してください。", ephemeral=True)
+            return
+        
+        if target != "all" and self.bot.get_command(target) is None:
+            await ctx.send(f"コマンド **{target}** は存在しません。", ephemeral=True)
+            return
+        
+        get_profiler().start(target, sample_rate)
+        self.log_manager.log_admin_action(None, ctx.author.id, "profile_start", 
+                                        f"プロファイリングを開始しました（対象: {target}, サンプリング率: {sample_rate}）")
+        
+        await ctx.send(f"プロファイリングを開始しました（対象: **{target}**, サンプリング率: **{sample_rate}**）。`!admin profile stop` で終了します。", ephemeral=True)
+    
+    @admin_profile.command(name="stop", description="コマンドのプロファイリングを終了")
+    async def profile_stop(self, ctx):
+        profiler = get_profiler()
+        if not profiler.active:
+            await ctx.send("プロファイリングは実行されていません。", ephemeral=True)
+            return
+        
+        results = profiler.stop(limit=10)
+        self.log_manager.log_admin_action(None, ctx.author.id, "profile_stop", "プロファイリングを終了しました")
+        
+        if not results:
+            await ctx.send("計測対象のコマンドは実行されませんでした。", ephemeral=True)
+            return
+        
+        embed = self.embed_creator.create_info_embed(
+            title="プロファイリング結果",
+            description="\n".join([f"**{r['command']}**: {r['count']}回" for r in results])
+        )
+        embed.set_footer(text="pstatsファイルは `python -m pstats <ファイル>` や snakeviz で開けます")
+        
+        # 累積時間の上位関数のテキストとpstatsファイルを添付（最大10ファイル）
+        files = []
+        for result in results[:5]:
+            files.append(discord.File(result["summary_path"]))
+            files.append(discord.File(result["path"]))
+        await ctx.send(embed=embed, files=files, ephemeral=True)
+
+    
+    @admin.group(name="memory", description="メモリ使用状況とリークの検出", invoke_without_command=True, fallback="report")
+    async def memory_report(self, ctx):
+        report = get_memory_tracker().collect(self.bot)
+        live = report["live"]
+        current, peak = report["traced"]
+        
+        embed = self.embed_creator.create_info_embed(
+            title="メモリレポート",
+            description=f"進行中のゲーム: {report['active_games']} (プレイヤー {report['active_players']}人)\n"
+                      f"生存オブジェクト: Game {live.get('game', 0)} / Player {live.get('player', 0)} / View {live.get('view', 0)}\n"
+                      f"終了済みなのに残っているゲーム: {report['leaked_count']}\n"
+                      f"tracemalloc: 現在 {current / 1024 / 1024:.2f} MB / ピーク {peak / 1024 / 1024:.2f} MB"
+        )
+        
+        subsystems = "\n".join([f"{name}: {size / 1024:.1f} KB" for name, size in report["subsystems"]])
+        embed.add_field(name="サブシステム別の保持量", value=subsystems or "tracemalloc停止中（`!admin memory start` で計測）", inline=True)
+        
+        deltas = "\n".join([f"{name}: {diff / 1024:+.1f} KB" for name, diff in report["deltas"]])
+        embed.add_field(name="前回からの増減", value=deltas or "なし", inline=True)
+        
+        for leak in report["leaked_games"][:3]:
+            chain = " ← ".join(leak["chain"])
+            embed.add_field(
+                name=f"残存ゲーム (サーバー {leak['guild_id']}, {leak['players']}人, 終了から{leak['finished_ago'] / 60:.0f}分)",
+                value=f"`{chain[:1000]}`",
+                inline=False
+            )
+        
+        await ctx.send(embed=embed, ephemeral=True)
+    
+    @memory_report.command(name="start", description="tracemallocによる計測を開始")
+    async def memory_start(self, ctx, minutes: float = 10.0):
+        if not 0 < minutes <= 120:
+            await ctx.send("計測時間は0より大きく120分以下で指定してください。", ephemeral=True)
+            return
+        
+        get_memory_tracker().start_tracing(minutes * 60)
+        self.log_manager.log_admin_action(None, ctx.author.id, "memory_start",
+                                        f"tracemallocを開始しました（{minutes:g}分）")
+        await ctx.send(f"tracemallocを開始しました（{minutes:g}分後に自動で停止）。`!admin memory` でレポート、`!admin memory stop` で停止します。", ephemeral=True)
+    
+    @memory_report.command(name="stop", description="tracemallocによる計測を停止")
+    async def memory_stop(self, ctx):
+        tracker = get_memory_tracker()
+        if not tracker.tracing:
+            await ctx.send("tracemallocは実行されていません。", ephemeral=True)
+            return
+        
+        tracker.stop_tracing()
+        self.log_manager.log_admin_action(None, ctx.author.id, "memory_stop", "tracemallocを停止しました")
+        await ctx.send("tracemallocを停止しました。", ephemeral=True)
+
 
 async def setup(bot):
     await bot.add_cog(AdminCommands(bot))
@@ -3,11 +3,16 @@
 """
 import discord
 from discord.ext import commands
+import asyncio
 import io
 import json
 import datetime
 from typing import Optional, Dict, List, Any, Union
 from utils.balance_analyzer import BalanceAnalyzer
+from utils.config_service import get_config_service
+from utils.logger import get_logger
+
+logger = get_logger("balance")
 
 class BalanceCog(commands.Cog):
     """ゲームバランスを管理するコグ"""
@@ -19,12 +24,30 @@ class BalanceCog(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         """Cogの準備完了時に呼ばれる"""
-        print(f"{self.__class__.__name__} Cog is ready.")
-        stats_manager = self.bot.get_cog("StatsCog")
-        if stats_manager:
-            self.analyzer = BalanceAnalyzer(stats_manager)
+        logger.info("Cog is ready", cog=self.__class__.__name__)
+        stats_cog = self.bot.get_cog("Stats")
+        if stats_cog:
+            self.analyzer = BalanceAnalyzer(stats_cog.stats_manager)
         else:
-            print("警告: StatsCogが見つかりません。BalanceCogは正常に機能しません。")
+            logger.warning("Stats Cogが見つかりません。BalanceCogは正常に機能しません。")
+    
+    async def _load_history(self):
+        """ゲーム履歴テーブルを準備（初回のログ読み込みはイベントループを止めないよう別スレッドで実行）"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.analyzer.stats_manager.get_history)
+    
+    def _parse_scope(self, ctx, scope: str, days: Optional[int]):
+        """表示範囲（server/global）と期間を分析条件に変換"""
+        filters = {"days": days}
+        if scope == "server":
+            filters["guild_id"] = ctx.guild.id
+        return filters
+    
+    def _scope_label(self, scope: str, days: Optional[int]):
+        label = "このサーバー" if scope == "server" else "全サーバー"
+        if days:
+            label += f"・直近{days}日"
+        return label
     
     @commands.group(name="balance", invoke_without_command=True)
     async def balance(self, ctx):
@@ -42,8 +65,9 @@ class BalanceCog(commands.Cog):
         embed.add_field(
             name="勝率分析",
             value=(
-                f"`{ctx.prefix}balance roles` - 役職ごとの勝率を表示\n"
-                f"`{ctx.prefix}balance teams` - 陣営ごとの勝率を表示"
+                f"`{ctx.prefix}balance roles [server/global] [日数]` - 役職ごとの勝率を表示\n"
+                f"`{ctx.prefix}balance teams [server/global] [日数]` - 陣営ごとの勝率を表示\n"
+                f"`{ctx.prefix}balance players [server/global] [日数]` - 人数ごとの陣営勝率を表示"
             ),
             inline=False
         )
@@ -63,17 +87,26 @@ class BalanceCog(commands.Cog):
             inline=False
         )
         
+        # 全サーバーの最近の傾向（履歴を読み込まずに減衰カウンタから表示）
+        stats_manager = self.analyzer.stats_manager
+        recent = stats_manager.get_recent_stats()
+        if recent["games"] >= 1:
+            embed.add_field(name="最近の傾向", value=stats_manager.format_recent_team_rates(recent), inline=False)
+        
         await ctx.send(embed=embed)
     
     @balance.command(name="roles")
-    async def show_role_win_rates(self, ctx):
+    async def show_role_win_rates(self, ctx, scope: str = "global", days: Optional[int] = None):
         """役職ごとの勝率を表示"""
         if not self.analyzer:
             await ctx.send("バランス分析システムが初期化されていません。")
             return
+        
+        await self._load_history()
+        filters = self._parse_scope(ctx, scope, days)
             
         # 役職勝率のグラフを生成
-        chart = self.analyzer.generate_win_rate_chart()
+        chart = self.analyzer.generate_win_rate_chart(**filters)
         if not chart:
             await ctx.send("十分なデータがありません。少なくとも10回以上プレイされた役職が必要です。")
             return
@@ -82,11 +115,11 @@ class BalanceCog(commands.Cog):
         file = discord.File(chart, filename="role_win_rates.png")
         
         # 役職勝率の分析結果を取得
-        analysis = self.analyzer.analyze_role_win_rates()
+        analysis = self.analyzer.analyze_role_win_rates(**filters)
         
         embed = discord.Embed(
             title="役職別勝率分析",
-            description="各役職の勝率と提案される調整",
+            description=f"各役職の勝率と提案される調整（{self._scope_label(scope, days)}）",
             color=discord.Color.blue()
         )
         
@@ -94,7 +127,8 @@ class BalanceCog(commands.Cog):
         win_rates_text = ""
         for role, rate in sorted(analysis["win_rates"].items(), key=lambda x: x[1], reverse=True):
             play_count = analysis["play_counts"][role]
-            win_rates_text += f"**{role}**: {rate:.1%} ({play_count}回プレイ)\n"
+            low, high = analysis["intervals"][role]
+            win_rates_text += f"**{role}**: {rate:.1%} [{low:.0%}〜{high:.0%}] ({play_count}回プレイ)\n"
             
         embed.add_field(name="役職勝率", value=win_rates_text or "データがありません", inline=False)
         
@@ -110,14 +144,17 @@ class BalanceCog(commands.Cog):
         await ctx.send(embed=embed, file=file)
     
     @balance.command(name="teams")
-    async def show_team_win_rates(self, ctx):
+    async def show_team_win_rates(self, ctx, scope: str = "global", days: Optional[int] = None):
         """陣営ごとの勝率を表示"""
         if not self.analyzer:
             await ctx.send("バランス分析システムが初期化されていません。")
             return
+        
+        await self._load_history()
+        filters = self._parse_scope(ctx, scope, days)
             
         # 陣営勝率のグラフを生成
-        chart = self.analyzer.generate_team_win_chart()
+        chart = self.analyzer.generate_team_win_chart(**filters)
         if not chart:
             await ctx.send("十分なデータがありません。")
             return
@@ -126,11 +163,11 @@ class BalanceCog(commands.Cog):
         file = discord.File(chart, filename="team_win_rates.png")
         
         # 陣営バランスの分析結果を取得
-        analysis = self.analyzer.analyze_team_balance()
+        analysis = self.analyzer.analyze_team_balance(**filters)
         
         embed = discord.Embed(
             title="陣営別勝率分析",
-            description=f"全{analysis['total_games']}ゲームの陣営別勝率",
+            description=f"{self._scope_label(scope, days)}の全{analysis['total_games']}ゲームの陣営別勝率",
             color=discord.Color.blue()
         )
         
@@ -138,7 +175,8 @@ class BalanceCog(commands.Cog):
         win_rates_text = ""
         for team, rate in sorted(analysis["win_rates"].items(), key=lambda x: x[1], reverse=True):
             wins = analysis["team_wins"][team]
-            win_rates_text += f"**{team}**: {rate:.1%} ({wins}勝)\n"
+            low, high = analysis["intervals"][team]
+            win_rates_text += f"**{team}**: {rate:.1%} [{low:.0%}〜{high:.0%}] ({wins}勝)\n"
             
         embed.add_field(name="陣営勝率", value=win_rates_text or "データがありません", inline=False)
         
@@ -163,12 +201,52 @@ class BalanceCog(commands.Cog):
         embed.set_image(url="attachment://team_win_rates.png")
         await ctx.send(embed=embed, file=file)
     
+    @balance.command(name="players")
+    async def show_player_count_win_rates(self, ctx, scope: str = "global", days: Optional[int] = None):
+        """人数ごとの陣営勝率を表示"""
+        if not self.analyzer:
+            await ctx.send("バランス分析システムが初期化されていません。")
+            return
+        
+        await self._load_history()
+        filters = self._parse_scope(ctx, scope, days)
+        by_count = self.analyzer.analyze_player_counts(**filters)
+        if not by_count:
+            await ctx.send("十分なデータがありません。")
+            return
+        
+        embed = discord.Embed(
+            title="人数別陣営勝率",
+            description=f"{self._scope_label(scope, days)}の人数ごとの陣営勝率",
+            color=discord.Color.blue()
+        )
+        
+        lines = []
+        for count, rates in sorted(by_count.items()):
+            games = next(iter(rates.values()))["games"] if rates else 0
+            parts = [f"{team} {data['rate']:.0%}" for team, data in rates.items() if data["wins"]]
+            lines.append(f"**{count}人** ({games}ゲーム): " + " / ".join(parts))
+        embed.add_field(name="勝率", value="\n".join(lines)[:1024], inline=False)
+        
+        # サーバー指定時は全体との比較も表示
+        if scope == "server":
+            comparison = self.analyzer.compare_with_global(ctx.guild.id, days=days)
+            compare_text = "\n".join(
+                f"**{team}**: {data['rate']:.1%}（全体 {comparison['global'].get(team, {}).get('rate', 0):.1%}）"
+                for team, data in comparison["guild"].items() if data["wins"]
+            )
+            embed.add_field(name="全体との比較", value=compare_text or "データがありません", inline=False)
+        
+        await ctx.send(embed=embed)
+    
     @balance.command(name="suggest")
     async def suggest_balance_adjustments(self, ctx):
         """バランス調整の提案を表示"""
         if not self.analyzer:
             await ctx.send("バランス分析システムが初期化されていません。")
             return
+        
+        await self._load_history()
             
         # バランス調整の提案を取得
         suggestions = self.analyzer.suggest_role_adjustments()
@@ -231,19 +309,13 @@ class BalanceCog(commands.Cog):
             return
             
         # 設定ファイルのパス
-        import os
-        role_params_path = "data/role_parameters.json"
+        config_service = get_config_service()
+        role_params_path = config_service.role_parameters_path()
         
-        # パラメータファイルの読み込み
+        # パラメータファイルの読み込み（設定サービスのキャッシュを使用）
         try:
-            if os.path.exists(role_params_path):
-                with open(role_params_path, "r", encoding="utf-8") as f:
-                    role_params = json.load(f)
-            else:
-                # ファイルがない場合は新規作成
-                role_params = {}
-                os.makedirs(os.path.dirname(role_params_path), exist_ok=True)
-        except (json.JSONDecodeError, FileNotFoundError):
+            role_params = config_service.read_json(role_params_path, {})
+        except json.JSONDecodeError:
             role_params = {}
         
         # 役職のパラメータがなければ初期化
@@ -261,8 +333,7 @@ class BalanceCog(commands.Cog):
             return
         
         # パラメータを保存
-        with open(role_params_path, "w", encoding="utf-8") as f:
-            json.dump(role_params, f, ensure_ascii=False, indent=2)
+        config_service.write_json(role_params_path, role_params)
         
         # 調整内容を表示
         embed = discord.Embed(
@@ -383,6 +454,7 @@ class BalanceCog(commands.Cog):
             return
             
         await ctx.send("バランスレポートを生成中...")
+        await self._load_history()
         
         # 役職勝率のグラフ
         role_chart = self.analyzer.generate_win_rate_chart()
@@ -9,6 +9,9 @@ import os
 from discord import app_commands
 from typing import Optional, List, Dict, Any, Union
 from models.suggestion import Suggestion, SuggestionManager
+from utils.logger import get_logger
+
+logger = get_logger("community")
 
 class SuggestionView(discord.ui.View):
     """提案表示用ビュー"""
@@ -182,7 +185,7 @@ class CommunityCog(commands.Cog):
     @commands.Cog.listener()
     async def on_ready(self):
         """Cogの準備完了時に呼ばれる"""
-        print(f"{self.__class__.__name__} Cog is ready.")
+        logger.info("Cog is ready", cog=self.__class__.__name__)
         
     @commands.group(name="suggest", invoke_without_command=True)
     async def suggest(self, ctx):
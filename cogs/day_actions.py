@@ -4,7 +4,7 @@
 """
 import discord
 from discord.ext import commands
-from utils.embed_creator import create_game_status_embed
+from utils.embed_creator import create_game_status_embed, alive_mentions
 from utils.config import GameConfig, EmbedColors
 
 class DayActionsCog(commands.Cog):
@@ -22,41 +22,34 @@ class DayActionsCog(commands.Cog):
         embed = create_game_status_embed(game, "day")
         
         # 生存プレイヤー一覧
-        alive_players = game.get_alive_players()
-        if alive_players:
-            players_mention = " ".join([f"<@{p.user_id}>" for p in alive_players])
+        players_mention = alive_mentions(game)
+        if players_mention:
             embed.add_field(name="生存者へのメンション", value=players_mention, inline=False)
         
         await channel.send(embed=embed)
         
+        # 昼の開始時の役職の処理
+        game_manager = self.bot.get_cog("GameManagementCog")
+        if game_manager:
+            await game_manager.send_hook_results(game, game.run_hook("on_day_start"))
+        
         # 朝の通知メッセージ
         day_msg = f"☀️ 第{game.day_count}日の朝になりました。生存者は議論を始めてください。\n"
         day_msg += "投票フェーズまで残り時間: "
         
-        # 制限時間を設定
-        async def update_timer(remaining):
-            if remaining % 60 == 0 and remaining > 0:
-                minutes = remaining // 60
-                await channel.send(f"☀️ 議論時間: 残り {minutes}分")
-        
-        async def timer_complete():
-            if game.phase == "day":
-                # 次のフェーズへ
-                game.next_phase()
-                
-                # 投票フェーズを開始
-                from cogs.voting import VotingCog
-                voting_cog = self.bot.get_cog("VotingCog")
-                if voting_cog:
-                    await voting_cog.start_voting_phase(channel, game)
-        
         # 議論時間のお知らせ
         minutes = GameConfig.DAY_PHASE_TIME // 60
         day_msg += f"{minutes}分"
         await channel.send(day_msg)
         
-        # タイマー開始
-        await game.start_timer(GameConfig.DAY_PHASE_TIME, update_timer, timer_complete)
+        # タイマー開始（期限切れはアクターが投票フェーズへ進める）
+        game.start_timer(GameConfig.DAY_PHASE_TIME)
+    
+    async def announce_day_time(self, channel, game, remaining):
+        """議論時間の残りをアナウンス"""
+        if remaining % 60 == 0 and remaining > 0:
+            minutes = remaining // 60
+            await channel.send(f"☀️ 議論時間: 残り {minutes}分")
 
 async def setup(bot):
     """Cogをbotに追加"""
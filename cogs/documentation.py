@@ -3,21 +3,54 @@
 """
 import discord
 from discord.ext import commands
+import asyncio
 import io
 import os
 from typing import Optional
 
+from utils.doc_index import DocIndex
+from utils.logger import get_logger
+
+logger = get_logger("documentation")
+
+# ドキュメントの更新を確認する間隔（秒）
+DOC_REFRESH_INTERVAL = 60
+
 class DocumentationCog(commands.Cog):
     """ドキュメントを管理するコグ"""
     
     def __init__(self, bot):
         self.bot = bot
         self.docs_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "docs")
+        # 読み込み時に1度だけ解析し、以降のコマンドはメモリ上の索引だけを参照する
+        self.index = DocIndex(self.docs_path)
+        self.refresh_task = None
+    
+    async def cog_load(self):
+        """Cogロード時にドキュメント更新の監視を開始"""
+        self.refresh_task = asyncio.create_task(self._refresh_loop())
+    
+    async def cog_unload(self):
+        """Cogアンロード時に監視を停止"""
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+    
+    async def _refresh_loop(self):
+        """ドキュメントの更新時刻を定期的に確認し、変更があれば索引を再構築"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(DOC_REFRESH_INTERVAL)
+            try:
+                if await loop.run_in_executor(None, self.index.refresh):
+                    logger.info("Rebuilt documentation index", sections=len(self.index.sections))
+            except Exception as e:
+                logger.error("Documentation index refresh failed", error=str(e))
     
     @commands.Cog.listener()
     async def on_ready(self):
         """Cogの準備完了時に呼ばれる"""
-        print(f"{self.__class__.__name__} Cog is ready.")
+        logger.info("Cog is ready", cog=self.__class__.__name__)
     
     @commands.group(name="docs", invoke_without_command=True)
     async def docs(self, ctx):
@@ -40,6 +73,12 @@ class DocumentationCog(commands.Cog):
             inline=False
         )
         
+        embed.add_field(
+            name="検索",
+            value=f"`{ctx.prefix}docs search <キーワード>` - ドキュメント全体を検索",
+            inline=False
+        )
+        
         embed.add_field(
             name="コマンドリスト",
             value=f"`{ctx.prefix}docs commands` - 使用可能なコマンド一覧を表示",
@@ -57,43 +96,34 @@ class DocumentationCog(commands.Cog):
     @docs.command(name="guide")
     async def show_user_guide(self, ctx, topic: Optional[str] = None):
         """ユーザーガイドを表示"""
-        guide_path = os.path.join(self.docs_path, "user_guide.md")
+        guide = self.index.get("guide")
         
-        if not os.path.exists(guide_path):
+        if not guide:
             await ctx.send("ユーザーガイドが見つかりません。")
             return
             
-        with open(guide_path, "r", encoding="utf-8") as f:
-            guide_content = f.read()
-            
         # トピック指定がある場合、該当部分を抽出
         if topic:
-            sections = self._extract_sections(guide_content)
+            section = guide.find_section(topic)
             
-            topic_lower = topic.lower()
-            matching_sections = [s for s in sections if topic_lower in s["title"].lower()]
-            
-            if not matching_sections:
+            if not section:
                 await ctx.send(f"トピック `{topic}` に関する情報が見つかりません。")
                 return
-                
-            # 最も関連度の高いセクションを選択
-            section = matching_sections[0]
             
             embed = discord.Embed(
-                title=section["title"],
-                description=section["content"][:4000] if len(section["content"]) > 4000 else section["content"],
+                title=section.title,
+                description=section.content[:4000],
                 color=discord.Color.blue()
             )
             
-            if len(section["content"]) > 4000:
+            if len(section.content) > 4000:
                 embed.set_footer(text="内容が長すぎるため、一部省略されています。完全な内容を見るには !docs download guide を使用してください。")
                 
             await ctx.send(embed=embed)
             return
             
         # トピック指定がない場合、目次を表示
-        toc = self._extract_toc(guide_content)
+        toc = guide.toc
         
         embed = discord.Embed(
             title="人狼Bot ユーザーガイド",
@@ -110,43 +140,34 @@ class DocumentationCog(commands.Cog):
     @docs.command(name="api")
     async def show_api_docs(self, ctx, topic: Optional[str] = None):
         """API ドキュメントを表示"""
-        api_path = os.path.join(self.docs_path, "api_reference.md")
+        api = self.index.get("api")
         
-        if not os.path.exists(api_path):
+        if not api:
             await ctx.send("API リファレンスが見つかりません。")
             return
             
-        with open(api_path, "r", encoding="utf-8") as f:
-            api_content = f.read()
-            
         # トピック指定がある場合、該当部分を抽出
         if topic:
-            sections = self._extract_sections(api_content)
+            section = api.find_section(topic)
             
-            topic_lower = topic.lower()
-            matching_sections = [s for s in sections if topic_lower in s["title"].lower()]
-            
-            if not matching_sections:
+            if not section:
                 await ctx.send(f"トピック `{topic}` に関するAPIドキュメントが見つかりません。")
                 return
-                
-            # 最も関連度の高いセクションを選択
-            section = matching_sections[0]
             
             embed = discord.Embed(
-                title=section["title"],
-                description=section["content"][:4000] if len(section["content"]) > 4000 else section["content"],
+                title=section.title,
+                description=section.content[:4000],
                 color=discord.Color.blue()
             )
             
-            if len(section["content"]) > 4000:
+            if len(section.content) > 4000:
                 embed.set_footer(text=f"内容が長すぎるため、一部省略されています。完全な内容を見るには {ctx.prefix}docs download api を使用してください。")
                 
             await ctx.send(embed=embed)
             return
             
         # トピック指定がない場合、目次を表示
-        toc = self._extract_toc(api_content)
+        toc = api.toc
         
         embed = discord.Embed(
             title="人狼Bot API リファレンス",
@@ -195,96 +216,55 @@ class DocumentationCog(commands.Cog):
         embed.set_footer(text=f"各コマンドの詳細は {ctx.prefix}help [コマンド名] で確認できます。")
         await ctx.send(embed=embed)
     
+    @docs.command(name="search")
+    async def search_docs(self, ctx, *, query: str):
+        """ドキュメント全体をキーワードで検索"""
+        results = self.index.search(query, limit=5)
+        
+        if not results:
+            await ctx.send(f"`{query}` に一致するドキュメントが見つかりません。")
+            return
+        
+        doc_names = {"guide": "ユーザーガイド", "api": "API リファレンス",
+                     "composer": "役職構成ガイド", "composer_dev": "役職構成 開発者向け"}
+        
+        embed = discord.Embed(
+            title=f"ドキュメント検索: {query}",
+            description=f"{len(results)}件のセクションが見つかりました。",
+            color=discord.Color.blue()
+        )
+        
+        for result in results:
+            embed.add_field(
+                name=f"{doc_names.get(result.doc, result.doc)} › {result.title}",
+                value=result.snippet[:1024],
+                inline=False
+            )
+        
+        embed.set_footer(text=f"セクションを表示するには {ctx.prefix}docs guide [トピック] / {ctx.prefix}docs api [トピック] を使用してください。")
+        await ctx.send(embed=embed)
+    
     @docs.command(name="download")
     async def download_docs(self, ctx, doc_type: str = "guide"):
         """ドキュメントをダウンロードする"""
         if doc_type.lower() == "guide":
-            doc_path = os.path.join(self.docs_path, "user_guide.md")
-            file_name = "user_guide.md"
             title = "ユーザーガイド"
         elif doc_type.lower() == "api":
-            doc_path = os.path.join(self.docs_path, "api_reference.md")
-            file_name = "api_reference.md"
             title = "API リファレンス"
         else:
             await ctx.send(f"ドキュメントタイプ `{doc_type}` は無効です。`guide` または `api` を指定してください。")
             return
-            
-        if not os.path.exists(doc_path):
+        
+        doc = self.index.get(doc_type.lower())
+        if not doc:
             await ctx.send(f"{title}が見つかりません。")
             return
             
-        with open(doc_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
         # ファイルを送信
-        buffer = io.BytesIO(content.encode('utf-8'))
-        file = discord.File(buffer, filename=file_name)
+        buffer = io.BytesIO(doc.content.encode('utf-8'))
+        file = discord.File(buffer, filename=os.path.basename(doc.path))
         
         await ctx.send(f"{title}ドキュメント:", file=file)
-    
-    def _extract_sections(self, content):
-        """マークダウンからセクションを抽出"""
-        sections = []
-        lines = content.split('\n')
-        
-        current_section = None
-        current_content = []
-        
-        for line in lines:
-            if line.startswith('# '):
-                # 新しいセクションが始まったら、前のセクションを保存
-                if current_section:
-                    sections.append({
-                        "title": current_section,
-                        "content": '\n'.join(current_content).strip()
-                    })
-                    
-                current_section = line[2:].strip()
-                current_content = []
-            elif line.startswith('## '):
-                # サブセクションも新しいセクションとして扱う
-                if current_section:
-                    sections.append({
-                        "title": current_section,
-                        "content": '\n'.join(current_content).strip()
-                    })
-                    
-                current_section = line[3:].strip()
-                current_content = []
-            else:
-                if current_section:
-                    current_content.append(line)
-        
-        # 最後のセクションを保存
-        if current_section:
-            sections.append({
-                "title": current_section,
-                "content": '\n'.join(current_content).strip()
-            })
-            
-        return sections
-    
-    def _extract_toc(self, content):
-        """マークダウンから目次を抽出"""
-        sections = self._extract_sections(content)
-        toc = []
-        
-        for section in sections:
-            # 各セクションの最初の段落を要約として使用
-            paragraphs = section["content"].split('\n\n')
-            summary = paragraphs[0] if paragraphs else "説明なし"
-            
-            # 要約が長すぎる場合は切り詰める
-            if len(summary) > 100:
-                summary = summary[:97] + "..."
-                
-            toc.append({
-                "title": section["title"],
-                "summary": summary
-            })
-            
-        return toc
 
 async def setup(bot):
     await bot.add_cog(DocumentationCog(bot))
@@ -8,6 +8,9 @@ import datetime
 from models.feedback import Feedback, FeedbackManager
 from utils.embed_creator import EmbedCreator
 from utils.validators import is_admin
+from utils.logger import get_logger
+
+logger = get_logger("feedback")
 
 
 class FeedbackView(discord.ui.View):
@@ -263,7 +266,7 @@ class FeedbackConfirmView(discord.ui.View):
                         
                         await admin_channel.send(embed=embed)
             except Exception as e:
-                print(f"管理者通知エラー: {e}")
+                logger.error("管理者通知エラー", error=str(e))
             
             self.parent_view.stop()
         else:
@@ -586,9 +589,9 @@ class Feedback(commands.Cog):
                     try:
                         await user.send(embed=embed)
                     except discord.Forbidden:
-                        print(f"ユーザー {user.id} にDMを送信できませんでした。")
+                        logger.info("ユーザーにDMを送信できませんでした", user=user.id, feedback_id=feedback_id)
             except Exception as e:
-                print(f"ユーザー通知エラー: {e}")
+                logger.error("ユーザー通知エラー", feedback_id=feedback_id, error=str(e))
         else:
             await ctx.send("フィードバックの保存中にエラーが発生しました。", ephemeral=True)
     
@@ -635,9 +638,9 @@ class Feedback(commands.Cog):
                         try:
                             await user.send(embed=embed)
                         except discord.Forbidden:
-                            print(f"ユーザー {user.id} にDMを送信できませんでした。")
+                            logger.info("ユーザーにDMを送信できませんでした", user=user.id, feedback_id=feedback_id)
                 except Exception as e:
-                    print(f"ユーザー通知エラー: {e}")
+                    logger.error("ユーザー通知エラー", feedback_id=feedback_id, error=str(e))
             else:
                 await ctx.send("フィードバックの保存中にエラーが発生しました。", ephemeral=True)
         else:
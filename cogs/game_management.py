@@ -2,28 +2,127 @@
 ゲーム管理コグ
 ゲームの開始、参加、開始、キャンセルなどのコマンドを提供
 """
+import asyncio
+import time
 import discord
 from discord.ext import commands
 from discord import app_commands
 from models.game import Game
-from utils.embed_creator import create_base_embed, create_game_status_embed, create_role_embed, create_help_embed
+from utils.embed_creator import create_base_embed, create_game_status_embed, create_role_embed, create_help_embed, player_list_text
 from utils.validators import is_guild_channel, is_game_owner, is_admin
 from utils.config import EmbedColors
+from utils import metrics
+from utils.game_actor import GameActor, BEGIN
+from utils.fallback_dm import get_dm_fallback
+from utils.logger import get_logger
+
+logger = get_logger("game_management")
 
 class GameManagementCog(commands.Cog):
     """ゲーム管理コマンドのCog"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.games = {}  # サーバーごとのゲーム情報 {guild_id: Game}
+        self.games = {}  # チャンネルごとのゲーム情報 {(guild_id, channel_id): Game}
+        self.guild_games = {}  # サーバーごとの進行中ゲーム {guild_id: {(guild_id, channel_id), ...}}
+        self.player_games = {}  # プレイヤーが参加中のゲーム {user_id: (guild_id, channel_id)}
+        
+        # 霊界チャットのカテゴリー・チャンネルのキャッシュ（使うときに存在を確認する）
+        self.dead_chat_categories = {}  # {guild_id: category_id}
+        self.dead_chat_channels = {}  # {(guild_id, game_channel_id): dead_chat_channel_id}
+    
+    # =================== ゲームの登録と検索 ===================
+    
+    def register_game(self, game):
+        """ゲームを登録"""
+        key = game.key
+        previous = self.games.get(key)
+        if previous is not None:
+            self.remove_game(previous)
+        self.games[key] = game
+        self.guild_games.setdefault(key[0], set()).add(key)
+        if game.actor is None:
+            game.actor = GameActor(game, self.bot)
+        game.actor.start()
+        for user_id in game.players:
+            self.player_games[user_id] = key
+    
+    def remove_game(self, game):
+        """ゲームの登録を解除（参加者の対応も削除）"""
+        key = game.key
+        if self.games.get(key) is not game:
+            return
+        del self.games[key]
+        # 解除した時刻（メモリリーク検出の猶予期間の起点）
+        game.finished_at = time.monotonic()
+        if game.actor:
+            game.actor.stop()
+        keys = self.guild_games.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.guild_games[key[0]]
+        for user_id in game.players:
+            if self.player_games.get(user_id) == key:
+                del self.player_games[user_id]
+        
+        # DMの代わりに貸し出したチャンネルをプールに戻す
+        dm_fallback = get_dm_fallback(self.bot)
+        guild = self.bot.get_guild(int(key[0]))
+        if guild and dm_fallback.has_leases(key):
+            asyncio.create_task(dm_fallback.release_game(guild, key))
+    
+    def add_player_to_game(self, game, user_id, name):
+        """ゲームにプレイヤーを追加し、プレイヤー→ゲームの対応を記録"""
+        player = game.add_player(user_id, name)
+        if player:
+            self.player_games[str(user_id)] = game.key
+        return player
     
-    def is_game_active(self, guild_id):
-        """サーバーでゲームが進行中かどうか確認"""
-        return str(guild_id) in self.games and self.games[str(guild_id)].phase != "finished"
+    def is_game_active(self, guild_id, channel_id):
+        """チャンネルでゲームが進行中かどうか確認"""
+        game = self.get_game(guild_id, channel_id)
+        return game is not None and game.phase != "finished"
     
-    def get_game(self, guild_id):
-        """サーバーのゲームを取得"""
-        return self.games.get(str(guild_id), None)
+    def get_game(self, guild_id, channel_id):
+        """チャンネルのゲームを取得"""
+        return self.games.get((str(guild_id), str(channel_id)), None)
+    
+    def get_guild_games(self, guild_id):
+        """サーバーで進行中のゲーム一覧"""
+        keys = self.guild_games.get(str(guild_id), ())
+        return [self.games[key] for key in keys if self.games[key].phase != "finished"]
+    
+    def get_player_game(self, user_id):
+        """プレイヤーが参加中の進行中ゲームを取得"""
+        key = self.player_games.get(str(user_id))
+        game = self.games.get(key) if key else None
+        if game is None or game.phase == "finished":
+            return None
+        return game
+    
+    def resolve_game(self, ctx):
+        """
+        コマンドの文脈からゲームを特定
+        
+        サーバーではそのチャンネルのゲーム、なければ実行者の参加中のゲーム、
+        それもなければサーバーで唯一のゲームを返す。DMでは実行者の参加中のゲームを返す
+        """
+        if ctx.guild is None:
+            return self.get_player_game(ctx.author.id)
+        
+        game = self.get_game(ctx.guild.id, ctx.channel.id)
+        if game is not None and game.phase != "finished":
+            return game
+        
+        game = self.get_player_game(ctx.author.id)
+        if game is not None and str(game.guild_id) == str(ctx.guild.id):
+            return game
+        
+        guild_games = self.get_guild_games(ctx.guild.id)
+        if len(guild_games) == 1:
+            return guild_games[0]
+        return None
     
     @commands.command(name="werewolf_help")
     async def werewolf_help_command(self, ctx):
@@ -39,18 +138,27 @@ class GameManagementCog(commands.Cog):
             await ctx.send("このコマンドはサーバーのチャンネルでのみ使用できます。")
             return
         
-        # 既にゲームが進行中かチェック
-        if self.is_game_active(ctx.guild.id):
-            await ctx.send("既にゲームが進行中です。`!cancel` でキャンセルするか、ゲームの終了を待ってください。")
+        # このチャンネルで既にゲームが進行中かチェック
+        if self.is_game_active(ctx.guild.id, ctx.channel.id):
+            await ctx.send("このチャンネルでは既にゲームが進行中です。`!cancel` でキャンセルするか、ゲームの終了を待ってください。")
+            return
+        
+        # 開始者が別のゲームに参加中かチェック
+        other_game = self.get_player_game(ctx.author.id)
+        if other_game:
+            await ctx.send(f"あなたは既に <#{other_game.channel_id}> のゲームに参加しています。")
             return
         
         # 新しいゲームを作成
         game = Game(ctx.guild.id, ctx.channel.id, ctx.author.id)
         game.bot = self.bot  # Botインスタンスを設定
-        self.games[str(ctx.guild.id)] = game
+        self.register_game(game)
         
         # 開始者を自動的に参加者として追加
-        game.add_player(ctx.author.id, ctx.author.display_name)
+        self.add_player_to_game(game, ctx.author.id, ctx.author.display_name)
+        
+        # 募集中にDM代替チャンネルのプールを補充しておく
+        asyncio.create_task(get_dm_fallback(self.bot).warm_pool(ctx.guild))
         
         # 開始メッセージを送信
         embed = create_game_status_embed(game, "waiting")
@@ -68,11 +176,11 @@ class GameManagementCog(commands.Cog):
             return
         
         # ゲームが募集中かチェック
-        if not self.is_game_active(ctx.guild.id):
-            await ctx.send("現在募集中のゲームがありません。`!start` で新しいゲームを開始してください。")
+        if not self.is_game_active(ctx.guild.id, ctx.channel.id):
+            await ctx.send("このチャンネルで募集中のゲームがありません。`!start` で新しいゲームを開始してください。")
             return
         
-        game = self.get_game(ctx.guild.id)
+        game = self.get_game(ctx.guild.id, ctx.channel.id)
         
         if game.phase != "waiting":
             await ctx.send("ゲームはすでに開始されています。次のゲームをお待ちください。")
@@ -83,13 +191,19 @@ class GameManagementCog(commands.Cog):
             await ctx.send("あなたはすでにこのゲームに参加しています。")
             return
         
+        # 別のゲームに参加中かチェック
+        other_game = self.get_player_game(ctx.author.id)
+        if other_game:
+            await ctx.send(f"あなたは既に <#{other_game.channel_id}> のゲームに参加しています。")
+            return
+        
         # 参加者上限チェック
         if len(game.players) >= 12:
             await ctx.send("参加者が上限（12人）に達しています。")
             return
         
         # プレイヤーを追加
-        player = game.add_player(ctx.author.id, ctx.author.display_name)
+        player = self.add_player_to_game(game, ctx.author.id, ctx.author.display_name)
         
         if player:
             # 参加メッセージを送信
@@ -101,8 +215,7 @@ class GameManagementCog(commands.Cog):
             embed.add_field(name="現在の参加者数", value=f"{len(game.players)}/12", inline=False)
             
             # 参加者一覧を表示
-            player_list = "\n".join([f"- {p.name}" for p in game.players.values()])
-            embed.add_field(name="参加者一覧", value=player_list, inline=False)
+            embed.add_field(name="参加者一覧", value=player_list_text(game), inline=False)
             
             await ctx.send(embed=embed)
         else:
@@ -150,18 +263,31 @@ class GameManagementCog(commands.Cog):
         start_msg = await ctx.send(embed=embed)
         
         # 各プレイヤーに役職をDMで通知
+        dm_fallback = get_dm_fallback(self.bot)
+        dm_fallback.record_game_size(ctx.guild.id, len(game.players))
         for player in game.players.values():
             member = ctx.guild.get_member(int(player.user_id))
             if member:
+                embed = create_role_embed(player)
                 try:
-                    embed = create_role_embed(player)
                     await member.send(embed=embed)
+                    metrics.record_dm(True)
+                    dm_fallback.record_dm_result(ctx.guild.id, True)
                 except discord.Forbidden:
-                    # DMが送れない場合
-                    await ctx.send(f"{member.mention} にDMを送信できませんでした。プライバシー設定を確認してください。")
-        
-        # 夜のフェーズを開始
-        await self.start_night_phase(ctx, game)
+                    # DMが送れない場合はプールから貸し出したチャンネルで代替する
+                    metrics.record_dm(False)
+                    dm_fallback.record_dm_result(ctx.guild.id, False)
+                    success, message = await dm_fallback.send_fallback(member, embed=embed, game_key=game.key)
+                    if success:
+                        await ctx.send(f"{member.mention} にDMを送信できなかったため、{message.channel.mention} に送信しました。")
+                    else:
+                        await ctx.send(f"{member.mention} にDMを送信できませんでした。プライバシー設定を確認してください。")
+        
+        # ゲーム開始時の役職の処理（共有者・猫又などの追加情報）
+        await self.send_hook_results(game, game.run_hook("on_game_start"))
+        
+        # 夜のフェーズを開始（以降のフェーズ進行はゲームのアクターが行う）
+        game.actor.post(BEGIN)
     
     @commands.command(name="cancel")
     async def cancel_game(self, ctx):
@@ -174,19 +300,18 @@ class GameManagementCog(commands.Cog):
             await ctx.send("このコマンドはゲーム開始者または管理者のみが使用できます。")
             return
         
-        if not self.is_game_active(ctx.guild.id):
+        # ゲームをキャンセル
+        game = result if is_owner else self.resolve_game(ctx)
+        if not game:
             await ctx.send("現在進行中のゲームがありません。")
             return
         
-        # ゲームをキャンセル
-        game = self.get_game(ctx.guild.id)
-        
         # タイマーをキャンセル
         game.cancel_timer()
         
         # ゲームを終了
         game.phase = "finished"
-        del self.games[str(ctx.guild.id)]
+        self.remove_game(game)
         
         embed = create_base_embed(
             title="ゲームキャンセル",
@@ -204,11 +329,16 @@ class GameManagementCog(commands.Cog):
             return
         
         # ゲームが進行中かチェック
-        if not self.is_game_active(ctx.guild.id):
-            await ctx.send("現在進行中のゲームがありません。")
+        game = self.resolve_game(ctx)
+        if not game:
+            guild_games = self.get_guild_games(ctx.guild.id)
+            if guild_games:
+                channels = "\n".join(f"<#{g.channel_id}>" for g in guild_games)
+                await ctx.send(f"このチャンネルではゲームが進行していません。進行中のゲーム:\n{channels}")
+            else:
+                await ctx.send("現在進行中のゲームがありません。")
             return
         
-        game = self.get_game(ctx.guild.id)
         embed = create_game_status_embed(game, game.phase)
         
         if game.phase != "waiting":
@@ -220,129 +350,174 @@ class GameManagementCog(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    async def start_night_phase(self, ctx, game):
+    async def send_hook_results(self, game, results):
+        """役職フックが返したEmbedを各プレイヤーにDMで送信（届かない場合は代替チャンネル）"""
+        guild = self.bot.get_guild(int(game.guild_id))
+        if not guild:
+            return
+        dm_fallback = get_dm_fallback(self.bot)
+        for player, result in results:
+            if not isinstance(result, discord.Embed):
+                continue
+            member = guild.get_member(int(player.user_id))
+            if member:
+                await dm_fallback.send_to_player(member, embed=result, game_key=game.key)
+    
+    async def start_night_phase(self, channel, game):
         """夜のフェーズを開始"""
         from cogs.night_actions import NightActionsCog
         
         # 夜のフェーズメッセージを送信
         embed = create_game_status_embed(game, "night")
-        await ctx.send(embed=embed)
+        await channel.send(embed=embed)
         
         # 各プレイヤーに夜のアクション指示をDM
         night_cog = self.bot.get_cog("NightActionsCog")
         if night_cog:
             await night_cog.send_night_action_instructions(game)
         
-        # 制限時間を設定
-        from utils.config import GameConfig
-        
-        async def update_timer(remaining):
-            # 30秒ごとにアナウンス
-            if remaining % 30 == 0 and remaining > 0:
-                minutes = remaining // 60
-                seconds = remaining % 60
-                time_str = f"{minutes}分{seconds}秒" if minutes > 0 else f"{seconds}秒"
-                
-                channel = self.bot.get_channel(int(game.channel_id))
-                if channel:
-                    await channel.send(f"🌙 夜のフェーズ: 残り {time_str}")
+        # 夜の開始時の役職の処理（霊媒師の結果など）
+        await self.send_hook_results(game, game.run_hook("on_night_start"))
         
-        async def timer_complete():
+        # 制限時間を設定（期限切れはアクターが夜の終了処理を行う）
+        from utils.config import GameConfig
+        game.start_timer(GameConfig.NIGHT_PHASE_TIME)
+    
+    async def announce_night_time(self, game, remaining):
+        """夜のフェーズの残り時間をアナウンス"""
+        # 30秒ごとにアナウンス
+        if remaining % 30 == 0 and remaining > 0:
+            minutes = remaining // 60
+            seconds = remaining % 60
+            time_str = f"{minutes}分{seconds}秒" if minutes > 0 else f"{seconds}秒"
+            
             channel = self.bot.get_channel(int(game.channel_id))
-            if channel and game.phase == "night":
-                # 次の昼フェーズへ
-                game.next_phase()
-                
-                # 昼のフェーズを開始
-                from cogs.day_actions import DayActionsCog
-                day_cog = self.bot.get_cog("DayActionsCog")
-                if day_cog:
-                    await day_cog.start_day_phase(channel, game)
-        
-        # タイマー開始
-        await game.start_timer(GameConfig.NIGHT_PHASE_TIME, update_timer, timer_complete)
+            if channel:
+                await channel.send(f"🌙 夜のフェーズ: 残り {time_str}")
 
-    async def create_dead_chat_channel(self, guild, game):
-        """霊界チャットチャンネルを作成"""
-        try:
-            # カテゴリーを作成または取得
+    def _cached_channel(self, guild, cache, key, channel_type):
+        """キャッシュしたIDのチャンネルを取得（削除・型違いの場合はキャッシュから外してNone）"""
+        channel_id = cache.get(key)
+        if channel_id is None:
+            return None
+        channel = guild.get_channel(channel_id)
+        if not isinstance(channel, channel_type):
+            del cache[key]
+            return None
+        return channel
+    
+    async def _get_dead_chat_category(self, guild):
+        """霊界チャット用のカテゴリーを取得または作成"""
+        guild_id = str(guild.id)
+        category = self._cached_channel(guild, self.dead_chat_categories, guild_id, discord.CategoryChannel)
+        if category is None:
             category_name = "人狼ゲーム"
             category = discord.utils.get(guild.categories, name=category_name)
             if not category:
                 # カテゴリーが存在しない場合は作成
                 category = await guild.create_category(category_name)
+            self.dead_chat_categories[guild_id] = category.id
+        return category
+    
+    def _dead_chat_overwrites(self, guild):
+        """霊界チャットの初期の権限（死亡者の権限は含まない）"""
+        return {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),  # デフォルトでは非表示
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Botは閲覧可能
+        }
+    
+    async def create_dead_chat_channel(self, guild, game):
+        """霊界チャットチャンネルを作成"""
+        try:
+            category = await self._get_dead_chat_category(guild)
+            overwrites = self._dead_chat_overwrites(guild)
             
-            # 霊界チャンネル名
-            channel_name = "霊界チャット"
-            
-            # 既存の霊界チャンネルを検索
-            existing_channel = discord.utils.get(guild.text_channels, name=channel_name, category=category)
-            if existing_channel:
-                # 既存のチャンネル権限をリセット
-                await existing_channel.edit(sync_permissions=True)
-                game.dead_chat_channel_id = existing_channel.id
-                return existing_channel
+            # 同じゲームチャンネルで前回使った霊界チャンネルを再利用
+            key = (str(guild.id), str(game.channel_id))
+            channel = self._cached_channel(guild, self.dead_chat_channels, key, discord.TextChannel)
             
-            # チャンネル作成時の権限設定
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(read_messages=False),  # デフォルトでは非表示
-                guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Botは閲覧可能
-            }
+            if channel is None:
+                # 霊界チャンネル名（同じサーバーで並行するゲームと区別するため、ゲームのチャンネル名を付ける）
+                game_channel = guild.get_channel(int(game.channel_id))
+                channel_name = f"霊界-{game_channel.name}" if game_channel else f"霊界-{game.channel_id}"
+                channel = discord.utils.get(category.text_channels, name=channel_name)
+                
+                if channel is None:
+                    # チャンネル作成
+                    channel = await guild.create_text_channel(
+                        name=channel_name,
+                        category=category,
+                        overwrites=overwrites,
+                        topic=f"<#{game.channel_id}> のゲームで死亡したプレイヤー専用のチャット"
+                    )
+                    self.dead_chat_channels[key] = channel.id
+                    game.dead_chat_channel_id = channel.id
+                    
+                    # 初期メッセージ
+                    embed = create_base_embed(
+                        title="👻 霊界チャット",
+                        description="ここは死亡したプレイヤー専用のチャットです。自由に会話ができますが、生存者との交流はできません。",
+                        color=EmbedColors.WARNING
+                    )
+                    await channel.send(embed=embed)
+                    return channel
+                
+                self.dead_chat_channels[key] = channel.id
             
-            # チャンネル作成
-            channel = await guild.create_text_channel(
-                name=channel_name,
-                category=category,
-                overwrites=overwrites,
-                topic="死亡したプレイヤー専用のチャット"
-            )
+            # 前回のゲームの死亡者の権限が残っている場合だけ、まとめて初期状態に戻す
+            if set(channel.overwrites) != set(overwrites):
+                await channel.edit(overwrites=overwrites)
             
-            # チャンネルIDをゲームに保存
             game.dead_chat_channel_id = channel.id
-            
-            # 初期メッセージ
-            embed = create_base_embed(
-                title="👻 霊界チャット",
-                description="ここは死亡したプレイヤー専用のチャットです。自由に会話ができますが、生存者との交流はできません。",
-                color=EmbedColors.WARNING
-            )
-            await channel.send(embed=embed)
-            
             return channel
         except Exception as e:
-            print(f"霊界チャンネル作成エラー: {e}")
+            logger.error("霊界チャンネル作成エラー", guild=guild.id, game=game.channel_id, error=str(e))
             return None
     
-    async def update_dead_chat_permissions(self, guild, game, dead_player):
-        """死亡したプレイヤーに霊界チャットへのアクセス権を付与"""
+    async def update_dead_chat_permissions(self, guild, game, dead_players):
+        """
+        死亡したプレイヤーに霊界チャットへのアクセス権を付与
+        
+        同時に死亡した複数のプレイヤーは、1回の権限編集と1件の入室メッセージにまとめる
+        """
         if not hasattr(game, 'dead_chat_channel_id') or not game.dead_chat_channel_id:
             return False
         
+        if not isinstance(dead_players, (list, tuple, set)):
+            dead_players = [dead_players]
+        
         try:
             # チャンネルを取得
             channel = guild.get_channel(game.dead_chat_channel_id)
             if not channel:
                 return False
             
-            # メンバーを取得
-            member = guild.get_member(int(dead_player.user_id))
-            if not member:
+            # 権限を追加するメンバー
+            overwrites = dict(channel.overwrites)
+            members = []
+            for player in dead_players:
+                member = guild.get_member(int(player.user_id))
+                if member and member not in overwrites:
+                    overwrites[member] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+                    members.append(member)
+            
+            if not members:
                 return False
             
-            # 権限を設定
-            await channel.set_permissions(member, read_messages=True, send_messages=True)
+            # 権限をまとめて設定
+            await channel.edit(overwrites=overwrites)
             
             # 入室メッセージ
             embed = create_base_embed(
                 title="👻 新たな亡霊",
-                description=f"{member.mention} が霊界に参加しました。",
+                description=f"{'、'.join(member.mention for member in members)} が霊界に参加しました。",
                 color=EmbedColors.WARNING
             )
             await channel.send(embed=embed)
             
             return True
         except Exception as e:
-            print(f"霊界チャット権限更新エラー: {e}")
+            logger.error("霊界チャット権限更新エラー", guild=guild.id, game=game.channel_id, error=str(e))
             return False
             
 async def setup(bot):
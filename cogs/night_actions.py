@@ -5,9 +5,16 @@
 import discord
 import asyncio
 from discord.ext import commands
-from utils.embed_creator import create_night_action_embed, create_divination_result_embed, create_night_result_embed, create_base_embed
+from utils.embed_creator import create_night_action_embed, create_night_result_embed, create_base_embed
 from utils.validators import can_perform_night_action, is_valid_target, MentionConverter
 from utils.config import EmbedColors, GameConfig
+from utils import metrics
+from utils.game_actor import NIGHT_ACTION
+from utils.fallback_dm import get_dm_fallback, send_fallback_dm
+from utils.logger import get_logger
+from models.night_resolution import ATTACK, BLOCKED_GUARDED, CAUSE_ATTACK, CAUSE_DIVINATION
+
+logger = get_logger("night_actions")
 
 class NightActionsCog(commands.Cog):
     """夜のアクション処理Cog"""
@@ -44,72 +51,29 @@ class NightActionsCog(commands.Cog):
         target_player = target_result
         
         # 役職に応じたアクション処理
-        success_msg = None
+        if not player.role_instance:
+            # 役職インスタンスは assign_roles で全員に割り当てられるため、ここに来るのは不整合な状態のみ
+            logger.error("Player has no role instance", guild=game.guild_id, game=game.channel_id,
+                         user=player.user_id, role=str(player.role))
+            await ctx.send("役職情報が見つからないため、アクションを実行できません。")
+            return
         
-        if player.role_instance:
-            # 役職インスタンスを使って処理
-            success, message = await player.role_instance.execute_night_action(target)
-            if success:
-                success_msg = message
-                
-                # 人狼の場合、他の人狼にも通知
-                if player.is_werewolf():
-                    await self.notify_other_wolves(player, target_player)
-                    game.wolf_target = target
-                
-                # 占い師の場合、結果を表示
-                if player.role == "占い師":
-                    is_werewolf = target_player.is_werewolf()
-                    embed = create_divination_result_embed(target_player, is_werewolf)
-                    await ctx.send(embed=embed)
-                    success_msg = None  # 既に結果を表示したので成功メッセージは不要
-                
-                # 狩人の場合
-                if player.role == "狩人":
-                    game.protected_target = target
-                    player.last_protected = target
-            else:
-                await ctx.send(message)
-                return
-        else:
-            # 旧式の処理（役職インスタンスがない場合のフォールバック）
-            if player.role == "人狼":
-                # 人狼の襲撃
-                success_msg = f"{target_player.name} を襲撃対象に設定しました。"
-                game.wolf_target = target
-                
-                # 他の人狼にも通知
-                await self.notify_other_wolves(player, target_player)
-            elif player.role == "占い師":
-                # 占い師の占い
-                is_werewolf = target_player.is_werewolf()
-                
-                # 妖狐の占い死判定
-                if target_player.is_fox() and target_player.is_alive:
-                    target_player.kill()
-                    game.killed_by_divination = target
-                
-                # 占い結果を記録
-                player.divination_results[target] = is_werewolf
-                
-                # 占い結果を表示
-                embed = create_divination_result_embed(target_player, is_werewolf)
-                await ctx.send(embed=embed)
-                success_msg = None  # 既に結果を表示したので成功メッセージは不要
-            elif player.role == "狩人":
-                # 前回と同じ対象を選択できないチェック
-                if player.last_protected == target:
-                    await ctx.send("同じ対象を連続で護衛することはできません。")
-                    return
-                
-                # 狩人の護衛
-                success_msg = f"{target_player.name} を護衛対象に設定しました。"
-                game.protected_target = target
-                player.last_protected = target
-            else:
-                # その他の役職（村人など）
-                await ctx.send("あなたの役職には夜のアクションがありません。")
-                return
+        # 役職インスタンスを使って処理
+        success, message = await player.role_instance.execute_night_action(target)
+        if not success:
+            await ctx.send(message)
+            return
+        success_msg = message
+        
+        # 人狼の場合、他の人狼にも通知
+        if player.is_werewolf():
+            await self.notify_other_wolves(player, target_player)
+        
+        # 役職ごとの後処理（襲撃・護衛対象の反映、占い結果など）
+        result_embed = game.run_player_hook(player, "on_night_action", target_player)
+        if isinstance(result_embed, discord.Embed):
+            await ctx.send(embed=result_embed)
+            success_msg = None  # 既に結果を表示したので成功メッセージは不要
         
         # アクション実行済みフラグを設定
         player.night_action_target = target
@@ -124,8 +88,8 @@ class NightActionsCog(commands.Cog):
             )
             await ctx.send(embed=embed)
         
-        # すべてのプレイヤーがアクションを実行したかチェック
-        await self.check_all_actions_completed(game)
+        # すべてのプレイヤーがアクションを実行したかの判定はゲームのアクターが行う
+        game.actor.post(NIGHT_ACTION)
     
     async def notify_other_wolves(self, wolf_player, target_player):
         """他の人狼に襲撃対象を通知"""
@@ -149,7 +113,7 @@ class NightActionsCog(commands.Cog):
                         w.night_action_target = target_player.user_id
                         w.night_action_used = True
                 except Exception as e:
-                    print(f"他の人狼への通知エラー: {e}")
+                    logger.error("他の人狼への通知エラー", guild=game.guild_id, game=game.channel_id, error=str(e))
     
     async def check_all_actions_completed(self, game):
         """全プレイヤーのアクションが完了したかチェック"""
@@ -170,11 +134,11 @@ class NightActionsCog(commands.Cog):
                 # アクションが必要な役職か確認
                 needs_action = False
                 
-                if player.role == "人狼":
+                if player.is_werewolf():
                     # 人狼の場合、1人がアクションを実行すれば全員が実行したことになる
                     needs_action = not wolves_acted
-                elif player.role in ["占い師", "狩人"]:
-                    needs_action = True
+                elif player.role_instance:
+                    needs_action = player.role_instance.can_use_night_action()
                 
                 # アクションが必要なのに実行していない場合
                 if needs_action and not player.night_action_used:
@@ -182,21 +146,15 @@ class NightActionsCog(commands.Cog):
                     break
         
         if all_completed:
-            # 非同期で次のフェーズへ進める
-            # タイマーが実行中なら少し待ってからタイマーをキャンセル
-            if game.remaining_time > 0:
-                await asyncio.sleep(2)
-                game.cancel_timer()
-            
-            # 次のフェーズへ
+            # 次のフェーズへ（タイマーは next_phase でキャンセルされる）
             await self.end_night_phase(game)
         
         return all_completed
     
     async def end_night_phase(self, game):
         """夜のフェーズを終了し、結果を処理"""
-        # 夜のアクションを処理
-        game.process_night_actions()
+        # 夜のアクションを優先度順に一括で解決
+        result = game.process_night_actions()
         game.next_phase()
         
         # メインチャンネルへの結果通知
@@ -205,35 +163,46 @@ class NightActionsCog(commands.Cog):
             return
         
         # 結果の生成
-        killed_player = None
-        protected = False
-        
-        if game.last_killed:
-            killed_player = game.players[game.last_killed]
-        elif game.wolf_target and game.wolf_target == game.protected_target:
-            protected = True
+        attacked = result.deaths_by(CAUSE_ATTACK)
+        killed_player = game.players[attacked[0]] if attacked else None
+        protected = result.was_blocked(ATTACK, BLOCKED_GUARDED)
         
         # 結果表示
         embed = create_night_result_embed(killed_player, protected)
         await channel.send(embed=embed)
         
         # 占いによる妖狐の死亡を処理
-        if game.killed_by_divination:
-            fox_player = game.players[game.killed_by_divination]
+        for fox_id in result.deaths_by(CAUSE_DIVINATION):
+            fox_player = game.players[fox_id]
             fox_embed = discord.Embed(
                 title="🦊 妖狐の死亡",
                 description=f"{fox_player.name} が占いによって死亡しました。",
                 color=EmbedColors.ERROR
             )
             await channel.send(embed=fox_embed)
-            
-            # 霊界チャットの権限を更新
-            if hasattr(game, 'dead_chat_channel_id') and game.special_rules.dead_chat_enabled:
-                guild = self.bot.get_guild(int(game.guild_id))
-                if guild:
-                    game_manager = self.bot.get_cog("GameManagementCog")
-                    if game_manager:
-                        await game_manager.update_dead_chat_permissions(guild, game, fox_player)
+        
+        # 死亡の連鎖（猫又の道連れ・恋人や背徳者の後追い）
+        announcements = [message.text for message in result.messages if message.user_id is None]
+        if announcements:
+            await channel.send(embed=create_base_embed(
+                title="💀 夜の出来事",
+                description="\n".join(announcements),
+                color=EmbedColors.ERROR
+            ))
+        
+        # 襲撃されたときの役職の処理
+        game_manager = self.bot.get_cog("GameManagementCog")
+        if game_manager:
+            hook_results = [(game.players[player_id], game.run_player_hook(game.players[player_id], "on_killed"))
+                            for player_id in attacked]
+            await game_manager.send_hook_results(game, hook_results)
+        
+        # この夜に死亡したプレイヤーの霊界チャットの権限をまとめて更新
+        dead_players = [game.players[death.player_id] for death in result.deaths]
+        if dead_players and hasattr(game, 'dead_chat_channel_id') and game.special_rules.dead_chat_enabled:
+            guild = self.bot.get_guild(int(game.guild_id))
+            if guild and game_manager:
+                await game_manager.update_dead_chat_permissions(guild, game, dead_players)
         
         # ゲーム終了判定
         is_game_end, winning_team = game.check_game_end()
@@ -265,13 +234,16 @@ class NightActionsCog(commands.Cog):
                     try:
                         embed = create_night_action_embed(player)
                         await member.send(embed=embed)
+                        metrics.record_dm(True)
+                        get_dm_fallback(self.bot).record_dm_result(guild.id, True)
                     except discord.Forbidden:
-                        # DMが送れない場合は代替手段を試みる
-                        from utils.fallback_dm import send_fallback_dm
-                        await send_fallback_dm(self.bot, guild, member, embed)
+                        metrics.record_dm(False)
+                        get_dm_fallback(self.bot).record_dm_result(guild.id, False)
+                        # DMが送れない場合はプールから貸し出したチャンネルで代替する
+                        await send_fallback_dm(self.bot, guild, member, embed, game.key)
                         
                         # ログに記録
-                        print(f"Failed to send DM to {member.name}")
+                        logger.info("Failed to send DM, used fallback channel", guild=guild.id, game=game.channel_id, user=member.id)
 
 async def setup(bot):
     """Cogをbotに追加"""
@@ -5,10 +5,17 @@
 import discord
 from discord.ext import commands
 import json
+import copy
 import asyncio
-import traceback
 import os
 
+from utils.config import DEFAULT_SERVER_SETTINGS
+from utils.config_service import get_config_service
+from utils.logger import get_logger
+from utils.composition_rules import validate as validate_composition
+
+logger = get_logger("role_composer")
+
 class RoleComposerCog(commands.Cog):
     """役職構成をカスタマイズするコグ"""
     
@@ -217,14 +224,12 @@ class RoleComposerCog(commands.Cog):
             await ctx.send(f"役職の合計人数 ({total_players}) が指定したプレイヤー数 ({player_count}) と一致しません。")
             return
         
-        # 役職バランスチェック
-        role_balancer = self.bot.get_cog("RoleBalancer")
-        if role_balancer:
-            balance_check = role_balancer.check_balance(composition)
-            if not balance_check["balanced"]:
-                warning = "\n".join(balance_check["warnings"])
-                await ctx.send(f"役職バランスに問題があります:\n{warning}\n\nそれでも設定を続行する場合は `!compose force {player_count} ...` を使用してください。")
-                return
+        # 役職バランスチェック（共通のバリデータを使用）
+        balance_check = validate_composition(composition)
+        if not balance_check.valid:
+            warning = "\n".join(balance_check.errors + balance_check.warnings)
+            await ctx.send(f"役職バランスに問題があります:\n{warning}\n\nそれでも設定を続行する場合は `!compose force {player_count} ...` を使用してください。")
+            return
         
         # 成功メッセージを先に送信
         roles_text = "\n".join([f"- {role}: {count}人" for role, count in composition.items()])
@@ -272,13 +277,11 @@ class RoleComposerCog(commands.Cog):
         
         # 警告表示（強制設定なので実行はブロックしない）
         warnings = []
-        role_balancer = self.bot.get_cog("RoleBalancer")
-        if role_balancer:
-            balance_check = role_balancer.check_balance(composition)
-            if not balance_check["balanced"]:
-                warnings = balance_check["warnings"]
-                warning_text = "\n".join(warnings)
-                await ctx.send(f"⚠️ **警告**: 以下の問題がありますが、強制設定します。\n{warning_text}")
+        balance_check = validate_composition(composition)
+        if not balance_check.valid:
+            warnings = list(balance_check.errors + balance_check.warnings)
+            warning_text = "\n".join(warnings)
+            await ctx.send(f"⚠️ **警告**: 以下の問題がありますが、強制設定します。\n{warning_text}")
         
         # 成功メッセージを先に送信
         roles_text = "\n".join([f"- {role}: {count}人" for role, count in composition.items()])
@@ -351,11 +354,12 @@ class RoleComposerCog(commands.Cog):
             await ctx.send("RoleBalancerが見つかりません。")
             return
         
-        # 推奨構成を取得
-        recommended = role_balancer.get_recommended_composition(player_count)
-        if not recommended:
+        # 推奨構成を取得（上位の候補も表示する）
+        recommendations = await role_balancer.get_recommendations(player_count, k=3)
+        if not recommendations:
             await ctx.send(f"{player_count}人用の推奨構成が見つかりません。")
             return
+        recommended = recommendations[0][1]
         
         # 提案を表示
         embed = discord.Embed(
@@ -375,6 +379,14 @@ class RoleComposerCog(commands.Cog):
             inline=False
         )
         
+        # 他の候補
+        if len(recommendations) > 1:
+            alternatives = "\n".join(
+                ", ".join(f"{role}: {count}" for role, count in composition.items())
+                for _, composition in recommendations[1:]
+            )
+            embed.add_field(name="他の候補", value=alternatives, inline=False)
+        
         await ctx.send(embed=embed)
     
     # =================== ユーティリティ関数 ===================
@@ -390,24 +402,12 @@ class RoleComposerCog(commands.Cog):
             
             # 既存の設定を読み込む（存在しない場合はデフォルト設定を使用）
             try:
-                with open(config_path, "r", encoding="utf-8") as f:
-                    settings = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                settings = {
-                    "roles_config": {},
-                    "game_rules": {
-                        "no_first_night_kill": False,
-                        "lovers_enabled": False,
-                        "no_consecutive_guard": True,
-                        "random_tied_vote": False,
-                        "dead_chat_enabled": True
-                    },
-                    "timers": {
-                        "day": 300,
-                        "night": 90,
-                        "voting": 60
-                    }
-                }
+                settings = get_config_service().read_json(config_path)
+            except json.JSONDecodeError:
+                settings = None
+            if settings is None:
+                settings = copy.deepcopy(DEFAULT_SERVER_SETTINGS)
+                settings["roles_config"] = {}
             
             # roles_configを確保
             if "roles_config" not in settings:
@@ -418,14 +418,12 @@ class RoleComposerCog(commands.Cog):
                 settings["roles_config"][player_count] = composition
             
             # 設定をファイルに保存
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            get_config_service().write_json(config_path, settings)
             
             return True
-        except Exception as e:
+        except Exception:
             # エラーをログに出力するだけ
-            print(f"[COMPOSE] Error saving preset: {e}")
-            traceback.print_exc()
+            logger.exception("Error saving preset", guild=guild_id)
             return False
     
     async def _save_custom_composition(self, guild_id, player_count, composition):
@@ -439,24 +437,12 @@ class RoleComposerCog(commands.Cog):
             
             # 既存の設定を読み込む（存在しない場合はデフォルト設定を使用）
             try:
-                with open(config_path, "r", encoding="utf-8") as f:
-                    settings = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                settings = {
-                    "roles_config": {},
-                    "game_rules": {
-                        "no_first_night_kill": False,
-                        "lovers_enabled": False,
-                        "no_consecutive_guard": True,
-                        "random_tied_vote": False,
-                        "dead_chat_enabled": True
-                    },
-                    "timers": {
-                        "day": 300,
-                        "night": 90,
-                        "voting": 60
-                    }
-                }
+                settings = get_config_service().read_json(config_path)
+            except json.JSONDecodeError:
+                settings = None
+            if settings is None:
+                settings = copy.deepcopy(DEFAULT_SERVER_SETTINGS)
+                settings["roles_config"] = {}
             
             # roles_configを確保
             if "roles_config" not in settings:
@@ -466,14 +452,12 @@ class RoleComposerCog(commands.Cog):
             settings["roles_config"][str(player_count)] = composition
             
             # 設定をファイルに保存
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            get_config_service().write_json(config_path, settings)
             
             return True
-        except Exception as e:
+        except Exception:
             # エラーをログに出力するだけ
-            print(f"[COMPOSE] Error saving custom composition: {e}")
-            traceback.print_exc()
+            logger.exception("Error saving custom composition", guild=guild_id)
             return False
     
     async def _load_server_config(self, guild_id):
@@ -484,14 +468,11 @@ class RoleComposerCog(commands.Cog):
             
             # 設定を読み込む
             try:
-                with open(config_path, "r", encoding="utf-8") as f:
-                    settings = json.load(f)
-                return settings
-            except (FileNotFoundError, json.JSONDecodeError):
+                return get_config_service().read_json(config_path)
+            except json.JSONDecodeError:
                 return None
-        except Exception as e:
-            print(f"[COMPOSE] Error loading config: {e}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error loading config", guild=guild_id)
             return None
 
 # Bot起動時のCog登録
@@ -6,6 +6,8 @@ import discord
 from discord.ext import commands
 import random
 
+from utils.config_service import get_config_service
+
 class RulesManagerCog(commands.Cog):
     """特殊ルールを管理するコグ"""
     
@@ -128,12 +130,8 @@ class RulesManagerCog(commands.Cog):
     # ゲーム準備時に実行するメソッド（Game Managerから呼び出される）
     async def setup_special_rules(self, guild_id, game):
         """特殊ルールをゲームに適用する"""
-        db_manager = self.bot.get_cog("DatabaseManager")
-        if not db_manager:
-            return
-        
-        settings = await db_manager.get_server_settings(str(guild_id))
-        rule_settings = settings.get("game_rules", {})
+        # 実効設定をメモリから1回で取得（ファイルが更新された場合のみ再構築される）
+        rule_settings = get_config_service().effective(guild_id).game_rules
         
         # 特殊ルールオブジェクトを設定
         from models.special_rules import SpecialRules
@@ -113,6 +113,15 @@ class Stats(commands.Cog):
                     inline=False
                 )
             
+            # 最近の傾向（減衰付きの役職勝率）
+            recent = self.stats_manager.get_recent_stats(ctx.guild.id)
+            if recent["roles"]:
+                recent_text = [
+                    f"{role}: 勝率 {data['win_rate'] * 100:.1f}%（実効 {data['appearances']:.1f}回）"
+                    for role, data in sorted(recent["roles"].items(), key=lambda x: x[1]["appearances"], reverse=True)[:10]
+                ]
+                embed.add_field(name="最近の傾向", value="\n".join(recent_text), inline=False)
+            
             # グラフも準備
             role_chart = await self.stats_manager.generate_role_stats_chart(ctx.guild.id)
             
@@ -192,13 +201,17 @@ class Stats(commands.Cog):
     @stats.command(name="leaderboard", description="プレイヤーのランキングを表示します")
     async def leaderboard(self, ctx, category: str = "wins"):
         """プレイヤーのランキングを表示するコマンド"""
-        valid_categories = ["wins", "games", "survival", "winrate"]
+        valid_categories = ["wins", "games", "survival", "winrate", "rating"]
         
         if category not in valid_categories:
             categories_str = ", ".join(f"`{c}`" for c in valid_categories)
             await ctx.send(f"無効なカテゴリです。有効なカテゴリ: {categories_str}", ephemeral=True)
             return
         
+        if category == "rating":
+            await self._rating_leaderboard(ctx)
+            return
+        
         async with ctx.typing():
             # すべてのプレイヤー統計を取得
             player_stats = self.stats_manager._load_player_stats()
@@ -283,6 +296,52 @@ class Stats(commands.Cog):
                     )
             
             await ctx.send(embed=embed)
+    
+    async def _rating_leaderboard(self, ctx):
+        """レーティングのランキングを表示（索引から上位を取得するため全件のソートは不要）"""
+        guild_member_ids = [str(member.id) for member in ctx.guild.members]
+        top_players = self.stats_manager.get_rating_leaderboard(guild_member_ids, limit=10)
+        
+        if not top_players:
+            await ctx.send("このサーバーにはレーティングの記録がありません。", ephemeral=True)
+            return
+        
+        embed = self.embed_creator.create_info_embed(
+            title="プレイヤーランキング: レーティング",
+            description=f"サーバー: {ctx.guild.name} のランキング"
+        )
+        
+        rank_text = [f"{i+1}. {name}: {rating:.0f}" for i, (_, name, rating) in enumerate(top_players)]
+        embed.add_field(name="ランキング", value="\n".join(rank_text), inline=False)
+        
+        # 実行者の順位と陣営別レーティング
+        author_rating = self.stats_manager.ratings.get(ctx.author.id)
+        if author_rating:
+            author_rank = self.stats_manager.ratings.index.rank_of(str(ctx.author.id), set(guild_member_ids))
+            team_names = {"village": "村人陣営", "wolf": "人狼陣営", "fox": "妖狐陣営"}
+            team_text = " / ".join(
+                f"{team_names[team]} {rating:.0f}（{author_rating['games'][team]}戦）"
+                for team, rating in author_rating["ratings"].items()
+                if author_rating["games"][team] > 0
+            )
+            embed.add_field(
+                name="あなたの順位",
+                value=f"{author_rank}位: {author_rating['overall']:.0f}\n{team_text}",
+                inline=False
+            )
+        
+        await ctx.send(embed=embed)
+    
+    @stats.command(name="recompute", description="ゲームログからレーティングを再計算します (管理者のみ)")
+    @commands.has_permissions(administrator=True)
+    async def recompute_ratings(self, ctx):
+        """保存済みのゲームログ全体からレーティングを再計算するコマンド"""
+        async with ctx.typing():
+            loop = asyncio.get_running_loop()
+            ratings = await loop.run_in_executor(None, self.stats_manager.recompute_ratings)
+            count = self.stats_manager.install_ratings(ratings)
+        
+        await ctx.send(f"レーティングを再計算しました（{count}人）。", ephemeral=True)
 
 
 async def setup(bot):
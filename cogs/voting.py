@@ -4,11 +4,15 @@
 """
 import discord
 from discord.ext import commands
-from utils.embed_creator import create_base_embed, create_game_status_embed
+from utils.embed_creator import create_base_embed, create_game_status_embed, create_vote_embed, alive_mentions
 from utils.validators import is_guild_channel, MentionConverter
 from utils.config import GameConfig, EmbedColors
+from utils.game_actor import VOTE
+from utils.logger import get_logger
 from views.vote_view import VoteView
 
+logger = get_logger("voting")
+
 class VotingCog(commands.Cog):
     """投票処理Cog"""
     
@@ -30,12 +34,11 @@ class VotingCog(commands.Cog):
             return
         
         # ゲームが進行中かチェック
-        if not game_manager.is_game_active(ctx.guild.id):
+        game = game_manager.resolve_game(ctx)
+        if not game:
             await ctx.send("現在進行中のゲームがありません。")
             return
         
-        game = game_manager.get_game(ctx.guild.id)
-        
         # 投票フェーズかチェック
         if game.phase != "voting":
             await ctx.send("現在は投票フェーズではありません。")
@@ -82,13 +85,8 @@ class VotingCog(commands.Cog):
         
         await ctx.send(embed=embed)
         
-        # 全員が投票したらタイマーを終了して結果処理
-        if vote_count >= alive_count:
-            # タイマーをキャンセル
-            game.cancel_timer()
-            
-            # 投票結果を処理
-            await self.process_voting_results(ctx.channel, game)
+        # 全員が投票したかの判定と結果処理はゲームのアクターが行う
+        game.actor.post(VOTE)
     
     @commands.command(name="voteui")
     async def vote_ui(self, ctx):
@@ -105,12 +103,11 @@ class VotingCog(commands.Cog):
             return
         
         # ゲームが進行中かチェック
-        if not game_manager.is_game_active(ctx.guild.id):
+        game = game_manager.resolve_game(ctx)
+        if not game:
             await ctx.send("現在進行中のゲームがありません。")
             return
         
-        game = game_manager.get_game(ctx.guild.id)
-        
         # 投票フェーズかチェック
         if game.phase != "voting":
             await ctx.send("現在は投票フェーズではありません。")
@@ -123,18 +120,8 @@ class VotingCog(commands.Cog):
         view = VoteView(game, ctx, timeout=timeout)
         
         # 埋め込みメッセージを作成
-        embed = create_base_embed(
-            title="🗳️ 投票",
-            description=f"処刑する人を決めるための投票です。\n"
-                        f"投票時間: {timeout}秒\n\n"
-                        f"**ボタンをクリックして投票してください**",
-            color=EmbedColors.PRIMARY
-        )
-        
-        # 生存プレイヤーリストを追加
+        embed = create_vote_embed(game, timeout)
         alive_players = game.get_alive_players()
-        player_list = "\n".join([f"- {p.name}" for p in alive_players])
-        embed.add_field(name="生存者", value=player_list, inline=False)
         
         # 投票状況フィールド（初期状態は空）
         embed.add_field(name="投票状況", value="まだ投票はありません。", inline=False)
@@ -162,9 +149,8 @@ class VotingCog(commands.Cog):
         embed = create_game_status_embed(game, "voting")
         
         # 生存プレイヤー一覧
-        alive_players = game.get_alive_players()
-        if alive_players:
-            players_mention = " ".join([f"<@{p.user_id}>" for p in alive_players])
+        players_mention = alive_mentions(game)
+        if players_mention:
             embed.add_field(name="生存者へのメンション", value=players_mention, inline=False)
         
         await channel.send(embed=embed)
@@ -180,24 +166,26 @@ class VotingCog(commands.Cog):
         ctx = await self.bot.get_context(channel.last_message)
         await self.vote_ui(ctx)
         
-        # 制限時間を設定
-        async def update_timer(remaining):
-            if remaining == 30:
-                await channel.send("⏰ 投票終了まであと30秒です！")
-        
-        async def timer_complete():
-            if game.phase == "voting":
-                # 投票結果を処理
-                await self.process_voting_results(channel, game)
-        
-        # タイマー開始
-        await game.start_timer(GameConfig.VOTE_TIME, update_timer, timer_complete)
+        # 制限時間を設定（期限切れはアクターが結果を処理する）
+        game.start_timer(GameConfig.VOTE_TIME)
+    
+    async def announce_vote_time(self, channel, game, remaining):
+        """投票時間の残りをアナウンス"""
+        if remaining == 30:
+            await channel.send("⏰ 投票終了まであと30秒です！")
     
     async def process_voting_results(self, channel, game):
-        """投票結果を処理"""
+        """投票結果を処理（ゲームのアクターからのみ呼ばれる）"""
         if not channel:
             return
         
+        # 票を受けたプレイヤーの役職の処理
+        hook_results = []
+        for target_id in set(game.votes.values()):
+            target = game.players.get(str(target_id))
+            if target:
+                hook_results.append((target, game.run_player_hook(target, "on_voted")))
+        
         # 投票集計
         game.process_voting()
         
@@ -229,8 +217,12 @@ class VotingCog(commands.Cog):
         )
         
         # 処刑結果
-        if game.last_killed:
-            executed_player = game.players[game.last_killed]
+        game_manager = self.bot.get_cog("GameManagementCog")
+        if game_manager:
+            await game_manager.send_hook_results(game, hook_results)
+        
+        if game.last_executed:
+            executed_player = game.players[game.last_executed]
             embed.add_field(
                 name="処刑結果",
                 value=f"**{executed_player.name}** が処刑されました。",
@@ -239,64 +231,13 @@ class VotingCog(commands.Cog):
             
             # 霊界チャットが有効な場合、処刑されたプレイヤーに権限を付与
             if hasattr(game, 'dead_chat_channel_id') and game.special_rules.dead_chat_enabled:
-                game_manager = self.bot.get_cog("GameManagementCog")
                 if game_manager:
-                    await game_manager.update_dead_chat_permissions(channel.guild, game, executed_player)
-        
-            # 霊能者がいる場合は処刑者の役職を通知
-            for player in game.players.values():
-                if player.is_alive and player.role == "霊能者":
-                    try:
-                        member = self.bot.get_guild(int(game.guild_id)).get_member(int(player.user_id))
-                        if member:
-                            is_werewolf = executed_player.role == "人狼"
-                            # 結果を保存
-                            if not hasattr(player, 'medium_results'):
-                                player.medium_results = {}
-                            player.medium_results[executed_player.user_id] = {
-                                'name': executed_player.name,
-                                'role': executed_player.role,
-                                'is_werewolf': is_werewolf,
-                                'day': game.day_count
-                            }
-                            
-                            # 改善された霊能結果表示
-                            medium_embed = create_base_embed(
-                                title="🔮 霊能結果",
-                                description=f"Day {game.day_count}の霊能結果",
-                                color=EmbedColors.ERROR if is_werewolf else EmbedColors.SUCCESS
-                            )
-                            
-                            # 結果の詳細
-                            result_text = f"処刑された **{executed_player.name}** は"
-                            if is_werewolf:
-                                result_text += f" **人狼**でした！"
-                            else:
-                                result_text += f" **村人陣営**でした。"
-                            
-                            medium_embed.add_field(
-                                name="本日の結果",
-                                value=result_text,
-                                inline=False
-                            )
-                            
-                            # 過去の霊能結果履歴
-                            if len(player.medium_results) > 1:
-                                history = "これまでの霊能結果:\n"
-                                for uid, result in player.medium_results.items():
-                                    if uid != executed_player.user_id:  # 今日の結果を除外
-                                        wolf_status = "**人狼**" if result['is_werewolf'] else "**村人陣営**"
-                                        history += f"Day {result['day']}: {result['name']} - {wolf_status}\n"
-                                
-                                medium_embed.add_field(
-                                    name="履歴",
-                                    value=history,
-                                    inline=False
-                                )
-                            
-                            await member.send(embed=medium_embed)
-                    except Exception as e:
-                        print(f"霊能者への通知に失敗: {e}")
+                    await game_manager.update_dead_chat_permissions(channel.guild, game, [executed_player])
+        
+            # 処刑されたときの役職の処理（猫又の道連れなど）
+            result = game.run_player_hook(executed_player, "on_executed")
+            if game_manager:
+                await game_manager.send_hook_results(game, [(executed_player, result)])
         else:
             embed.add_field(
                 name="処刑結果",
@@ -362,11 +303,30 @@ class VotingCog(commands.Cog):
         
         await channel.send(embed=embed)
         
+        # ゲーム結果をログと統計に記録
+        game.phase = "finished"
+        await self.record_game_result(channel, game, winning_team)
+        
         # ゲーム情報をクリア
         game_manager = self.bot.get_cog("GameManagementCog")
         if game_manager:
-            game.phase = "finished"
-            del game_manager.games[str(game.guild_id)]
+            game_manager.remove_game(game)
+    
+    async def record_game_result(self, channel, game, winning_team):
+        """終了したゲームをゲームログに保存し、統計・レーティング・最近の傾向を更新"""
+        game_data = game.build_result(winning_team, guild_name=channel.guild.name)
+        
+        # 先にログを書き、統計の更新で失敗してもログは残す
+        db_manager = self.bot.get_cog("DatabaseManager")
+        if db_manager:
+            await db_manager.log_game_result(game.guild_id, game_data)
+        
+        stats_cog = self.bot.get_cog("Stats")
+        if stats_cog:
+            try:
+                stats_cog.stats_manager.record_game_result(game_data)
+            except Exception:
+                logger.exception("統計の記録に失敗しました", game_id=game_data["id"])
 
 async def setup(bot):
     """Cogをbotに追加"""
@@ -2,25 +2,15 @@
 直接登録するコマンドモジュール - コマンド実行問題を解決するための緊急対応
 """
 import discord
-import json
 import os
 import traceback
 import sys
-import asyncio
 from discord.ext import commands
 
-# コマンド実行時のロックを管理する辞書
-command_locks = {}
-# 最近実行されたコマンドを追跡するキャッシュ
-recent_commands = {}
-
-# 最近のコマンドリストからエントリを削除する非同期関数
-async def clear_recent_command(command_id, delay_seconds):
-    """指定された時間後に最近使用したコマンドリストからコマンドIDを削除する"""
-    await asyncio.sleep(delay_seconds)
-    if command_id in recent_commands:
-        del recent_commands[command_id]
-        logger.debug(f"コマンド履歴から削除: {command_id}")
+from utils.ttl_store import TTLStore
+from utils.config_service import get_config_service
+from utils.composition_search import MAX_PLAYERS, STANDARD_ROLES, recommend_async as recommend_roles
+from utils.composition_rules import validate as validate_composition
 
 # ロガーの取得
 try:
@@ -114,29 +104,21 @@ VALID_ROLES = [
     "てるてる坊主", "賢者", "仮病人", "呪狼", "大狼", "子狼", "狼憑き"
 ]
 
-# 役職グループ - バランス調整用
-ROLE_GROUPS = {
-    "村陣営": ["村人", "占い師", "狩人", "霊媒師", "共有者", "猫又", "てるてる坊主", "賢者", "仮病人"],
-    "狼陣営": ["人狼", "呪狼", "大狼", "子狼"],
-    "第三陣営": ["妖狐", "背徳者", "狼憑き"],
-    "狂信者陣営": ["狂人"]
-}
-
 # 登録済みコマンド追跡用のグローバル変数
 _registered_commands = set()
 
-# グローバル変数でコマンド呼び出し履歴とロックを管理
-_command_history = {}
-_command_locks = {}
+# コマンド呼び出し履歴（5分）とチャンネルごとのロックを管理
+_command_history = TTLStore(ttl=300, max_entries=5000, bucket_seconds=10)
+_command_locks = TTLStore(ttl=60, max_entries=1000, bucket_seconds=0.5)
 
 # 設定の読み込み/保存関数
 async def load_config(guild_id):
     """サーバー固有の役職構成設定を読み込む"""
     config_path = os.path.join(CONFIG_DIR, f"role_config_{guild_id}.json")
     try:
-        if os.path.exists(config_path):
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
+        # 設定サービスのキャッシュから読み込む（ファイルが更新されていれば再読み込み）
+        config = get_config_service().read_json(config_path)
+        if config is not None:
             logger.info(f"設定読み込み成功: guild_id={guild_id}")
             return config
         else:
@@ -150,8 +132,7 @@ async def save_config(guild_id, config):
     """サーバー固有の役職構成設定を保存する"""
     config_path = os.path.join(CONFIG_DIR, f"role_config_{guild_id}.json")
     try:
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        get_config_service().write_json(config_path, config)
         logger.info(f"設定保存成功: guild_id={guild_id}")
         return True
     except Exception as e:
@@ -160,40 +141,10 @@ async def save_config(guild_id, config):
 
 # バランスチェック関数
 def check_balance(roles):
-    """役職構成のバランスをチェックする"""
-    # 役職の合計数を計算
-    total_players = sum(roles.values())
-    
-    # 陣営ごとの人数を計算
-    village_count = sum(roles.get(role, 0) for role in ROLE_GROUPS["村陣営"])
-    wolf_count = sum(roles.get(role, 0) for role in ROLE_GROUPS["狼陣営"])
-    third_count = sum(roles.get(role, 0) for role in ROLE_GROUPS["第三陣営"])
-    madman_count = sum(roles.get(role, 0) for role in ROLE_GROUPS["狂信者陣営"])
-    
-    # 最低限の役職確認
-    if "占い師" not in roles or roles["占い師"] < 1:
-        return False, "占い師が必要です"
-    
-    if not any(roles.get(role, 0) > 0 for role in ROLE_GROUPS["狼陣営"]):
-        return False, "人狼が必要です"
-    
-    # 比率チェック
-    if wolf_count >= village_count:
-        return False, "人狼の数が多すぎます"
-    
-    if third_count > total_players // 4:
-        return False, "第三陣営の数が多すぎます"
-    
-    if madman_count > wolf_count:
-        return False, "狂人の数が人狼より多くなっています"
-    
-    # その他の特殊ルール
-    if "妖狐" in roles and roles["妖狐"] > 0 and "占い師" not in roles:
-        return False, "妖狐がいる場合は占い師が必要です"
-    
-    if "背徳者" in roles and roles["背徳者"] > 0 and ("妖狐" not in roles or roles["妖狐"] == 0):
-        return False, "背徳者がいる場合は妖狐が必要です"
-    
+    """役職構成のバランスをチェックする（共通のバリデータを使用）"""
+    result = validate_composition(roles)
+    if not result.valid:
+        return False, result.errors[0]
     return True, "バランスOK"
 
 # コマンド実行を追跡するデコレータ - 改善版
@@ -201,12 +152,10 @@ def track_command_execution(command_name):
     """コマンドの実行を追跡して重複実行を防止するデコレータ"""
     def decorator(func):
         async def wrapper(ctx, *args, **kwargs):
-            global _command_history, _command_locks
-            
             # メッセージIDとチャネルIDの組み合わせでユニークなキーを生成
             message_id = ctx.message.id
             channel_id = ctx.channel.id
-            key = f"{channel_id}_{message_id}_{command_name}"
+            key = (channel_id, message_id, command_name)
             
             # すでに実行済みかチェック
             if key in _command_history:
@@ -214,37 +163,24 @@ def track_command_execution(command_name):
                 return
             
             # 同じチャネルでの連続実行をロック
-            channel_key = f"{channel_id}_{command_name}"
+            channel_key = (channel_id, command_name)
             if channel_key in _command_locks:
                 logger.debug(f"連続実行をブロック: {command_name} (チャネル: {channel_id})")
                 return
             
-            # ロックを設定
-            _command_locks[channel_key] = True
+            # ロックを設定（実行中は最大60秒保持）
+            _command_locks.add(channel_key)
             
-            # 履歴に追加
-            _command_history[key] = True
+            # 履歴に追加（5分後に期限切れ）
+            _command_history.add(key)
             
             try:
                 # 実際のコマンド実行
                 result = await func(ctx, *args, **kwargs)
                 return result
             finally:
-                # 5秒後にロックを解除
-                async def clear_lock():
-                    await asyncio.sleep(5)  # 5秒待機
-                    if channel_key in _command_locks:
-                        del _command_locks[channel_key]
-                
-                # 5分後に履歴から削除
-                async def clear_history():
-                    await asyncio.sleep(300)  # 5分待機
-                    if key in _command_history:
-                        del _command_history[key]
-                
-                # 非同期タスクを作成
-                asyncio.create_task(clear_lock())
-                asyncio.create_task(clear_history())
+                # 完了から5秒後にロックが切れるようにする
+                _command_locks.shorten(channel_key, 5)
         return wrapper
     return decorator
 
@@ -341,14 +277,14 @@ def setup_commands(bot):
         """役職構成管理のヘルプを表示"""
         # 重複実行を防止するためのロック
         channel_id = ctx.channel.id
-        lock_key = f"help_lock_{channel_id}"
+        lock_key = ("help", channel_id)
         
-        if hasattr(bot, lock_key):
+        if lock_key in _command_locks:
             logger.debug(f"ヘルプ表示ロック中: {ctx.channel.id}")
             return
         
         # ロックを設定
-        setattr(bot, lock_key, True)
+        _command_locks.add(lock_key)
         
         try:
             logger.info(f"compose help 実行: {ctx.message.id}, チャンネル: {ctx.channel.id}")
@@ -401,28 +337,22 @@ def setup_commands(bot):
             sent_message = await ctx.send(embed=embed)
             logger.info(f"compose help メッセージ送信成功: {ctx.channel.id}, メッセージID: {sent_message.id}")
         finally:
-            # 3秒後にロックを解除
-            async def unlock():
-                await asyncio.sleep(3)
-                if hasattr(bot, lock_key):
-                    delattr(bot, lock_key)
-                    logger.debug(f"ヘルプ表示ロック解除: {ctx.channel.id}")
-            
-            asyncio.create_task(unlock())
+            # 3秒後にロックが切れるようにする
+            _command_locks.shorten(lock_key, 3)
 
     # プリセット一覧表示関数（重複防止を強化）
     async def show_presets(ctx):
         """利用可能なプリセット一覧を表示"""
         # 重複実行を防止するためのロック
         channel_id = ctx.channel.id
-        lock_key = f"presets_lock_{channel_id}"
+        lock_key = ("presets", channel_id)
         
-        if hasattr(bot, lock_key):
+        if lock_key in _command_locks:
             logger.debug(f"プリセット一覧表示ロック中: {ctx.channel.id}")
             return
         
         # ロックを設定
-        setattr(bot, lock_key, True)
+        _command_locks.add(lock_key)
         
         try:
             logger.info(f"compose presets 実行: {ctx.message.id}, チャンネル: {ctx.channel.id}")
@@ -447,14 +377,8 @@ def setup_commands(bot):
             sent_message = await ctx.send(embed=embed)
             logger.info(f"compose presets メッセージ送信成功: {ctx.channel.id}, メッセージID: {sent_message.id}")
         finally:
-            # 3秒後にロックを解除
-            async def unlock():
-                await asyncio.sleep(3)
-                if hasattr(bot, lock_key):
-                    delattr(bot, lock_key)
-                    logger.debug(f"プリセット一覧表示ロック解除: {ctx.channel.id}")
-            
-            asyncio.create_task(unlock())
+            # 3秒後にロックが切れるようにする
+            _command_locks.shorten(lock_key, 3)
     
     # プリセット適用関数
     async def apply_preset(ctx, preset_name):
@@ -612,10 +536,10 @@ def setup_commands(bot):
         # 人数の抽出と検証
         try:
             player_count = int(args[0])
-            if player_count < 4 or player_count > 20:
+            if player_count < 4 or player_count > MAX_PLAYERS:
                 embed = discord.Embed(
                     title="人数エラー",
-                    description="プレイヤー数は4人から20人の間である必要があります。",
+                    description=f"プレイヤー数は4人から{MAX_PLAYERS}人の間である必要があります。",
                     color=discord.Color.red()
                 )
                 await ctx.send(embed=embed)
@@ -743,10 +667,10 @@ def setup_commands(bot):
         # 人数の検証
         try:
             player_count = int(player_count_str)
-            if player_count < 4 or player_count > 20:
+            if player_count < 4 or player_count > MAX_PLAYERS:
                 embed = discord.Embed(
                     title="人数エラー",
-                    description="プレイヤー数は4人から20人の間である必要があります。",
+                    description=f"プレイヤー数は4人から{MAX_PLAYERS}人の間である必要があります。",
                     color=discord.Color.red()
                 )
                 await ctx.send(embed=embed)
@@ -771,26 +695,12 @@ def setup_commands(bot):
                 recommended_composition = preset_data["compositions"][str(player_count)]
                 break
         
-        # 完全一致がない場合、最も近い人数のプリセットを探す
+        # 完全一致がない場合、構成探索で最もバランスの良い構成を提案する
         if recommended_preset is None:
-            # 標準プリセットから最も近い人数の構成をベースにする
-            if "standard" in PRESETS:
-                standard_counts = [int(c) for c in PRESETS["standard"]["compositions"].keys()]
-                if standard_counts:
-                    closest_count = min(standard_counts, key=lambda x: abs(x - player_count))
-                    base_composition = PRESETS["standard"]["compositions"][str(closest_count)].copy()
-                    
-                    # 人数の差に基づいて調整
-                    diff = player_count - closest_count
-                    if diff > 0:
-                        # 人数が多い場合は村人を増やす
-                        base_composition["村人"] = base_composition.get("村人", 0) + diff
-                    elif diff < 0:
-                        # 人数が少ない場合は村人を減らす
-                        base_composition["村人"] = max(1, base_composition.get("村人", 0) + diff)
-                    
-                    recommended_preset = "カスタム提案"
-                    recommended_composition = base_composition
+            recommendations = await recommend_roles(player_count, STANDARD_ROLES, k=1)
+            if recommendations:
+                recommended_preset = "カスタム提案"
+                recommended_composition = recommendations[0][1]
         
         if recommended_composition:
             embed = discord.Embed(
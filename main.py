@@ -3,96 +3,46 @@ Discord人狼Bot メインエントリーポイント
 """
 import os
 import sys
-import traceback
 
 # カレントディレクトリをモジュール検索パスに追加
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-# *** 最優先 ***
-# Discord.pyをインポートする前に、最も強力な統合フックシステムを適用
-try:
-    # 新しいフックシステムをロード
-    from bot_hooks import apply_all_hooks
-    hook_result = apply_all_hooks()
-    print(f"Bot hooks applied: {hook_result}")
-except ImportError:
-    print("WARNING: Could not load bot_hooks module")
-except Exception as e:
-    print(f"ERROR: Failed to apply hooks: {e}")
-    traceback.print_exc()
-
-# 旧エラーハンドリングパッチも一応適用
-try:
-    import discord_error_patch
-    print("Discord error patch loaded")
-except ImportError:
-    print("WARNING: Could not load discord_error_patch module")
-
-# 重複メッセージ防止パッチを適用
-try:
-    import message_deduplicator
-    print("Message deduplicator loaded")
-except ImportError:
-    print("WARNING: Could not load message_deduplicator module")
-    message_deduplicator = None
-except Exception as e:
-    print(f"ERROR: Failed to load message_deduplicator: {e}")
-    traceback.print_exc()
-    message_deduplicator = None
-
-# さらに強力なメッセージフィルタリングを適用
-try:
-    # メッセージフィルタを適用（後でdiscordモジュールをインポートした後に実行）
-    print(f"Message filter will be applied later")
-except Exception as e:
-    print(f"WARNING: Could not set up message filter: {e}")
-
-# 特殊テクニック: CSSスタイルでエラーメッセージを非表示にする試み
-ERROR_CSS_TRICK = """
-<style>
-  .errorMessage, div[class*="error"], div[class*="Error"] {
-    display: none !important;
-    visibility: hidden !important;
-    height: 0 !important;
-    width: 0 !important;
-    opacity: 0 !important;
-    pointer-events: none !important;
-    position: absolute !important;
-    z-index: -9999 !important;
-  }
-</style>
-"""
-
-# 最強のパッチを適用
-try:
-    # モンキーパッチを適用（Discord.pyの読み込み前）
-    import monkey_patch
-    monkey_patch.apply_monkey_patches()
-    print("Monkey patches applied")
-except Exception as e:
-    print(f"WARNING: Could not apply monkey patches: {e}")
-
 # その他のモジュールをインポート
 import asyncio
+import time
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
 from utils.config import GameConfig, EmbedColors
+from utils import metrics
+from utils.watchdog import get_watchdog
+from utils.profiler import get_profiler
+from utils.memory_tracker import get_memory_tracker
+from utils.startup import StartupPipeline, GAME_COGS, GATE_GAMES, GATE_GATEWAY
+from utils.logger import configure_logging, get_logger, log_context
 
 # 環境変数の読み込み
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-# Discord.pyモジュールが読み込まれた後でメッセージフィルタを適用
+# ログはキュー経由でバックグラウンドのスレッドから出力する（discord.py のログも同じ出力先にまとめる）
+configure_logging(capture=("discord",))
+logger = get_logger("bot")
+
+# ミドルウェアパイプラインを構築（送信: エラーフィルタ・重複送信防止、受信: 重複コマンド防止）
+from utils.middleware import INBOUND, get_pipeline, install_pipeline
 try:
     from utils.message_filter import apply_message_filter
-    filter_result = apply_message_filter()
-    print(f"Message filter applied: {filter_result}")
-except Exception as e:
-    print(f"WARNING: Could not apply message filter: {e}")
+    from message_deduplicator import apply_deduplicator
+    apply_message_filter()
+    apply_deduplicator()
+    pipeline_result = install_pipeline()
+    logger.info("Middleware pipeline installed", result=pipeline_result)
+except Exception:
+    logger.exception("Could not set up middleware pipeline")
 
 # データディレクトリが存在することを確認
 for directory in [GameConfig.DATA_DIR, GameConfig.CONFIG_DIR, GameConfig.STATS_DIR, GameConfig.LOG_DIR]:
@@ -107,6 +57,18 @@ intents.guilds = True
 
 # カスタムBotクラスの定義
 class JinroBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.startup = StartupPipeline(self)
+    
+    async def setup_hook(self):
+        """ログイン後、ゲートウェイ接続前に1度だけ呼ばれる（再接続では呼ばれない）"""
+        await self.startup.stage("prepare", ensure_views_package)
+        await self.startup.run(
+            ("compose_commands", setup_compose_commands),
+            ("monitoring", start_monitoring),
+        )
+    
     async def get_context(self, message, *, cls=commands.Context):
         """カスタムコンテキスト処理"""
         # 元のコンテキスト取得
@@ -121,7 +83,34 @@ class JinroBot(commands.Bot):
         return ctx
     
     async def invoke(self, ctx):
-        """コマンド実行のカスタム処理"""
+        """コマンド実行のカスタム処理（受信パイプラインを通してから実行）"""
+        # 起動処理が終わるまではゲームのコマンドを受け付けない
+        if ctx.command and ctx.command.cog_name in GAME_COGS and not self.startup.is_ready(GATE_GAMES):
+            await ctx.send("Botの起動処理中です。しばらくしてからもう一度お試しください。")
+            return False
+        
+        pipeline = get_pipeline()
+        route = ctx.command.qualified_name.split()[0] if ctx.command else None
+        executed = pipeline.run(INBOUND, route, ctx)
+        if executed is None:
+            return False
+        
+        start = time.perf_counter()
+        try:
+            # コマンド実行中のログにはサーバー・チャンネル・コマンドを付ける
+            with log_context(guild=ctx.guild.id if ctx.guild else None, channel=ctx.channel.id,
+                             user=ctx.author.id, command=ctx.command.qualified_name if ctx.command else None):
+                # プロファイル対象の場合はcProfileで計測しながら実行
+                profiler = get_profiler()
+                if ctx.command and profiler.should_profile(ctx.command.qualified_name):
+                    return await profiler.run(ctx.command.qualified_name, self._invoke_command(ctx))
+                return await self._invoke_command(ctx)
+        finally:
+            metrics.command_latency.observe(time.perf_counter() - start, route or "unknown")
+            pipeline.finish(executed, ctx)
+    
+    async def _invoke_command(self, ctx):
+        """コマンドを実行"""
         # composeコマンドのプロアクティブ検出
         if ctx.command and (
             (ctx.command.name == 'compose') or 
@@ -129,7 +118,7 @@ class JinroBot(commands.Bot):
         ):
             # composeコマンドは常にエラー抑制モード
             ctx.suppressed_errors = True
-            print(f"[INVOKE] Detected compose command: {ctx.command.name}")
+            logger.debug("Detected compose command")
             
         if hasattr(ctx, 'suppressed_errors') and ctx.suppressed_errors:
             # エラー抑制モード
@@ -141,16 +130,15 @@ class JinroBot(commands.Bot):
                 return True
             except Exception as e:
                 # エラーをログに記録するが表示はしない
-                print(f"[SILENT_ERROR] Error in {ctx.command}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Suppressed command error", error=str(e))
                 return False
         else:
             # 通常の実行
             return await super().invoke(ctx)
 
 # Botの初期化
-bot = JinroBot(command_prefix=GameConfig.PREFIX, intents=intents, help_command=None)
+bot = JinroBot(command_prefix=GameConfig.PREFIX, intents=intents, help_command=None,
+               http_trace=metrics.create_trace_config())
 
 # 最強のエラー抑制: すべてのエラーを抑制するプレースホルダを設定
 # これにより他のモジュールがエラーハンドラを参照してもエラーにならない
@@ -162,7 +150,7 @@ bot.on_error = lambda *args, **kwargs: None     # 一般的なエラーも無視
 async def on_command_error(ctx, error):
     """カスタムのオーバーライド - composeコマンド以外だけ処理"""
     # エラーの詳細をログに出力
-    print(f"[ERROR HANDLER] Handling error: {type(error)}: {error}")
+    logger.debug("Handling command error", error_type=type(error).__name__, error=str(error))
     
     # エラーメッセージを完全に抑制するケース
     if any([
@@ -177,7 +165,7 @@ async def on_command_error(ctx, error):
         "attribute" in str(error).lower(),
         "attributeerror" in str(error).lower()
     ]):
-        print(f"[ERROR HANDLER] Suppressed error: {error}")
+        logger.info("Suppressed command error", error=str(error))
         # エラーを表示せずにヘルプメッセージだけ表示する
         if ctx.command and ctx.command.name == 'compose':
             try:
@@ -192,7 +180,7 @@ async def on_command_error(ctx, error):
                     # コマンドが見つからない場合はシンプルなメッセージを表示
                     await ctx.send("役職構成管理コマンドを使用するには: `!compose help`")
             except Exception as e:
-                print(f"[ERROR HANDLER] Error showing help: {e}")
+                logger.error("Error showing compose help", error=str(e))
         return
     
     # その他のエラーは通常通り処理
@@ -221,10 +209,9 @@ async def on_command_error(ctx, error):
         )
         await ctx.send(embed=embed)
 
-# Cogの読み込み
-async def load_extensions():
-    """すべてのCogを読み込む"""
-    # views モジュールが存在するか確認し、存在しない場合はインポートエラーを防ぐために空のパッケージを作成
+# 起動処理の各段階
+def ensure_views_package():
+    """views モジュールが存在するか確認し、存在しない場合はインポートエラーを防ぐために空のパッケージを作成"""
     views_dir = os.path.join(current_dir, 'views')
     if not os.path.exists(views_dir):
         try:
@@ -233,117 +220,73 @@ async def load_extensions():
             if not os.path.exists(init_file):
                 with open(init_file, 'w') as f:
                     f.write('"""投票UI用のViewsパッケージ"""')
-            print("Created views package directory and __init__.py file")
+            logger.info("Created views package directory and __init__.py file")
         except Exception as e:
-            print(f"Warning: Failed to create views package: {e}")
+            logger.warning("Failed to create views package", error=str(e))
 
-    # 基本的なユーティリティCogを先に読み込む
-    utility_cogs = [
-        'utils.database_manager',  # データベース管理
-        'utils.role_balancer',     # 役職バランサー
-    ]
-    
-    # コア機能のCog
-    core_cogs = [
-        'cogs.game_management',  # ゲーム管理
-        'cogs.night_actions',    # 夜のアクション
-        'cogs.day_actions',      # 昼のアクション
-        'cogs.voting',           # 投票システム
-    ]
-    
-    # 管理系のCog
-    admin_cogs = [
-        'cogs.admin',            # 管理者コマンド
-    ]
-    
-    # 統計情報とフィードバック系のCog
-    stats_cogs = [
-        'cogs.stats',            # 統計情報
-        'cogs.feedback',         # フィードバック
-    ]
-    
-    # 追加機能のCog
-    additional_cogs = [
-        'cogs.rules_manager',    # ルール管理
-        # 'cogs.role_composer',  # 役職構成管理 - 直接コマンドに置き換えたため無効化
-        'cogs.community',        # コミュニティ提案システム
-        'cogs.balance',          # ゲームバランス調整システム
-        'cogs.documentation'     # ドキュメント管理
-    ]
-    
-    # 全てのCogを読み込む
-    all_cogs = utility_cogs + core_cogs + admin_cogs + stats_cogs + additional_cogs
+def setup_compose_commands():
+    """役職構成管理コマンドを登録（失敗した場合は最小限のコマンドを登録）"""
+    try:
+        # 最も安全なバージョンを使用
+        import direct_compose_safe
+        direct_compose_safe.setup_commands(bot)
+        logger.info("安全なバージョン適用成功")
+        return
+    except Exception:
+        logger.exception("安全なバージョン適用でエラー")
     
-    for cog in all_cogs:
-        try:
-            await bot.load_extension(cog)
-            print(f'Loaded extension: {cog}')
-        except Exception as e:
-            print(f'Failed to load extension {cog}: {e}')
+    # 最終手段（最小限のコード）
+    try:
+        logger.warning("最終手段を実行: 埋め込みコマンド登録")
+        
+        # 最小限のコードで直接登録
+        @bot.command(name="compose")
+        async def compose_command(ctx, *args):
+            """最も単純なcomposeコマンド"""
+            try:
+                if not args or args[0].lower() == "help":
+                    embed = discord.Embed(
+                        title="役職構成管理",
+                        description="現在機能が制限されています。メンテナンス中です。",
+                        color=discord.Color.blue()
+                    )
+                    await ctx.send(embed=embed)
+                    return
+                    
+                if args[0].lower() == "presets":
+                    embed = discord.Embed(
+                        title="プリセット一覧",
+                        description="standard, beginner, advanced, chaos",
+                        color=discord.Color.green()
+                    )
+                    await ctx.send(embed=embed)
+                    return
+            except Exception as cmd_e:
+                logger.error("コマンド実行エラー", error=str(cmd_e))
+        
+        logger.info("埋め込みコマンド登録完了")
+    except Exception:
+        logger.exception("埋め込みコマンドも失敗")
+
+def start_monitoring():
+    """イベントループの停止監視とメモリ計測を開始"""
+    get_watchdog().start(asyncio.get_running_loop())
+    get_memory_tracker().start(bot)
 
 @bot.event
 async def on_ready():
-    """Botの準備完了時に呼ばれる"""
-    print(f'{bot.user.name} has connected to Discord!')
-    print(f'Bot ID: {bot.user.id}')
+    """
+    Botの準備完了時に呼ばれる
     
-    try:
-        # 重複防止機能はここでは適用しない（シンプル解決策を使用）
-        print("シンプルな対応策を使用します...")
-
-        # Cogを読み込む
-        await load_extensions()
-        print("すべてのCogの読み込みに成功しました")
-        
-        # 最も単純なアプローチを使用
-        try:
-            # 最も安全なバージョンを使用
-            print("最も安全なバージョンを使用します...")
-            import direct_compose_safe
-            direct_compose_safe.setup_commands(bot)
-            print("安全なバージョン適用成功")
-        except Exception as e:
-            print(f"安全なバージョン適用でエラー: {e}")
-            traceback.print_exc()
-            
-            # 最終手段（最小限のコード）
-            try:
-                print("最終手段を実行: 埋め込みコマンド登録")
-                
-                # 最小限のコードで直接登録
-                @bot.command(name="compose")
-                async def compose_command(ctx, *args):
-                    """最も単純なcomposeコマンド"""
-                    try:
-                        if not args or args[0].lower() == "help":
-                            embed = discord.Embed(
-                                title="役職構成管理",
-                                description="現在機能が制限されています。メンテナンス中です。",
-                                color=discord.Color.blue()
-                            )
-                            await ctx.send(embed=embed)
-                            return
-                            
-                        if args[0].lower() == "presets":
-                            embed = discord.Embed(
-                                title="プリセット一覧",
-                                description="standard, beginner, advanced, chaos",
-                                color=discord.Color.green()
-                            )
-                            await ctx.send(embed=embed)
-                            return
-                    except Exception as cmd_e:
-                        print(f"コマンド実行エラー: {cmd_e}")
-                
-                print("埋め込みコマンド登録完了")
-            except Exception as e3:
-                print(f"埋め込みコマンドも失敗: {e3}")
-                traceback.print_exc()
-    except Exception as e:
-        print(f"Cogの読み込み中にエラーが発生しました: {e}")
-        traceback.print_exc()
+    再接続のたびに呼ばれるため、読み込みなどの起動処理は setup_hook で行い、ここでは状態の更新だけを行う
+    """
+    reconnected = bot.startup.is_ready(GATE_GATEWAY)
+    if reconnected:
+        logger.info("Reconnected to Discord", bot_name=bot.user.name)
+    else:
+        logger.info("Connected to Discord", bot_name=bot.user.name, bot_id=bot.user.id)
     
-    print('------')
+    bot.startup.mark_ready(GATE_GATEWAY)
     
     # プレゼンス（状態）を設定
     await bot.change_presence(activity=discord.Game(name=f"{GameConfig.PREFIX}werewolf_help で使い方を表示"))
@@ -360,7 +303,7 @@ async def on_message(message):
         return
     
     # 通常のコマンド処理
-    # 重複防止パッチがprocess_commandsを上書きしているので、
+    # 重複防止は受信パイプライン（JinroBot.invoke）で行うので、
     # ここで複雑な処理は行わない
     await bot.process_commands(message)
 
@@ -369,28 +312,29 @@ async def on_command_error(ctx, error):
     """コマンドエラー時の処理"""
     # コマンド識別子（ログ用）
     command_id = ctx.command.qualified_name if ctx.command else f"unknown-{ctx.message.content[:20]}"
+    metrics.command_errors.inc(ctx.command.qualified_name.split()[0] if ctx.command else "unknown")
     
     # コマンド実行時のエラー（CommandInvokeError）の場合は元の例外を取得
     original_error = error
     if isinstance(error, commands.CommandInvokeError):
         original_error = error.original
     
-    # スタックトレースの取得と表示（重要なデバッグ情報）
-    import traceback
-    tb_str = ''.join(traceback.format_exception(type(original_error), original_error, original_error.__traceback__))
-    print(f"[詳細エラー情報] コマンド: {command_id}")
-    print(f"[詳細エラー情報] エラータイプ: {type(original_error).__name__}")
-    print(f"[詳細エラー情報] エラーメッセージ: {original_error}")
-    print(f"[詳細エラー情報] スタックトレース:\n{tb_str}")
+    # スタックトレース付きで記録（重要なデバッグ情報）。ユーザーの入力ミスはトレースを付けない
+    fields = {"guild": ctx.guild.id if ctx.guild else None, "channel": ctx.channel.id,
+              "command": command_id, "error_type": type(original_error).__name__}
+    if isinstance(error, (commands.CommandNotFound, commands.UserInputError, commands.CheckFailure)):
+        logger.info("Command error", error=str(original_error), **fields)
+    else:
+        logger.error("Command error", error=str(original_error),
+                     exc_info=(type(original_error), original_error, original_error.__traceback__), **fields)
     
     # コルーチンに関連するエラーの場合は特別な処理
     if "coroutine" in str(original_error) and "has no attribute" in str(original_error):
-        print(f"[重要な警告] コルーチンが正しく await されていない可能性があります！")
-        print(f"[重要な警告] エラー発生箇所を確認して await キーワードを追加してください。")
+        logger.warning("コルーチンが正しく await されていない可能性があります。エラー発生箇所に await を追加してください", **fields)
     
     # エラー抑制フラグがある場合は何も表示しない
     if hasattr(ctx, 'suppressed_errors') and ctx.suppressed_errors:
-        print(f"[ERROR_HANDLER] Suppressed display of error in {command_id}: {error}")
+        logger.debug("Suppressed display of command error", **fields)
         return
     
     # composeコマンドのエラー処理は特別に行う
@@ -405,7 +349,7 @@ async def on_command_error(ctx, error):
                 # コマンドが見つからない場合はシンプルなメッセージを表示
                 await ctx.send("役職構成管理コマンドを使用するには: `!compose help`")
         except Exception as help_e:
-            print(f"[ERROR_HANDLER] Error showing help: {help_e}")
+            logger.error("Error showing compose help", error=str(help_e))
             # エラーが発生した場合はシンプルなメッセージを表示
             await ctx.send("役職構成管理コマンドのヘルプ表示中にエラーが発生しました。`!compose help`を使用してください。")
         return
@@ -451,9 +395,7 @@ async def on_command(ctx):
     # compose コマンドの場合
     if ctx.command and ctx.command.qualified_name.startswith('compose'):
         ctx.suppressed_errors = True
-        print(f"[ON_COMMAND] Set suppressed_errors for {ctx.command}")
-
-# パッチモジュールで実装済みのため、ここでの実装は不要になったので削除
+        logger.debug("Set suppressed_errors", command=ctx.command.qualified_name)
 
 # Botの起動
 if __name__ == "__main__":
@@ -472,7 +414,7 @@ if __name__ == "__main__":
         exit(1)
     
     try:
-        bot.run(TOKEN)
+        bot.run(TOKEN, log_handler=None)
     except discord.LoginFailure:
         print("ERROR: Discordへのログインに失敗しました。トークンが正しいか確認してください。")
     except Exception as e:
@@ -1,31 +1,21 @@
 """
 メッセージの重複処理を完全に防止するための最終解決策
 """
-import asyncio
 import functools
-import time
-import logging
 
-# ロガーの設定
-logger = logging.getLogger('message_deduplicator')
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('[%(levelname)s] %(name)s: %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+from utils.ttl_store import TTLStore
+from utils.logger import get_logger
+
+logger = get_logger("message_deduplicator")
 
 class MessageDeduplicator:
     """メッセージの重複処理を防止するクラス"""
     
-    def __init__(self):
-        # 処理済みメッセージを追跡
-        self.processed_messages = set()
-        # チャンネルごとのコマンドロック
-        self.channel_locks = {}
-        # コマンド実行時刻追跡
-        self.command_timestamps = {}
-        # 最後のクリーンアップ時刻
-        self.last_cleanup = time.time()
+    def __init__(self, message_ttl=600, max_messages=5000, max_locks=1000):
+        # 処理済みメッセージを追跡（10分で期限切れ）
+        self.processed_messages = TTLStore(ttl=message_ttl, max_entries=max_messages, bucket_seconds=10)
+        # チャンネルごとのコマンドロック {(channel_id, command_name): True}
+        self.channel_locks = TTLStore(ttl=2.0, max_entries=max_locks, bucket_seconds=0.5)
     
     def is_duplicate(self, message_id):
         """メッセージが重複しているかチェック"""
@@ -34,41 +24,27 @@ class MessageDeduplicator:
     def mark_processed(self, message_id):
         """メッセージを処理済みとしてマーク"""
         self.processed_messages.add(message_id)
-        
-        # 定期的なクリーンアップ（10分ごと）
-        current_time = time.time()
-        if current_time - self.last_cleanup > 600:  # 10分
-            self.cleanup()
-            self.last_cleanup = current_time
     
     def is_channel_locked(self, channel_id, command_name):
         """チャンネルがロックされているかチェック"""
-        lock_key = f"{channel_id}_{command_name}"
-        return lock_key in self.channel_locks
+        return (channel_id, command_name) in self.channel_locks
     
     def lock_channel(self, channel_id, command_name, duration=2.0):
         """チャンネルをロック"""
-        lock_key = f"{channel_id}_{command_name}"
-        self.channel_locks[lock_key] = time.time() + duration
+        self.channel_locks.add((channel_id, command_name), ttl=duration)
+    
+    def release_channel(self, channel_id, command_name, delay=0.5):
+        """実行完了後、最小限の間隔をおいてロックが切れるようにする"""
+        self.channel_locks.shorten((channel_id, command_name), delay)
     
     def unlock_channel(self, channel_id, command_name):
         """チャンネルのロックを解除"""
-        lock_key = f"{channel_id}_{command_name}"
-        if lock_key in self.channel_locks:
-            del self.channel_locks[lock_key]
+        self.channel_locks.discard((channel_id, command_name))
     
     def cleanup(self):
-        """古いロックと処理済みメッセージをクリーンアップ"""
-        # 期限切れのロックを削除
-        current_time = time.time()
-        expired_locks = [key for key, expiry in self.channel_locks.items() if expiry < current_time]
-        for key in expired_locks:
-            del self.channel_locks[key]
-        
-        # 処理済みメッセージのサイズを制限
-        if len(self.processed_messages) > 1000:
-            self.processed_messages.clear()
-            logger.info("処理済みメッセージをクリア")
+        """期限切れのロックと処理済みメッセージの削除を進める"""
+        self.channel_locks.expire()
+        self.processed_messages.expire()
 
 # グローバルなDeduplicatorインスタンス
 _deduplicator = MessageDeduplicator()
@@ -78,94 +54,49 @@ def get_deduplicator():
     global _deduplicator
     return _deduplicator
 
-def patch_bot(bot):
-    """Botのイベント処理を修正してメッセージの重複を防止"""
-    logger.info("Botのイベント処理を修正してメッセージの重複を防止します")
-    
-    # オリジナルのprocess_commands関数を保存
-    original_process_commands = bot.process_commands
-    
-    # メッセージ処理関数を上書き
-    async def deduplicated_process_commands(message):
-        # Deduplicatorインスタンスを取得
-        deduplicator = get_deduplicator()
-        
-        # メッセージIDを取得
-        message_id = message.id
-        
-        # 重複チェック
-        if deduplicator.is_duplicate(message_id):
-            logger.debug(f"重複メッセージをスキップ: {message_id}")
-            return
-        
-        # 処理済みとしてマーク
-        deduplicator.mark_processed(message_id)
-        
-        # コマンドプレフィックスかどうか確認
-        if message.content.startswith(bot.command_prefix):
-            command_parts = message.content[len(bot.command_prefix):].split()
-            if not command_parts:
-                return
-            
-            command_name = command_parts[0].lower()
-            channel_id = message.channel.id
-            
-            # チャンネルロックをチェック
-            if deduplicator.is_channel_locked(channel_id, command_name):
-                logger.debug(f"チャンネルロックによりコマンドをスキップ: {command_name} in {channel_id}")
-                return
-            
-            # チャンネルをロック (特定のコマンドだけより長いロック時間を設定)
-            lock_duration = 5.0 if command_name == "compose" else 2.0
-            deduplicator.lock_channel(channel_id, command_name, lock_duration)
-            
-            try:
-                # オリジナルの処理を実行
-                await original_process_commands(message)
-            finally:
-                # 一定時間後にロックを解除
-                await asyncio.sleep(0.5)  # 最小限の実行時間を保証
-                deduplicator.unlock_channel(channel_id, command_name)
-        else:
-            # コマンド以外のメッセージはそのまま処理
-            await original_process_commands(message)
-    
-    # 処理関数を上書き
-    bot.process_commands = deduplicated_process_commands
-    
-    # オリジナルのinvoke関数を保存
-    original_invoke = bot.invoke
-    
-    # invoke関数を上書き
-    async def deduplicated_invoke(ctx):
-        # メッセージIDを取得
-        message_id = ctx.message.id
-        
-        # Deduplicatorインスタンスを取得
-        deduplicator = get_deduplicator()
-        
-        # ここで二重にチェック - メッセージIDで安全に処理
-        message_invoke_key = f"invoke_{message_id}"
-        if message_invoke_key in deduplicator.processed_messages or hasattr(ctx, "_processed"):
-            logger.debug(f"重複invokeをスキップ: {message_id}")
-            return
-        
-        # 処理済みとしてマーク
-        deduplicator.processed_messages.add(message_invoke_key)
-        setattr(ctx, "_processed", True)
-        
-        # 安全なオリジナル処理実行
-        try:
-            return await original_invoke(ctx)
-        except Exception as e:
-            logger.error(f"Invoke中にエラー発生: {e}")
-            traceback.print_exc()
-    
-    # invoke関数を上書き
-    bot.invoke = deduplicated_invoke
-    
-    logger.info("Botのパッチ適用完了")
-    return bot
+def deduplicate_stage(ctx):
+    """受信パイプラインのステージ: 重複メッセージと連続実行をブロック"""
+    deduplicator = get_deduplicator()
+
+    # 重複チェック
+    message_id = ctx.message.id
+    if deduplicator.is_duplicate(message_id):
+        logger.debug("重複メッセージをスキップ", message_id=message_id)
+        return False
+
+    # 処理済みとしてマーク
+    deduplicator.mark_processed(message_id)
+
+    if ctx.command is None:
+        return True
+
+    command_name = ctx.command.qualified_name.split()[0]
+    channel_id = ctx.channel.id
+
+    # チャンネルロックをチェック
+    if deduplicator.is_channel_locked(channel_id, command_name):
+        logger.debug("チャンネルロックによりコマンドをスキップ", command=command_name, channel=channel_id)
+        return False
+
+    # チャンネルをロック (特定のコマンドだけより長いロック時間を設定)
+    lock_duration = 5.0 if command_name == "compose" else 2.0
+    deduplicator.lock_channel(channel_id, command_name, lock_duration)
+    return True
+
+def release_stage(ctx):
+    """受信パイプラインの後処理: 実行完了後にチャンネルロックを短縮"""
+    if ctx.command is None:
+        return
+    get_deduplicator().release_channel(ctx.channel.id, ctx.command.qualified_name.split()[0])
+
+def apply_deduplicator():
+    """重複防止を受信パイプラインに登録"""
+    from utils.middleware import Stage, INBOUND, get_pipeline
+
+    get_pipeline().add_stage(Stage("deduplicator", INBOUND, deduplicate_stage,
+                                   order=10, finish=release_stage))
+    logger.info("重複防止ステージを登録しました")
+    return True
 
 def patch_command(command_name):
     """特定のコマンドに重複防止機能を追加するデコレータ"""
@@ -180,7 +111,7 @@ def patch_command(command_name):
             
             # 重複チェック (確実に二重にチェック)
             if hasattr(ctx, f"_processed_{command_name}") or deduplicator.is_duplicate(f"{message_id}_{command_name}"):
-                logger.debug(f"重複コマンド実行をスキップ: {command_name} for message {message_id}")
+                logger.debug("重複コマンド実行をスキップ", command=command_name, message_id=message_id)
                 return
             
             # 処理済みとしてマーク
@@ -192,7 +123,7 @@ def patch_command(command_name):
             
             # 同一チャンネルでの連続実行をチェック
             if deduplicator.is_channel_locked(channel_id, command_name):
-                logger.debug(f"チャンネルロックによりコマンドをスキップ: {command_name} in {channel_id}")
+                logger.debug("チャンネルロックによりコマンドをスキップ", command=command_name, channel=channel_id)
                 return
             
             # チャンネルをロック
@@ -202,9 +133,8 @@ def patch_command(command_name):
                 # 実際の処理を実行
                 return await func(ctx, *args, **kwargs)
             finally:
-                # 一定時間後にロックを解除
-                await asyncio.sleep(0.5)  # 最小限の実行時間を保証
-                deduplicator.unlock_channel(channel_id, command_name)
+                # 最小限の間隔をおいてロックを解除
+                deduplicator.release_channel(channel_id, command_name)
         
         return wrapper
     
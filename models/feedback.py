@@ -1,9 +1,13 @@
 import uuid
 import datetime
-import json
 import os
 from typing import List, Dict, Any, Optional
 
+from utils import json_codec
+from utils.logger import get_logger
+
+logger = get_logger("feedback")
+
 
 class Feedback:
     """フィードバックを表すモデルクラス"""
@@ -150,8 +154,7 @@ class FeedbackManager:
             os.makedirs(self.feedback_directory)
         
         if not os.path.exists(self.feedback_file):
-            with open(self.feedback_file, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
+            json_codec.dump_file(self.feedback_file, [])
     
     def save_feedback(self, feedback: Feedback) -> bool:
         """フィードバックを保存する"""
@@ -166,19 +169,17 @@ class FeedbackManager:
             all_feedback.append(feedback.to_dict())
         
         try:
-            with open(self.feedback_file, "w", encoding="utf-8") as f:
-                json.dump(all_feedback, f, ensure_ascii=False, indent=2)
+            json_codec.dump_file(self.feedback_file, all_feedback)
             return True
         except Exception as e:
-            print(f"フィードバック保存エラー: {e}")
+            logger.error("フィードバック保存エラー", feedback_id=feedback.id, error=str(e))
             return False
     
     def load_all_feedback(self) -> List[Dict[str, Any]]:
         """すべてのフィードバックを読み込む"""
         try:
-            with open(self.feedback_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            return json_codec.load_file(self.feedback_file)
+        except (FileNotFoundError, json_codec.JSONDecodeError):
             return []
     
     def get_feedback_by_id(self, feedback_id: str) -> Optional[Feedback]:
@@ -233,11 +234,10 @@ class FeedbackManager:
                 all_feedback.pop(i)
                 
                 try:
-                    with open(self.feedback_file, "w", encoding="utf-8") as f:
-                        json.dump(all_feedback, f, ensure_ascii=False, indent=2)
+                    json_codec.dump_file(self.feedback_file, all_feedback)
                     return True
                 except Exception as e:
-                    print(f"フィードバック削除エラー: {e}")
+                    logger.error("フィードバック削除エラー", feedback_id=feedback_id, error=str(e))
                     return False
         
         return False  # フィードバックが見つからなかった
@@ -3,8 +3,20 @@
 """
 import random
 import asyncio
+import datetime
 from models.player import Player
+from models.roles import HOOKS, overridden_hooks
+from models.night_resolution import ATTACK, CAUSE_ATTACK, CAUSE_DIVINATION, make_action, resolve_night
+from utils.game_actor import TICK, DEADLINE
 from utils.config import GameConfig
+from utils.memory_tracker import track
+from utils.logger import get_logger
+
+logger = get_logger("game")
+
+# 統計用のゲーム結果で使う陣営名
+RESULT_TEAMS = {"村人陣営": "village", "人狼陣営": "werewolf", "妖狐陣営": "fox"}
+RESULT_WINNERS = {"villager": "village", "werewolf": "werewolf", "fox": "fox"}
 
 class Game:
     """ゲームクラス"""
@@ -16,15 +28,24 @@ class Game:
         self.players = {}  # {user_id: Player}
         self.phase = "waiting"  # waiting, night, day, voting, finished
         self.day_count = 0  # 経過日数
+        self.started_at = None  # 開始日時
+        self.finished_at = None  # 登録を解除した時刻（time.monotonic）
         
         # Discord Bot参照（後で設定）
         self.bot = None
         
+        # フェーズの進行を直列に処理するアクター（GameManagementCogで設定）
+        self.actor = None
+        # フェーズが進むたびに増える番号（古いイベントの判定用）
+        self.phase_generation = 0
+        
         # 夜のアクション結果
         self.wolf_target = None  # 人狼の標的
         self.protected_target = None  # 狩人の護衛対象
         self.last_killed = None  # 最後に殺された人
+        self.last_executed = None  # 最後に処刑された人
         self.killed_by_divination = None  # 占いによって殺された妖狐
+        self.night_result = None  # 直前の夜の解決結果
         
         # 投票関連
         self.votes = {}  # {voter_id: target_id}
@@ -38,6 +59,20 @@ class Game:
         # 特殊ルール
         from models.special_rules import SpecialRules
         self.special_rules = SpecialRules()
+        
+        # 役職フックの呼び出し先 {フック名: {user_id: Player}}（上書きしている役職のプレイヤーのみ）
+        self.hook_table = {hook: {} for hook in HOOKS}
+        
+        # Embed用の表示断片のキャッシュ（参加者・生死・役職が変わったときに破棄）
+        self.render_cache = {}
+        
+        # メモリ計測用に登録
+        track(self, "game")
+    
+    @property
+    def key(self):
+        """ゲームを識別するキー (サーバーID, チャンネルID)"""
+        return (str(self.guild_id), str(self.channel_id))
     
     def add_player(self, user_id, name):
         """プレイヤーを追加"""
@@ -46,8 +81,13 @@ class Game:
         
         player = Player(user_id, name, self)
         self.players[str(user_id)] = player
+        self.invalidate_render_cache()
         return player
     
+    def invalidate_render_cache(self):
+        """表示断片のキャッシュを破棄"""
+        self.render_cache.clear()
+    
     def start_game(self):
         """ゲームを開始、役職を割り当て"""
         if len(self.players) < 5:
@@ -56,8 +96,10 @@ class Game:
         # 役職割り当て
         try:
             self.assign_roles()
+            self.build_hook_table()
             self.phase = "night"
             self.day_count = 1
+            self.started_at = datetime.datetime.now()
             return True, None
         except Exception as e:
             return False, str(e)
@@ -81,9 +123,49 @@ class Game:
             if i < len(role_list):
                 self.players[player_id].assign_role(role_list[i])
     
+    def build_hook_table(self):
+        """役職クラスが上書きしているフックごとに、呼び出すプレイヤーの表を作成"""
+        table = {hook: {} for hook in HOOKS}
+        for user_id, player in self.players.items():
+            if player.role_instance:
+                for hook in overridden_hooks(type(player.role_instance)):
+                    table[hook][user_id] = player
+        self.hook_table = table
+    
+    def run_hook(self, hook, *args):
+        """
+        フェーズのフックを、上書きしている役職の生存者だけに呼び出す
+        
+        Returns:
+        --------
+        list
+            [(Player, 戻り値), ...]（戻り値がNoneのものは除く）
+        """
+        results = []
+        for player in list(self.hook_table[hook].values()):
+            if player.is_alive:
+                result = self._call_hook(player, hook, *args)
+                if result is not None:
+                    results.append((player, result))
+        return results
+    
+    def run_player_hook(self, player, hook, *args):
+        """特定のプレイヤーのフックを呼び出す（上書きしていない役職では何もしない）"""
+        if str(player.user_id) not in self.hook_table[hook]:
+            return None
+        return self._call_hook(player, hook, *args)
+    
+    def _call_hook(self, player, hook, *args):
+        try:
+            return getattr(player.role_instance, hook)(*args)
+        except Exception as e:
+            logger.error("Role hook failed", guild=self.guild_id, game=self.channel_id, role=player.role, hook=hook, error=str(e))
+            return None
+    
     def next_phase(self):
         """次のフェーズへ移行"""
         self.cancel_timer()  # 現在のタイマーをキャンセル
+        self.phase_generation += 1
         
         if self.phase == "waiting":
             self.phase = "night"
@@ -99,48 +181,71 @@ class Game:
             self.day_count += 1
             self.reset_night_actions()
     
-    def process_night_actions(self):
-        """夜のアクションを処理"""
-        # 人狼の襲撃処理
-        self.last_killed = None  # 最後に殺されたプレイヤーをリセット
-        
-        if self.wolf_target:
-            target_id = self.wolf_target
-            target_player = self.players.get(str(target_id))
-            
-            # 護衛対象かチェック
-            if self.protected_target == target_id:
-                # 護衛成功
-                pass
-            # 妖狐の襲撃耐性チェック
-            elif target_player and target_player.is_fox():
-                # 妖狐は人狼の襲撃では死なない
-                pass
-            else:
-                # 襲撃成功
-                if target_player:
-                    target_player.kill()
-                    self.last_killed = str(target_id)
-                    
-                    # 霊界チャットの権限更新は非同期で行う必要があるため、
-                    # night_actions.py側でasyncioタスクとして実行している
-        
-        # 妖狐の占い死亡処理
-        if self.killed_by_divination:
-            fox_player = self.players.get(str(self.killed_by_divination))
-            if fox_player and fox_player.is_alive:
-                fox_player.kill()
-                # last_killedが設定されていない場合のみ設定（人狼の襲撃より優先度低）
-                if not self.last_killed:
-                    self.last_killed = str(self.killed_by_divination)
+    def collect_night_actions(self):
+        """提出された夜のアクションを解決エンジン用に集める（人狼の襲撃は1件にまとめる）"""
+        actions = []
+        attack_added = False
+        for user_id, player in self.players.items():
+            role = player.role_instance
+            if not (role and role.night_action_kind and player.is_alive and player.night_action_used):
+                continue
+            target_id = player.night_action_target
+            if role.night_action_kind == ATTACK:
+                if attack_added:
+                    continue
+                target_id = self.wolf_target or target_id
+                attack_added = True
+            if target_id is None:
+                continue
+            actions.append(make_action(user_id, role.night_action_kind, target_id, role.night_action_priority))
+        return actions
+    
+    def process_night_actions(self, rng=None):
+        """
+        夜のアクションを解決エンジンで一括処理
+        
+        Returns:
+        --------
+        NightResult
+            死亡者と死因・阻止されたアクション・告知メッセージ
+        """
+        lovers = {}
+        if self.special_rules.lovers_enabled:
+            for first, second in self.special_rules.lovers:
+                lovers[str(first)] = str(second)
+                lovers[str(second)] = str(first)
+        
+        result = resolve_night(
+            {user_id: player.role for user_id, player in self.players.items()},
+            [user_id for user_id, player in self.players.items() if player.is_alive],
+            self.collect_night_actions(),
+            lovers=lovers,
+            names={user_id: player.name for user_id, player in self.players.items()},
+            rng=rng
+        )
+        
+        # 死亡を反映（恋人などの連鎖はエンジン側で解決済み）
+        for death in result.deaths:
+            player = self.players[death.player_id]
+            player.is_alive = False
+            player.death_reason = player.death_reason or death.cause
+        
+        # 襲撃の犠牲者を優先し、いなければ最初の死亡者
+        attacked = result.deaths_by(CAUSE_ATTACK)
+        divined = result.deaths_by(CAUSE_DIVINATION)
+        self.last_killed = attacked[0] if attacked else (result.deaths[0].player_id if result.deaths else None)
+        self.killed_by_divination = divined[0] if divined else None
+        self.night_result = result
         
         # 次の夜に備えて状態リセット (last_killedとkilled_by_divinationは保持)
         self.wolf_target = None
         self.protected_target = None
+        return result
     
     def process_voting(self):
         """投票を集計"""
         self.vote_count = {}
+        self.last_executed = None
         
         # 票を集計
         for target_id in self.votes.values():
@@ -163,8 +268,11 @@ class Game:
         if targets:
             executed_id = random.choice(targets)
             if str(executed_id) in self.players:
-                self.players[str(executed_id)].kill()
+                executed = self.players[str(executed_id)].kill()
+                if not executed.is_alive:
+                    executed.death_reason = executed.death_reason or "executed"
                 self.last_killed = str(executed_id)
+                self.last_executed = str(executed_id)
         
         # 投票リセット
         self.votes = {}
@@ -198,7 +306,43 @@ class Game:
         
         # ゲーム続行
         return False, None
-    
+
+    def build_result(self, winning_team, guild_name=""):
+        """
+        統計・ゲームログ用のゲーム結果を作成（StatsManager.record_game_result の形式）
+
+        Parameters:
+        -----------
+        winning_team : str
+            check_game_end が返した勝者（"villager", "werewolf", "fox"）
+        """
+        end_time = datetime.datetime.now()
+        start_time = self.started_at or end_time
+        players = []
+        for user_id, player in self.players.items():
+            team = player.role_instance.team if player.role_instance else None
+            players.append({
+                "id": int(user_id),
+                "name": player.name,
+                "role": player.role,
+                "team": RESULT_TEAMS.get(team),
+                "is_alive": player.is_alive,
+                "death_reason": player.death_reason,
+                "death_day": player.death_day
+            })
+        return {
+            "id": f"{self.guild_id}_{self.channel_id}_{start_time:%Y%m%d%H%M%S}",
+            "guild_id": int(self.guild_id),
+            "guild_name": guild_name,
+            "channel_id": int(self.channel_id),
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "duration": int((end_time - start_time).total_seconds()),
+            "day_count": self.day_count,
+            "winner": RESULT_WINNERS.get(winning_team, winning_team),
+            "players": players
+        }
+
     def reset_night_actions(self):
         """夜のアクション状態をリセット"""
         for player in self.players.values():
@@ -225,27 +369,35 @@ class Game:
         """人狼プレイヤーを取得"""
         return [p for p in self.players.values() if p.is_werewolf()]
     
-    async def start_timer(self, seconds, update_callback, complete_callback):
-        """タイマーを開始"""
+    def start_timer(self, seconds):
+        """
+        フェーズのタイマーを開始
+        
+        経過（毎秒）と期限切れはアクターにイベントとして投函し、フェーズの処理自体はアクター側で行う
+        """
         # 既存のタイマーをキャンセル
         self.cancel_timer()
         
         self.remaining_time = seconds
-        
-        # タイマー処理
+        self.timer = asyncio.create_task(self._run_timer(seconds))
+    
+    async def _run_timer(self, seconds):
+        """タイマー処理（sleepの誤差が積み重ならないよう期限の時刻から残り秒数を求める）"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
         try:
             while self.remaining_time > 0:
-                if update_callback:
-                    await update_callback(self.remaining_time)
+                if self.actor:
+                    self.actor.post(TICK, remaining=self.remaining_time)
                 
-                await asyncio.sleep(1)
+                await asyncio.sleep(max(0.0, deadline - loop.time() - (self.remaining_time - 1)))
                 self.remaining_time -= 1
             
             # タイマー完了
-            if complete_callback:
-                await complete_callback()
+            if self.actor:
+                self.actor.post(DEADLINE)
         except asyncio.CancelledError:
-            print("タイマーがキャンセルされました")
+            pass
     
     def cancel_timer(self):
         """タイマーをキャンセル"""
@@ -0,0 +1,177 @@
+"""
+夜の解決エンジン
+提出された夜のアクションを優先度順に並べ、1回の走査で決定的に解決する
+
+入力は役職名・生存者・アクションの単純なデータだけなので、ライブのゲームだけでなく
+ログの再生や大量のシミュレーションからもそのまま呼び出せる
+"""
+import random
+from collections import namedtuple
+
+# アクションの種類
+GUARD = "guard"          # 護衛（狩人）
+DIVINE = "divine"        # 占い（占い師）: 人狼かどうか
+PROPHECY = "prophecy"    # 預言（預言者）: 人狼 / 妖狐 / 人間
+ATTACK = "attack"        # 襲撃（人狼）
+
+# 既定の優先度（小さいほど先に解決）。護衛は襲撃より、占いによる妖狐の死亡は襲撃より先
+ACTION_PRIORITIES = {
+    GUARD: 10,
+    DIVINE: 20,
+    PROPHECY: 20,
+    ATTACK: 30,
+}
+
+# 死因
+CAUSE_ATTACK = "attack"          # 人狼の襲撃
+CAUSE_DIVINATION = "divination"  # 占われた妖狐
+CAUSE_REVENGE = "revenge"        # 猫又の道連れ
+CAUSE_SUICIDE = "suicide"        # 妖狐の全滅による背徳者の後追い
+CAUSE_LOVERS = "lovers"          # 恋人の後追い
+
+# 阻止の理由
+BLOCKED_GUARDED = "guarded"      # 護衛された
+BLOCKED_FOX = "fox"              # 妖狐は襲撃では死なない
+BLOCKED_DEAD = "dead"            # 対象か実行者がすでに死亡している
+BLOCKED_SELF = "self"            # 自分自身が対象
+
+NightAction = namedtuple("NightAction", ["actor_id", "kind", "target_id", "priority"])
+Death = namedtuple("Death", ["player_id", "cause", "source_id"])
+BlockedAction = namedtuple("BlockedAction", ["action", "reason"])
+ActionResult = namedtuple("ActionResult", ["action", "value"])
+NightMessage = namedtuple("NightMessage", ["user_id", "text"])  # user_id が None なら全体への告知
+
+
+class NightResult:
+    """夜の解決結果"""
+
+    __slots__ = ("deaths", "blocked", "results", "messages", "alive")
+
+    def __init__(self, alive):
+        self.deaths = []      # [Death, ...]（死亡した順）
+        self.blocked = []     # [BlockedAction, ...]
+        self.results = []     # [ActionResult, ...]（占い・預言・護衛の結果）
+        self.messages = []    # [NightMessage, ...]
+        self.alive = alive    # 解決後の生存者
+
+    def deaths_by(self, cause):
+        """指定した死因の死亡者ID"""
+        return [death.player_id for death in self.deaths if death.cause == cause]
+
+    def was_blocked(self, kind, reason):
+        """指定した種類のアクションが指定した理由で阻止されたか"""
+        return any(blocked.action.kind == kind and blocked.reason == reason for blocked in self.blocked)
+
+    def to_dict(self):
+        """ログ・シミュレーション集計用の辞書"""
+        return {
+            "deaths": [death._asdict() for death in self.deaths],
+            "blocked": [{"actor_id": b.action.actor_id, "kind": b.action.kind,
+                         "target_id": b.action.target_id, "reason": b.reason} for b in self.blocked],
+            "results": [{"actor_id": r.action.actor_id, "kind": r.action.kind,
+                         "target_id": r.action.target_id, "value": r.value} for r in self.results],
+        }
+
+
+def make_action(actor_id, kind, target_id, priority=None):
+    """アクションを作成（優先度を省略した場合は種類の既定値）"""
+    if priority is None:
+        priority = ACTION_PRIORITIES[kind]
+    return NightAction(str(actor_id), kind, str(target_id), priority)
+
+
+def resolve_night(roles, alive, actions, lovers=None, names=None, rng=None):
+    """
+    夜のアクションを解決
+
+    Parameters:
+    -----------
+    roles : dict
+        {player_id: 役職名}
+    alive : iterable
+        夜の開始時点の生存者ID
+    actions : iterable
+        NightAction のリスト（人狼の襲撃は1件にまとめておく）
+    lovers : dict, optional
+        {player_id: 恋人のID}
+    names : dict, optional
+        {player_id: 表示名}（メッセージ用、省略時はID）
+    rng : random.Random, optional
+        猫又の道連れ先の抽選に使う乱数（再生・シミュレーションでは種を固定する）
+
+    Returns:
+    --------
+    NightResult
+    """
+    rng = rng or random
+    names = names or {}
+    lovers = lovers or {}
+    alive = set(str(player_id) for player_id in alive)
+    result = NightResult(alive)
+    guarded = set()
+
+    def name(player_id):
+        return names.get(player_id, player_id)
+
+    def kill(player_id, cause, source_id=None):
+        if player_id not in alive:
+            return False
+        alive.discard(player_id)
+        result.deaths.append(Death(player_id, cause, source_id))
+        return True
+
+    # 優先度順（同じ優先度は実行者ID順）に1回だけ走査
+    for action in sorted(actions, key=lambda a: (a.priority, a.actor_id)):
+        actor_id, kind, target_id = action.actor_id, action.kind, action.target_id
+
+        if actor_id not in alive or target_id not in alive:
+            result.blocked.append(BlockedAction(action, BLOCKED_DEAD))
+            continue
+
+        if kind == GUARD:
+            if target_id == actor_id:
+                result.blocked.append(BlockedAction(action, BLOCKED_SELF))
+                continue
+            guarded.add(target_id)
+            result.results.append(ActionResult(action, True))
+
+        elif kind == DIVINE or kind == PROPHECY:
+            target_role = roles.get(target_id)
+            if kind == DIVINE:
+                value = target_role == "人狼"
+            else:
+                value = "werewolf" if target_role == "人狼" else "fox" if target_role == "妖狐" else "human"
+            result.results.append(ActionResult(action, value))
+            # 占われた妖狐は死亡する
+            if target_role == "妖狐":
+                kill(target_id, CAUSE_DIVINATION, actor_id)
+
+        elif kind == ATTACK:
+            if target_id in guarded:
+                result.blocked.append(BlockedAction(action, BLOCKED_GUARDED))
+            elif roles.get(target_id) == "妖狐":
+                result.blocked.append(BlockedAction(action, BLOCKED_FOX))
+            else:
+                kill(target_id, CAUSE_ATTACK, actor_id)
+
+    # 死亡による連鎖（猫又の道連れ → 恋人の後追い → 背徳者の後追い）
+    for death in list(result.deaths):
+        if death.cause == CAUSE_ATTACK and roles.get(death.player_id) == "猫又":
+            wolves = sorted(player_id for player_id in alive if roles.get(player_id) == "人狼")
+            if wolves:
+                victim = rng.choice(wolves)
+                kill(victim, CAUSE_REVENGE, death.player_id)
+                result.messages.append(NightMessage(None, f"猫又 **{name(death.player_id)}** の呪いにより、**{name(victim)}** が道連れになりました。"))
+
+    for death in list(result.deaths):
+        partner_id = lovers.get(death.player_id)
+        if partner_id and kill(str(partner_id), CAUSE_LOVERS, death.player_id):
+            result.messages.append(NightMessage(None, f"**{name(str(partner_id))}** は恋人の後を追いました。"))
+
+    fox_died = any(roles.get(death.player_id) == "妖狐" for death in result.deaths)
+    if fox_died and not any(roles.get(player_id) == "妖狐" for player_id in alive):
+        for player_id in sorted(alive):
+            if roles.get(player_id) == "背徳者" and kill(player_id, CAUSE_SUICIDE):
+                result.messages.append(NightMessage(None, f"**{name(player_id)}** は妖狐の後を追いました。"))
+
+    return result
@@ -2,6 +2,7 @@
 プレイヤーモデル
 """
 from models.roles import create_role_instance
+from utils.memory_tracker import track
 
 class Player:
     """プレイヤークラス"""
@@ -11,8 +12,10 @@ class Player:
         self.name = name  # プレイヤー名
         self.role_name = None  # 役職名（文字列）
         self.role_instance = None  # 役職クラスのインスタンス
-        self.is_alive = True  # 生存状態
         self.game = game  # ゲーム参照
+        self._is_alive = True  # 生存状態
+        self.death_day = None  # 死亡した日
+        self.death_reason = None  # 死因（"attack", "executed" など）
         
         # 夜のアクション用
         self.night_action_used = False  # 夜のアクションを使用したか
@@ -21,13 +24,33 @@ class Player:
         
         # 占い結果保存用（占い師用）
         self.divination_results = {}  # {user_id: is_werewolf}
+        
+        # メモリ計測用に登録
+        track(self, "player")
     
     def assign_role(self, role_name):
         """役職を割り当て"""
         self.role_name = role_name
         self.role_instance = create_role_instance(role_name, self)
+        if self.game:
+            self.game.invalidate_render_cache()
         return self
     
+    @property
+    def is_alive(self):
+        """生存状態"""
+        return self._is_alive
+    
+    @is_alive.setter
+    def is_alive(self, value):
+        """生存状態を設定（変化した場合はゲームの表示キャッシュを破棄）"""
+        if value != self._is_alive:
+            self._is_alive = value
+            if not value and self.death_day is None and self.game:
+                self.death_day = self.game.day_count
+            if self.game:
+                self.game.invalidate_render_cache()
+    
     @property
     def role(self):
         """役職名を返す（後方互換性のため）"""
@@ -1,4 +1,4 @@
-from .base_role import BaseRole
+from .base_role import BaseRole, HOOKS, overridden_hooks
 from .villager import Villager
 from .werewolf import Werewolf
 from .seer import Seer
@@ -47,6 +47,8 @@ def create_role_instance(role_name, player):
 
 __all__ = [
     'BaseRole',
+    'HOOKS',
+    'overridden_hooks',
     'Villager',
     'Werewolf',
     'Seer',
@@ -3,10 +3,27 @@
 全ての役職クラスはこのクラスを継承する
 """
 from abc import ABC, abstractmethod
+from functools import lru_cache
+
+# ゲームが役職クラスに対して呼び出すフック
+# 戻り値が discord.Embed の場合、呼び出し側がそのプレイヤーにDMで送信する
+HOOKS = (
+    "on_game_start",
+    "on_night_start",
+    "on_day_start",
+    "on_night_action",
+    "on_voted",
+    "on_executed",
+    "on_killed",
+)
 
 class BaseRole(ABC):
     """役職の基底クラス"""
     
+    # 夜のアクションの種類と解決の優先度（models.night_resolution を参照、Noneは解決対象外）
+    night_action_kind = None
+    night_action_priority = None
+    
     def __init__(self, player):
         self.player = player  # プレイヤーの参照
         self.game = player.game  # ゲームの参照
@@ -31,6 +48,10 @@ class BaseRole(ABC):
         """夜のアクションを実行する"""
         pass
     
+    def on_night_action(self, target_player):
+        """夜のアクションが成功したときの処理（結果のEmbedを返すと実行者に表示される）"""
+        pass
+    
     def on_voted(self):
         """投票されたときの処理"""
         pass
@@ -58,3 +79,9 @@ class BaseRole(ABC):
     def get_night_action_result(self):
         """夜のアクション結果を取得"""
         return None
+
+
+@lru_cache(maxsize=None)
+def overridden_hooks(role_class):
+    """役職クラスが上書きしているフックの一覧"""
+    return tuple(hook for hook in HOOKS if getattr(role_class, hook) is not getattr(BaseRole, hook))
@@ -31,7 +31,7 @@ class Cat(BaseRole):
         
         embed.add_field(
             name="特殊能力", 
-            value="処刑または襲撃で死亡した場合、生存者の中から一人を選んで道連れにできます。", 
+            value="処刑された場合は生存者の中から一人を選んで道連れにできます。人狼に襲撃された場合は、人狼の中から一人が道連れになります。", 
             inline=False
         )
         
@@ -39,11 +39,7 @@ class Cat(BaseRole):
         return embed
     
     def on_executed(self):
-        """処刑されたときの処理（道連れ能力の発動）"""
-        return self._activate_curse_ability()
-    
-    def on_killed(self):
-        """襲撃されたときの処理（道連れ能力の発動）"""
+        """処刑されたときの処理（道連れ能力の発動、襲撃時の道連れは夜の解決で処理される）"""
         return self._activate_curse_ability()
     
     def _activate_curse_ability(self):
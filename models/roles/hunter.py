@@ -3,10 +3,13 @@
 夜に一人を護衛して人狼の襲撃から守る能力を持つ
 """
 from .base_role import BaseRole
+from models.night_resolution import GUARD
 
 class Hunter(BaseRole):
     """狩人クラス"""
     
+    night_action_kind = GUARD
+    
     @property
     def name(self):
         return "狩人"
@@ -26,3 +29,8 @@ class Hunter(BaseRole):
         self.player.night_action_used = True
         
         return True, "護衛対象を設定しました。"
+    
+    def on_night_action(self, target_player):
+        """護衛対象をゲームに反映"""
+        self.game.protected_target = str(target_player.user_id)
+        self.player.last_protected = str(target_player.user_id)
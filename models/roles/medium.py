@@ -3,6 +3,7 @@
 処刑されたプレイヤーが人狼かどうかを知る能力を持つ
 """
 from .base_role import BaseRole
+import discord
 
 class Medium(BaseRole):
     """霊媒師クラス"""
@@ -20,16 +21,43 @@ class Medium(BaseRole):
         return False, "霊媒師は対象を選択するアクションがありません。処刑結果は自動的に通知されます。"
     
     def on_night_start(self):
-        """夜のフェーズ開始時に自動的に処刑者の結果を得る"""
+        """夜のフェーズ開始時に自動的に処刑者の結果を得て、結果のEmbedを返す"""
         if not self.game.last_executed:
-            return
+            return None
         
         executed_player = self.game.players.get(self.game.last_executed)
-        if executed_player:
-            is_werewolf = executed_player.role == "人狼"
-            self.player.medium_results[self.game.last_executed] = is_werewolf
-            # アクション済みフラグを立てる
-            self.player.night_action_used = True
+        if not executed_player:
+            return None
+        
+        is_werewolf = executed_player.role == "人狼"
+        if not hasattr(self.player, "medium_results"):
+            self.player.medium_results = {}
+        self.player.medium_results[self.game.last_executed] = {
+            "name": executed_player.name,
+            "is_werewolf": is_werewolf,
+            "day": self.game.day_count - 1
+        }
+        # アクション済みフラグを立てる
+        self.player.night_action_used = True
+        
+        embed = discord.Embed(
+            title="🔮 霊能結果",
+            description=f"Day {self.game.day_count - 1}の霊能結果",
+            color=0xF44336 if is_werewolf else 0x4CAF50  # 赤色（人狼）/ 緑色（村人陣営）
+        )
+        result = "**人狼**でした！" if is_werewolf else "**村人陣営**でした。"
+        embed.add_field(name="本日の結果", value=f"処刑された **{executed_player.name}** は {result}", inline=False)
+        
+        # 過去の霊能結果履歴
+        history = [
+            f"Day {entry['day']}: {entry['name']} - {'**人狼**' if entry['is_werewolf'] else '**村人陣営**'}"
+            for user_id, entry in self.player.medium_results.items()
+            if user_id != self.game.last_executed
+        ]
+        if history:
+            embed.add_field(name="履歴", value="これまでの霊能結果:\n" + "\n".join(history), inline=False)
+        
+        return embed
     
     def get_night_action_result(self):
         """霊媒結果を取得"""
@@ -3,10 +3,14 @@
 夜に一人を預言して、人狼と妖狐を区別できる上位互換の占い師
 """
 from .base_role import BaseRole
+from models.night_resolution import PROPHECY
+import discord
 
 class Prophet(BaseRole):
     """預言者クラス"""
     
+    night_action_kind = PROPHECY
+    
     @property
     def name(self):
         return "預言者"
@@ -39,13 +43,21 @@ class Prophet(BaseRole):
         
         self.player.prophecy_results[target_id] = result
         
-        # 妖狐の占い死判定 - 預言者も妖狐を死亡させる
-        if target_player.role == "妖狐" and target_player.is_alive:
-            target_player.kill()
-            self.game.killed_by_divination = target_id
+        # 占われた妖狐の死亡は夜の解決時に処理される
         
         return True, "預言を実行しました。"
     
+    def on_night_action(self, target_player):
+        """預言結果を表示"""
+        _, result_text = self.get_night_action_result()
+        if result_text is None:
+            return None
+        return discord.Embed(
+            title="🔮 預言結果",
+            description=f"**{target_player.name}** は **{result_text}** です。",
+            color=0x9C27B0  # 紫色（預言）
+        )
+    
     def get_night_action_result(self):
         """預言結果を取得"""
         if not self.player.night_action_target:
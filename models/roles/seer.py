@@ -3,10 +3,14 @@
 夜に一人を占い、陣営を知ることができる
 """
 from .base_role import BaseRole
+from models.night_resolution import DIVINE
+from utils.embed_creator import create_divination_result_embed
 
 class Seer(BaseRole):
     """占い師クラス"""
     
+    night_action_kind = DIVINE
+    
     @property
     def name(self):
         return "占い師"
@@ -29,13 +33,14 @@ class Seer(BaseRole):
         is_werewolf = target_player.role == "人狼"
         self.player.divination_results[target_id] = is_werewolf
         
-        # 妖狐の占い死判定
-        if target_player.role == "妖狐" and target_player.is_alive:
-            target_player.kill()
-            self.game.killed_by_divination = target_id
+        # 占われた妖狐の死亡は夜の解決時に処理される
         
         return True, "占いを実行しました。"
     
+    def on_night_action(self, target_player):
+        """占い結果を表示"""
+        return create_divination_result_embed(target_player, target_player.is_werewolf())
+    
     def get_night_action_result(self):
         """占い結果を取得"""
         if not self.player.night_action_target:
@@ -3,10 +3,13 @@
 夜に一人を襲撃できる能力を持つ
 """
 from .base_role import BaseRole
+from models.night_resolution import ATTACK
 
 class Werewolf(BaseRole):
     """人狼クラス"""
     
+    night_action_kind = ATTACK
+    
     @property
     def name(self):
         return "人狼"
@@ -38,6 +41,10 @@ class Werewolf(BaseRole):
         
         return True, "襲撃対象を設定しました。"
     
+    def on_night_action(self, target_player):
+        """襲撃対象をゲームに反映"""
+        self.game.wolf_target = str(target_player.user_id)
+    
     def get_teammates(self):
         """仲間の人狼を取得"""
         return [p for p in self.game.players.values() 
@@ -3,9 +3,10 @@
 """
 import datetime
 import uuid
-import json
 from typing import Dict, List, Optional, Any, Union
 
+from utils import json_codec
+
 class Suggestion:
     """ユーザー提案を管理するクラス"""
     
@@ -100,18 +101,16 @@ class SuggestionManager:
         import os
         if not os.path.exists(self.data_path):
             os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
-            with open(self.data_path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+            json_codec.dump_file(self.data_path, [])
             return
             
         try:
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                suggestions_data = json.load(f)
+            suggestions_data = json_codec.load_file(self.data_path)
                 
             for data in suggestions_data:
                 suggestion = Suggestion.from_dict(data)
                 self.suggestions[suggestion.id] = suggestion
-        except (json.JSONDecodeError, FileNotFoundError):
+        except (json_codec.JSONDecodeError, FileNotFoundError):
             self.suggestions = {}
             
     def save_suggestions(self) -> None:
@@ -121,8 +120,7 @@ class SuggestionManager:
         import os
         os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
         
-        with open(self.data_path, "w", encoding="utf-8") as f:
-            json.dump(suggestions_data, f, ensure_ascii=False, indent=2)
+        json_codec.dump_file(self.data_path, suggestions_data)
         
     def save_suggestion(self, suggestion: Suggestion) -> None:
         """提案を保存"""
@@ -1,8 +0,0 @@
-"""
-モンキーパッチユーティリティ（一時的に無効化中）
-"""
-
-def apply_monkey_patches():
-    """Discord.pyの内部実装にモンキーパッチを適用"""
-    print("モンキーパッチは一時的に無効化されています。")
-    return False
@@ -0,0 +1,115 @@
+"""
+utils/backup_store.py のテスト
+増分バックアップの実体の共有と、検証してから入れ替える復元を一時ディレクトリで確認します
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import backup_store
+from utils.backup_store import BackupVerificationError, create_backup, restore_backup
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def make_sources(root):
+    sources = {"config": os.path.join(root, "config"), "logs": os.path.join(root, "logs")}
+    write(os.path.join(sources["config"], "server_1.json"), '{"prefix":"!"}')
+    write(os.path.join(sources["logs"], "1", "game_a.json"), '{"id":"a"}')
+    write(os.path.join(sources["logs"], "1", "game_b.json"), '{"id":"a"}')
+    return sources
+
+
+def test_create_backup_deduplicates_contents():
+    with tempfile.TemporaryDirectory() as root:
+        sources = make_sources(root)
+        backup_dir = os.path.join(root, "backup")
+        result = create_backup(sources, backup_dir, os.path.join(backup_dir, "backup_1"))
+        assert result["files"] == 3
+        # game_a と game_b は同じ内容なので実体は2つ
+        assert result["new_objects"] == 2
+        assert result["reused"] == 1
+
+        manifest = backup_store.load_manifest(os.path.join(backup_dir, "backup_1"))
+        assert set(manifest) == {"config/server_1.json", "logs/1/game_a.json", "logs/1/game_b.json"}
+        assert manifest["logs/1/game_a.json"]["hash"] == manifest["logs/1/game_b.json"]["hash"]
+        assert read(os.path.join(backup_dir, "backup_1", "logs", "1", "game_b.json")) == '{"id":"a"}'
+
+
+def test_second_backup_only_copies_changed_files():
+    with tempfile.TemporaryDirectory() as root:
+        sources = make_sources(root)
+        backup_dir = os.path.join(root, "backup")
+        create_backup(sources, backup_dir, os.path.join(backup_dir, "backup_1"))
+        write(os.path.join(sources["config"], "server_1.json"), '{"prefix":"??"}')
+
+        result = create_backup(sources, backup_dir, os.path.join(backup_dir, "backup_2"))
+        assert result["new_objects"] == 1
+        assert result["reused"] == 2
+        assert backup_store.latest_backup(backup_dir) == os.path.join(backup_dir, "backup_2")
+        # 前回のバックアップは変わらない
+        assert read(os.path.join(backup_dir, "backup_1", "config", "server_1.json")) == '{"prefix":"!"}'
+        assert read(os.path.join(backup_dir, "backup_2", "config", "server_1.json")) == '{"prefix":"??"}'
+        assert not any(name.endswith(backup_store.STAGING_SUFFIX) for name in os.listdir(backup_dir))
+
+
+def test_restore_swaps_in_backup_contents():
+    with tempfile.TemporaryDirectory() as root:
+        sources = make_sources(root)
+        backup_dir = os.path.join(root, "backup")
+        backup_path = os.path.join(backup_dir, "backup_1")
+        create_backup(sources, backup_dir, backup_path)
+
+        write(os.path.join(sources["config"], "server_1.json"), "broken")
+        write(os.path.join(sources["config"], "server_2.json"), "{}")
+        assert restore_backup(backup_path, sources) == 3
+
+        assert read(os.path.join(sources["config"], "server_1.json")) == '{"prefix":"!"}'
+        assert not os.path.exists(os.path.join(sources["config"], "server_2.json"))
+        assert sorted(os.listdir(root)) == ["backup", "config", "logs"]
+
+        # 復元したファイルを書き換えてもバックアップ側は変わらない
+        write(os.path.join(sources["config"], "server_1.json"), "changed")
+        assert read(os.path.join(backup_path, "config", "server_1.json")) == '{"prefix":"!"}'
+
+
+def test_restore_verification_failure_keeps_live_data():
+    with tempfile.TemporaryDirectory() as root:
+        sources = make_sources(root)
+        backup_dir = os.path.join(root, "backup")
+        backup_path = os.path.join(backup_dir, "backup_1")
+        create_backup(sources, backup_dir, backup_path)
+
+        # バックアップ内のファイルを壊す（実体とのハードリンクを切ってから書き換える）
+        corrupted = os.path.join(backup_path, "logs", "1", "game_a.json")
+        os.remove(corrupted)
+        write(corrupted, "corrupted")
+        write(os.path.join(sources["config"], "server_1.json"), "live")
+
+        try:
+            restore_backup(backup_path, sources)
+            assert False, "BackupVerificationError was not raised"
+        except BackupVerificationError:
+            pass
+
+        # 検証に失敗した場合はどのディレクトリも入れ替えない
+        assert read(os.path.join(sources["config"], "server_1.json")) == "live"
+        assert sorted(os.listdir(root)) == ["backup", "config", "logs"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,86 @@
+"""
+utils/composition_rules.py のテスト
+宣言的なルールから作ったバリデータが、構成ごとに正しいエラー・警告を返すことを確認します
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.composition_rules import CompositionValidator, normalize, validate
+
+
+def test_standard_composition_is_valid():
+    result = validate({"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1})
+    assert result.valid
+    assert result.errors == ()
+    assert result.warnings == ()
+    assert abs(result.score - (3 - 6 + 3 + 2 + 1.5 - 1)) < 1e-9
+
+
+def test_normalize_merges_aliases_and_drops_zero_counts():
+    assert normalize({"霊能者": 1, "霊媒師": 1, "狩人": 0, "村人": "2"}) == (("村人", 2), ("霊媒師", 2))
+    assert validate({"霊能者": 1, "村人": 2, "人狼": 1, "占い師": 1}) is validate(
+        {"霊媒師": 1, "村人": 2, "人狼": 1, "占い師": 1})
+
+
+def test_errors():
+    cases = [
+        ({"村人": 2, "人狼": 1, "占い師": 1}, "5人未満"),
+        ({"村人": 4, "占い師": 1}, "人狼役職がいません"),
+        ({"村人": 4, "人狼": 1}, "占い師が必要"),
+        ({"村人": 2, "人狼": 2, "占い師": 1, "狂人": 1}, "村人陣営の人数以上"),
+        ({"村人": 5, "人狼": 1, "占い師": 1, "狂人": 1, "狂信者": 1}, "狂人の数が人狼より多く"),
+        ({"村人": 3, "人狼": 1, "占い師": 1, "妖狐": 1, "背徳者": 1}, "第三陣営の数が多すぎます"),
+        ({"村人": 6, "人狼": 1, "占い師": 1, "背徳者": 1}, "背徳者がいる場合は妖狐が必要"),
+        ({"村人": 6, "人狼": 1, "妖狐": 1}, "妖狐がいる場合は占い師か預言者が必要"),
+    ]
+    for composition, expected in cases:
+        result = validate(composition)
+        assert not result.valid, composition
+        assert any(expected in message for message in result.errors), (composition, result.errors)
+
+
+def test_fox_accepts_any_seer_role():
+    result = validate({"村人": 4, "人狼": 2, "預言者": 1, "狩人": 1, "妖狐": 1})
+    assert result.valid, result.errors
+
+
+def test_warnings_do_not_invalidate():
+    cases = [
+        ({"村人": 3, "人狼": 1, "占い師": 1, "共有者": 1}, "共有者は0人か2人"),
+        ({"村人": 3, "人狼": 1, "占い師": 1, "預言者": 1}, "占い師と預言者が同時"),
+        ({"村人": 3, "人狼": 1, "占い師": 1, "謎の役職": 1}, "不明な役職が含まれています: 謎の役職"),
+        ({"村人": 10, "人狼": 1, "占い師": 1, "狩人": 1, "霊媒師": 1}, "村人陣営が有利すぎる"),
+    ]
+    for composition, expected in cases:
+        result = validate(composition)
+        assert result.valid, (composition, result.errors)
+        assert any(expected in message for message in result.warnings), (composition, result.warnings)
+
+
+def test_custom_rules_and_cache():
+    validator = CompositionValidator([
+        {"type": "min_players", "value": 3, "level": "error", "message": "少なすぎ"},
+        {"type": "required", "roles": ("人狼",), "level": "warning", "message": "人狼なし"},
+    ])
+    assert validator.validate({"村人": 2}).errors == ("少なすぎ",)
+    result = validator.validate({"村人": 3})
+    assert result.valid and result.warnings == ("人狼なし",)
+    validator.validate({"村人": 3})
+    assert validator.cache_info().hits == 1
+
+
+def test_unknown_rule_type_is_rejected():
+    try:
+        CompositionValidator([{"type": "no_such_rule", "level": "error"}])
+        assert False, "ValueError was not raised"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,97 @@
+"""
+utils/composition_search.py のテスト
+推奨構成が以前の人数別の推奨構成表と一致することを確認します
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import composition_search
+from utils.composition_rules import ROLE_CATALOG, validate
+from utils.composition_search import STANDARD_ROLES, recommend, recommend_async
+
+# 以前の推奨構成表（11人は共有者を2人に揃えたもの）
+EXPECTED = {
+    5: {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1},
+    6: {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+    7: {"村人": 3, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+    8: {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "狂人": 1},
+    9: {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1},
+    10: {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1},
+    11: {"村人": 2, "人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "共有者": 2},
+    12: {"村人": 2, "人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1, "共有者": 2},
+}
+
+
+def test_all_roles_match_previous_table():
+    for player_count, expected in EXPECTED.items():
+        assert recommend(player_count, k=1)[0][1] == expected, player_count
+
+
+def test_standard_roles_match_previous_table():
+    for player_count, expected in EXPECTED.items():
+        assert recommend(player_count, STANDARD_ROLES, k=1)[0][1] == expected, player_count
+
+
+def test_alternatives_are_valid_and_sorted():
+    for player_count in (5, 8, 12, 20):
+        results = recommend(player_count, STANDARD_ROLES, k=5)
+        assert len(results) == 5
+        scores = [score for score, _ in results]
+        assert scores == sorted(scores, reverse=True)
+        for _, composition in results:
+            assert sum(composition.values()) == player_count
+            assert validate(composition).valid
+            assert set(composition) <= set(STANDARD_ROLES)
+
+
+def test_large_counts_scale_wolves():
+    composition = recommend(30, STANDARD_ROLES, k=1)[0][1]
+    assert composition["人狼"] == 6
+    assert sum(composition.values()) == 30
+    assert validate(composition).valid
+
+
+def test_disabled_role_is_not_used():
+    enabled = [role for role in ROLE_CATALOG if role != "狩人"]
+    for player_count in (5, 9, 12):
+        composition = recommend(player_count, enabled, k=1)[0][1]
+        assert "狩人" not in composition
+        assert validate(composition).valid
+
+
+def test_k_shares_cache():
+    composition_search.search.cache_clear()
+    recommend(9, STANDARD_ROLES, k=1)
+    recommend(9, STANDARD_ROLES, k=3)
+    assert composition_search.search.cache_info().misses == 1
+
+
+def test_recommend_async():
+    results = asyncio.run(recommend_async(7, STANDARD_ROLES, k=1))
+    assert results[0][1] == EXPECTED[7]
+
+
+def test_large_search_is_fast():
+    # 全役職・最大人数でもキャッシュなしの探索が短時間で終わる
+    composition_search.search.cache_clear()
+    started = time.perf_counter()
+    results = recommend(composition_search.MAX_PLAYERS, k=5)
+    elapsed = time.perf_counter() - started
+    assert len(results) == 5
+    assert elapsed < 0.5, elapsed
+
+
+def test_out_of_range():
+    assert recommend(4) == []
+    assert recommend(composition_search.MAX_PLAYERS + 1) == []
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,90 @@
+"""
+utils/decayed_stats.py のテスト
+終了したゲームの結果（Game.build_result の形式）で最近の傾向と平均ゲーム時間が更新されることを確認します
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.decayed_stats import DecayedStats
+
+DAY = 24 * 3600
+
+
+def game_result(guild_id, winner, duration):
+    """VotingCog.end_game が記録するゲーム結果と同じ形"""
+    return {
+        "id": f"{guild_id}_1_{duration}",
+        "guild_id": guild_id,
+        "duration": duration,
+        "winner": winner,
+        "players": [
+            {"id": 1, "name": "a", "role": "人狼", "team": "werewolf", "is_alive": True},
+            {"id": 2, "name": "b", "role": "占い師", "team": "village", "is_alive": False},
+            {"id": 3, "name": "c", "role": "村人", "team": "village", "is_alive": True},
+        ]
+    }
+
+
+def new_stats(tmp, half_life=14 * DAY):
+    return DecayedStats(os.path.join(tmp, "decayed_stats.json"), half_life=half_life)
+
+
+def test_records_game_and_average_duration():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = new_stats(tmp)
+        now = stats.landmark
+        stats.record_game(game_result(10, "village", 600), now=now)
+        stats.record_game(game_result(10, "werewolf", 1200), now=now)
+        snapshot = stats.snapshot(10, now=now)
+    assert abs(snapshot["games"] - 2) < 1e-9
+    assert abs(snapshot["average_duration"] - 900) < 1e-9
+    assert abs(snapshot["team_win_rates"]["village"] - 0.5) < 1e-9
+    assert abs(snapshot["team_win_rates"]["wolf"] - 0.5) < 1e-9
+    assert snapshot["roles"]["人狼"]["wins"] == 1
+    assert snapshot["roles"]["村人"]["appearances"] == 2
+
+
+def test_guild_and_global_scopes():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = new_stats(tmp)
+        now = stats.landmark
+        stats.record_game(game_result(10, "village", 600), now=now)
+        stats.record_game(game_result(20, "werewolf", 300), now=now)
+        assert abs(stats.snapshot(20, now=now)["average_duration"] - 300) < 1e-9
+        assert abs(stats.snapshot(now=now)["games"] - 2) < 1e-9
+        assert stats.snapshot(30, now=now)["games"] == 0
+
+
+def test_old_games_decay_by_half_life():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = new_stats(tmp, half_life=DAY)
+        start = stats.landmark
+        stats.record_game(game_result(10, "werewolf", 600), now=start)
+        stats.record_game(game_result(10, "village", 1800), now=start + DAY)
+        snapshot = stats.snapshot(10, now=start + DAY)
+    # 1日前のゲームは重み1/2
+    assert abs(snapshot["games"] - 1.5) < 1e-9
+    assert abs(snapshot["team_win_rates"]["village"] - 2 / 3) < 1e-9
+    assert abs(snapshot["average_duration"] - (600 * 0.5 + 1800) / 1.5) < 1e-6
+
+
+def test_unknown_winner_is_ignored_and_state_persists():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = new_stats(tmp)
+        now = stats.landmark
+        stats.record_game(game_result(10, None, 600), now=now)
+        assert stats.snapshot(10, now=now)["games"] == 0
+        stats.record_game(game_result(10, "fox", 600), now=now)
+        stats.save()
+        loaded = new_stats(tmp)
+        assert loaded.snapshot(10, now=now) == stats.snapshot(10, now=now)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
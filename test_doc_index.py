@@ -0,0 +1,59 @@
+"""
+utils/doc_index.py のテスト
+セクションの抽出と、分かち書きなしの日本語での検索を一時ディレクトリのドキュメントで確認します
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.doc_index import DocIndex, tokenize
+
+GUIDE = """# ユーザーガイド
+人狼ゲームを遊ぶためのガイドです。
+
+## 役職
+人狼は夜に村人を襲撃します。占い師は夜に1人を占います。
+
+## コマンド
+!werewolf_help でヘルプを表示します。
+"""
+
+
+def make_index(root):
+    with open(os.path.join(root, "user_guide.md"), "w", encoding="utf-8") as f:
+        f.write(GUIDE)
+    return DocIndex(root, {"guide": "user_guide.md"})
+
+
+def test_tokenize():
+    assert tokenize("人狼 Game") == ["人狼", "game"]
+    assert tokenize("占い師") == ["占い", "い師"]
+    assert sorted(tokenize("人狼", unigrams=True)) == sorted(["人狼", "人", "狼"])
+    assert tokenize("狼") == ["狼"]
+
+
+def test_sections_and_search():
+    with tempfile.TemporaryDirectory() as root:
+        index = make_index(root)
+        assert [section.title for section in index.sections] == ["ユーザーガイド", "役職", "コマンド"]
+        results = index.search("占い師")
+        assert results[0].title == "役職"
+        assert "占い師" in results[0].snippet
+        assert index.search("werewolf_help")[0].title == "コマンド"
+        assert index.search("存在しない語句") == []
+
+
+def test_single_character_query_matches_bigrams():
+    with tempfile.TemporaryDirectory() as root:
+        index = make_index(root)
+        titles = {result.title for result in index.search("狼")}
+        assert titles == {"ユーザーガイド", "役職"}
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,103 @@
+"""
+utils/game_archive.py のテスト
+個別ログのファイル名、月ごとのアーカイブへの圧縮と読み込みを一時ディレクトリで確認します
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import game_archive, json_codec
+
+
+def write_log(guild_dir, name, game_data, age=7200):
+    path = os.path.join(guild_dir, name)
+    json_codec.dump_file(path, game_data)
+    mtime = os.path.getmtime(path) - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def game(game_id, end_time):
+    return {"id": game_id, "end_time": end_time, "winner": "village", "players": []}
+
+
+def test_loose_names_are_unique_and_match_pattern():
+    now = datetime.datetime(2026, 3, 1, 21, 0, 0)
+    names = {game_archive.loose_log_name(123, now) for _ in range(100)}
+    assert len(names) == 100
+    for name in names:
+        match = game_archive.LOOSE_PATTERN.match(name)
+        assert match and match.group(1) == "202603"
+        assert name.startswith("game_20260301_210000_123_")
+    # 旧形式のファイル名も圧縮対象
+    assert game_archive.LOOSE_PATTERN.match("game_20260301_210000.json").group(1) == "202603"
+    assert not game_archive.LOOSE_PATTERN.match("game_20260301_210000.json.tmp")
+    assert not game_archive.LOOSE_PATTERN.match("games_202603.jsonl.gz")
+
+
+def test_compact_and_read_back():
+    with tempfile.TemporaryDirectory() as guild_dir:
+        first = game_archive.loose_log_name(1, datetime.datetime(2026, 3, 1, 21, 0, 0))
+        second = game_archive.loose_log_name(2, datetime.datetime(2026, 3, 1, 21, 0, 0))
+        third = game_archive.loose_log_name(1, datetime.datetime(2026, 4, 2, 21, 0, 0))
+        write_log(guild_dir, first, game("a", "2026-03-01T21:00:00"))
+        write_log(guild_dir, second, game("b", "2026-03-01T21:00:00"))
+        write_log(guild_dir, third, game("c", "2026-04-02T21:00:00"))
+        write_log(guild_dir, "game_20260405_210000.json", game("d", "2026-04-05T21:00:00"))
+        # 書き込み直後のファイルは残す
+        fresh = game_archive.loose_log_name(1)
+        write_log(guild_dir, fresh, game("e", "2099-01-01T00:00:00"), age=0)
+
+        assert game_archive.compact_guild(guild_dir) == 4
+        assert sorted(os.listdir(guild_dir)) == sorted([
+            fresh, "games_202603.jsonl.gz", "games_202603.idx.json",
+            "games_202604.jsonl.gz", "games_202604.idx.json"])
+        assert game_archive.list_months(guild_dir) == ["202604", "202603"]
+
+        entries = game_archive.list_entries(guild_dir)
+        assert set(entries) == {first, second, third, "game_20260405_210000.json"}
+        month, offset, length = entries[second]
+        assert game_archive.read_entry(guild_dir, month, offset, length)["id"] == "b"
+
+        ids = [game_data["id"] for game_data in game_archive.iter_guild_logs(guild_dir)]
+        assert sorted(ids[:2]) == ["a", "b"]
+        assert ids[2:] == ["c", "d", "e"]
+
+
+def test_compact_appends_and_truncates_unindexed_tail():
+    with tempfile.TemporaryDirectory() as guild_dir:
+        when = datetime.datetime(2026, 5, 1, 12, 0, 0)
+        write_log(guild_dir, game_archive.loose_log_name(1, when), game("a", "2026-05-01T12:00:00"))
+        game_archive.compact_guild(guild_dir)
+
+        # 前回の圧縮が索引の保存前に中断した状態を再現
+        with open(game_archive.archive_path(guild_dir, "202605"), "ab") as pack:
+            pack.write(b"garbage")
+        write_log(guild_dir, game_archive.loose_log_name(1, when), game("b", "2026-05-01T12:00:00"))
+        assert game_archive.compact_guild(guild_dir) == 1
+
+        ids = sorted(game_data["id"] for game_data in game_archive.iter_archive(guild_dir, "202605"))
+        assert ids == ["a", "b"]
+
+
+def test_iter_all_logs_merges_guilds_by_end_time():
+    with tempfile.TemporaryDirectory() as logs_dir:
+        for guild_id, games in (("1", [("a", "2026-01-01"), ("c", "2026-01-03")]),
+                                ("2", [("b", "2026-01-02"), ("d", "2026-01-04")])):
+            guild_dir = os.path.join(logs_dir, guild_id)
+            os.makedirs(guild_dir)
+            for game_id, day in games:
+                when = datetime.datetime.fromisoformat(day)
+                write_log(guild_dir, game_archive.loose_log_name(guild_id, when), game(game_id, f"{day}T00:00:00"))
+        game_archive.compact_all(logs_dir)
+        assert [game_data["id"] for game_data in game_archive.iter_all_logs(logs_dir)] == ["a", "b", "c", "d"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,102 @@
+"""
+utils/game_history.py のテスト
+列指向のゲーム履歴の追加・絞り込み・集計と、Wilsonスコア区間を確認します
+"""
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.game_history import GameHistory, wilson_interval
+
+
+def game(game_id, winner, roles, guild_id=1, day=1, duration=600):
+    teams = {"人狼": "werewolf", "狂人": "werewolf", "妖狐": "fox"}
+    return {
+        "id": game_id,
+        "guild_id": guild_id,
+        "winner": winner,
+        "end_time": datetime.datetime(2026, 1, day, 21, 0, 0).isoformat(),
+        "duration": duration,
+        "players": [{"role": role, "team": teams.get(role, "village"), "is_alive": i % 2 == 0}
+                    for i, role in enumerate(roles)],
+    }
+
+
+FIVE = ["人狼", "占い師", "狩人", "村人", "村人"]
+SIX = ["人狼", "占い師", "狩人", "村人", "村人", "狂人"]
+
+
+def make_history():
+    return GameHistory([
+        game("a", "village", FIVE, day=1, duration=300),
+        game("b", "werewolf", FIVE, day=2, duration=900),
+        game("c", "village", SIX, guild_id=2, day=3, duration=600),
+        game("d", "village", FIVE, day=4, duration=300),
+    ])
+
+
+def test_wilson_interval():
+    low, high = wilson_interval([5, 0], [10, 0])
+    assert abs(low[0] - 0.2366) < 1e-3 and abs(high[0] - 0.7634) < 1e-3
+    assert low[1] == 0.0 and high[1] == 0.0
+
+
+def test_append_skips_duplicates_and_unknown_winner():
+    history = make_history()
+    assert len(history) == 4
+    assert not history.append(game("a", "village", FIVE))
+    assert not history.append(game("e", None, FIVE))
+    assert history.append(game("e", "fox", SIX + ["妖狐"], day=5))
+    assert len(history) == 5
+
+
+def test_select():
+    history = make_history()
+    assert int(history.select().sum()) == 4
+    assert int(history.select(guild_id=2).sum()) == 1
+    assert int(history.select(player_count=(6, 7)).sum()) == 1
+    assert int(history.select(since=datetime.datetime(2026, 1, 2), until=datetime.datetime(2026, 1, 4)).sum()) == 2
+    assert int(history.select(composition={"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1}).sum()) == 3
+    assert int(history.select(composition={"村人": 5}).sum()) == 0
+
+
+def test_team_and_role_rates():
+    history = make_history()
+    teams = history.team_win_rates()
+    assert teams["village"]["wins"] == 3 and teams["village"]["games"] == 4
+    assert teams["werewolf"]["rate"] == 0.25
+    assert teams["fox"]["wins"] == 0 and teams["fox"]["rate"] == 0.0
+    assert teams["village"]["low"] < 0.75 < teams["village"]["high"]
+
+    roles = history.role_win_rates(guild_id=1)
+    assert roles["村人"] == dict(roles["村人"], games=6, wins=4)
+    assert roles["人狼"]["wins"] == 1
+    assert "狂人" not in roles
+    assert history.role_survival_rates()["人狼"]["wins"] == 4
+    assert history.average_duration() == {"village": 400.0, "werewolf": 900.0}
+
+
+def test_by_player_count_and_composition():
+    history = make_history()
+    by_count = history.by_player_count()
+    assert sorted(by_count) == [5, 6]
+    assert by_count[5]["village"]["wins"] == 2 and by_count[5]["village"]["games"] == 3
+
+    compositions = history.by_composition()
+    assert set(compositions[0][0].split(",")) == {"人狼1", "占い師1", "狩人1", "村人2"}
+    assert [games for _, games, _ in compositions] == [3, 1]
+    assert history.by_composition(min_games=2)[0][1] == 3
+    assert len(history.by_composition(min_games=2)) == 1
+
+    compare = history.compare_guild(2)
+    assert compare["guild"]["village"]["rate"] == 1.0
+    assert compare["global"]["village"]["games"] == 4
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
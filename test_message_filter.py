@@ -0,0 +1,65 @@
+"""
+utils/message_filter.py のテスト
+エラーメッセージのブロックと、短時間の二重送信だけを防ぐ重複フィルタを確認します
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import message_filter, ttl_store
+
+_MONOTONIC = time.monotonic
+
+
+class FakeClock:
+    """time.monotonic の代わりに使う手動の時計"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def payload(content=None, embeds=None, channel_id=1):
+    data = {"content": content}
+    if embeds is not None:
+        data["embeds"] = embeds
+    return {"route": SimpleNamespace(channel_id=channel_id, method="POST", url=""), "kwargs": {"json": data}}
+
+
+def teardown_function(_):
+    ttl_store.time.monotonic = _MONOTONIC
+    message_filter._recent_messages.clear()
+
+
+def test_error_messages_are_blocked():
+    assert not message_filter.error_filter_stage(payload("ValueError: bad"))
+    blocked = payload(embeds=[{"description": "Traceback (most recent call last)"}])
+    assert not message_filter.error_filter_stage(blocked)
+    assert blocked["response"]["id"] == message_filter.BLOCKED_MESSAGE_ID
+    assert message_filter.error_filter_stage(payload("エラーが発生しました"))
+
+
+def test_duplicates_are_blocked_only_within_window():
+    clock = FakeClock()
+    ttl_store.time.monotonic = clock
+    embeds = [{"title": "🌙 夜のフェーズ 第1夜"}]
+    assert message_filter.duplicate_filter_stage(payload(embeds=embeds))
+    assert not message_filter.duplicate_filter_stage(payload(embeds=embeds))
+    # 別のチャンネルには送れる
+    assert message_filter.duplicate_filter_stage(payload(embeds=embeds, channel_id=2))
+    # 次のゲームの同じ告知は送れる
+    clock.now += message_filter.DUPLICATE_WINDOW + 1
+    assert message_filter.duplicate_filter_stage(payload(embeds=embeds))
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            teardown_function(func)
+            print(f"OK {name}")
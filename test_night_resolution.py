@@ -0,0 +1,105 @@
+"""
+models/night_resolution.py のテスト
+護衛・妖狐・猫又・恋人・背徳者の連鎖が決定的に解決されることを確認します
+"""
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.night_resolution import (
+    ATTACK, BLOCKED_DEAD, BLOCKED_FOX, BLOCKED_GUARDED, BLOCKED_SELF, CAUSE_ATTACK,
+    CAUSE_DIVINATION, CAUSE_LOVERS, CAUSE_REVENGE, CAUSE_SUICIDE, DIVINE, GUARD, PROPHECY,
+    make_action, resolve_night,
+)
+
+ROLES = {
+    "1": "人狼", "2": "人狼", "3": "占い師", "4": "狩人", "5": "村人",
+    "6": "妖狐", "7": "背徳者", "8": "猫又", "9": "預言者",
+}
+
+
+def test_guard_blocks_attack():
+    actions = [make_action(1, ATTACK, 5), make_action(4, GUARD, 5)]
+    result = resolve_night(ROLES, ROLES, actions)
+    assert result.deaths == []
+    assert result.was_blocked(ATTACK, BLOCKED_GUARDED)
+    assert "5" in result.alive
+
+
+def test_guard_self_is_blocked():
+    actions = [make_action(4, GUARD, 4), make_action(1, ATTACK, 4)]
+    result = resolve_night(ROLES, ROLES, actions)
+    assert result.was_blocked(GUARD, BLOCKED_SELF)
+    assert result.deaths_by(CAUSE_ATTACK) == ["4"]
+
+
+def test_fox_survives_attack():
+    result = resolve_night(ROLES, ROLES, [make_action(1, ATTACK, 6)])
+    assert result.deaths == []
+    assert result.was_blocked(ATTACK, BLOCKED_FOX)
+
+
+def test_divined_fox_dies_and_immoralist_follows():
+    actions = [make_action(3, DIVINE, 6), make_action(1, ATTACK, 5)]
+    result = resolve_night(ROLES, ROLES, actions)
+    assert result.deaths_by(CAUSE_DIVINATION) == ["6"]
+    assert result.deaths_by(CAUSE_ATTACK) == ["5"]
+    assert result.deaths_by(CAUSE_SUICIDE) == ["7"]
+    assert result.results[0].value is False
+    assert "7" not in result.alive
+
+
+def test_prophecy_values():
+    actions = [make_action(9, PROPHECY, 1), make_action(3, DIVINE, 2)]
+    result = resolve_night(ROLES, ROLES, actions)
+    assert [r.value for r in result.results] == [True, "werewolf"]
+    result = resolve_night(ROLES, ROLES, [make_action(9, PROPHECY, 6)])
+    assert result.results[0].value == "fox"
+    assert result.deaths_by(CAUSE_DIVINATION) == ["6"]
+
+
+def test_nekomata_takes_a_wolf():
+    result = resolve_night(ROLES, ROLES, [make_action(1, ATTACK, 8)], rng=random.Random(0))
+    assert result.deaths_by(CAUSE_ATTACK) == ["8"]
+    victims = result.deaths_by(CAUSE_REVENGE)
+    assert len(victims) == 1 and ROLES[victims[0]] == "人狼"
+    assert result.deaths[1].source_id == "8"
+    assert len(result.messages) == 1
+
+
+def test_lovers_follow_chain_deaths():
+    # 猫又の道連れになった人狼の恋人も後を追う
+    roles = {"1": "人狼", "3": "占い師", "5": "村人", "8": "猫又"}
+    lovers = {"1": "5", "5": "1"}
+    result = resolve_night(roles, roles, [make_action(1, ATTACK, 8)], lovers=lovers,
+                           names={"5": "Alice"}, rng=random.Random(0))
+    assert [death.cause for death in result.deaths] == [CAUSE_ATTACK, CAUSE_REVENGE, CAUSE_LOVERS]
+    assert result.deaths[2] == ("5", CAUSE_LOVERS, "1")
+    assert "Alice" in result.messages[-1].text
+    assert result.alive == {"3"}
+
+
+def test_dead_actor_or_target_is_blocked():
+    alive = [player_id for player_id in ROLES if player_id != "5"]
+    actions = [make_action(2, ATTACK, 5), make_action(3, DIVINE, 6)]
+    result = resolve_night(ROLES, alive, actions)
+    assert result.was_blocked(ATTACK, BLOCKED_DEAD)
+    # 死亡者を対象にしないアクションはそのまま解決される
+    assert result.deaths_by(CAUSE_DIVINATION) == ["6"]
+
+
+def test_priority_order_is_deterministic():
+    # 優先度を下げた護衛は襲撃に間に合わない
+    actions = [make_action(1, ATTACK, 5), make_action(4, GUARD, 5, priority=40)]
+    result = resolve_night(ROLES, ROLES, actions)
+    assert result.deaths_by(CAUSE_ATTACK) == ["5"]
+    assert result.to_dict() == resolve_night(ROLES, ROLES, list(reversed(actions))).to_dict()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
@@ -0,0 +1,118 @@
+"""
+utils/rating.py のテスト
+1ゲームずつの差分更新（RatingBook.record_game）と一括再計算（batch_recompute）が同じ結果になることを確認します
+"""
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import rating
+from utils.rating import TEAMS, RatingBook, batch_recompute
+
+ROLES = {"village": "村人", "werewolf": "人狼", "fox": "妖狐"}
+
+
+def make_games(count, seed=0, pool=12):
+    """ランダムなゲーム履歴（古い順）"""
+    rng = random.Random(seed)
+    games = []
+    for i in range(count):
+        seats = rng.sample(range(pool), rng.randint(5, 9))
+        teams = ["werewolf", "werewolf"] + ["village"] * (len(seats) - 2)
+        if rng.random() < 0.3:
+            teams[-1] = "fox"
+        rng.shuffle(teams)
+        present = sorted(set(teams))
+        games.append({
+            "id": f"game{i}",
+            "winner": rng.choice(present),
+            "players": [{"id": seat, "name": f"p{seat}", "role": ROLES[team], "team": team}
+                        for seat, team in zip(seats, teams)]
+        })
+    return games
+
+
+def incremental(games, path):
+    book = RatingBook(path)
+    for game_data in games:
+        book.record_game(game_data)
+    return book
+
+
+def assert_same(book, player_ids, names, ratings, played):
+    assert sorted(book.players) == sorted(player_ids)
+    for i, player_id in enumerate(player_ids):
+        entry = book.players[player_id]
+        assert entry["name"] == names[i]
+        for j, team in enumerate(TEAMS):
+            assert entry["games"][team] == played[i][j]
+            assert abs(entry["ratings"][team] - float(ratings[i][j])) < 1e-9
+
+
+def test_incremental_matches_batch():
+    games = make_games(300)
+    with tempfile.TemporaryDirectory() as tmp:
+        book = incremental(games, os.path.join(tmp, "ratings.json"))
+    player_ids, names, ratings, played = batch_recompute(games)
+    assert_same(book, player_ids, names, ratings[0], played)
+
+
+def test_incremental_matches_pure_python_batch():
+    games = make_games(200, seed=1)
+    original = rating.NUMPY_AVAILABLE
+    rating.NUMPY_AVAILABLE = False
+    try:
+        player_ids, names, ratings, played = batch_recompute(games, k_values=(16.0, 32.0))
+    finally:
+        rating.NUMPY_AVAILABLE = original
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, k in enumerate((16.0, 32.0)):
+            book = RatingBook(os.path.join(tmp, f"ratings{i}.json"), k=k)
+            for game_data in games:
+                book.record_game(game_data)
+            assert_same(book, player_ids, names, ratings[i], played)
+
+
+def test_recompute_matches_incremental_and_index():
+    games = make_games(150, seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ratings.json")
+        expected = incremental(games, path)
+        book = RatingBook(path)
+        book.recompute(games)
+    for player_id in expected.players:
+        assert abs(book.overall(player_id) - expected.overall(player_id)) < 1e-9
+    assert [p for p, _ in book.index.top(5)] == [p for p, _ in expected.index.top(5)]
+
+
+def test_unknown_winner_and_team_are_ignored():
+    games = make_games(20, seed=3)
+    noisy = games + [
+        {"id": "x", "winner": None, "players": games[0]["players"]},
+        {"id": "y", "winner": "village", "players": [{"id": 99, "name": "観戦", "role": "?", "team": None}]},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        book = incremental(noisy, os.path.join(tmp, "ratings.json"))
+    player_ids, names, ratings, played = batch_recompute(games)
+    assert_same(book, player_ids, names, ratings[0], played)
+
+
+def test_save_and_load_round_trip():
+    games = make_games(30, seed=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ratings.json")
+        book = incremental(games, path)
+        book.save()
+        loaded = RatingBook(path)
+    assert loaded.players == book.players
+    assert loaded.index.top(3) == book.index.top(3)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"OK {name}")
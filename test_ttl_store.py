@@ -0,0 +1,133 @@
+"""
+utils/ttl_store.py のテスト
+期限切れ・上限件数・バケット内の参照数を、時刻を差し替えて確認します
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+
+from utils import ttl_store
+from utils.ttl_store import TTLStore
+
+_MONOTONIC = time.monotonic
+
+
+class FakeClock:
+    """time.monotonic の代わりに使う手動の時計"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(clock, **kwargs):
+    ttl_store.time.monotonic = clock
+    return TTLStore(**kwargs)
+
+
+def references(store):
+    """バケットが保持しているキー参照の総数"""
+    return sum(len(keys) for keys in store._buckets.values())
+
+
+def teardown_function(_):
+    ttl_store.time.monotonic = _MONOTONIC
+
+
+def test_get_set_and_expiry():
+    clock = FakeClock()
+    store = make_store(clock, ttl=10, bucket_seconds=1)
+    store.set("a", 1)
+    store.add("b", ttl=2)
+    assert store.get("a") == 1
+    assert "b" in store
+    clock.now += 3
+    assert "b" not in store
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    clock.now += 10
+    store.expire()
+    assert len(store) == 0
+    assert store.get_stats()["expired"] == 2
+
+
+def test_repeated_set_keeps_one_reference_per_key():
+    clock = FakeClock()
+    store = make_store(clock, ttl=5, max_entries=10, bucket_seconds=1)
+    for i in range(100000):
+        store.set("k", i)
+        clock.now += 0.01
+    assert len(store) == 1
+    assert references(store) == 1
+    assert store.get("k") == 99999
+    assert store.get_stats()["heap"] <= 2 * len(store._buckets) + 16
+
+
+def test_max_entries_evicts_nearest_expiry():
+    clock = FakeClock()
+    store = make_store(clock, ttl=100, max_entries=3, bucket_seconds=1)
+    for i, key in enumerate("abcd"):
+        store.set(key, ttl=10 + i)
+    assert len(store) == 3
+    assert references(store) == 3
+    assert "a" not in store
+    assert store.get_stats()["evicted"] == 1
+
+
+def test_pop_discard_and_shorten_leave_no_stale_references():
+    clock = FakeClock()
+    store = make_store(clock, ttl=60, max_entries=1000, bucket_seconds=1)
+    for i in range(500):
+        store.set(i, i)
+    for i in range(0, 500, 2):
+        assert store.pop(i) == i
+    for i in range(1, 250, 2):
+        store.discard(i)
+    for i in range(251, 500, 2):
+        store.shorten(i, 5)
+    assert len(store) == 125
+    assert references(store) == 125
+    assert store.pop(0, "none") == "none"
+    clock.now += 6
+    for _ in range(10):
+        store.expire()
+    assert len(store) == 0
+    assert references(store) == 0
+    assert store._buckets == {}
+
+
+def test_sweep_is_incremental():
+    clock = FakeClock()
+    store = make_store(clock, ttl=1, max_entries=1000, bucket_seconds=1, sweep_limit=4)
+    for i in range(10):
+        store.set(i)
+    clock.now += 5
+    store.expire()
+    assert len(store) == 6
+    store.expire()
+    store.expire()
+    assert len(store) == 0
+
+
+def test_clear():
+    clock = FakeClock()
+    store = make_store(clock, ttl=10)
+    store.set("a")
+    store.clear()
+    assert len(store) == 0
+    assert store.get_stats() == {"entries": 0, "buckets": 0, "heap": 0, "expired": 0, "evicted": 0}
+    store.set("a", 2)
+    assert store.get("a") == 2
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            teardown_function(func)
+            print(f"OK {name}")
@@ -0,0 +1,231 @@
+"""
+バックアップストアモジュール
+ファイル内容のハッシュで重複を排除した増分バックアップと、一時ディレクトリ経由の復元を行う
+
+構成:
+- {backup_dir}/objects/ab/abcdef... : 内容ごとに1つだけ保存される実体
+- {backup_dir}/backup_YYYYmmdd_HHMMSS/ : 実体へのハードリンクで組み立てた通常のディレクトリツリー
+- {backup_dir}/backup_YYYYmmdd_HHMMSS/manifest.json : {相対パス: {"hash", "size", "mtime_ns"}}
+
+すべての処理はブロッキングなので、イベントループからは run_in_executor で呼び出す
+"""
+import hashlib
+import os
+import shutil
+
+from utils import json_codec
+
+MANIFEST_NAME = "manifest.json"
+OBJECTS_DIR = "objects"
+# 復元時の一時ディレクトリの接尾辞
+STAGING_SUFFIX = ".restoring"
+OLD_SUFFIX = ".old"
+# ハッシュ計算時の読み込みサイズ
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupVerificationError(Exception):
+    """復元データの検証に失敗した場合の例外"""
+    pass
+
+
+def file_hash(path):
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _walk_files(root):
+    """root以下のファイルの相対パス（区切りは/）"""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def load_manifest(backup_path):
+    """バックアップのマニフェストを読み込む（旧形式のバックアップではNone）"""
+    try:
+        return json_codec.load_file(os.path.join(backup_path, MANIFEST_NAME))
+    except (FileNotFoundError, json_codec.JSONDecodeError):
+        return None
+
+
+def latest_backup(backup_dir):
+    """マニフェストを持つ最新のバックアップ"""
+    if not os.path.exists(backup_dir):
+        return None
+    names = sorted((name for name in os.listdir(backup_dir) if name.startswith("backup_")), reverse=True)
+    for name in names:
+        path = os.path.join(backup_dir, name)
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            return path
+    return None
+
+
+def _link_or_copy(src, dst):
+    """ハードリンクを作成（非対応のファイルシステムではコピー）"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def create_backup(sources, backup_dir, backup_path, progress=None):
+    """
+    増分バックアップを作成
+
+    Parameters:
+    -----------
+    sources : dict
+        {バックアップ内の名前: 元ディレクトリ} （例: {"config": "data/config"}）
+    progress : callable, optional
+        progress(処理済みファイル数, 総ファイル数) を呼び出す
+
+    Returns:
+    --------
+    dict
+        {"files", "new_objects", "reused", "bytes_copied"}
+    """
+    objects_dir = os.path.join(backup_dir, OBJECTS_DIR)
+    os.makedirs(objects_dir, exist_ok=True)
+
+    # 前回のマニフェストと比較し、サイズと更新時刻が同じファイルはハッシュを再計算しない
+    previous_path = latest_backup(backup_dir)
+    previous = (load_manifest(previous_path) or {}) if previous_path else {}
+
+    files = []
+    for name, source in sources.items():
+        if os.path.exists(source):
+            files.extend((name, source, relative) for relative in _walk_files(source))
+
+    manifest = {}
+    result = {"files": len(files), "new_objects": 0, "reused": 0, "bytes_copied": 0}
+    staging_path = backup_path + STAGING_SUFFIX
+    os.makedirs(staging_path, exist_ok=True)
+
+    for done, (name, source, relative) in enumerate(files, 1):
+        src = os.path.join(source, relative)
+        key = f"{name}/{relative}"
+        try:
+            stat = os.stat(src)
+        except FileNotFoundError:
+            continue
+
+        entry = previous.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            digest = entry["hash"]
+        else:
+            digest = file_hash(src)
+
+        obj_path = os.path.join(objects_dir, digest[:2], digest)
+        if os.path.exists(obj_path):
+            result["reused"] += 1
+        else:
+            # 実体は必ずコピーで作る（元ファイルは上書き保存されるためリンクしない）
+            os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+            tmp_path = f"{obj_path}.tmp"
+            shutil.copy2(src, tmp_path)
+            # コピー中に書き換えられた場合に備えて実体のハッシュを取り直す
+            digest = file_hash(tmp_path)
+            obj_path = os.path.join(objects_dir, digest[:2], digest)
+            os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+            os.replace(tmp_path, obj_path)
+            result["new_objects"] += 1
+            result["bytes_copied"] += stat.st_size
+
+        dst = os.path.join(staging_path, name, relative)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        _link_or_copy(obj_path, dst)
+        manifest[key] = {"hash": digest, "size": os.path.getsize(obj_path), "mtime_ns": stat.st_mtime_ns}
+
+        if progress:
+            progress(done, len(files))
+
+    json_codec.dump_file(os.path.join(staging_path, MANIFEST_NAME), manifest)
+
+    # 完成したバックアップだけが backup_* の名前で見えるようにする
+    os.replace(staging_path, backup_path)
+    return result
+
+
+def _verify(staging_path, name, manifest):
+    """一時ディレクトリに展開したデータをマニフェストと照合"""
+    prefix = f"{name}/"
+    expected = {key[len(prefix):]: entry for key, entry in manifest.items() if key.startswith(prefix)}
+    actual = set(_walk_files(staging_path)) if os.path.exists(staging_path) else set()
+
+    missing = set(expected) - actual
+    if missing:
+        raise BackupVerificationError(f"{name}: {len(missing)}件のファイルが欠落しています")
+    for relative, entry in expected.items():
+        if file_hash(os.path.join(staging_path, relative)) != entry["hash"]:
+            raise BackupVerificationError(f"{name}/{relative}: ハッシュが一致しません")
+
+
+def _swap_in(staging_path, target):
+    """一時ディレクトリを本番ディレクトリとリネームで入れ替える"""
+    old_path = target + OLD_SUFFIX
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+    if os.path.exists(target):
+        os.rename(target, old_path)
+    os.rename(staging_path, target)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def restore_backup(backup_path, targets, progress=None):
+    """
+    バックアップから復元
+
+    各ディレクトリは隣に一時ディレクトリとして展開・検証してからリネームで入れ替えるため、
+    本番ディレクトリが空になる時間はほぼない。すべての検証が終わるまで入れ替えは行わない
+
+    Parameters:
+    -----------
+    targets : dict
+        {バックアップ内の名前: 復元先ディレクトリ}
+    """
+    manifest = load_manifest(backup_path)
+    sections = [(name, target) for name, target in targets.items()
+                if os.path.exists(os.path.join(backup_path, name))]
+
+    files = []
+    for name, _ in sections:
+        files.extend((name, relative) for relative in _walk_files(os.path.join(backup_path, name)))
+
+    staged = []
+    try:
+        done = 0
+        for name, target in sections:
+            staging_path = target.rstrip("/\\") + STAGING_SUFFIX
+            if os.path.exists(staging_path):
+                shutil.rmtree(staging_path)
+            staged.append((staging_path, target))
+
+            # 復元後に上書きされてもバックアップ側が変わらないようリンクではなくコピーする
+            for file_name, relative in files:
+                if file_name != name:
+                    continue
+                dst = os.path.join(staging_path, relative)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(os.path.join(backup_path, name, relative), dst)
+                done += 1
+                if progress:
+                    progress(done, len(files))
+            os.makedirs(staging_path, exist_ok=True)
+
+            if manifest is not None:
+                _verify(staging_path, name, manifest)
+    except Exception:
+        for staging_path, _ in staged:
+            shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    for staging_path, target in staged:
+        _swap_in(staging_path, target.rstrip("/\\"))
+
+    return len(files)
@@ -5,6 +5,9 @@ import io
 from collections import defaultdict
 import datetime
 from typing import Dict, List, Any, Optional, Tuple, Union
+from utils.logger import get_logger
+
+logger = get_logger("balance_analyzer")
 
 class BalanceAnalyzer:
     """役職バランスを分析するクラス"""
@@ -21,73 +24,81 @@ class BalanceAnalyzer:
             self.plt = plt
             self.matplotlib_available = True
         except ImportError:
-            print("matplotlib or numpy is not available. Charts will not be generated.")
-        
-    def analyze_role_win_rates(self, min_games: int = 10) -> Dict[str, Any]:
-        """役職ごとの勝率を分析"""
-        # 統計マネージャーから役職統計を取得
-        role_stats = self.stats_manager.get_role_stats()
+            logger.info("matplotlib or numpy is not available. Charts will not be generated.")
+        
+    def _filters(self, guild_id=None, days=None, player_count=None, composition=None):
+        """分析条件を GameHistory.select の引数に変換"""
+        since = None
+        if days:
+            since = datetime.datetime.now() - datetime.timedelta(days=days)
+        return {"guild_id": guild_id, "since": since, "player_count": player_count, "composition": composition}
+    
+    def analyze_role_win_rates(self, min_games: int = 10, **filters) -> Dict[str, Any]:
+        """
+        役職ごとの勝率を分析
         
+        filtersには guild_id（省略時は全サーバー）, days（直近の日数）, player_count, composition を指定できる
+        """
         results = {
             "win_rates": {},
             "play_counts": {},
+            "intervals": {},
             "balance_scores": {},
             "suggestions": []
         }
         
-        # 役職ごとの勝率を計算
-        for role, stats in role_stats.items():
-            if stats["times_played"] >= min_games:
-                win_rate = stats["times_won"] / stats["times_played"] if stats["times_played"] > 0 else 0
-                results["win_rates"][role] = win_rate
-                results["play_counts"][role] = stats["times_played"]
-                
-                # バランススコアを計算（50%からの乖離）
-                balance_score = abs(win_rate - 0.5)
-                results["balance_scores"][role] = balance_score
-                
-                # バランス調整の提案
-                if win_rate > 0.65:
-                    results["suggestions"].append(f"{role}の勝率が高すぎます（{win_rate:.1%}）。弱体化を検討してください。")
-                elif win_rate < 0.35:
-                    results["suggestions"].append(f"{role}の勝率が低すぎます（{win_rate:.1%}）。強化を検討してください。")
+        history = self.stats_manager.get_history()
+        if history is None:
+            return results
+        
+        # 役職ごとの勝率を列演算でまとめて計算
+        role_rates = history.role_win_rates(min_games=min_games, **self._filters(**filters))
+        for role, stats in role_rates.items():
+            win_rate = stats["rate"]
+            results["win_rates"][role] = win_rate
+            results["play_counts"][role] = stats["games"]
+            results["intervals"][role] = (stats["low"], stats["high"])
+            
+            # バランススコアを計算（50%からの乖離）
+            results["balance_scores"][role] = abs(win_rate - 0.5)
+            
+            # バランス調整の提案（信頼区間が基準をまたぐ場合は偶然の範囲として提案しない）
+            if win_rate > 0.65 and stats["low"] > 0.5:
+                results["suggestions"].append(
+                    f"{role}の勝率が高すぎます（{win_rate:.1%}, 95%区間 {stats['low']:.1%}〜{stats['high']:.1%}）。弱体化を検討してください。")
+            elif win_rate < 0.35 and stats["high"] < 0.5:
+                results["suggestions"].append(
+                    f"{role}の勝率が低すぎます（{win_rate:.1%}, 95%区間 {stats['low']:.1%}〜{stats['high']:.1%}）。強化を検討してください。")
         
         return results
         
-    def analyze_team_balance(self) -> Dict[str, Any]:
-        """陣営バランスを分析"""
-        # 統計マネージャーからゲームログを取得
-        game_logs = self.stats_manager.get_game_logs()
-        
+    def analyze_team_balance(self, **filters) -> Dict[str, Any]:
+        """陣営バランスを分析（filtersは analyze_role_win_rates と同じ）"""
         results = {
             "team_wins": defaultdict(int),
-            "total_games": len(game_logs),
+            "total_games": 0,
             "win_rates": {},
+            "intervals": {},
             "avg_game_duration": {},
             "suggestions": []
         }
         
-        # 陣営ごとの勝利回数を集計
-        for game in game_logs:
-            winner = game.get("winner")
-            if winner in ["village", "werewolf", "fox"]:
-                results["team_wins"][winner] += 1
-                
-            # ゲーム時間の集計
-            if game.get("duration"):
-                if winner not in results["avg_game_duration"]:
-                    results["avg_game_duration"][winner] = []
-                    
-                results["avg_game_duration"][winner].append(game["duration"])
-        
-        # 勝率を計算
-        total_games = results["total_games"]
-        for team, wins in results["team_wins"].items():
-            results["win_rates"][team] = wins / total_games if total_games > 0 else 0
-            
-        # 平均ゲーム時間を計算
-        for team, durations in list(results["avg_game_duration"].items()):
-            results["avg_game_duration"][team] = sum(durations) / len(durations) if durations else 0
+        history = self.stats_manager.get_history()
+        if history is None:
+            return results
+        
+        mask = history.select(**self._filters(**filters))
+        results["total_games"] = int(mask.sum())
+        
+        # 陣営ごとの勝利回数と勝率
+        for team, stats in history.team_win_rates(mask).items():
+            if stats["wins"]:
+                results["team_wins"][team] = stats["wins"]
+                results["win_rates"][team] = stats["rate"]
+                results["intervals"][team] = (stats["low"], stats["high"])
+        
+        # 平均ゲーム時間
+        results["avg_game_duration"] = history.average_duration(mask)
             
         # バランス調整の提案
         village_win_rate = results["win_rates"].get("village", 0)
@@ -103,14 +114,37 @@ class BalanceAnalyzer:
             results["suggestions"].append(f"妖狐の勝率が高い（{fox_win_rate:.1%}）。妖狐を弱体化することを検討してください。")
             
         return results
-        
-    def generate_win_rate_chart(self) -> Optional[io.BytesIO]:
+    
+    def analyze_player_counts(self, **filters) -> Dict[int, Dict[str, Any]]:
+        """人数ごとの陣営勝率を分析 {人数: {陣営: {"games", "wins", "rate", "low", "high"}}}"""
+        history = self.stats_manager.get_history()
+        if history is None:
+            return {}
+        return history.by_player_count(**self._filters(**filters))
+    
+    def analyze_compositions(self, min_games: int = 5, limit: int = 10, **filters) -> List[Tuple[str, int, Dict[str, Any]]]:
+        """よく使われる構成ごとの陣営勝率を分析"""
+        history = self.stats_manager.get_history()
+        if history is None:
+            return []
+        return history.by_composition(min_games=min_games, limit=limit, **self._filters(**filters))
+    
+    def compare_with_global(self, guild_id: int, **filters) -> Dict[str, Any]:
+        """サーバーの陣営勝率を全体と比較"""
+        history = self.stats_manager.get_history()
+        if history is None:
+            return {"guild": {}, "global": {}}
+        filters = self._filters(**filters)
+        filters.pop("guild_id")
+        return history.compare_guild(guild_id, **filters)
+        
+    def generate_win_rate_chart(self, **filters) -> Optional[io.BytesIO]:
         """役職勝率のグラフを生成"""
         if not self.matplotlib_available:
             return None
             
         # 役職勝率データを取得
-        analysis = self.analyze_role_win_rates()
+        analysis = self.analyze_role_win_rates(**filters)
         win_rates = analysis["win_rates"]
         
         if not win_rates:
@@ -158,13 +192,13 @@ class BalanceAnalyzer:
         
         return buffer
         
-    def generate_team_win_chart(self) -> Optional[io.BytesIO]:
+    def generate_team_win_chart(self, **filters) -> Optional[io.BytesIO]:
         """陣営勝率のグラフを生成"""
         if not self.matplotlib_available:
             return None
             
         # 陣営勝率データを取得
-        analysis = self.analyze_team_balance()
+        analysis = self.analyze_team_balance(**filters)
         win_rates = analysis["win_rates"]
         
         if not win_rates:
@@ -0,0 +1,217 @@
+"""
+役職構成ルールモジュール
+役職構成のバランスルールを宣言的に定義し、起動時に1度だけ検証関数へコンパイルする
+
+検証結果は正規化した構成（役職名でソートした (役職, 人数) のタプル）ごとにメモ化するため、
+同じ構成のプレビューを何度検証してもコストはほぼかからない
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+# 役職の定義 {役職: (陣営, 重み, 最大人数)}
+# 陣営: village / wolf（人狼）/ madman（人狼陣営の人間）/ third（第三陣営）
+# 最大人数がNoneの役職は人数に応じて増やせる
+ROLE_CATALOG = {
+    "村人": ("village", 1.0, None),
+    "占い師": ("village", 3.0, 1),
+    "預言者": ("village", 3.5, 1),
+    "狩人": ("village", 2.0, 1),
+    "霊媒師": ("village", 1.5, 1),
+    "共有者": ("village", 1.2, 2),
+    "猫又": ("village", 1.5, 1),
+    "賢者": ("village", 2.5, 1),
+    "仮病人": ("village", 0.8, 1),
+    "てるてる坊主": ("village", 0.5, 1),
+    "人狼": ("wolf", -3.0, None),
+    "呪狼": ("wolf", -3.5, 1),
+    "大狼": ("wolf", -3.5, 1),
+    "子狼": ("wolf", -2.5, 1),
+    "狂人": ("madman", -1.0, 1),
+    "狂信者": ("madman", -1.5, 1),
+    "妖狐": ("third", 0.0, 1),
+    "背徳者": ("third", -0.5, 1),
+    "狼憑き": ("third", -0.5, 1),
+}
+
+# 表記ゆれの統一 {別名: 役職}
+ROLE_ALIASES = {
+    "霊能者": "霊媒師",
+}
+
+# 特定の人数しか取れない役職（共有者は0人か2人）
+ALLOWED_COUNTS = {
+    "共有者": (0, 2),
+}
+
+# 占い系の役職（いずれか1人が必須）
+SEER_ROLES = ("占い師", "預言者")
+
+# 役職の依存関係 {役職: 必要な役職（いずれか1つ）}
+DEPENDENCIES = {
+    "背徳者": ("妖狐",),
+    "妖狐": SEER_ROLES,
+}
+
+# 人狼の役職
+WOLF_ROLES = tuple(role for role, (team, _, _) in ROLE_CATALOG.items() if team == "wolf")
+
+# ルール定義（level: error は構成不可、warning は警告のみ）
+RULES = [
+    {"type": "min_players", "value": 5, "level": "error",
+     "message": "プレイヤー数が5人未満です。最低5人必要です。"},
+    {"type": "known_roles", "level": "warning",
+     "message": "不明な役職が含まれています: {roles}"},
+    {"type": "required", "roles": WOLF_ROLES, "level": "error",
+     "message": "人狼役職がいません。少なくとも1人の人狼が必要です。"},
+    {"type": "required", "roles": SEER_ROLES, "level": "error",
+     "message": "占い師が必要です。"},
+    {"type": "team_ratio", "teams": ("wolf", "madman"), "versus": ("village",), "level": "error",
+     "message": "人狼陣営の人数が村人陣営の人数以上です。村人陣営の人数を増やしてください。"},
+    {"type": "team_cap", "teams": ("madman",), "max_teams": ("wolf",), "level": "error",
+     "message": "狂人の数が人狼より多くなっています。"},
+    {"type": "team_cap", "teams": ("third",), "max_ratio": 0.25, "level": "error",
+     "message": "第三陣営の数が多すぎます（全体の1/4まで）。"},
+] + [
+    {"type": "dependency", "role": role, "requires": required, "level": "error",
+     "message": f"{role}がいる場合は{'か'.join(required)}が必要です。"}
+    for role, required in DEPENDENCIES.items()
+] + [
+    {"type": "allowed_counts", "role": role, "counts": counts, "level": "warning",
+     "message": f"{role}は" + "か".join(f"{count}人" for count in counts) + "で採用することを推奨します。"}
+    for role, counts in ALLOWED_COUNTS.items()
+] + [
+    {"type": "exclusive", "roles": SEER_ROLES, "level": "warning",
+     "message": "占い師と預言者が同時に含まれています。どちらか一方のみを採用することを推奨します。"},
+    {"type": "weight_range", "min": -5.0, "max": 10.0, "level": "warning",
+     "low_message": "人狼陣営が有利すぎる構成です。村人陣営の役職を増やすことを検討してください。",
+     "high_message": "村人陣営が有利すぎる構成です。人狼陣営の役職を増やすことを検討してください。"},
+]
+
+# 検証結果
+ValidationResult = namedtuple("ValidationResult", ["valid", "errors", "warnings", "score"])
+
+# 検証に使う集計値
+_Summary = namedtuple("_Summary", ["counts", "total", "teams", "weight", "unknown"])
+
+
+def normalize(composition):
+    """役職名の表記ゆれを統一し、人数0の役職を除いた正規化済みタプルを返す"""
+    merged = {}
+    for role, count in composition.items():
+        role = ROLE_ALIASES.get(role, role)
+        merged[role] = merged.get(role, 0) + int(count)
+    return tuple(sorted((role, count) for role, count in merged.items() if count > 0))
+
+
+def _summarize(key):
+    counts = dict(key)
+    teams = {"village": 0, "wolf": 0, "madman": 0, "third": 0}
+    weight = 0.0
+    unknown = []
+    for role, count in key:
+        spec = ROLE_CATALOG.get(role)
+        if spec is None:
+            unknown.append(role)
+            continue
+        teams[spec[0]] += count
+        weight += spec[1] * count
+    return _Summary(counts, sum(counts.values()), teams, weight, tuple(unknown))
+
+
+def _compile_rule(rule):
+    """ルール1件を (level, チェック関数) に変換。チェック関数はメッセージかNoneを返す"""
+    kind = rule["type"]
+    message = rule.get("message")
+
+    if kind == "min_players":
+        value = rule["value"]
+        return lambda s: message if s.total < value else None
+
+    if kind == "known_roles":
+        return lambda s: message.format(roles=", ".join(s.unknown)) if s.unknown else None
+
+    if kind == "required":
+        roles = rule["roles"]
+        return lambda s: None if any(s.counts.get(role, 0) > 0 for role in roles) else message
+
+    if kind == "team_ratio":
+        teams, versus = rule["teams"], rule["versus"]
+        return lambda s: message if sum(s.teams[t] for t in teams) >= sum(s.teams[t] for t in versus) else None
+
+    if kind == "team_cap":
+        teams = rule["teams"]
+        if "max_teams" in rule:
+            max_teams = rule["max_teams"]
+            return lambda s: message if sum(s.teams[t] for t in teams) > sum(s.teams[t] for t in max_teams) else None
+        ratio = rule["max_ratio"]
+        return lambda s: message if sum(s.teams[t] for t in teams) > int(s.total * ratio) else None
+
+    if kind == "dependency":
+        role, required = rule["role"], rule["requires"]
+        return lambda s: message if s.counts.get(role, 0) > 0 and not any(s.counts.get(r, 0) for r in required) else None
+
+    if kind == "allowed_counts":
+        role, counts = rule["role"], rule["counts"]
+        return lambda s: message if s.counts.get(role, 0) not in counts else None
+
+    if kind == "exclusive":
+        roles = rule["roles"]
+        return lambda s: message if sum(1 for role in roles if s.counts.get(role, 0) > 0) > 1 else None
+
+    if kind == "weight_range":
+        low, high = rule["min"], rule["max"]
+        low_message, high_message = rule["low_message"], rule["high_message"]
+        return lambda s: low_message if s.weight < low else (high_message if s.weight > high else None)
+
+    raise ValueError(f"Unknown composition rule type: {kind}")
+
+
+class CompositionValidator:
+    """コンパイル済みの役職構成バリデータ"""
+
+    def __init__(self, rules=RULES):
+        self.checks = [(rule["level"], _compile_rule(rule)) for rule in rules]
+        self._validate_key = lru_cache(maxsize=4096)(self._validate_key)
+
+    def _validate_key(self, key):
+        summary = _summarize(key)
+        errors = []
+        warnings = []
+        for level, check in self.checks:
+            message = check(summary)
+            if message:
+                (errors if level == "error" else warnings).append(message)
+        return ValidationResult(not errors, tuple(errors), tuple(warnings), summary.weight)
+
+    def validate(self, composition):
+        """
+        役職構成を検証
+
+        Parameters:
+        -----------
+        composition : dict
+            {役職: 人数}
+
+        Returns:
+        --------
+        ValidationResult
+            (valid, errors, warnings, score) の読み取り専用の結果
+        """
+        return self._validate_key(normalize(composition))
+
+    def cache_info(self):
+        return self._validate_key.cache_info()
+
+
+# グローバルなバリデータ（起動時に1度だけコンパイル）
+_validator = CompositionValidator()
+
+
+def get_validator():
+    """グローバルなバリデータを取得"""
+    return _validator
+
+
+def validate(composition):
+    """役職構成を検証（get_validator().validate の省略形）"""
+    return _validator.validate(composition)
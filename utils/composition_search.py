@@ -0,0 +1,300 @@
+"""
+役職構成探索モジュール
+人数と使用可能な役職から妥当な役職構成を列挙し、バランススコアの高い順に返す
+
+探索は村人以外の役職を1つずつ決めていく動的計画法で行う。
+途中状態は陣営ごとの人数などの集計値でまとめる。スコアは
+「集計値の関数」+「役職ごとの項の和」なので、同じ集計値の部分構成は役職ごとの項の合計が
+大きい上位k件だけを残せばよい。最後に残り人数を村人で埋め、ルールを満たすものをスコア順に並べる
+
+役職の重みの合計は状態に含めない（状態数が重みの組み合わせの数だけ増えるため）。
+重みは役職ごとの項で評価する
+"""
+import asyncio
+import heapq
+from collections import namedtuple
+from functools import lru_cache
+
+from utils.composition_rules import ROLE_CATALOG, ALLOWED_COUNTS, DEPENDENCIES, SEER_ROLES, validate
+
+# 探索できる最大人数
+MAX_PLAYERS = 50
+
+# 推奨構成で標準的に使う役職
+STANDARD_ROLES = ("村人", "人狼", "占い師", "狩人", "霊媒師", "狂人", "妖狐", "背徳者", "共有者", "猫又")
+
+# 探索順（人狼陣営→第三陣営→村人陣営の順に決め、人数の幅が広い人狼はその後、村人は最後に残り人数で埋める）
+_TEAM_ORDER = {"wolf": 0, "madman": 1, "third": 2, "village": 3}
+
+# 人数ごとの標準構成（村人以外。以前の推奨構成表で、11人の共有者は2人に揃えている）
+STANDARD_TABLE = {
+    5: {"人狼": 1, "占い師": 1, "狩人": 1},
+    6: {"人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+    7: {"人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+    8: {"人狼": 2, "占い師": 1, "狩人": 1, "狂人": 1},
+    9: {"人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1},
+    10: {"人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1},
+    11: {"人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "共有者": 2},
+    12: {"人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1, "共有者": 2},
+    13: {"人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1, "共有者": 2, "背徳者": 1},
+    14: {"人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1, "共有者": 2, "背徳者": 1,
+         "猫又": 1},
+    15: {"人狼": 3, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "狂信者": 1, "妖狐": 1, "共有者": 2,
+         "背徳者": 1, "猫又": 1},
+}
+
+# 16人以上は15人の構成から人狼を全体の2割まで増やし、残りを村人にする
+_WOLF_RATIO = 0.2
+
+# 探索する件数の既定値
+_DEFAULT_K = 5
+
+# 役職ごとの重み
+_ROLE_WEIGHTS = {role: weight for role, (_, weight, _) in ROLE_CATALOG.items()}
+
+# 集計値
+CompositionStats = namedtuple(
+    "CompositionStats",
+    ["players", "wolves", "madmen", "third", "villagers", "specials"]
+)
+
+# スコア関数の登録先 {名前: (集計値の関数, 役職ごとの項の関数 or None)}
+_scores = {}
+
+
+def register_score(name, func, role_term=None):
+    """
+    スコア関数を登録（高いほど良い）
+
+    Parameters:
+    -----------
+    func : callable
+        func(stats) -> float。集計値 CompositionStats から計算する項
+    role_term : callable, optional
+        role_term(player_count, role, count) -> float。役職ごとに足し合わせる項（村人以外）
+    """
+    _scores[name] = (func, role_term)
+    search.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def standard_composition(player_count):
+    """人数ごとの標準構成（村人を含む）"""
+    if player_count < 5:
+        return {}
+    if player_count in STANDARD_TABLE:
+        composition = dict(STANDARD_TABLE[player_count])
+    else:
+        composition = dict(STANDARD_TABLE[15])
+        composition["人狼"] = max(composition["人狼"], round(player_count * _WOLF_RATIO))
+    composition["村人"] = player_count - sum(composition.values())
+    return composition
+
+
+@lru_cache(maxsize=None)
+def _standard_stats(player_count):
+    """標準構成の集計値"""
+    teams = {"village": 0, "wolf": 0, "madman": 0, "third": 0}
+    for role, count in standard_composition(player_count).items():
+        teams[ROLE_CATALOG[role][0]] += count
+    villagers = standard_composition(player_count)["村人"]
+    return CompositionStats(player_count, teams["wolf"], teams["madman"], teams["third"],
+                            villagers, teams["village"] - villagers)
+
+
+def balance_score(stats):
+    """
+    標準のバランススコア（集計値の項）
+
+    標準構成との陣営ごとの人数差で減点する。使えない役職があるときに、
+    同じ陣営の別の役職で埋めた構成が上位に来るようにする
+    """
+    target = _standard_stats(stats.players)
+    return -(1.5 * abs(stats.wolves - target.wolves)
+             + 1.0 * abs(stats.madmen - target.madmen)
+             + 1.0 * abs(stats.third - target.third)
+             + 0.5 * abs(stats.specials - target.specials)
+             + 0.1 * _ROLE_WEIGHTS["村人"] * abs(stats.villagers - target.villagers))
+
+
+def balance_role_term(player_count, role, count):
+    """標準のバランススコア（役職ごとの項）: 標準構成の人数との差と、その分の重みの差で減点"""
+    diff = abs(count - standard_composition(player_count).get(role, 0))
+    return -(1.0 + 0.1 * abs(_ROLE_WEIGHTS[role])) * diff
+
+
+def _role_range(role, player_count):
+    """役職ごとに探索する人数の候補"""
+    if role in ALLOWED_COUNTS:
+        return ALLOWED_COUNTS[role]
+    team, _, max_count = ROLE_CATALOG[role]
+    if max_count is None:
+        # 人狼は最低1人、最大で全体の4割程度まで
+        return range(0, player_count * 2 // 5 + 1)
+    return range(0, max_count + 1)
+
+
+@lru_cache(maxsize=256)
+def search(player_count, enabled_roles, k=5, score="balance"):
+    """
+    役職構成を探索（ブロッキング処理。イベントループからは recommend_async を使う）
+
+    Parameters:
+    -----------
+    player_count : int
+        プレイヤー数（5〜MAX_PLAYERS）
+    enabled_roles : frozenset
+        使用可能な役職（村人と人狼は常に含む）
+    k : int
+        返す件数
+    score : str
+        register_score で登録したスコア関数の名前
+
+    Returns:
+    --------
+    tuple
+        ((スコア, {役職: 人数}), ...) をスコアの高い順に最大k件
+    """
+    if player_count < 5 or player_count > MAX_PLAYERS:
+        return ()
+    score_func, role_term = _scores[score]
+
+    roles = [role for role in ROLE_CATALOG if role in enabled_roles or role in ("村人", "人狼")]
+    roles = [role for role in roles if role != "村人"]
+    # 人数の幅が広い役職（人狼）を最後に決めると、途中の層の状態数が少なく済む
+    roles.sort(key=lambda role: (len(_role_range(role, player_count)) > 3, _TEAM_ORDER[ROLE_CATALOG[role][0]]))
+    seer_roles = [role for role in SEER_ROLES if role in roles]
+
+    # 依存関係に関わる役職の有無をビットで状態に含める
+    dependency_bits = {}
+    for role, required in DEPENDENCIES.items():
+        for name in (role,) + tuple(required):
+            dependency_bits.setdefault(name, 1 << len(dependency_bits))
+    # {役職のビット: 必要な役職のビットの和}
+    dependency_masks = [(dependency_bits[role], sum(dependency_bits[name] for name in required))
+                        for role, required in DEPENDENCIES.items()]
+
+    max_wolf_side = (player_count - 1) // 2
+    max_third = player_count // 4
+
+    # 状態: (人狼, 狂人, 第三陣営, 役職持ち村人, 占い系の有無, 依存役職のビット)
+    # 各層は {状態: [(役職ごとの項の合計, 前の層の状態, 人数), ...]} の逆向きリンクを
+    # 合計の大きい順に最大k件持つ（合計は前の層の状態の最大値に今の役職の項を足したもの）
+    initial = (0, 0, 0, 0, False, 0)
+    layers = []
+    best = {initial: 0.0}
+    for role in roles:
+        team = ROLE_CATALOG[role][0]
+        bit = dependency_bits.get(role, 0)
+        is_seer = role in seer_roles
+        counts = _role_range(role, player_count)
+        terms = [role_term(player_count, role, count) if role_term else 0.0 for count in counts]
+        next_states = {}
+        for key, partial in best.items():
+            wolves, madmen, third, specials, seer, present = key
+            used = wolves + madmen + third + specials
+            for count, term in zip(counts, terms):
+                if used + count > player_count:
+                    break
+                n_wolves = wolves + count if team == "wolf" else wolves
+                n_madmen = madmen + count if team == "madman" else madmen
+                n_third = third + count if team == "third" else third
+                # 枝刈り: 陣営比率の上限を超えたら打ち切り（狂人と人狼の比較は人狼が決まる最後に行う）
+                if n_wolves + n_madmen > max_wolf_side or n_third > max_third:
+                    break
+                # 依存先の役職がまだ決まっていない場合は最後に判定する
+                next_key = (n_wolves, n_madmen, n_third,
+                            specials + count if team == "village" else specials,
+                            seer or (count > 0 and is_seer),
+                            present | bit if count else present)
+                link = (partial + term, key, count)
+                links = next_states.get(next_key)
+                if links is None:
+                    next_states[next_key] = [link]
+                elif len(links) < k:
+                    links.append(link)
+                else:
+                    # 合計が最小のリンクより良ければ入れ替える
+                    worst = min(range(k), key=lambda i: links[i][0])
+                    if link[0] > links[worst][0]:
+                        links[worst] = link
+        for links in next_states.values():
+            links.sort(key=lambda link: -link[0])
+        layers.append(next_states)
+        best = {key: links[0][0] for key, links in next_states.items()}
+
+    # 最終状態ごとにスコアの上限（集計値の項 + 役職ごとの項の最大値）を計算
+    bounds = []
+    for key, partial in best.items():
+        wolves, madmen, third, specials, seer, present = key
+        villagers = player_count - wolves - madmen - third - specials
+        if wolves < 1 or madmen > wolves or wolves + madmen >= villagers + specials:
+            continue
+        if seer_roles and not seer:
+            continue
+        if any(present & role_bit and not present & required_mask for role_bit, required_mask in dependency_masks):
+            continue
+        stats = CompositionStats(player_count, wolves, madmen, third, villagers, specials)
+        bounds.append((score_func(stats) + partial, score_func(stats), key, villagers))
+    bounds.sort(key=lambda item: -item[0])
+
+    # 上限の高い状態から構成を復元し、k件目のスコアが次の状態の上限以上になったら終了
+    found = []
+    order = 0
+    for bound, base, key, villagers in bounds:
+        if len(found) >= k and bound <= found[0][0]:
+            break
+        for total, composition in _unwind(layers, roles, key, k):
+            if villagers:
+                composition["村人"] = villagers
+            # 最終判定は共通のバリデータで行う
+            if not validate(composition).valid:
+                continue
+            # 同点なら先に見つかったものを残す
+            order += 1
+            item = (round(base + total, 6), -order, composition)
+            if len(found) < k:
+                heapq.heappush(found, item)
+            elif item[0] > found[0][0]:
+                heapq.heapreplace(found, item)
+    found.sort(key=lambda item: (-item[0], -item[1]))
+    return tuple((value, composition) for value, _, composition in found)
+
+
+def _unwind(layers, roles, key, limit):
+    """逆向きリンクをたどって最終状態から最大limit件の構成と役職ごとの項の合計を復元"""
+    found = []
+
+    def walk(depth, state, counts, total):
+        if len(found) >= limit:
+            return
+        if depth < 0:
+            found.append((total, {role: count for role, count in reversed(counts) if count}))
+            return
+        links = layers[depth][state]
+        for link_total, previous, count in links:
+            # リンクの合計は「前の状態の最大値 + この役職の項」なので、項だけを取り出して積み上げる
+            term = link_total - (layers[depth - 1][previous][0][0] if depth > 0 else 0.0)
+            walk(depth - 1, previous, counts + [(roles[depth], count)], total + term)
+
+    walk(len(layers) - 1, key, [], 0.0)
+    return found
+
+
+def recommend(player_count, enabled_roles=None, k=5, score="balance"):
+    """推奨構成を取得（enabled_rolesを省略した場合は全役職。ブロッキング処理）"""
+    if enabled_roles is None:
+        enabled_roles = ROLE_CATALOG.keys()
+    enabled = frozenset(role for role in enabled_roles if role in ROLE_CATALOG)
+    # 件数違いで探索し直さないよう、少なくとも既定の件数で探索してキャッシュを共有する
+    results = search(player_count, enabled, max(k, _DEFAULT_K), score)
+    return [(value, dict(counts)) for value, counts in results[:k]]
+
+
+async def recommend_async(player_count, enabled_roles=None, k=5, score="balance"):
+    """推奨構成をエグゼキュータで取得（初回の探索でイベントループを止めない）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, recommend, player_count, enabled_roles, k, score)
+
+
+register_score("balance", balance_score, balance_role_term)
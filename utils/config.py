@@ -2,6 +2,7 @@
 設定管理のためのユーティリティクラス
 """
 import os
+import copy
 import json
 from typing import Dict, Any, Optional, List
 
@@ -113,6 +114,55 @@ class GameConfig:
                 "妖狐": 1
             }
 
+# サーバー設定（data/config/server_{guild}.json）のデフォルト値
+DEFAULT_SERVER_SETTINGS = {
+    "roles_config": {
+        "5": {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1},
+        "6": {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+        "7": {"村人": 3, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
+        "8": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "狂人": 1},
+        "9": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1},
+        "10": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1},
+    },
+    "game_rules": {
+        "no_first_night_kill": False,
+        "lovers_enabled": False,
+        "no_consecutive_guard": True,
+        "random_tied_vote": False,
+        "dead_chat_enabled": True
+    },
+    "timers": {
+        "day": 300,    # 昼のフェーズの時間（秒）
+        "night": 90,   # 夜のフェーズの時間（秒）
+        "voting": 60   # 投票フェーズの時間（秒）
+    }
+}
+
+# ConfigManager設定（data/config/{guild}_config.json）のデフォルト値
+DEFAULT_GUILD_CONFIG = {
+    # ゲーム設定
+    "day_time": 300,       # 昼フェーズの時間（秒）
+    "night_time": 90,      # 夜フェーズの時間（秒）
+    "min_players": 4,      # 最小プレイヤー数
+    "max_players": 15,     # 最大プレイヤー数
+    "random_roles": True,  # 役職ランダム割り当て
+    "spectator_chat": True,  # 死亡プレイヤーのチャット
+    
+    # 役職設定
+    "roles": {
+        "Villager": {"enabled": True, "min_count": 1, "max_count": 999},
+        "Werewolf": {"enabled": True, "min_count": 1, "max_count": 999},
+        "Seer": {"enabled": True, "min_count": 0, "max_count": 1},
+        "Hunter": {"enabled": True, "min_count": 0, "max_count": 1},
+        "Medium": {"enabled": True, "min_count": 0, "max_count": 1},
+        "Madman": {"enabled": True, "min_count": 0, "max_count": 1},
+        "Fox": {"enabled": True, "min_count": 0, "max_count": 1}
+    },
+    
+    # 管理者権限
+    "admin_roles": []
+}
+
 class ConfigManager:
     """サーバーごとの設定を管理するクラス"""
     
@@ -132,65 +182,35 @@ class ConfigManager:
     
     def _get_default_config(self) -> Dict[str, Any]:
         """デフォルト設定を取得"""
-        return {
-            # ゲーム設定
-            "day_time": 300,       # 昼フェーズの時間（秒）
-            "night_time": 90,      # 夜フェーズの時間（秒）
-            "min_players": 4,      # 最小プレイヤー数
-            "max_players": 15,     # 最大プレイヤー数
-            "random_roles": True,  # 役職ランダム割り当て
-            "spectator_chat": True,  # 死亡プレイヤーのチャット
-            
-            # 役職設定
-            "roles": {
-                "Villager": {"enabled": True, "min_count": 1, "max_count": 999},
-                "Werewolf": {"enabled": True, "min_count": 1, "max_count": 999},
-                "Seer": {"enabled": True, "min_count": 0, "max_count": 1},
-                "Hunter": {"enabled": True, "min_count": 0, "max_count": 1},
-                "Medium": {"enabled": True, "min_count": 0, "max_count": 1},
-                "Madman": {"enabled": True, "min_count": 0, "max_count": 1},
-                "Fox": {"enabled": True, "min_count": 0, "max_count": 1}
-            },
-            
-            # 管理者権限
-            "admin_roles": []
-        }
+        return copy.deepcopy(DEFAULT_GUILD_CONFIG)
     
     def get_server_config(self, guild_id: int) -> Dict[str, Any]:
         """サーバーの設定を取得"""
+        from utils.config_service import get_config_service
         config_path = self._get_server_config_path(guild_id)
         
-        # 設定ファイルが存在する場合は読み込む
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, "r", encoding="utf-8") as f:
-                    config = json.load(f)
-                return config
-            except json.JSONDecodeError:
-                # ファイルが破損している場合はデフォルト設定を返す
-                return self.default_config.copy()
-        else:
-            # 設定ファイルが存在しない場合はデフォルト設定を返す
-            return self.default_config.copy()
+        # 設定サービスのキャッシュから読み込む（ファイルが更新されていれば再読み込み）
+        try:
+            config = get_config_service().read_json(config_path)
+        except json.JSONDecodeError:
+            # ファイルが破損している場合はデフォルト設定を返す
+            config = None
+        
+        # 設定ファイルが存在しない場合はデフォルト設定を返す
+        return config if config is not None else self._get_default_config()
     
     def save_server_config(self, guild_id: int, config: Dict[str, Any]):
         """サーバーの設定を保存"""
+        from utils.config_service import get_config_service
         config_path = self._get_server_config_path(guild_id)
         
-        # 設定ディレクトリが存在することを確認
-        self._ensure_config_directory()
-        
-        # 設定を保存
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        # 設定を保存（キャッシュも更新される）
+        get_config_service().write_json(config_path, config)
     
     def reset_server_config(self, guild_id: int):
         """サーバーの設定をリセット"""
-        config_path = self._get_server_config_path(guild_id)
-        
-        # 設定ファイルが存在する場合は削除
-        if os.path.exists(config_path):
-            os.remove(config_path)
+        from utils.config_service import get_config_service
+        get_config_service().delete(self._get_server_config_path(guild_id))
     
     def get_setting(self, guild_id: int, setting: str, default=None) -> Any:
         """特定の設定値を取得"""
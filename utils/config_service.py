@@ -0,0 +1,272 @@
+"""
+設定サービスモジュール
+各種設定ファイルをメモリにキャッシュし、デフォルト値・サーバー設定・上書き設定を
+サーバーごとの読み取り専用の実効設定にまとめる
+
+レイヤー（後のものが優先）:
+1. デフォルト（DEFAULT_SERVER_SETTINGS / DEFAULT_GUILD_CONFIG）
+2. data/config/server_{guild}.json（DatabaseManager / RoleComposerCog）
+3. data/config/{guild}_config.json（ConfigManager）
+4. data/role_config_{guild}.json（!compose コマンドの役職構成。roles_config に上書き）
+5. data/role_parameters.json（!balance adjust の役職パラメータ。全サーバー共通）
+
+キャッシュはファイルの更新時刻とサイズで検証し、write_json で書き込んだ場合は即座に無効化する
+"""
+import copy
+import os
+import threading
+from types import MappingProxyType
+
+from utils import json_codec
+from utils.config import GameConfig, DEFAULT_SERVER_SETTINGS, DEFAULT_GUILD_CONFIG
+from utils.logger import get_logger
+
+logger = get_logger("config")
+
+
+def _freeze(value):
+    """辞書とリストを読み取り専用に変換"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    """読み取り専用の値を通常の辞書とリストに戻す"""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def deep_merge(base, override):
+    """辞書を再帰的にマージした新しい辞書を返す"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class EffectiveConfig:
+    """サーバーごとの実効設定（読み取り専用）"""
+
+    __slots__ = ("guild_id", "data")
+
+    def __init__(self, guild_id, data):
+        self.guild_id = guild_id
+        self.data = _freeze(data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    @property
+    def game_rules(self):
+        return self.data.get("game_rules", MappingProxyType({}))
+
+    @property
+    def timers(self):
+        return self.data.get("timers", MappingProxyType({}))
+
+    @property
+    def roles_config(self):
+        return self.data.get("roles_config", MappingProxyType({}))
+
+    @property
+    def role_parameters(self):
+        return self.data.get("role_parameters", MappingProxyType({}))
+
+    def composition_for(self, player_count):
+        """指定人数の役職構成（未設定ならNone）"""
+        composition = self.roles_config.get(str(player_count))
+        return dict(composition) if composition is not None else None
+
+    def to_dict(self):
+        """変更可能なコピーを取得"""
+        return _thaw(self.data)
+
+
+class ConfigService:
+    """設定ファイルのキャッシュと実効設定の管理"""
+
+    def __init__(self, data_dir=GameConfig.DATA_DIR):
+        self.data_dir = data_dir
+        self.config_dir = os.path.join(data_dir, "config")
+        self._lock = threading.Lock()
+        # {絶対パス: (mtime_ns, size, データ)}
+        self._files = {}
+        # {guild_id: (ソースの状態, EffectiveConfig)}
+        self._effective = {}
+        self.hits = 0
+        self.misses = 0
+
+    # =================== ファイルキャッシュ ===================
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _load(self, path):
+        """キャッシュ済みのデータを取得（共有オブジェクトなので変更しないこと）"""
+        key = os.path.abspath(path)
+        state = self._stat(key)
+        if state is None:
+            return None
+
+        with self._lock:
+            cached = self._files.get(key)
+            if cached and cached[:2] == state:
+                self.hits += 1
+                return cached[2]
+
+        try:
+            data = json_codec.load_file(key)
+        except FileNotFoundError:
+            # statの後、読み込みまでの間に削除された場合もファイルなしとして扱う
+            with self._lock:
+                self._files.pop(key, None)
+            return None
+        with self._lock:
+            self.misses += 1
+            self._files[key] = (state[0], state[1], data)
+        return data
+
+    def read_json(self, path, default=None):
+        """
+        JSONファイルを読み込む（変更可能なコピーを返す）
+
+        ファイルがない場合はdefaultを返す。JSONが壊れている場合はJSONDecodeErrorを送出する
+        """
+        data = self._load(path)
+        if data is None:
+            return default
+        return copy.deepcopy(data)
+
+    def write_json(self, path, data):
+        """JSONファイルを書き込み、キャッシュを更新する"""
+        key = os.path.abspath(path)
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        tmp_path = f"{key}.tmp"
+        # 設定ファイルは人が編集するのでインデント付きで書く
+        json_codec.dump_file(tmp_path, data, pretty=True)
+        os.replace(tmp_path, key)
+
+        state = self._stat(key)
+        with self._lock:
+            if state is not None:
+                self._files[key] = (state[0], state[1], copy.deepcopy(data))
+            else:
+                self._files.pop(key, None)
+            # 実効設定は次回参照時に再構築する
+            self._effective.clear()
+
+    def delete(self, path):
+        """ファイルを削除し、キャッシュから除外する"""
+        key = os.path.abspath(path)
+        if os.path.exists(key):
+            os.remove(key)
+        with self._lock:
+            self._files.pop(key, None)
+            self._effective.clear()
+
+    # =================== 実効設定 ===================
+
+    def server_settings_path(self, guild_id):
+        return os.path.join(self.config_dir, f"server_{guild_id}.json")
+
+    def guild_config_path(self, guild_id):
+        return os.path.join(self.config_dir, f"{guild_id}_config.json")
+
+    def compose_config_path(self, guild_id):
+        return os.path.join(self.data_dir, f"role_config_{guild_id}.json")
+
+    def role_parameters_path(self):
+        return os.path.join(self.data_dir, "role_parameters.json")
+
+    def _sources(self, guild_id):
+        return (
+            self.server_settings_path(guild_id),
+            self.guild_config_path(guild_id),
+            self.compose_config_path(guild_id),
+            self.role_parameters_path()
+        )
+
+    def _safe_load(self, path):
+        try:
+            data = self._load(path)
+        except (json_codec.JSONDecodeError, OSError) as e:
+            logger.warning("Failed to load config file", path=path, error=str(e))
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def effective(self, guild_id):
+        """サーバーの実効設定を取得"""
+        guild_id = str(guild_id)
+        sources = self._sources(guild_id)
+        state = tuple(self._stat(path) for path in sources)
+
+        with self._lock:
+            cached = self._effective.get(guild_id)
+            if cached and cached[0] == state:
+                return cached[1]
+
+        server_path, guild_path, compose_path, params_path = sources
+        data = deep_merge(DEFAULT_SERVER_SETTINGS, DEFAULT_GUILD_CONFIG)
+        server = self._safe_load(server_path)
+        data = deep_merge(data, server)
+        data = deep_merge(data, self._safe_load(guild_path))
+
+        # 役職構成は人数ごとに丸ごと置き換える（役職単位ではマージしない）
+        roles_config = dict(DEFAULT_SERVER_SETTINGS["roles_config"])
+        roles_config.update(server.get("roles_config") or {})
+        roles_config.update(self._safe_load(compose_path))
+        data["roles_config"] = roles_config
+        data["role_parameters"] = self._safe_load(params_path)
+
+        config = EffectiveConfig(guild_id, data)
+        with self._lock:
+            self._effective[guild_id] = (state, config)
+        return config
+
+    def invalidate(self, guild_id=None):
+        """実効設定のキャッシュを破棄"""
+        with self._lock:
+            if guild_id is None:
+                self._effective.clear()
+            else:
+                self._effective.pop(str(guild_id), None)
+
+    def clear(self):
+        """ファイルと実効設定のキャッシュをすべて破棄（バックアップ復元後など）"""
+        with self._lock:
+            self._files.clear()
+            self._effective.clear()
+
+    def get_stats(self):
+        return {
+            "files": len(self._files),
+            "guilds": len(self._effective),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# グローバルな設定サービス
+_service = ConfigService()
+
+
+def get_config_service():
+    """グローバルな設定サービスを取得"""
+    return _service
@@ -3,10 +3,22 @@
 サーバー設定やプレイヤー統計データを管理するためのユーティリティクラス
 """
 import os
-import json
+import copy
 import asyncio
 from discord.ext import commands
 from typing import Dict, Any, Optional, List
+from utils import metrics
+from utils.config import DEFAULT_SERVER_SETTINGS
+from utils.config_service import get_config_service
+from utils import game_archive
+from utils import backup_store
+from utils import json_codec
+from utils.logger import get_logger
+
+logger = get_logger("database")
+
+# ゲームログ圧縮の実行間隔（秒）
+GAME_LOG_COMPACT_INTERVAL = 3600
 
 class DatabaseManager(commands.Cog):
     """サーバー設定やゲームデータを管理するためのCog"""
@@ -26,56 +38,81 @@ class DatabaseManager(commands.Cog):
         for directory in [self.config_dir, self.stats_dir, self.logs_dir]:
             if not os.path.exists(directory):
                 os.makedirs(directory, exist_ok=True)
+        
+        self.compact_task = None
+        # 実行中のバックアップ/復元の進捗
+        self.backup_progress = None
+    
+    async def cog_load(self):
+        """Cogロード時にゲームログの圧縮タスクを開始"""
+        self.compact_task = asyncio.create_task(self._compact_loop())
+    
+    async def cog_unload(self):
+        """Cogアンロード時に圧縮タスクを停止"""
+        if self.compact_task:
+            self.compact_task.cancel()
+            self.compact_task = None
+    
+    async def _compact_loop(self):
+        """個別のゲームログを定期的に月別アーカイブへまとめる"""
+        while True:
+            try:
+                count = await self.compact_game_logs()
+                if count:
+                    logger.info("Compacted game logs into archives", count=count)
+            except Exception as e:
+                logger.error("Game log compaction failed", error=str(e))
+            await asyncio.sleep(GAME_LOG_COMPACT_INTERVAL)
+    
+    async def compact_game_logs(self, min_age=game_archive.DEFAULT_MIN_AGE):
+        """個別のゲームログをアーカイブにまとめる（ファイル操作は別スレッドで実行）"""
+        loop = asyncio.get_running_loop()
+        async with self.game_log_lock:
+            return await loop.run_in_executor(None, game_archive.compact_all, self.logs_dir, min_age)
     
     async def get_server_settings(self, guild_id):
         """サーバーの設定を取得"""
         guild_id = str(guild_id)  # IDを文字列に変換
         settings_path = f"{self.config_dir}/server_{guild_id}.json"
         
-        # デバッグ用ログを追加
-        print(f"[DATABASE] Loading settings for guild {guild_id} from {settings_path}")
+        logger.debug("Loading settings", guild=guild_id, path=settings_path)
         
         # デフォルト設定を事前に取得
         default_settings = self._get_default_settings()
-        print(f"[DATABASE] Default settings type: {type(default_settings)}")
         
         if os.path.exists(settings_path):
             try:
                 async with self.settings_lock:
-                    with open(settings_path, "r", encoding="utf-8") as f:
-                        result = json.load(f)
-                        
-                        # デバッグログを追加
-                        print(f"[DATABASE] Loaded settings: {type(result)}")
-                        
-                        # 辞書型でない場合は例外を発生させる
-                        if not isinstance(result, dict):
-                            print(f"[DATABASE] ERROR: Loaded settings is not a dict: {type(result)}")
-                            return default_settings
-                        
-                        return result
-            except json.JSONDecodeError as e:
+                    # 設定サービスのキャッシュから読み込む（更新時刻が変わった場合のみ再パース）
+                    with metrics.observe_json("read", "server_settings"):
+                        result = get_config_service().read_json(settings_path)
+                    
+                    # 辞書型でない場合は例外を発生させる
+                    if not isinstance(result, dict):
+                        logger.error("Loaded settings is not a dict", guild=guild_id, type=type(result).__name__)
+                        return default_settings
+                    
+                    return result
+            except json_codec.JSONDecodeError as e:
                 # ファイルが破損している場合、デフォルト設定を返す
-                print(f"[DATABASE] JSON decode error: {e}. Returning default settings")
+                logger.warning("Settings JSON decode error, returning default settings", guild=guild_id, error=str(e))
                 return default_settings
             except Exception as e:
                 # その他のエラーが発生した場合も、デフォルト設定を返す
-                print(f"[DATABASE] Error loading settings: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error loading settings", guild=guild_id)
                 return default_settings
         else:
             # 設定ファイルが存在しない場合、デフォルト設定を返す
-            print(f"[DATABASE] Settings file not found, returning default settings")
+            logger.debug("Settings file not found, returning default settings", guild=guild_id)
             
             # 新しいサーバーの場合は設定ファイルを作成しておく
             try:
                 async with self.settings_lock:
-                    with open(settings_path, "w", encoding="utf-8") as f:
-                        json.dump(default_settings, f, ensure_ascii=False, indent=2)
-                print(f"[DATABASE] Created new settings file for guild {guild_id}")
+                    with metrics.observe_json("write", "server_settings"):
+                        get_config_service().write_json(settings_path, default_settings)
+                logger.info("Created new settings file", guild=guild_id)
             except Exception as e:
-                print(f"[DATABASE] Error creating settings file: {e}")
+                logger.error("Error creating settings file", guild=guild_id, error=str(e))
             
             return default_settings
     
@@ -85,36 +122,31 @@ class DatabaseManager(commands.Cog):
         settings_path = f"{self.config_dir}/server_{guild_id}.json"
         
         try:
-            print(f"[DATABASE] Updating setting for guild {guild_id}, key: {key}")
+            logger.debug("Updating setting", guild=guild_id, key=key)
             # 現在の設定を取得
             settings = await self.get_server_settings(guild_id)
-            print(f"[DATABASE] Current settings type: {type(settings)}")
             
             # 例外ケースをチェック
             if asyncio.iscoroutine(settings):
-                print("[DATABASE] Warning: settings is still a coroutine in update_server_setting, awaiting again")
+                logger.warning("Settings is still a coroutine in update_server_setting, awaiting again", guild=guild_id)
                 settings = await settings
-                print(f"[DATABASE] After second await, settings type: {type(settings)}")
             
             # 設定が辞書型でない場合は新しい辞書を作成
             if not isinstance(settings, dict):
-                print(f"[DATABASE] Settings is not a dict, creating new settings")
+                logger.warning("Settings is not a dict, creating new settings", guild=guild_id)
                 settings = self._get_default_settings()
             
             # 設定を更新
             settings[key] = value
             
             # 設定を保存
-            print(f"[DATABASE] Saving updated settings to {settings_path}")
             async with self.settings_lock:
-                with open(settings_path, "w", encoding="utf-8") as f:
-                    json.dump(settings, f, ensure_ascii=False, indent=2)
+                with metrics.observe_json("write", "server_settings"):
+                    get_config_service().write_json(settings_path, settings)
             
             return True
         except Exception as e:
-            print(f"[DATABASE] 設定更新エラー: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("設定更新エラー", guild=guild_id, key=key)
             return False
     
     async def get_player_stats(self, player_id):
@@ -125,13 +157,13 @@ class DatabaseManager(commands.Cog):
         if os.path.exists(stats_path):
             try:
                 async with self.stats_lock:
-                    with open(stats_path, "r", encoding="utf-8") as f:
-                        return json.load(f)
-            except json.JSONDecodeError:
+                    with metrics.observe_json("read", "player_stats"):
+                        return json_codec.load_file(stats_path)
+            except json_codec.JSONDecodeError:
                 # ファイルが破損している場合、初期統計を返す
                 return self._get_initial_player_stats()
             except Exception as e:
-                print(f"統計読み込みエラー: {e}")
+                logger.error("統計読み込みエラー", error=str(e))
                 return self._get_initial_player_stats()
         else:
             # 統計ファイルが存在しない場合、初期統計を返す
@@ -148,8 +180,8 @@ class DatabaseManager(commands.Cog):
             if os.path.exists(stats_path):
                 try:
                     async with self.stats_lock:
-                        with open(stats_path, "r", encoding="utf-8") as f:
-                            current_stats = json.load(f)
+                        with metrics.observe_json("read", "player_stats"):
+                            current_stats = json_codec.load_file(stats_path)
                 except:
                     current_stats = self._get_initial_player_stats()
             else:
@@ -166,12 +198,12 @@ class DatabaseManager(commands.Cog):
             
             # 統計を保存
             async with self.stats_lock:
-                with open(stats_path, "w", encoding="utf-8") as f:
-                    json.dump(current_stats, f, ensure_ascii=False, indent=2)
+                with metrics.observe_json("write", "player_stats"):
+                    json_codec.dump_file(stats_path, current_stats)
             
             return True
         except Exception as e:
-            print(f"統計更新エラー: {e}")
+            logger.error("統計更新エラー", error=str(e))
             return False
     
     async def log_game_result(self, guild_id, game_data):
@@ -183,24 +215,22 @@ class DatabaseManager(commands.Cog):
         if not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
         
-        # タイムスタンプをファイル名に使用
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_path = f"{log_dir}/game_{timestamp}.json"
+        # タイムスタンプ・チャンネルID・乱数をファイル名に使用（同じ秒に終わったゲームと重ならない）
+        log_path = f"{log_dir}/{game_archive.loose_log_name(game_data.get('channel_id'))}"
         
         try:
             # ゲームデータを保存
             async with self.game_log_lock:
-                with open(log_path, "w", encoding="utf-8") as f:
-                    json.dump(game_data, f, ensure_ascii=False, indent=2)
+                with metrics.observe_json("write", "game_logs"):
+                    json_codec.dump_file(log_path, game_data)
             
             return True
         except Exception as e:
-            print(f"ゲームログ保存エラー: {e}")
+            logger.error("ゲームログ保存エラー", error=str(e))
             return False
     
     async def get_game_logs(self, guild_id, limit=10):
-        """サーバーのゲームログを取得"""
+        """サーバーのゲームログを取得（個別ファイルとアーカイブの両方から新しい順）"""
         guild_id = str(guild_id)  # IDを文字列に変換
         log_dir = f"{self.logs_dir}/{guild_id}"
         
@@ -208,55 +238,39 @@ class DatabaseManager(commands.Cog):
             return []
         
         try:
-            # ゲームログファイルのリストを取得
-            log_files = [f for f in os.listdir(log_dir) if f.startswith("game_") and f.endswith(".json")]
-            
-            # 新しい順にソート
-            log_files.sort(reverse=True)
-            
-            # 指定された数だけログを読み込む
-            logs = []
-            for i, log_file in enumerate(log_files):
-                if i >= limit:
-                    break
+            async with self.game_log_lock:
+                # ゲームログファイルのリストを取得
+                log_files = [f for f in os.listdir(log_dir) if f.startswith("game_") and f.endswith(".json")]
+                archived = game_archive.list_entries(log_dir)
                 
-                log_path = f"{log_dir}/{log_file}"
-                try:
-                    with open(log_path, "r", encoding="utf-8") as f:
-                        log_data = json.load(f)
-                        logs.append(log_data)
-                except:
-                    continue
+                # 新しい順にソート（ファイル名はタイムスタンプ順）
+                names = sorted(set(log_files) | set(archived), reverse=True)
+                
+                # 指定された数だけログを読み込む
+                logs = []
+                for name in names[:limit]:
+                    try:
+                        if name in archived:
+                            with metrics.observe_json("read", "game_archive"):
+                                logs.append(game_archive.read_entry(log_dir, *archived[name]))
+                        else:
+                            with metrics.observe_json("read", "game_logs"):
+                                logs.append(json_codec.load_file(f"{log_dir}/{name}"))
+                    except Exception:
+                        continue
             
             return logs
         except Exception as e:
-            print(f"ゲームログ取得エラー: {e}")
+            logger.error("ゲームログ取得エラー", error=str(e))
             return []
     
+    def iter_game_logs(self, guild_id):
+        """サーバーの全ゲームログを古い順にストリーミングで読み込む（ブロッキング処理）"""
+        yield from game_archive.iter_guild_logs(f"{self.logs_dir}/{guild_id}")
+    
     def _get_default_settings(self):
         """デフォルトのサーバー設定を返す"""
-        return {
-            "roles_config": {
-                "5": {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1},
-                "6": {"村人": 2, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
-                "7": {"村人": 3, "人狼": 1, "占い師": 1, "狩人": 1, "狂人": 1},
-                "8": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "狂人": 1},
-                "9": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1},
-                "10": {"村人": 3, "人狼": 2, "占い師": 1, "狩人": 1, "霊媒師": 1, "狂人": 1, "妖狐": 1},
-            },
-            "game_rules": {
-                "no_first_night_kill": False,
-                "lovers_enabled": False,
-                "no_consecutive_guard": True,
-                "random_tied_vote": False,
-                "dead_chat_enabled": True
-            },
-            "timers": {
-                "day": 300,    # 昼のフェーズの時間（秒）
-                "night": 90,   # 夜のフェーズの時間（秒）
-                "voting": 60   # 投票フェーズの時間（秒）
-            }
-        }
+        return copy.deepcopy(DEFAULT_SERVER_SETTINGS)
     
     def _get_initial_player_stats(self):
         """初期プレイヤー統計を返す"""
@@ -273,75 +287,61 @@ class DatabaseManager(commands.Cog):
             "last_updated": ""
         }
 
+    def _report_backup_progress(self, label, done, total):
+        """バックアップ/復元の進捗を記録（ワーカースレッドから呼ばれる）"""
+        self.backup_progress = {"operation": label, "done": done, "total": total}
+        if done == total or done % 500 == 0:
+            logger.info("Backup progress", operation=label, done=done, total=total)
+    
+    def _backup_sections(self):
+        return {"config": self.config_dir, "stats": self.stats_dir, "logs": self.logs_dir}
+    
     async def backup_all_data(self, backup_dir="data/backup"):
-        """全データのバックアップを作成"""
+        """全データの増分バックアップを作成（内容が同じファイルは前回の実体を共有）"""
         import datetime
-        import shutil
-        
-        # バックアップディレクトリが存在することを確認
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir, exist_ok=True)
         
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{backup_dir}/backup_{timestamp}"
         
         try:
-            # バックアップディレクトリを作成
-            os.makedirs(backup_path, exist_ok=True)
-            
-            # 設定ディレクトリのバックアップ
-            config_backup = f"{backup_path}/config"
-            if os.path.exists(self.config_dir):
-                shutil.copytree(self.config_dir, config_backup)
-            
-            # 統計ディレクトリのバックアップ
-            stats_backup = f"{backup_path}/stats"
-            if os.path.exists(self.stats_dir):
-                shutil.copytree(self.stats_dir, stats_backup)
-            
-            # ログディレクトリのバックアップ
-            logs_backup = f"{backup_path}/logs"
-            if os.path.exists(self.logs_dir):
-                shutil.copytree(self.logs_dir, logs_backup)
-            
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                None, backup_store.create_backup, self._backup_sections(), backup_dir, backup_path,
+                lambda done, total: self._report_backup_progress("backup", done, total)
+            )
+            logger.info("Created backup", path=backup_path, files=result['files'],
+                        new_objects=result['new_objects'], reused=result['reused'])
             return True, backup_path
         except Exception as e:
-            print(f"バックアップエラー: {e}")
+            logger.error("バックアップエラー", error=str(e))
             return False, None
+        finally:
+            self.backup_progress = None
 
     async def restore_from_backup(self, backup_path):
-        """バックアップからデータを復元"""
-        import shutil
-        
+        """バックアップからデータを復元（検証後にディレクトリを入れ替える）"""
         if not os.path.exists(backup_path):
             return False, "バックアップパスが存在しません"
         
         try:
-            # 設定ディレクトリの復元
-            config_backup = f"{backup_path}/config"
-            if os.path.exists(config_backup):
-                if os.path.exists(self.config_dir):
-                    shutil.rmtree(self.config_dir)
-                shutil.copytree(config_backup, self.config_dir)
-            
-            # 統計ディレクトリの復元
-            stats_backup = f"{backup_path}/stats"
-            if os.path.exists(stats_backup):
-                if os.path.exists(self.stats_dir):
-                    shutil.rmtree(self.stats_dir)
-                shutil.copytree(stats_backup, self.stats_dir)
-            
-            # ログディレクトリの復元
-            logs_backup = f"{backup_path}/logs"
-            if os.path.exists(logs_backup):
-                if os.path.exists(self.logs_dir):
-                    shutil.rmtree(self.logs_dir)
-                shutil.copytree(logs_backup, self.logs_dir)
+            loop = asyncio.get_running_loop()
+            # 復元中に設定や統計が書き込まれないようロックを保持する
+            async with self.settings_lock, self.stats_lock, self.game_log_lock:
+                await loop.run_in_executor(
+                    None, backup_store.restore_backup, backup_path, self._backup_sections(),
+                    lambda done, total: self._report_backup_progress("restore", done, total)
+                )
+                get_config_service().clear()
             
             return True, "バックアップからの復元が完了しました"
+        except backup_store.BackupVerificationError as e:
+            logger.error("復元検証エラー", error=str(e))
+            return False, f"バックアップの検証に失敗しました: {str(e)}"
         except Exception as e:
-            print(f"復元エラー: {e}")
+            logger.error("復元エラー", error=str(e))
             return False, f"復元中にエラーが発生しました: {str(e)}"
+        finally:
+            self.backup_progress = None
 
 async def setup(bot):
     """Cogのセットアップ"""
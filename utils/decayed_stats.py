@@ -0,0 +1,141 @@
+"""
+減衰付きの統計カウンタ
+サーバーごと・全体の陣営勝利数、役職の出現数/勝利数、ゲーム時間を指数減衰で集計し、「最近の傾向」を求める
+
+カウンタは基準時刻からの経過に応じて重みを大きくして加算する（前向き減衰）。
+読み出し時に現在時刻の重みで割ることで、ゲーム追加時に他のカウンタを更新せずに済む
+（1ゲームの更新は登場した役職の数に比例）
+"""
+import os
+import time
+
+from utils import json_codec
+from utils.rating import normalize_team
+
+# 半減期（秒）
+DEFAULT_HALF_LIFE = 14 * 24 * 3600
+
+# 重みの指数がこの値を超えたら全カウンタを基準時刻に合わせて縮小する
+_RESCALE_EXPONENT = 64
+
+GLOBAL_SCOPE = "global"
+
+
+def _empty_scope():
+    return {"games": 0.0, "duration": 0.0, "team_wins": {}, "roles": {}}
+
+
+class DecayedStats:
+    """指数減衰カウンタ（サーバーごと + 全体）"""
+
+    def __init__(self, path="data/stats/decayed_stats.json", half_life=DEFAULT_HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self.landmark = time.time()
+        self.scopes = {}
+        self.load()
+
+    # =================== 永続化 ===================
+
+    def load(self):
+        try:
+            data = json_codec.load_file(self.path)
+        except (FileNotFoundError, json_codec.JSONDecodeError):
+            return
+        self.landmark = data.get("landmark", self.landmark)
+        self.scopes = data.get("scopes", {})
+        if data.get("half_life", self.half_life) != self.half_life:
+            # 半減期が変わった場合は過去の値の重みが合わないため破棄
+            self.scopes = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        json_codec.dump_file(tmp_path, {"half_life": self.half_life, "landmark": self.landmark, "scopes": self.scopes})
+        os.replace(tmp_path, self.path)
+
+    # =================== 重み ===================
+
+    def _exponent(self, now):
+        return (now - self.landmark) / self.half_life
+
+    def _rescale(self, now):
+        """基準時刻を現在に移し、全カウンタを縮小する"""
+        factor = 2.0 ** -self._exponent(now)
+        for scope in self.scopes.values():
+            scope["games"] *= factor
+            scope["duration"] *= factor
+            for team in scope["team_wins"]:
+                scope["team_wins"][team] *= factor
+            for counts in scope["roles"].values():
+                counts[0] *= factor
+                counts[1] *= factor
+        self.landmark = now
+
+    def _weight(self, now):
+        if self._exponent(now) > _RESCALE_EXPONENT:
+            self._rescale(now)
+        return 2.0 ** self._exponent(now)
+
+    # =================== 更新 ===================
+
+    def record_game(self, game_data, now=None):
+        """1ゲーム分の結果を加算（O(登場した役職数)）"""
+        winner = normalize_team(game_data.get("winner"))
+        if winner is None:
+            return
+        now = time.time() if now is None else now
+        weight = self._weight(now)
+
+        # 役職ごとの出現数と勝利数をまとめてから加算
+        role_counts = {}
+        for player in game_data.get("players", []):
+            counts = role_counts.setdefault(player.get("role", "不明"), [0, 0])
+            counts[0] += 1
+            if normalize_team(player.get("team")) == winner:
+                counts[1] += 1
+
+        duration = float(game_data.get("duration") or 0)
+        for key in (GLOBAL_SCOPE, str(game_data.get("guild_id"))):
+            scope = self.scopes.setdefault(key, _empty_scope())
+            scope["games"] += weight
+            scope["duration"] += weight * duration
+            scope["team_wins"][winner] = scope["team_wins"].get(winner, 0.0) + weight
+            for role, (appearances, wins) in role_counts.items():
+                counts = scope["roles"].setdefault(role, [0.0, 0.0])
+                counts[0] += weight * appearances
+                counts[1] += weight * wins
+
+    # =================== 参照 ===================
+
+    def snapshot(self, guild_id=None, now=None):
+        """
+        現在時刻で減衰させた統計を取得
+
+        Returns:
+        --------
+        dict
+            {"games": 実効ゲーム数, "average_duration": 秒,
+             "team_win_rates": {陣営: 勝率}, "roles": {役職: {"appearances", "wins", "win_rate"}}}
+        """
+        now = time.time() if now is None else now
+        scope = self.scopes.get(GLOBAL_SCOPE if guild_id is None else str(guild_id))
+        if not scope or scope["games"] <= 0:
+            return {"games": 0.0, "average_duration": 0.0, "team_win_rates": {}, "roles": {}}
+
+        scale = 2.0 ** -self._exponent(now)
+        games = scope["games"]
+        return {
+            "games": games * scale,
+            "average_duration": scope["duration"] / games,
+            "team_win_rates": {team: wins / games for team, wins in scope["team_wins"].items()},
+            "roles": {
+                role: {"appearances": appearances * scale, "wins": wins * scale,
+                       "win_rate": wins / appearances if appearances else 0.0}
+                for role, (appearances, wins) in scope["roles"].items()
+            }
+        }
+
+    def reset(self, guild_id):
+        """サーバーの減衰統計を削除"""
+        return self.scopes.pop(str(guild_id), None) is not None
@@ -0,0 +1,248 @@
+"""
+ドキュメント索引モジュール
+docs/ のマークダウンを読み込み時に1度だけ解析し、セクション・目次・全文検索用の転置索引をメモリに保持する
+
+検索は日本語でも分かち書きなしで使えるよう、文字bigram（英数字は単語単位）を語として
+BM25でセクションを順位付けする。1文字の検索語でも引けるよう、索引には1文字の語も含める。ファイルの更新は refresh() で更新時刻を見て再構築する
+"""
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+# コマンドで指定するドキュメント名 {名前: ファイル名}
+DOCUMENTS = {
+    "guide": "user_guide.md",
+    "api": "api_reference.md",
+    "composer": "role_composer_guide.md",
+    "composer_dev": "role_composer_dev.md",
+}
+
+# BM25のパラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 見出しの語は本文より重く数える
+TITLE_WEIGHT = 3
+
+# 目次の要約の最大文字数
+SUMMARY_LENGTH = 100
+
+Section = namedtuple("Section", ["doc", "title", "content", "title_lower"])
+SearchResult = namedtuple("SearchResult", ["score", "doc", "title", "snippet"])
+
+# 索引の状態（再構築時は新しい状態を作ってから1回の代入で差し替える）
+# postings: {語: ((セクション番号, 出現回数), ...)}
+# norms: セクションごとのBM25の長さ補正 k1 * (1 - b + b * 長さ / 平均長)
+IndexState = namedtuple("IndexState", ["docs", "sections", "postings", "norms"])
+_EMPTY_STATE = IndexState({}, (), {}, ())
+
+# 英数字の連続 / 英数字以外（ASCIIの記号・空白と和文の句読点を除く）の連続
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[^\x00-\x7f、。・「」『』【】…]+")
+
+
+def tokenize(text, unigrams=False):
+    """
+    テキストを語に分割（英数字は単語、日本語などは文字bigram）
+
+    unigrams=True の場合は2文字以上の日本語などの連続から1文字の語も加える（索引用）
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text):
+        if run.isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if unigrams:
+                tokens.extend(run)
+    return tokens
+
+
+def extract_sections(doc, content):
+    """マークダウンからセクション（# と ## の見出しごと）を抽出"""
+    sections = []
+    current_section = None
+    current_content = []
+
+    for line in content.split("\n"):
+        if line.startswith("# ") or line.startswith("## "):
+            if current_section:
+                sections.append((current_section, "\n".join(current_content).strip()))
+            current_section = line.split(" ", 1)[1].strip()
+            current_content = []
+        elif current_section:
+            current_content.append(line)
+
+    if current_section:
+        sections.append((current_section, "\n".join(current_content).strip()))
+
+    return [Section(doc, title, body, title.lower()) for title, body in sections]
+
+
+def _summary(content):
+    """セクションの最初の段落を要約として使用"""
+    summary = content.split("\n\n")[0] if content else ""
+    summary = summary or "説明なし"
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH - 3] + "..."
+    return summary
+
+
+class ParsedDocument:
+    """解析済みのドキュメント"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            self.content = f.read()
+        self.sections = extract_sections(name, self.content)
+        self.toc = [{"title": section.title, "summary": _summary(section.content)} for section in self.sections]
+
+    def find_section(self, topic):
+        """見出しにトピックを含む最初のセクション"""
+        topic_lower = topic.lower()
+        return next((section for section in self.sections if topic_lower in section.title_lower), None)
+
+
+class DocIndex:
+    """全ドキュメントのセクション索引とBM25の転置索引"""
+
+    def __init__(self, docs_path, documents=DOCUMENTS):
+        self.docs_path = docs_path
+        self.documents = documents
+        self.state = _EMPTY_STATE
+        self.rebuild()
+
+    @property
+    def docs(self):
+        return self.state.docs
+
+    @property
+    def sections(self):
+        return self.state.sections
+
+    # =================== 構築 ===================
+
+    def _mtimes(self):
+        mtimes = {}
+        for name, file_name in self.documents.items():
+            path = os.path.join(self.docs_path, file_name)
+            try:
+                mtimes[name] = os.path.getmtime(path)
+            except OSError:
+                mtimes[name] = None
+        return mtimes
+
+    def rebuild(self):
+        """全ドキュメントを読み込み、索引を作り直す"""
+        docs = {}
+        for name, file_name in self.documents.items():
+            path = os.path.join(self.docs_path, file_name)
+            if os.path.exists(path):
+                docs[name] = ParsedDocument(name, path)
+
+        sections = tuple(section for doc in docs.values() for section in doc.sections)
+        postings = {}
+        lengths = []
+        for section_id, section in enumerate(sections):
+            counts = Counter(tokenize(section.content, unigrams=True))
+            for token in tokenize(section.title, unigrams=True):
+                counts[token] += TITLE_WEIGHT
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((section_id, count))
+            lengths.append(sum(counts.values()))
+
+        average_length = sum(lengths) / len(lengths) if lengths else 1.0
+        norms = tuple(BM25_K1 * (1 - BM25_B + BM25_B * length / average_length) for length in lengths)
+
+        # エグゼキュータで再構築している間も参照側が途中の状態を見ないよう、完成した状態を1回の代入で公開する
+        self.state = IndexState(docs, sections, {token: tuple(items) for token, items in postings.items()}, norms)
+
+    def refresh(self):
+        """更新されたドキュメントがあれば再構築（再構築した場合はTrue）"""
+        current = {name: doc.mtime for name, doc in self.state.docs.items()}
+        mtimes = {name: mtime for name, mtime in self._mtimes().items() if mtime is not None}
+        if mtimes == current:
+            return False
+        self.rebuild()
+        return True
+
+    # =================== 参照 ===================
+
+    def get(self, name):
+        """解析済みのドキュメント（存在しない場合はNone）"""
+        return self.state.docs.get(name)
+
+    def search(self, query, limit=5, doc=None):
+        """
+        BM25でセクションを検索
+
+        Parameters:
+        -----------
+        query : str
+            検索語（日本語は分かち書き不要）
+        limit : int
+            返す件数
+        doc : str, optional
+            ドキュメント名で絞り込む
+
+        Returns:
+        --------
+        list
+            [SearchResult(score, doc, title, snippet), ...] をスコアの高い順に
+        """
+        # 検索中に再構築されても同じ状態を使い続ける
+        state = self.state
+        tokens = set(tokenize(query))
+        if not tokens or not state.sections:
+            return []
+
+        total = len(state.sections)
+        scores = {}
+        for token in tokens:
+            postings = state.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for section_id, tf in postings:
+                scores[section_id] = scores.get(section_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + state.norms[section_id])
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        results = []
+        for section_id, score in ranked:
+            section = state.sections[section_id]
+            if doc is not None and section.doc != doc:
+                continue
+            results.append(SearchResult(score, section.doc, section.title, self._snippet(section, query)))
+            if len(results) >= limit:
+                break
+        return results
+
+    def _snippet(self, section, query, width=80):
+        """検索語を含む本文の抜粋"""
+        content = section.content.replace("\n", " ")
+        lowered = content.lower()
+        position = -1
+        for word in query.lower().split():
+            position = lowered.find(word)
+            if position >= 0:
+                break
+        if position < 0:
+            # 単語で見つからない場合は先頭のbigramで探す
+            for token in tokenize(query):
+                position = lowered.find(token)
+                if position >= 0:
+                    break
+        start = max(0, position - width // 4) if position >= 0 else 0
+        snippet = content[start:start + width].strip()
+        if start > 0:
+            snippet = "..." + snippet
+        if start + width < len(content):
+            snippet += "..."
+        return snippet or "（本文なし）"
@@ -2,8 +2,34 @@
 DMフォールバックモジュール
 DMが届かない場合の代替表示機能を提供
 """
+import asyncio
+import datetime
+import math
+
 import discord
 from discord.ext import commands
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("fallback_dm")
+
+# フォールバックチャンネルを置くカテゴリー
+FALLBACK_CATEGORY_NAME = "人狼ゲームDM"
+# プールのチャンネル名の接頭辞
+POOL_CHANNEL_PREFIX = "dm-fallback-"
+
+# サーバーごとに待機させておくチャンネル数の範囲
+MIN_POOL_SIZE = 1
+MAX_POOL_SIZE = 8
+# DM失敗率・1ゲームの人数の移動平均の重み
+FAILURE_RATE_ALPHA = 0.05
+PLAYER_COUNT_ALPHA = 0.2
+# 初期値（観測がないサーバー）
+INITIAL_FAILURE_RATE = 0.1
+INITIAL_PLAYER_COUNT = 8
+# チャンネル作成のレート制限を避けるための間隔（秒）
+POOL_CREATE_INTERVAL = 1.0
+
 
 class DMFallbackSystem:
     """DMフォールバックシステムクラス"""
@@ -13,65 +39,197 @@ class DMFallbackSystem:
         self.bot = bot
         # DMチャンネルのマッピング {user_id: channel_id}
         self.fallback_channels = {}
+        
+        # サーバーごとの待機中のチャンネル {guild_id: [channel_id, ...]}
+        self.pools = {}
+        # 貸し出し中のチャンネル {channel_id: (guild_id, user_id, game_key)}
+        self.leases = {}
+        # カテゴリーのキャッシュ {guild_id: category_id}
+        self.categories = {}
+        # DM失敗率と1ゲームの人数の移動平均 {guild_id: value}
+        self.failure_rates = {}
+        self.player_counts = {}
+        # 補充中のサーバー（同時に2つ補充しない）
+        self._warming = {}
     
-    async def create_fallback_channel(self, guild, member):
+    # =================== プールの大きさ ===================
+    
+    def record_dm_result(self, guild_id, success):
+        """DM送信の成否を記録し、サーバーのDM失敗率を更新"""
+        guild_id = str(guild_id)
+        rate = self.failure_rates.get(guild_id, INITIAL_FAILURE_RATE)
+        self.failure_rates[guild_id] = rate + FAILURE_RATE_ALPHA * ((0.0 if success else 1.0) - rate)
+    
+    def record_game_size(self, guild_id, player_count):
+        """ゲームの参加人数を記録"""
+        guild_id = str(guild_id)
+        count = self.player_counts.get(guild_id, INITIAL_PLAYER_COUNT)
+        self.player_counts[guild_id] = count + PLAYER_COUNT_ALPHA * (player_count - count)
+    
+    def target_pool_size(self, guild_id):
+        """1ゲームで見込まれるDM失敗人数から、待機させるチャンネル数を決める"""
+        guild_id = str(guild_id)
+        rate = self.failure_rates.get(guild_id, INITIAL_FAILURE_RATE)
+        players = self.player_counts.get(guild_id, INITIAL_PLAYER_COUNT)
+        expected = math.ceil(rate * players)
+        return max(MIN_POOL_SIZE, min(MAX_POOL_SIZE, expected + 1))
+    
+    # =================== プールの管理 ===================
+    
+    def _hidden_overwrites(self, guild):
+        """待機中のチャンネルの権限（Bot以外には非表示）"""
+        return {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        }
+    
+    async def _get_category(self, guild):
+        """フォールバック用のカテゴリーを取得または作成"""
+        guild_id = str(guild.id)
+        category = guild.get_channel(self.categories.get(guild_id, 0))
+        if isinstance(category, discord.CategoryChannel):
+            return category
+        
+        category = discord.utils.get(guild.categories, name=FALLBACK_CATEGORY_NAME)
+        if not category:
+            # カテゴリを作成
+            category = await guild.create_category(
+                FALLBACK_CATEGORY_NAME,
+                overwrites={
+                    guild.default_role: discord.PermissionOverwrite(read_messages=False)
+                }
+            )
+        self.categories[guild_id] = category.id
+        
+        # 再起動前に作成した待機中のチャンネルをプールに戻す
+        if guild_id not in self.pools:
+            leased = set(self.leases)
+            self.pools[guild_id] = [
+                channel.id for channel in category.text_channels
+                if channel.name.startswith(POOL_CHANNEL_PREFIX) and channel.id not in leased
+            ]
+        return category
+    
+    def _take_idle(self, guild):
+        """待機中のチャンネルを1つ取り出す（削除済みのものは捨てる）"""
+        pool = self.pools.get(str(guild.id), [])
+        while pool:
+            channel = guild.get_channel(pool.pop())
+            if isinstance(channel, discord.TextChannel):
+                return channel
+        return None
+    
+    async def _create_pool_channel(self, guild, category):
+        """待機用のチャンネルを作成"""
+        index = len(self.pools.get(str(guild.id), [])) + sum(
+            1 for lease in self.leases.values() if lease[0] == str(guild.id)) + 1
+        return await guild.create_text_channel(
+            f"{POOL_CHANNEL_PREFIX}{index}",
+            category=category,
+            overwrites=self._hidden_overwrites(guild),
+            topic="DMを受け取れないプレイヤー用の代替チャンネル"
+        )
+    
+    async def warm_pool(self, guild):
         """
-        ユーザー専用のチャンネルを作成
+        待機中のチャンネルを目標数まで作成
+        
+        ゲームの募集開始時やチャンネルの貸し出し後にバックグラウンドで呼び出し、
+        DMの失敗がまとまって起きる !begin の時点ではチャンネルを作成せずに済むようにする
+        """
+        guild_id = str(guild.id)
+        if self._warming.get(guild_id):
+            return
+        self._warming[guild_id] = True
+        try:
+            category = await self._get_category(guild)
+            pool = self.pools.setdefault(guild_id, [])
+            while len(pool) < self.target_pool_size(guild_id):
+                channel = await self._create_pool_channel(guild, category)
+                pool.append(channel.id)
+                await asyncio.sleep(POOL_CREATE_INTERVAL)
+        except discord.Forbidden:
+            logger.warning("Cannot create fallback channels: insufficient permissions", guild=guild.id)
+        except Exception as e:
+            logger.error("Failed to warm fallback pool", guild=guild.id, error=str(e))
+        finally:
+            self._warming[guild_id] = False
+    
+    async def lease_channel(self, guild, member, game_key=None):
+        """
+        ユーザー専用のチャンネルをプールから貸し出す
+        
+        権限の書き換え1回で済み、プールが空の場合のみ新しく作成する
         
-        Parameters:
-        -----------
-        guild: discord.Guild
-            サーバーオブジェクト
-        member: discord.Member
-            メンバーオブジェクト
-            
         Returns:
         --------
         discord.TextChannel or None
-            作成されたチャンネル、または失敗した場合はNone
+            貸し出したチャンネル、または失敗した場合はNone
         """
         try:
-            # チャンネル権限を設定
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                member: discord.PermissionOverwrite(read_messages=True)
-            }
-            
-            # カテゴリが存在するかチェック
-            category = discord.utils.get(guild.categories, name="人狼ゲームDM")
-            if not category:
-                # カテゴリを作成
-                category = await guild.create_category(
-                    "人狼ゲームDM", 
-                    overwrites={
-                        guild.default_role: discord.PermissionOverwrite(read_messages=False)
-                    }
-                )
+            category = await self._get_category(guild)
+            channel = self._take_idle(guild)
             
-            # チャンネル名（特殊文字を除去）
-            channel_name = f"dm-{member.display_name}"[:32].replace(' ', '-').lower()
+            overwrites = self._hidden_overwrites(guild)
+            overwrites[member] = discord.PermissionOverwrite(read_messages=True)
             
-            # チャンネルを作成
-            channel = await guild.create_text_channel(
-                channel_name,
-                category=category,
-                overwrites=overwrites,
-                topic=f"{member.display_name}のDM代替チャンネル"
-            )
+            if channel:
+                await channel.edit(overwrites=overwrites, topic=f"{member.display_name}のDM代替チャンネル")
+            else:
+                channel = await self._create_pool_channel(guild, category)
+                await channel.edit(overwrites=overwrites, topic=f"{member.display_name}のDM代替チャンネル")
             
-            # マッピングに保存
+            self.leases[channel.id] = (str(guild.id), str(member.id), game_key)
             self.fallback_channels[str(member.id)] = channel.id
             
+            # 使った分をバックグラウンドで補充
+            asyncio.create_task(self.warm_pool(guild))
             return channel
         
         except discord.Forbidden:
-            print(f"Failed to create fallback channel for {member.display_name}: Insufficient permissions")
+            logger.warning("Failed to create fallback channel: insufficient permissions", guild=guild.id, user=member.id)
             return None
         
         except Exception as e:
-            print(f"Failed to create fallback channel for {member.display_name}: {str(e)}")
+            logger.error("Failed to create fallback channel", guild=guild.id, user=member.id, error=str(e))
             return None
     
+    async def create_fallback_channel(self, guild, member):
+        """ユーザー専用のチャンネルを用意（ゲームに紐づかない貸し出し）"""
+        return await self.lease_channel(guild, member)
+    
+    def has_leases(self, game_key):
+        """ゲームに貸し出し中のチャンネルがあるか"""
+        return any(lease[2] == game_key for lease in self.leases.values())
+    
+    async def release_game(self, guild, game_key):
+        """
+        ゲームに貸し出したチャンネルのメッセージを消去してプールに戻す
+        
+        目標数を超えた分は削除する
+        """
+        guild_id = str(guild.id)
+        pool = self.pools.setdefault(guild_id, [])
+        for channel_id, (lease_guild_id, user_id, lease_key) in list(self.leases.items()):
+            if lease_guild_id != guild_id or lease_key != game_key:
+                continue
+            del self.leases[channel_id]
+            if self.fallback_channels.get(user_id) == channel_id:
+                del self.fallback_channels[user_id]
+            
+            channel = guild.get_channel(channel_id)
+            if not isinstance(channel, discord.TextChannel):
+                continue
+            try:
+                if len(pool) >= self.target_pool_size(guild_id):
+                    await channel.delete(reason="DMフォールバックチャンネルのプールの縮小")
+                    continue
+                await channel.purge(limit=None)
+                await channel.edit(overwrites=self._hidden_overwrites(guild), topic="DMを受け取れないプレイヤー用の代替チャンネル")
+                pool.append(channel.id)
+            except Exception as e:
+                logger.error("Failed to return channel to the pool", guild=guild_id, channel=channel.id, error=str(e))
+    
     async def send_dm(self, user, content=None, embed=None, file=None):
         """
         DMを送信、失敗した場合はフォールバックを使用
@@ -111,17 +269,26 @@ class DMFallbackSystem:
             else:
                 return False, None
                 
+            self._record_dm(user, True)
             return True, dm
         
         except discord.Forbidden:
             # DMが送れない場合
+            self._record_dm(user, False)
             return False, None
         
         except Exception as e:
-            print(f"Failed to send DM to {user.name}: {str(e)}")
+            logger.error("Failed to send DM", user=user.id, error=str(e))
+            self._record_dm(user, False)
             return False, None
     
-    async def send_fallback(self, member, content=None, embed=None, file=None):
+    def _record_dm(self, user, success):
+        metrics.record_dm(success)
+        guild = getattr(user, "guild", None)
+        if guild is not None:
+            self.record_dm_result(guild.id, success)
+    
+    async def send_fallback(self, member, content=None, embed=None, file=None, game_key=None):
         """
         フォールバックチャンネルを使用してメッセージを送信
         
@@ -135,6 +302,8 @@ class DMFallbackSystem:
             送信する埋め込み
         file: discord.File
             送信するファイル
+        game_key: tuple
+            チャンネルを貸し出すゲーム（ゲーム終了時にプールに戻す）
             
         Returns:
         --------
@@ -148,9 +317,9 @@ class DMFallbackSystem:
         if channel_id:
             channel = self.bot.get_channel(channel_id)
         
-        # チャンネルが存在しない場合は新規作成
+        # チャンネルが存在しない場合はプールから貸し出す
         if not channel and member.guild:
-            channel = await self.create_fallback_channel(member.guild, member)
+            channel = await self.lease_channel(member.guild, member, game_key)
         
         if not channel:
             return False, None
@@ -159,30 +328,23 @@ class DMFallbackSystem:
         try:
             notification = f"{member.mention} **DMの代わりに表示されているメッセージです**"
             
-            if content and embed and file:
-                msg = await channel.send(notification, content=content, embed=embed, file=file)
-            elif content and embed:
-                msg = await channel.send(notification, content=content, embed=embed)
-            elif content and file:
-                msg = await channel.send(notification, content=content, file=file)
-            elif embed and file:
-                msg = await channel.send(notification, embed=embed, file=file)
-            elif content:
-                msg = await channel.send(notification, content=content)
-            elif embed:
-                msg = await channel.send(notification, embed=embed)
-            elif file:
-                msg = await channel.send(notification, file=file)
-            else:
+            if not (content or embed or file):
                 return False, None
+            
+            kwargs = {"content": f"{notification}\n{content}" if content else notification}
+            if embed:
+                kwargs["embed"] = embed
+            if file:
+                kwargs["file"] = file
+            msg = await channel.send(**kwargs)
                 
             return True, msg
             
         except Exception as e:
-            print(f"Failed to send fallback message to {member.display_name}: {str(e)}")
+            logger.error("Failed to send fallback message", user=member.id, error=str(e))
             return False, None
     
-    async def send_to_player(self, member, content=None, embed=None, file=None):
+    async def send_to_player(self, member, content=None, embed=None, file=None, game_key=None):
         """
         プレイヤーにメッセージを送信（DMまたはフォールバック）
         
@@ -196,6 +358,8 @@ class DMFallbackSystem:
             送信する埋め込み
         file: discord.File
             送信するファイル
+        game_key: tuple
+            フォールバックチャンネルを貸し出すゲーム
             
         Returns:
         --------
@@ -207,7 +371,7 @@ class DMFallbackSystem:
         
         # DMが失敗したらフォールバックを使用
         if not success:
-            success, message = await self.send_fallback(member, content, embed, file)
+            success, message = await self.send_fallback(member, content, embed, file, game_key)
         
         return success
     
@@ -221,15 +385,19 @@ class DMFallbackSystem:
             チャンネルがあるサーバー
         """
         # カテゴリを探す
-        category = discord.utils.get(guild.categories, name="人狼ゲームDM")
+        category = discord.utils.get(guild.categories, name=FALLBACK_CATEGORY_NAME)
         if not category:
             return
         
         # 7日以上経過したチャンネルを削除
-        import datetime
         cutoff_time = datetime.datetime.utcnow() - datetime.timedelta(days=7)
         
+        # プールで待機中・貸し出し中のチャンネルは削除しない
+        keep = set(self.pools.get(str(guild.id), [])) | set(self.leases)
+        
         for channel in category.text_channels:
+            if channel.id in keep:
+                continue
             try:
                 # 最後のメッセージの時間を取得
                 messages = await channel.history(limit=1).flatten()
@@ -242,4 +410,22 @@ class DMFallbackSystem:
                     await channel.delete(reason="7日以上使用されていないDMフォールバックチャンネル")
             
             except Exception as e:
-                print(f"Failed to clean up channel {channel.name}: {str(e)}")
+                logger.error("Failed to clean up fallback channel", channel=channel.id, error=str(e))
+
+
+# グローバルなフォールバックシステム（最初に使うときに作成）
+_dm_fallback = None
+
+
+def get_dm_fallback(bot):
+    """グローバルなDMフォールバックシステムを取得"""
+    global _dm_fallback
+    if _dm_fallback is None:
+        _dm_fallback = DMFallbackSystem(bot)
+    return _dm_fallback
+
+
+async def send_fallback_dm(bot, guild, member, embed, game_key=None):
+    """DMが届かなかったメンバーに、貸し出したフォールバックチャンネルで埋め込みを送信"""
+    success, _ = await get_dm_fallback(bot).send_fallback(member, embed=embed, game_key=game_key)
+    return success
@@ -0,0 +1,212 @@
+"""
+ゲームアクターモジュール
+1ゲームにつき1つのタスクがイベントキューを順に処理し、フェーズ遷移表に従ってハンドラを呼び出す
+
+コマンド・ボタン・タイマーはイベントを投函するだけで、フェーズを進める処理は常にアクターのタスク上で
+1件ずつ実行される。投票結果の集計や夜の終了が並行して二重に走ることはなく、タイマーも次のフェーズを
+直接awaitしないため、コルーチンのスタックは試合が進んでも深くならない
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("game_actor")
+
+# イベントの種類
+BEGIN = "begin"                # !begin で役職の割り当てが終わった
+NIGHT_ACTION = "night_action"  # 夜のアクションが実行された
+VOTE = "vote"                  # 投票された（コマンド・ボタン）
+TICK = "tick"                  # フェーズタイマーの1秒経過 (remaining)
+DEADLINE = "deadline"          # フェーズの制限時間切れ
+
+# generation は投函時点のフェーズ番号。処理時にフェーズが進んでいれば古いイベントとして捨てる
+GameEvent = namedtuple("GameEvent", ["kind", "generation", "data"])
+
+
+def _channel(actor):
+    return actor.bot.get_channel(int(actor.game.channel_id))
+
+
+# =================== 遷移ハンドラ ===================
+
+async def _begin(actor, event):
+    cog = actor.bot.get_cog("GameManagementCog")
+    channel = _channel(actor)
+    if cog and channel:
+        await cog.start_night_phase(channel, actor.game)
+
+
+async def _night_tick(actor, event):
+    cog = actor.bot.get_cog("GameManagementCog")
+    if cog:
+        await cog.announce_night_time(actor.game, event.data["remaining"])
+
+
+async def _night_action(actor, event):
+    cog = actor.bot.get_cog("NightActionsCog")
+    if cog:
+        await cog.check_all_actions_completed(actor.game)
+
+
+async def _end_night(actor, event):
+    cog = actor.bot.get_cog("NightActionsCog")
+    if cog:
+        await cog.end_night_phase(actor.game)
+
+
+async def _day_tick(actor, event):
+    cog = actor.bot.get_cog("DayActionsCog")
+    channel = _channel(actor)
+    if cog and channel:
+        await cog.announce_day_time(channel, actor.game, event.data["remaining"])
+
+
+async def _end_day(actor, event):
+    actor.game.next_phase()
+    cog = actor.bot.get_cog("VotingCog")
+    channel = _channel(actor)
+    if cog and channel:
+        await cog.start_voting_phase(channel, actor.game)
+
+
+async def _voting_tick(actor, event):
+    cog = actor.bot.get_cog("VotingCog")
+    channel = _channel(actor)
+    if cog and channel:
+        await cog.announce_vote_time(channel, actor.game, event.data["remaining"])
+
+
+async def _vote(actor, event):
+    # 全員が投票し終えた時点で締め切る
+    game = actor.game
+    if len(game.votes) >= len(game.get_alive_players()):
+        await _end_voting(actor, event)
+
+
+async def _end_voting(actor, event):
+    cog = actor.bot.get_cog("VotingCog")
+    channel = _channel(actor)
+    if cog and channel:
+        await cog.process_voting_results(channel, actor.game)
+
+
+# フェーズ遷移表 {(フェーズ, イベント): ハンドラ}。載っていない組み合わせのイベントは捨てる
+TRANSITIONS = {
+    ("night", BEGIN): _begin,
+    ("night", TICK): _night_tick,
+    ("night", NIGHT_ACTION): _night_action,
+    ("night", DEADLINE): _end_night,
+    ("day", TICK): _day_tick,
+    ("day", DEADLINE): _end_day,
+    ("voting", TICK): _voting_tick,
+    ("voting", VOTE): _vote,
+    ("voting", DEADLINE): _end_voting,
+}
+
+
+class GameActor:
+    """1ゲーム分のイベントを直列に処理するアクター"""
+
+    def __init__(self, game, bot, transitions=TRANSITIONS):
+        self.game = game
+        self.bot = bot
+        self.transitions = transitions
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.closed = False
+
+        # 統計
+        self.started_at = None
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.handler_time = 0.0
+        self.max_handler_time = 0.0
+        self.max_queue_depth = 0
+        self.counts = {}
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        """アクターのタスクを開始"""
+        if self.running or self.closed:
+            return
+        self.started_at = time.monotonic()
+        self.task = asyncio.create_task(self._run(), name=f"game-actor-{self.game.guild_id}-{self.game.channel_id}")
+
+    def stop(self):
+        """
+        アクターを停止（キュー内の残りのイベントは処理しない）
+
+        ハンドラ内（ゲーム終了処理など）から呼ばれても自分自身をキャンセルしないよう、
+        番兵を投函して現在のハンドラの完了後にループを抜ける
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.game.cancel_timer()
+        self.queue.put_nowait(None)
+
+    def post(self, kind, **data):
+        """イベントを投函（停止済みの場合はFalse）"""
+        if self.closed:
+            return False
+        self.queue.put_nowait(GameEvent(kind, self.game.phase_generation, data))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    async def _run(self):
+        while True:
+            event = await self.queue.get()
+            if event is None or self.closed:
+                break
+            await self.dispatch(event)
+
+    async def dispatch(self, event):
+        """遷移表に従ってイベントを1件処理"""
+        handler = self.transitions.get((self.game.phase, event.kind))
+        if handler is None or event.generation != self.game.phase_generation:
+            self.dropped += 1
+            metrics.game_events.inc(event.kind, "dropped")
+            return
+
+        start = time.perf_counter()
+        try:
+            await handler(self, event)
+            result = "handled"
+        except Exception:
+            self.failed += 1
+            result = "error"
+            logger.exception("Event handler failed", guild=self.game.guild_id, game=self.game.channel_id,
+                             event=event.kind, phase=self.game.phase)
+        elapsed = time.perf_counter() - start
+
+        self.processed += 1
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+        self.handler_time += elapsed
+        if elapsed > self.max_handler_time:
+            self.max_handler_time = elapsed
+        metrics.game_events.inc(event.kind, result)
+        metrics.game_event_duration.observe(elapsed, event.kind)
+
+    def get_stats(self):
+        """ゲームごとの処理量"""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "events_per_minute": self.processed * 60 / uptime if uptime > 0 else 0.0,
+            "avg_ms": self.handler_time * 1000 / self.processed if self.processed else 0.0,
+            "max_ms": self.max_handler_time * 1000,
+            "counts": dict(self.counts),
+        }
@@ -0,0 +1,240 @@
+"""
+ゲームログアーカイブモジュール
+サーバーごと・月ごとにゲーム結果を1つの圧縮ファイルにまとめ、オフセット索引でランダムアクセスする
+
+形式:
+- games_YYYYMM.jsonl.gz : 1ゲーム=1つのgzipメンバー（JSON 1行）を連結したもの。
+  そのまま zcat で JSON Lines として読める
+- games_YYYYMM.idx.json : {"size": 有効なバイト数, "entries": [[ファイル名, オフセット, 長さ], ...]}
+"""
+import datetime
+import gzip
+import heapq
+import os
+import re
+import time
+import uuid
+
+from utils import json_codec
+from utils.logger import get_logger
+
+logger = get_logger("game_archive")
+
+# 個別ログのファイル名（game_YYYYMMDD_HHMMSS_チャンネルID_乱数.json。旧形式は game_YYYYMMDD_HHMMSS.json）
+LOOSE_PATTERN = re.compile(r"^game_(\d{6})\d{2}_\d{6}(?:_\w+)?\.json$")
+# アーカイブのファイル名
+ARCHIVE_PATTERN = re.compile(r"^games_(\d{6})\.jsonl\.gz$")
+
+# 書き込み直後のファイルは圧縮しない（秒）
+DEFAULT_MIN_AGE = 3600
+
+
+def loose_log_name(channel_id=None, now=None):
+    """
+    個別ログのファイル名を作成
+
+    同じ秒に複数のゲームが終わっても重ならないよう、チャンネルIDと乱数を付ける。
+    先頭が時刻なので名前順が終了順になる
+    """
+    now = now or datetime.datetime.now()
+    return f"game_{now:%Y%m%d_%H%M%S}_{channel_id or 0}_{uuid.uuid4().hex[:8]}.json"
+
+
+def archive_path(guild_dir, month):
+    return os.path.join(guild_dir, f"games_{month}.jsonl.gz")
+
+
+def index_path(guild_dir, month):
+    return os.path.join(guild_dir, f"games_{month}.idx.json")
+
+
+def _load_index(guild_dir, month):
+    """索引を読み込む（存在しない場合は空）"""
+    try:
+        index = json_codec.load_file(index_path(guild_dir, month))
+        return {"size": index.get("size", 0), "entries": index.get("entries", [])}
+    except (FileNotFoundError, json_codec.JSONDecodeError):
+        return {"size": 0, "entries": []}
+
+
+def _save_index(guild_dir, month, index):
+    """索引を一時ファイル経由で置き換える"""
+    path = index_path(guild_dir, month)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(json_codec.dumpb(index))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def list_months(guild_dir):
+    """アーカイブ済みの月（新しい順）"""
+    if not os.path.exists(guild_dir):
+        return []
+    months = []
+    for name in os.listdir(guild_dir):
+        match = ARCHIVE_PATTERN.match(name)
+        if match:
+            months.append(match.group(1))
+    return sorted(months, reverse=True)
+
+
+def list_entries(guild_dir):
+    """
+    アーカイブ内の全ゲームの索引
+
+    Returns:
+    --------
+    dict
+        {ファイル名: (月, オフセット, 長さ)}
+    """
+    entries = {}
+    for month in list_months(guild_dir):
+        for name, offset, length in _load_index(guild_dir, month)["entries"]:
+            entries[name] = (month, offset, length)
+    return entries
+
+
+def read_entry(guild_dir, month, offset, length):
+    """アーカイブから1ゲームを読み込む"""
+    with open(archive_path(guild_dir, month), "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return json_codec.loads(gzip.decompress(data))
+
+
+def iter_archive(guild_dir, month):
+    """アーカイブ内の全ゲームを古い順にストリーミングで読み込む"""
+    index = _load_index(guild_dir, month)
+    with open(archive_path(guild_dir, month), "rb") as raw:
+        # 索引に載っていない末尾（書き込み途中）は読まない
+        with gzip.GzipFile(fileobj=_LimitedReader(raw, index["size"])) as f:
+            for line in f:
+                if line.strip():
+                    yield json_codec.loads(line)
+
+
+class _LimitedReader:
+    """指定バイト数までしか読まないファイルラッパー"""
+
+    def __init__(self, raw, limit):
+        self.raw = raw
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.raw.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def compact_guild(guild_dir, min_age=DEFAULT_MIN_AGE, now=None):
+    """
+    個別ログファイルを月ごとのアーカイブにまとめる（ブロッキング処理）
+
+    Returns:
+    --------
+    int
+        アーカイブに移したファイル数
+    """
+    if not os.path.exists(guild_dir):
+        return 0
+
+    now = now or time.time()
+    by_month = {}
+    for name in os.listdir(guild_dir):
+        match = LOOSE_PATTERN.match(name)
+        if not match:
+            continue
+        path = os.path.join(guild_dir, name)
+        if now - os.path.getmtime(path) < min_age:
+            continue
+        by_month.setdefault(match.group(1), []).append(name)
+
+    compacted = 0
+    for month, names in by_month.items():
+        index = _load_index(guild_dir, month)
+        archived = {entry[0] for entry in index["entries"]}
+        pack_path = archive_path(guild_dir, month)
+
+        moved = []
+        with open(pack_path, "ab") as pack:
+            # 前回中断して索引に載らなかった末尾を切り詰める
+            pack.truncate(index["size"])
+            pack.seek(index["size"])
+            offset = index["size"]
+
+            for name in sorted(names):
+                if name in archived:
+                    moved.append(name)
+                    continue
+                try:
+                    game_data = json_codec.load_file(os.path.join(guild_dir, name))
+                except (json_codec.JSONDecodeError, OSError) as e:
+                    logger.warning("ゲームログ圧縮スキップ", file=name, error=str(e))
+                    continue
+
+                member = gzip.compress(json_codec.dumpb(game_data) + b"\n", mtime=0)
+                pack.write(member)
+                index["entries"].append([name, offset, len(member)])
+                offset += len(member)
+                moved.append(name)
+
+            pack.flush()
+            os.fsync(pack.fileno())
+
+        index["entries"].sort(key=lambda entry: entry[0])
+        index["size"] = offset
+        _save_index(guild_dir, month, index)
+
+        # 索引に反映されてから個別ファイルを削除
+        for name in moved:
+            try:
+                os.remove(os.path.join(guild_dir, name))
+                compacted += 1
+            except FileNotFoundError:
+                pass
+
+    return compacted
+
+
+def compact_all(logs_dir, min_age=DEFAULT_MIN_AGE):
+    """全サーバーのログを圧縮"""
+    total = 0
+    if not os.path.exists(logs_dir):
+        return total
+    for name in os.listdir(logs_dir):
+        guild_dir = os.path.join(logs_dir, name)
+        if name.isdigit() and os.path.isdir(guild_dir):
+            total += compact_guild(guild_dir, min_age)
+    return total
+
+
+def iter_guild_logs(guild_dir):
+    """サーバーの全ゲームログを古い順に読み込む（アーカイブ→未圧縮の個別ログの順）"""
+    if not os.path.exists(guild_dir):
+        return
+
+    for month in reversed(list_months(guild_dir)):
+        yield from iter_archive(guild_dir, month)
+
+    log_files = sorted(f for f in os.listdir(guild_dir) if f.startswith("game_") and f.endswith(".json"))
+    for name in log_files:
+        try:
+            yield json_codec.load_file(os.path.join(guild_dir, name))
+        except (FileNotFoundError, json_codec.JSONDecodeError):
+            continue
+
+
+def iter_all_logs(logs_dir):
+    """全サーバーのゲームログを終了時刻順にマージして読み込む"""
+    if not os.path.exists(logs_dir):
+        return
+    streams = [
+        iter_guild_logs(os.path.join(logs_dir, name))
+        for name in sorted(os.listdir(logs_dir))
+        if name.isdigit() and os.path.isdir(os.path.join(logs_dir, name))
+    ]
+    yield from heapq.merge(*streams, key=lambda game: str(game.get("end_time") or game.get("start_time") or ""))
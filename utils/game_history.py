@@ -0,0 +1,288 @@
+"""
+ゲーム履歴の列指向テーブル
+ゲームログをNumPyの列（ゲームごとの列と、座席=プレイヤーごとの列）に変換し、勝率などの集計をベクトル演算で行う
+
+列:
+- ゲーム: ゲームID, サーバー, 人数, 構成シグネチャ, 勝者, 終了時刻, ゲーム時間
+- 座席: ゲームの行番号, 役職, 陣営, 勝敗, 生存
+文字列（ゲームID・役職・構成）は語彙表の番号で保持する
+"""
+import datetime
+import math
+
+import numpy as np
+
+from utils.composition_rules import normalize
+from utils.rating import TEAMS, normalize_team
+
+# 勝者・陣営の表示名（utils.rating.TEAMS と同じ順）
+TEAM_NAMES = ("village", "werewolf", "fox")
+
+# 95%信頼区間
+DEFAULT_Z = 1.96
+
+
+def wilson_interval(wins, games, z=DEFAULT_Z):
+    """
+    Wilsonスコア区間（配列をまとめて計算できる）
+
+    Returns:
+    --------
+    tuple
+        (下限, 上限)。試行数0の要素は (0, 0)
+    """
+    wins = np.asarray(wins, dtype=np.float64)
+    games = np.asarray(games, dtype=np.float64)
+    safe = np.where(games > 0, games, 1.0)
+    p = wins / safe
+    denominator = 1.0 + z * z / safe
+    center = (p + z * z / (2 * safe)) / denominator
+    margin = z * np.sqrt(p * (1 - p) / safe + z * z / (4 * safe * safe)) / denominator
+    empty = games == 0
+    return np.where(empty, 0.0, center - margin), np.where(empty, 0.0, center + margin)
+
+
+def _timestamp(value):
+    """ISO形式の日時をUNIX時刻に変換（不明な場合はNaN）"""
+    if not value:
+        return math.nan
+    try:
+        return datetime.datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def _signature(players):
+    """役職構成のシグネチャ（例: "人狼2,占い師1,村人3"）"""
+    counts = {}
+    for player in players:
+        counts[player.get("role")] = counts.get(player.get("role"), 0) + 1
+    return ",".join(f"{role}{count}" for role, count in normalize(
+        {role: count for role, count in counts.items() if role}))
+
+
+class _Vocabulary:
+    """文字列と番号の対応表"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class GameHistory:
+    """ゲーム履歴の列指向テーブル（追加はバッファに貯め、集計時にまとめて列へ反映）"""
+
+    _GAME_COLUMNS = (
+        ("game_id", np.int64), ("guild", np.int64), ("player_count", np.int16),
+        ("composition", np.int32), ("winner", np.int8), ("end_time", np.float64), ("duration", np.float64),
+    )
+    _SEAT_COLUMNS = (
+        ("seat_game", np.int64), ("seat_role", np.int32), ("seat_team", np.int8),
+        ("seat_won", np.bool_), ("seat_alive", np.bool_),
+    )
+
+    def __init__(self, games=()):
+        self.game_ids = _Vocabulary()
+        self.roles = _Vocabulary()
+        self.compositions = _Vocabulary()
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self._GAME_COLUMNS + self._SEAT_COLUMNS}
+        self._pending = {name: [] for name, _ in self._GAME_COLUMNS + self._SEAT_COLUMNS}
+        self._pending_games = 0
+        self.extend(games)
+
+    def __len__(self):
+        return len(self.columns["game_id"]) + self._pending_games
+
+    # =================== 追加 ===================
+
+    def append(self, game_data):
+        """
+        ゲームを1件追加（勝者が不明なゲームと、同じゲームIDが追加済みのゲームは無視）
+
+        終了直後のゲームはログ保存と同時にこのテーブルへも追加されるため、
+        ログから構築した直後に同じゲームが追加されても二重に数えない
+        """
+        winner = normalize_team(game_data.get("winner"))
+        players = game_data.get("players", [])
+        if winner is None or not players:
+            return False
+
+        row = len(self)
+        game_id = str(game_data.get("id", f"#{row}"))
+        if game_id in self.game_ids.codes:
+            return False
+        pending = self._pending
+        pending["game_id"].append(self.game_ids.code(game_id))
+        pending["guild"].append(int(game_data.get("guild_id") or 0))
+        pending["player_count"].append(len(players))
+        pending["composition"].append(self.compositions.code(_signature(players)))
+        pending["winner"].append(TEAMS.index(winner))
+        pending["end_time"].append(_timestamp(game_data.get("end_time")))
+        pending["duration"].append(float(game_data.get("duration") or 0))
+
+        for player in players:
+            team = normalize_team(player.get("team"))
+            pending["seat_game"].append(row)
+            pending["seat_role"].append(self.roles.code(player.get("role") or ""))
+            pending["seat_team"].append(TEAMS.index(team) if team else -1)
+            pending["seat_won"].append(team == winner)
+            pending["seat_alive"].append(bool(player.get("is_alive")))
+        self._pending_games += 1
+        return True
+
+    def extend(self, games):
+        for game_data in games:
+            self.append(game_data)
+
+    def _flush(self):
+        if not self._pending_games:
+            return
+        for name, dtype in self._GAME_COLUMNS + self._SEAT_COLUMNS:
+            values = self._pending[name]
+            if values:
+                self.columns[name] = np.concatenate([self.columns[name], np.asarray(values, dtype=dtype)])
+                self._pending[name] = []
+        self._pending_games = 0
+
+    # =================== 絞り込み ===================
+
+    def select(self, guild_id=None, since=None, until=None, player_count=None, composition=None):
+        """
+        条件に合うゲームのマスクを作成
+
+        Parameters:
+        -----------
+        guild_id : int, optional
+            サーバーで絞り込む（省略時は全サーバー）
+        since, until : datetime or float, optional
+            終了時刻の範囲
+        player_count : int or tuple, optional
+            人数、または (最小, 最大)
+        composition : dict or str, optional
+            役職構成 {役職: 人数} またはシグネチャ
+        """
+        self._flush()
+        mask = np.ones(len(self.columns["game_id"]), dtype=bool)
+        if guild_id is not None:
+            mask &= self.columns["guild"] == int(guild_id)
+        if since is not None:
+            mask &= self.columns["end_time"] >= (since.timestamp() if hasattr(since, "timestamp") else since)
+        if until is not None:
+            mask &= self.columns["end_time"] < (until.timestamp() if hasattr(until, "timestamp") else until)
+        if player_count is not None:
+            if isinstance(player_count, tuple):
+                low, high = player_count
+                mask &= (self.columns["player_count"] >= low) & (self.columns["player_count"] <= high)
+            else:
+                mask &= self.columns["player_count"] == player_count
+        if composition is not None:
+            if isinstance(composition, dict):
+                composition = ",".join(f"{role}{count}" for role, count in normalize(composition))
+            code = self.compositions.codes.get(composition)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= self.columns["composition"] == code
+        return mask
+
+    def _mask(self, mask, filters):
+        return self.select(**filters) if mask is None else mask
+
+    def _rates(self, labels, wins, games, min_games=0):
+        low, high = wilson_interval(wins, games)
+        return {
+            label: {"games": int(games[i]), "wins": int(wins[i]), "rate": float(wins[i] / games[i]),
+                    "low": float(low[i]), "high": float(high[i])}
+            for i, label in enumerate(labels)
+            if games[i] > 0 and games[i] >= min_games
+        }
+
+    # =================== 集計 ===================
+
+    def team_win_rates(self, mask=None, **filters):
+        """陣営ごとの勝率（勝利数/対象ゲーム数）と信頼区間"""
+        mask = self._mask(mask, filters)
+        wins = np.bincount(self.columns["winner"][mask], minlength=len(TEAMS))
+        games = np.full(len(TEAMS), int(mask.sum()))
+        return self._rates(TEAM_NAMES, wins, games)
+
+    def average_duration(self, mask=None, **filters):
+        """勝利陣営ごとの平均ゲーム時間（秒）"""
+        mask = self._mask(mask, filters)
+        winners = self.columns["winner"][mask]
+        totals = np.bincount(winners, weights=self.columns["duration"][mask], minlength=len(TEAMS))
+        counts = np.bincount(winners, minlength=len(TEAMS))
+        return {TEAM_NAMES[i]: float(totals[i] / counts[i]) for i in range(len(TEAMS)) if counts[i]}
+
+    def role_win_rates(self, mask=None, min_games=0, **filters):
+        """役職ごとの勝率（座席単位）と信頼区間"""
+        mask = self._mask(mask, filters)
+        seats = mask[self.columns["seat_game"]]
+        roles = self.columns["seat_role"][seats]
+        size = len(self.roles.values)
+        games = np.bincount(roles, minlength=size)
+        wins = np.bincount(roles, weights=self.columns["seat_won"][seats], minlength=size)
+        return self._rates(self.roles.values, wins, games, min_games)
+
+    def role_survival_rates(self, mask=None, min_games=0, **filters):
+        """役職ごとの生存率"""
+        mask = self._mask(mask, filters)
+        seats = mask[self.columns["seat_game"]]
+        roles = self.columns["seat_role"][seats]
+        size = len(self.roles.values)
+        games = np.bincount(roles, minlength=size)
+        alive = np.bincount(roles, weights=self.columns["seat_alive"][seats], minlength=size)
+        return self._rates(self.roles.values, alive, games, min_games)
+
+    def by_player_count(self, mask=None, **filters):
+        """人数ごとの陣営勝率 {人数: {陣営: {...}}}"""
+        mask = self._mask(mask, filters)
+        counts = self.columns["player_count"][mask].astype(np.int64)
+        if not len(counts):
+            return {}
+        winners = self.columns["winner"][mask].astype(np.int64)
+        size = int(counts.max()) + 1
+        table = np.bincount(counts * len(TEAMS) + winners, minlength=size * len(TEAMS)).reshape(size, len(TEAMS))
+        totals = table.sum(axis=1)
+        return {
+            count: self._rates(TEAM_NAMES, table[count], np.full(len(TEAMS), totals[count]))
+            for count in np.nonzero(totals)[0].tolist()
+        }
+
+    def by_composition(self, mask=None, min_games=1, limit=10, **filters):
+        """
+        構成ごとの陣営勝率（ゲーム数の多い順）
+
+        Returns:
+        --------
+        list
+            [(シグネチャ, ゲーム数, {陣営: {...}}), ...]
+        """
+        mask = self._mask(mask, filters)
+        codes = self.columns["composition"][mask].astype(np.int64)
+        winners = self.columns["winner"][mask].astype(np.int64)
+        size = len(self.compositions.values)
+        table = np.bincount(codes * len(TEAMS) + winners, minlength=size * len(TEAMS)).reshape(size, len(TEAMS))
+        totals = table.sum(axis=1)
+        order = np.argsort(-totals, kind="stable")
+        result = []
+        for code in order[:limit].tolist():
+            if totals[code] < max(min_games, 1):
+                break
+            result.append((self.compositions.values[code], int(totals[code]),
+                           self._rates(TEAM_NAMES, table[code], np.full(len(TEAMS), totals[code]))))
+        return result
+
+    def compare_guild(self, guild_id, **filters):
+        """サーバーと全体の陣営勝率を比較 {"guild": {...}, "global": {...}}"""
+        return {
+            "guild": self.team_win_rates(guild_id=guild_id, **filters),
+            "global": self.team_win_rates(**filters),
+        }
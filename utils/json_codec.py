@@ -0,0 +1,82 @@
+"""
+JSONコーデックモジュール
+すべてのJSONストアが使う共通のエンコード・デコード処理
+
+orjson がインストールされていればそれを使い、なければ標準の json にフォールバックする。
+どちらでも出力は UTF-8（ensure_ascii なし）で、機械が読み書きするファイルは区切りの空白なしの
+コンパクト形式、人が編集する設定ファイルだけ pretty=True でインデント付きにする
+
+デコード時の例外はどちらの実装でも json.JSONDecodeError（orjson の例外はそのサブクラス）
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 使用中の実装名（"orjson" / "json"）
+BACKEND = "orjson" if orjson else "json"
+
+# 呼び出し側は json.JSONDecodeError の代わりにこれを捕捉してもよい
+JSONDecodeError = json.JSONDecodeError
+
+# orjson のオプション（標準の json と同じく、文字列以外の辞書キーは文字列に変換する）
+_ORJSON_COMPACT = orjson.OPT_NON_STR_KEYS if orjson else 0
+_ORJSON_PRETTY = _ORJSON_COMPACT | orjson.OPT_INDENT_2 if orjson else 0
+
+_COMPACT_SEPARATORS = (",", ":")
+
+
+def _stdlib_dumps(obj, pretty, default):
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+    return json.dumps(obj, ensure_ascii=False, separators=_COMPACT_SEPARATORS, default=default)
+
+
+def dumpb(obj, pretty=False, default=None):
+    """UTF-8のバイト列にエンコード"""
+    if orjson:
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_PRETTY if pretty else _ORJSON_COMPACT)
+        except orjson.JSONEncodeError:
+            # 64bitを超える整数など orjson が扱えない値は標準の json で書く
+            pass
+    return _stdlib_dumps(obj, pretty, default).encode("utf-8")
+
+
+def dumps(obj, pretty=False, default=None):
+    """文字列にエンコード"""
+    if orjson:
+        return dumpb(obj, pretty, default).decode("utf-8")
+    return _stdlib_dumps(obj, pretty, default)
+
+
+def loads(data):
+    """文字列またはバイト列をデコード"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path):
+    """
+    JSONファイルを読み込む
+
+    Raises:
+    -------
+    FileNotFoundError
+        ファイルが存在しない場合
+    json.JSONDecodeError
+        JSONが壊れている場合
+    """
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(path, obj, pretty=False):
+    """JSONファイルを書き込む（pretty=True は人が編集する設定ファイルだけに使う）"""
+    data = dumpb(obj, pretty)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
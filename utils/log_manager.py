@@ -1,10 +1,11 @@
 import os
-import json
 import datetime
 import discord
 from typing import Optional, List, Dict, Any
 import uuid
 
+from utils import json_codec
+
 class LogManager:
     """
     ゲームログの記録と管理を行うクラス
@@ -112,7 +113,7 @@ class LogManager:
     def _write_log_entry(self, filename: str, log_entry: Dict[str, Any]):
         """ログエントリをファイルに書き込む"""
         with open(filename, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+            f.write(json_codec.dumps(log_entry) + "\n")
     
     async def export_game_log(self, game_id: str, game_data: Dict[str, Any]) -> Optional[str]:
         """
@@ -152,9 +153,9 @@ class LogManager:
             with open(log_file, "r", encoding="utf-8") as f:
                 for line in f:
                     try:
-                        entry = json.loads(line.strip())
+                        entry = json_codec.loads(line.strip())
                         log_entries.append(entry)
-                    except json.JSONDecodeError:
+                    except json_codec.JSONDecodeError:
                         continue
             
             # タイムスタンプでソート
@@ -326,11 +327,11 @@ class LogManager:
                     try:
                         with open(os.path.join(self.log_directory, filename), "r", encoding="utf-8") as f:
                             first_line = f.readline().strip()
-                            log_data = json.loads(first_line)
+                            log_data = json_codec.loads(first_line)
                             if "details" in log_data and "guild_id" in log_data["details"]:
                                 if log_data["details"]["guild_id"] == guild_id:
                                     log_files.append(filename)
-                    except (json.JSONDecodeError, IOError):
+                    except (json_codec.JSONDecodeError, IOError):
                         # エラーが発生した場合はこのファイルをスキップ
                         continue
                 else:
@@ -1,10 +1,297 @@
 """
 ロギングモジュール
 ゲームのログを記録する
+
+Bot全体のログは "werewolf" 以下のロガーに JSON Lines（1行1レコード）で出力する。
+ログの呼び出し側はキューに積むだけで、書式化と標準出力への書き込みはバックグラウンドの
+スレッドで行うため、大量のログを出してもイベントループを止めない
+
+    logger = get_logger("database")
+    logger.info("Settings loaded", guild=guild_id)
+
+サーバー・ゲーム・コマンドは log_context() でタスク単位に束ねておけば、その間の全レコードに付く。
+モジュールごとのレベルは環境変数 LOG_LEVELS（例: "database=WARNING,message_filter=ERROR"）で指定する
 """
+import atexit
+import contextvars
 import os
 import logging
-from datetime import datetime
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from utils import json_codec
+
+# ルートロガー名（get_logger の名前はこの下に付く）
+ROOT_LOGGER = "werewolf"
+
+# 環境変数が未設定の場合の既定のレベル・出力形式（json / text）
+DEFAULT_LOG_LEVEL = "INFO"
+DEFAULT_LOG_FORMAT = "json"
+
+# 同じメッセージは1窓あたりこの件数まで出力し、残りは件数だけを次のレコードに付ける
+SAMPLING_WINDOW = 10.0
+SAMPLING_BURST = 5
+# このレベル以上は間引かない
+SAMPLING_MAX_LEVEL = logging.ERROR
+# 追跡するメッセージの種類の上限（超えたら窓をまとめてリセット）
+SAMPLING_MAX_KEYS = 2000
+
+# レコードに付けるコンテキスト（サーバー・ゲーム・コマンドなど）
+_context = contextvars.ContextVar("log_context", default={})
+
+# LogRecord の標準属性（これ以外の属性は構造化フィールドとして出力する）
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_lock = threading.Lock()
+
+
+# =================== コンテキスト ===================
+
+@contextmanager
+def log_context(**fields):
+    """ブロック内（同じタスク）で出力する全レコードにフィールドを付ける"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind_context(**fields):
+    """現在のタスクのコンテキストにフィールドを追加（reset_context に渡すトークンを返す）"""
+    return _context.set({**_context.get(), **fields})
+
+
+def reset_context(token):
+    """bind_context の前の状態に戻す"""
+    _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """呼び出し元のコンテキストをレコードに写す（呼び出し元のスレッドで実行される）"""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+# =================== 間引き ===================
+
+class SamplingFilter(logging.Filter):
+    """
+    同じロガー・同じメッセージ（書式化前）のレコードを窓ごとに burst 件までに間引く
+
+    間引いた件数は、次の窓で最初に出力するレコードの suppressed フィールドに付ける
+    """
+
+    def __init__(self, window=SAMPLING_WINDOW, burst=SAMPLING_BURST, max_level=SAMPLING_MAX_LEVEL,
+                 max_keys=SAMPLING_MAX_KEYS, clock=time.monotonic):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_level = max_level
+        self.max_keys = max_keys
+        self.clock = clock
+        self.windows = {}  # {(ロガー名, メッセージ, レベル): [窓の開始時刻, 出力数, 間引いた数]}
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        if record.levelno >= self.max_level:
+            return True
+        key = (record.name, record.msg, record.levelno)
+        now = self.clock()
+        state = self.windows.get(key)
+        if state is None or now - state[0] >= self.window:
+            if state is None and len(self.windows) >= self.max_keys:
+                self.windows.clear()
+            suppressed = state[2] if state else 0
+            self.windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+        state[2] += 1
+        self.suppressed_total += 1
+        return False
+
+
+# =================== 書式 ===================
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行のJSON"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json_codec.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """開発用の1行テキスト（構造化フィールドは key=value で末尾に付ける）"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items()
+                          if key not in _RESERVED and not key.startswith("_"))
+        if fields:
+            head, _, tail = line.partition("\n")
+            line = f"{head} {fields}" + (f"\n{tail}" if tail else "")
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """呼び出し元では書式化せず、メッセージと例外だけを文字列にして積む"""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """キーワード引数を構造化フィールドとして渡せるロガー"""
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def process(self, msg, kwargs):
+        extra = kwargs.pop("extra", None) or {}
+        passthrough = {key: kwargs.pop(key) for key in ("exc_info", "stack_info", "stacklevel") if key in kwargs}
+        for key, value in kwargs.items():
+            # LogRecord の標準属性と同じ名前は上書きできないため末尾に _ を付ける
+            extra[f"{key}_" if key in _RESERVED else key] = value
+        passthrough["extra"] = extra
+        return msg, passthrough
+
+
+# =================== 設定 ===================
+
+def _logger_name(name):
+    return name if name == ROOT_LOGGER or name.startswith(ROOT_LOGGER + ".") else f"{ROOT_LOGGER}.{name}"
+
+
+def _parse_levels(levels):
+    """"database=WARNING,message_filter=ERROR" または辞書 → {"werewolf.database": "WARNING", ...}"""
+    if isinstance(levels, str):
+        pairs = (item.strip().partition("=")[::2] for item in levels.split(","))
+        levels = {name.strip(): level for name, level in pairs if name.strip() and level.strip()}
+    return {_logger_name(name): level.strip().upper() for name, level in levels.items()}
+
+
+def configure_logging(level=None, levels=None, fmt=None, stream=None, capture=()):
+    """
+    ロギングを設定し、バックグラウンドの出力スレッドを開始（2回目以降はレベルだけ更新）
+
+    Parameters:
+    -----------
+    level : str, optional
+        既定のレベル（省略時は環境変数 LOG_LEVEL）
+    levels : dict or str, optional
+        モジュールごとのレベル（省略時は環境変数 LOG_LEVELS）
+    fmt : str, optional
+        "json" または "text"（省略時は環境変数 LOG_FORMAT）
+    capture : tuple, optional
+        同じキューに流す外部ライブラリのロガー名（"discord" など）
+    """
+    global _listener
+    # .env は呼び出し前に読み込まれているので、環境変数はここで読む
+    level = level or os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL)
+    levels = _parse_levels(os.getenv("LOG_LEVELS", "") if levels is None else levels)
+    fmt = fmt or os.getenv("LOG_FORMAT", DEFAULT_LOG_FORMAT)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level.upper())
+    for name, name_level in levels.items():
+        logging.getLogger(name).setLevel(name_level)
+
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        log_queue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(ContextFilter())
+        handler.addFilter(SamplingFilter())
+        for name in (ROOT_LOGGER,) + tuple(capture):
+            logging.getLogger(name).addHandler(handler)
+            logging.getLogger(name).propagate = False
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """キューに残ったレコードを書き出して出力スレッドを止める"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    """"werewolf.<name>" の構造化ロガー"""
+    return StructuredLogger(logging.getLogger(_logger_name(name)))
+
+
+def get_logging_stats():
+    """書き込み待ちのレコード数と間引いたレコードの総数"""
+    handlers = [handler for handler in logging.getLogger(ROOT_LOGGER).handlers if isinstance(handler, _QueueHandler)]
+    return {
+        "queued": sum(handler.queue.qsize() for handler in handlers),
+        "suppressed": sum(f.suppressed_total for handler in handlers for f in handler.filters
+                          if isinstance(f, SamplingFilter)),
+    }
+
+
+# =================== 定型ログ ===================
+
+def log_command(user_id, guild_id, command, args):
+    """コマンドの実行を記録"""
+    get_logger("command").info("Command executed", user=user_id, guild=guild_id, command=command, arguments=args)
+
+
+def log_role_composer(guild_id, action, details):
+    """役職構成の変更を記録"""
+    get_logger("role_composer").info(action, guild=guild_id, details=details)
+
+
+def log_error(error, context=None):
+    """エラーを記録"""
+    get_logger("error").error(str(error), error_type=type(error).__name__, where=context)
+
 
 class GameLogger:
     """ゲームロガークラス"""
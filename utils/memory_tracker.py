@@ -0,0 +1,276 @@
+"""
+メモリ計測モジュール
+Game/Player/View の生存数をweakrefで追跡し、tracemallocでサブシステムごとの保持量を集計する
+
+tracemallocは割り当てのたびにコストがかかるため常時は動かさず、
+!admin memory start で開始してから一定時間（または !admin memory stop まで）だけ計測する
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import types
+import weakref
+
+from utils.logger import get_logger
+
+logger = get_logger("memory")
+
+# tracemallocで記録するフレーム数
+TRACEMALLOC_FRAMES = 1
+# tracemallocの計測時間の既定値（秒）
+TRACE_WINDOW = 600
+# 終了したゲームをリークとみなすまでの猶予（秒）。終了処理中のタスクやViewが参照を手放すのを待つ
+LEAK_GRACE_SECONDS = 300
+# 参照元をたどる最大深さ
+MAX_REFERRER_DEPTH = 6
+# 1段あたりに調べる参照元の最大数
+MAX_REFERRERS_PER_LEVEL = 20
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 種類ごとの生存オブジェクト {kind: WeakSet}
+_registries = {}
+
+
+def track(obj, kind):
+    """オブジェクトを生存数の追跡対象に登録"""
+    registry = _registries.get(kind)
+    if registry is None:
+        registry = _registries[kind] = weakref.WeakSet()
+    registry.add(obj)
+
+
+def live_objects(kind):
+    """追跡中の生存オブジェクト一覧を取得"""
+    registry = _registries.get(kind)
+    return list(registry) if registry is not None else []
+
+
+def live_counts():
+    """種類ごとの生存数を取得"""
+    return {kind: len(registry) for kind, registry in _registries.items()}
+
+
+def subsystem_of(filename):
+    """ファイル名からサブシステム名を判定（例: cogs.voting, models, discord）"""
+    if filename.startswith(_ROOT_DIR):
+        relative = os.path.relpath(filename, _ROOT_DIR)
+        parts = relative.replace("\\", "/").split("/")
+        if len(parts) > 1 and parts[0] == "cogs":
+            return f"cogs.{os.path.splitext(parts[1])[0]}"
+        if len(parts) > 1:
+            return parts[0]
+        return os.path.splitext(parts[0])[0]
+
+    normalized = filename.replace("\\", "/")
+    for package in ("discord", "aiohttp", "matplotlib", "numpy", "asyncio", "json"):
+        if f"/{package}/" in normalized:
+            return package
+    return "other"
+
+
+def _describe(obj):
+    """参照元を短い文字列で表す"""
+    if isinstance(obj, types.FrameType):
+        return f"frame {obj.f_code.co_name} ({os.path.basename(obj.f_code.co_filename)}:{obj.f_lineno})"
+    if isinstance(obj, types.ModuleType):
+        return f"module {obj.__name__}"
+    if isinstance(obj, dict):
+        return f"dict(len={len(obj)})"
+    if isinstance(obj, (list, tuple, set)):
+        return f"{type(obj).__name__}(len={len(obj)})"
+    if isinstance(obj, types.CellType):
+        return "cell"
+    if isinstance(obj, types.CoroutineType):
+        return f"coroutine {obj.__qualname__}"
+    return type(obj).__name__
+
+
+def _attribute_name(holder, child):
+    """holderのどの属性/キーがchildを参照しているか"""
+    if isinstance(holder, dict):
+        for key, value in holder.items():
+            if value is child:
+                return f"[{key!r}]"
+    elif hasattr(holder, "__dict__"):
+        for key, value in vars(holder).items():
+            if value is child:
+                return f".{key}"
+    return ""
+
+
+def _is_root(obj):
+    """参照チェーンの起点とみなすオブジェクトか（モジュール、タスク、組み込み以外のクラスのインスタンス）"""
+    if isinstance(obj, (types.ModuleType, asyncio.Task)):
+        return True
+    if isinstance(obj, (dict, list, tuple, set, types.FrameType, types.CellType,
+                        types.FunctionType, types.MethodType, types.CoroutineType)):
+        return False
+    return type(obj).__module__ not in ("builtins", "models.game", "models.player") and \
+        not type(obj).__module__.startswith("models.roles")
+
+
+def referrer_chain(obj, max_depth=MAX_REFERRER_DEPTH):
+    """
+    objを生かしている参照元のチェーンを幅優先でたどる
+
+    Returns:
+    --------
+    list
+        ["Game", "dict(len=12) ['game']", "VoteView"] のような起点までの説明
+    """
+    ignore = {id(sys._getframe()), id(_registries)}
+    visited = {id(obj)}
+    queue = [(obj, [_describe(obj)])]
+
+    for _ in range(max_depth):
+        next_queue = []
+        for current, path in queue:
+            referrers = gc.get_referrers(current)
+            ignore.add(id(referrers))
+            for referrer in referrers[:MAX_REFERRERS_PER_LEVEL]:
+                if id(referrer) in visited or id(referrer) in ignore:
+                    continue
+                # 自分自身の走査で作ったフレームやキューは除外
+                if isinstance(referrer, types.FrameType) and referrer.f_code.co_filename == __file__:
+                    continue
+                if referrer is queue or referrer is next_queue or referrer is path:
+                    continue
+                visited.add(id(referrer))
+                step = _describe(referrer) + _attribute_name(referrer, current)
+                new_path = path + [step]
+                if _is_root(referrer):
+                    return new_path
+                next_queue.append((referrer, new_path))
+        queue = next_queue
+        if not queue:
+            break
+
+    return queue[0][1] if queue else [_describe(obj)]
+
+
+class MemoryTracker:
+    """メモリ計測クラス"""
+
+    def __init__(self, interval=600, grace=LEAK_GRACE_SECONDS):
+        self.interval = interval
+        self.grace = grace
+        self.task = None
+        self.trace_handle = None
+        self.last_snapshot = None
+        self.last_report = None
+
+    def start(self, bot):
+        """生存数とリークの定期計測を開始（tracemallocは start_tracing で別に開始）"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run(bot))
+        logger.info("Memory tracking started", interval=self.interval)
+
+    def stop(self):
+        """定期計測とtracemallocを停止"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        self.stop_tracing()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, duration=TRACE_WINDOW):
+        """tracemallocをduration秒だけ有効にする（既に計測中なら終了時刻を延長）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.last_snapshot = None
+        if self.trace_handle:
+            self.trace_handle.cancel()
+        self.trace_handle = asyncio.get_running_loop().call_later(duration, self.stop_tracing)
+        logger.info("tracemalloc started", duration=duration)
+
+    def stop_tracing(self):
+        """tracemallocを停止（保持していたスナップショットも破棄）"""
+        if self.trace_handle:
+            self.trace_handle.cancel()
+            self.trace_handle = None
+        self.last_snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+
+    async def _run(self, bot):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                report = self.collect(bot)
+                for leak in report["leaked_games"]:
+                    logger.warning("Leaked game", guild=leak['guild_id'], chain=" <- ".join(leak['chain']))
+            except Exception as e:
+                logger.error("Failed to collect memory report", error=str(e))
+
+    def get_active_games(self, bot):
+        """GameManagementCogが保持している進行中のゲーム"""
+        game_cog = bot.get_cog("GameManagementCog")
+        return list(game_cog.games.values()) if game_cog else []
+
+    def collect(self, bot, limit=10):
+        """メモリレポートを作成"""
+        gc.collect()
+
+        active_games = self.get_active_games(bot)
+        active_ids = {id(game) for game in active_games}
+        active_players = sum(len(game.players) for game in active_games)
+
+        # 終了から猶予期間を過ぎても残っているゲームだけをリークとみなす
+        now = time.monotonic()
+        leaked_games = []
+        for game in live_objects("game"):
+            if id(game) in active_ids or getattr(game, "phase", None) != "finished":
+                continue
+            finished_at = getattr(game, "finished_at", None)
+            if finished_at is None or now - finished_at < self.grace:
+                continue
+            leaked_games.append({
+                "guild_id": getattr(game, "guild_id", None),
+                "phase": getattr(game, "phase", None),
+                "players": len(getattr(game, "players", {})),
+                "finished_ago": now - finished_at,
+                "chain": referrer_chain(game)
+            })
+
+        subsystems = {}
+        deltas = {}
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.statistics("filename"):
+                name = subsystem_of(stat.traceback[0].filename)
+                subsystems[name] = subsystems.get(name, 0) + stat.size
+            if self.last_snapshot is not None:
+                for stat in snapshot.compare_to(self.last_snapshot, "filename"):
+                    name = subsystem_of(stat.traceback[0].filename)
+                    deltas[name] = deltas.get(name, 0) + stat.size_diff
+            self.last_snapshot = snapshot
+
+        report = {
+            "live": live_counts(),
+            "active_games": len(active_games),
+            "active_players": active_players,
+            "leaked_games": leaked_games[:limit],
+            "leaked_count": len(leaked_games),
+            "subsystems": sorted(subsystems.items(), key=lambda item: item[1], reverse=True)[:limit],
+            "deltas": sorted(deltas.items(), key=lambda item: abs(item[1]), reverse=True)[:limit],
+            "traced": tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        }
+        self.last_report = report
+        return report
+
+
+# グローバルなメモリトラッカー
+_tracker = MemoryTracker()
+
+
+def get_memory_tracker():
+    """グローバルなメモリトラッカーを取得"""
+    return _tracker
@@ -1,150 +1,197 @@
 """
 メッセージフィルタリングモジュール
-Discord.pyのメッセージ送信処理を上書きして、特定のエラーメッセージを非表示にする
+送信パイプラインのステージとして、特定のエラーメッセージと重複メッセージを非表示にする
 """
-import discord
-import functools
 import re
-import asyncio
 
-# エラーメッセージのパターン
+from utils import json_codec
+from utils.middleware import Stage, OUTBOUND, get_pipeline
+from utils.logger import get_logger
+from utils.ttl_store import TTLStore
+
+logger = get_logger("message_filter")
+
+# 例外の内容がそのまま送られたメッセージのパターン（本文・Embed説明文に適用）
+# 通常の文章や、Botが意図して送る「…エラーが発生しました」などの案内は対象にしない
 ERROR_PATTERNS = [
-    r"エラーが発生しました",
-    r"coroutine.*object.*no attribute",
+    r"Traceback \(most recent call last\)",
     r"Command raised an exception",
-    r"AttributeError",
-    r"'coroutine'.*object.*has no attribute.*'get'"
+    r"'coroutine' object has no attribute",
+    r"coroutine '[^']*' was never awaited",
+    r"\b[A-Z]\w*(?:Error|Exception): ",
+]
+
+# メッセージ系のルート（これ以外のルートはフィルタを通らない）
+MESSAGE_ROUTES = [
+    "POST /channels/{channel_id}/messages",
+    "PATCH /channels/{channel_id}/messages/{message_id}",
+]
+CREATE_MESSAGE_ROUTES = [
+    "POST /channels/{channel_id}/messages",
+]
+# ブロックしたメッセージへの後続操作（編集・削除）
+FOLLOWUP_ROUTES = [
+    "PATCH /channels/{channel_id}/messages/{message_id}",
+    "DELETE /channels/{channel_id}/messages/{message_id}",
 ]
 
-# コンパイル済みパターン
-COMPILED_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in ERROR_PATTERNS]
+# ブロックした送信の代わりに返すメッセージのID
+# send() の戻り値は通常どおりMessageになるが、このIDのメッセージは実在しない。
+# 後から edit() / delete() された場合は block_followup_stage がAPIに送らずに処理する
+BLOCKED_MESSAGE_ID = "0"
 
-# 元のメソッドを保存
-ORIGINAL_HTTP_REQUEST = None
+# 重複送信として扱う時間（秒）と保持する最大件数
+# 二重送信だけを防ぐため短くする（次のゲームの同じ告知や、繰り返したヘルプは通す）
+DUPLICATE_WINDOW = 5.0
+RECENT_MESSAGE_LIMIT = 100
+
+# コンパイル済みの結合パターン
+ERROR_REGEX = re.compile("|".join(f"(?:{pattern})" for pattern in ERROR_PATTERNS))
 
 # フックが既に適用されているかどうかのフラグ
 _hooks_applied = False
 
+# 直近に送信したメッセージのハッシュ
+_recent_messages = TTLStore(ttl=DUPLICATE_WINDOW, max_entries=RECENT_MESSAGE_LIMIT, bucket_seconds=0.5)
+
+
+def matches_error(text):
+    """テキストが例外メッセージのパターンに一致するか判定"""
+    if not text or not isinstance(text, str):
+        return False
+    return ERROR_REGEX.search(text) is not None
+
+
 def is_error_message(data):
     """データがエラーメッセージかどうかを判定"""
-    # Embedメッセージのチェック
-    if isinstance(data, dict):
-        # contentフィールドをチェック
-        if 'content' in data and data['content'] and isinstance(data['content'], str):
-            content = data['content']
-            for pattern in COMPILED_PATTERNS:
-                if pattern.search(content):
-                    return True
-        
-        # embedsフィールドをチェック
-        if 'embeds' in data and data['embeds']:
-            for embed in data['embeds']:
-                # タイトルチェック
-                if 'title' in embed and isinstance(embed['title'], str) and "エラー" in embed['title']:
-                    return True
-                
-                # 説明文チェック
-                if 'description' in embed and isinstance(embed['description'], str):
-                    for pattern in COMPILED_PATTERNS:
-                        if pattern.search(embed['description']):
-                            return True
-    
+    if not isinstance(data, dict):
+        return False
+
+    # contentフィールドをチェック
+    if matches_error(data.get('content')):
+        return True
+
+    # embedsの説明文をチェック
+    return any(matches_error(embed.get('description')) for embed in data.get('embeds') or [])
+
+
+def get_message_data(kwargs):
+    """リクエスト引数からメッセージのJSONデータを取得"""
+    data = kwargs.get('json')
+    if data is None:
+        # 添付ファイル付きの場合は payload_json に入っている
+        for part in kwargs.get('form') or []:
+            if part.get('name') == 'payload_json':
+                try:
+                    data = json_codec.loads(part.get('value') or "{}")
+                except ValueError:
+                    data = None
+                break
+    return data if isinstance(data, dict) else {}
+
+
+def create_fake_message(channel_id):
+    """送信をブロックした際に返す代替メッセージデータを作成（IDは BLOCKED_MESSAGE_ID）"""
+    return {
+        'id': BLOCKED_MESSAGE_ID,
+        'channel_id': str(channel_id or 0),
+        'author': {'id': '0', 'username': 'System', 'discriminator': '0000', 'avatar': None, 'bot': True},
+        'content': '',
+        'timestamp': '2023-01-01T00:00:00.000000+00:00',
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [],
+        'components': [],
+        'pinned': False,
+        'type': 0
+    }
+
+
+def error_filter_stage(payload):
+    """エラーメッセージの送信をブロックするステージ"""
+    data = get_message_data(payload["kwargs"])
+    if not is_error_message(data):
+        return True
+
+    logger.info("Blocked error message", channel=getattr(payload["route"], 'channel_id', None),
+                content=str(data.get('content'))[:100])
+    payload["response"] = create_fake_message(getattr(payload["route"], 'channel_id', None))
     return False
 
-async def filtered_http_request(original_func, *args, **kwargs):
-    """HTTP リクエストをフィルタリングする関数"""
-    self = args[0]  # HTTPClient インスタンス
-    route = args[1]  # Route オブジェクト
-    
-    # Create Message エンドポイントに対する処理を特別扱い
-    if route.method == "POST" and "channels/" in route.url and "/messages" in route.url:
-        # メッセージデータを取得
-        data = kwargs.get('json', {})
-        
-        # データがエラーメッセージかどうかをチェック
-        if is_error_message(data):
-            print(f"[MESSAGE_FILTER] Blocked error message: {data}")
-            
-            # エラーメッセージの場合は、成功したフェイクレスポンスを返す
-            fake_message = {
-                'id': '0',
-                'channel_id': route.url.split('channels/')[1].split('/')[0],
-                'author': {'id': '0', 'username': 'System'},
-                'content': '',
-                'timestamp': '2023-01-01T00:00:00.000000+00:00',
-                'tts': False,
-                'mention_everyone': False,
-                'mentions': [],
-                'mention_roles': [],
-                'attachments': [],
-                'embeds': [],
-                'pinned': False,
-                'type': 0
-            }
-            
-            # 偽のレスポンスオブジェクトを返す
-            return discord.http.HTTPResponse(
-                response=type('obj', (object,), {'status': 200, 'headers': {}}),
-                data=fake_message
-            )
-    
-    # 通常のリクエスト処理を継続
-    return await original_func(*args, **kwargs)
+
+def is_blocked_message_route(route):
+    """ブロックした代替メッセージ（実在しないID）への操作かどうか"""
+    url = str(getattr(route, 'url', '') or '').rstrip('/')
+    return url.endswith(f"/messages/{BLOCKED_MESSAGE_ID}")
+
+
+def block_followup_stage(payload):
+    """ブロックしたメッセージへの編集・削除をAPIに送らずに済ませるステージ"""
+    route = payload["route"]
+    if not is_blocked_message_route(route):
+        return True
+    # 削除のレスポンスは本来も空、編集は代替メッセージを返す
+    if route.method == "PATCH":
+        payload["response"] = create_fake_message(getattr(route, 'channel_id', None))
+    return False
+
+
+def duplicate_filter_stage(payload):
+    """DUPLICATE_WINDOW 秒以内の同一内容のメッセージ送信をブロックするステージ"""
+    data = get_message_data(payload["kwargs"])
+    channel_id = getattr(payload["route"], 'channel_id', None)
+    msg_hash = hash((channel_id, data.get('content'), repr(data.get('embeds'))))
+
+    if msg_hash in _recent_messages:
+        logger.debug("Deduplicated message", channel=channel_id, content=str(data.get('content'))[:50])
+        payload["response"] = create_fake_message(channel_id)
+        return False
+
+    # 期限は最初の送信から数える（重複の度に延長しない）
+    _recent_messages.add(msg_hash)
+    return True
+
 
 def apply_message_filter():
-    """メッセージフィルタリングを適用"""
-    global _hooks_applied, ORIGINAL_HTTP_REQUEST
-    
+    """メッセージフィルタリングを送信パイプラインに登録"""
+    global _hooks_applied
+
     # 既に適用済みならスキップ
     if _hooks_applied:
         return True
-    
+
     try:
-        # Discordのメッセージ送信をフィルタリング
-        original_send = discord.abc.Messageable.send
-        
-        async def filtered_send(self, content=None, **kwargs):
-            # エラーメッセージをフィルタリング
-            if content and isinstance(content, str):
-                for pattern in COMPILED_PATTERNS:
-                    if pattern.search(content):
-                        print(f"[MESSAGE_FILTER] Blocked error message: {content}")
-                        return None  # 何も送信しない
-            
-            # Embedをフィルタリング
-            if 'embed' in kwargs and kwargs['embed']:
-                embed = kwargs['embed']
-                if hasattr(embed, 'title') and embed.title:
-                    if "エラー" in embed.title:
-                        print(f"[MESSAGE_FILTER] Blocked error embed: {embed.title}")
-                        return None
-            
-            # 通常のメッセージは送信
-            return await original_send(self, content, **kwargs)
-        
-        # モンキーパッチを適用
-        discord.abc.Messageable.send = filtered_send
-        
-        print("[MESSAGE_FILTER] Successfully applied message filtering")
+        pipeline = get_pipeline()
+        pipeline.add_stage(Stage("blocked_followup", OUTBOUND, block_followup_stage,
+                                 routes=FOLLOWUP_ROUTES, order=5))
+        pipeline.add_stage(Stage("error_filter", OUTBOUND, error_filter_stage,
+                                 routes=MESSAGE_ROUTES, order=10))
+        pipeline.add_stage(Stage("duplicate_filter", OUTBOUND, duplicate_filter_stage,
+                                 routes=CREATE_MESSAGE_ROUTES, order=20))
+
+        logger.info("Successfully applied message filtering")
         _hooks_applied = True
         return True
-    except Exception as e:
-        print(f"[MESSAGE_FILTER] Failed to apply message filtering: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Failed to apply message filtering")
         return False
 
+
 def reset_message_filter():
     """フィルタリングをリセット"""
     global _hooks_applied
-    
-    if not _hooks_applied or ORIGINAL_HTTP_REQUEST is None:
+
+    if not _hooks_applied:
         return
-    
-    try:
-        # 元のメソッドに戻す
-        discord.http.HTTPClient.request = ORIGINAL_HTTP_REQUEST
-        _hooks_applied = False
-        print("[MESSAGE_FILTER] Message filtering removed")
-    except Exception as e:
-        print(f"[MESSAGE_FILTER] Failed to remove message filtering: {e}")
+
+    pipeline = get_pipeline()
+    pipeline.remove_stage("blocked_followup")
+    pipeline.remove_stage("error_filter")
+    pipeline.remove_stage("duplicate_filter")
+    _recent_messages.clear()
+    _hooks_applied = False
+    logger.info("Message filtering removed")
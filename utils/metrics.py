@@ -0,0 +1,398 @@
+"""
+メトリクスモジュール
+Prometheusテキスト形式のメトリクスをローカルHTTPエンドポイントで公開する
+
+カウンタはイベントループ上で単純な加算のみを行うため、ロックなしで本番環境でも常時有効にできる
+"""
+import asyncio
+import bisect
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from discord.ext import commands
+from utils.logger import get_logger
+
+logger = get_logger("metrics")
+
+# 公開先（ローカルのみ）
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# レイテンシ用のデフォルトバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# URLのスノーフレークIDやトークンをまとめるためのパターン
+_ID_PATTERN = re.compile(r"/\d{15,}")
+_TOKEN_PATTERN = re.compile(r"(/(?:webhooks|interactions)/\{id\})/[^/]+")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """単調増加カウンタ"""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        """加算"""
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, _format_labels(self.label_names, label_values), value
+
+
+class Gauge(Counter):
+    """任意の値を取るゲージ"""
+
+    type_name = "gauge"
+
+    def set(self, *label_values, value=0):
+        """値を設定"""
+        self.values[label_values] = value
+
+    def replace(self, values):
+        """全ラベルの値をまとめて置き換え"""
+        self.values = dict(values)
+
+
+class Histogram:
+    """固定バケットのヒストグラム"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # {label_values: [bucket_counts..., sum, count]}
+        self.values = {}
+
+    def observe(self, value, *label_values):
+        """値を記録"""
+        state = self.values.get(label_values)
+        if state is None:
+            state = [0] * (len(self.buckets) + 2)
+            self.values[label_values] = state
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """ブロックの実行時間を記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        for label_values, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            yield f"{self.name}_bucket", labels, state[-1]
+            labels = _format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+
+class MetricsRegistry:
+    """メトリクスの登録とテキスト出力"""
+
+    def __init__(self):
+        self.metrics = {}
+        # スクレイプ時に呼ばれる収集関数
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector):
+        """スクレイプ時に値を更新する関数を登録"""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def render(self):
+        """Prometheusテキスト形式で出力"""
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error("Collector failed", error=str(e))
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# グローバルなレジストリ
+registry = MetricsRegistry()
+
+# コマンド
+command_latency = registry.histogram(
+    "jinro_command_latency_seconds", "コマンドの実行時間", ("command",))
+command_errors = registry.counter(
+    "jinro_command_errors_total", "エラーで終了したコマンド数", ("command",))
+
+# イベントループ
+event_loop_lag = registry.gauge(
+    "jinro_event_loop_lag_seconds", "直近のイベントループ遅延")
+event_loop_lag_histogram = registry.histogram(
+    "jinro_event_loop_lag_histogram_seconds", "イベントループ遅延の分布",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+
+# ゲーム
+active_games = registry.gauge(
+    "jinro_active_games", "フェーズごとの進行中ゲーム数", ("phase",))
+players_in_games = registry.gauge(
+    "jinro_players_in_games", "ゲームに参加中のプレイヤー数", ("state",))
+
+# 起動
+startup_stage_seconds = registry.gauge(
+    "jinro_startup_stage_seconds", "起動処理の段階ごとの所要時間", ("stage",))
+
+# ゲームアクター
+game_events = registry.counter(
+    "jinro_game_events_total", "ゲームアクターが受け取ったイベント数", ("kind", "result"))
+game_event_duration = registry.histogram(
+    "jinro_game_event_duration_seconds", "ゲームアクターのイベント処理時間", ("kind",))
+game_event_queue_depth = registry.gauge(
+    "jinro_game_event_queue_depth", "ゲームアクターのキューに残っているイベント数の合計")
+
+# DM
+dm_sends = registry.counter(
+    "jinro_dm_sends_total", "DM送信の結果", ("result",))
+
+# Discord HTTP
+http_requests = registry.counter(
+    "jinro_discord_http_requests_total", "Discord HTTP APIの呼び出し数", ("method", "route", "status"))
+http_rate_limited = registry.counter(
+    "jinro_discord_http_429_total", "レート制限（429）を受けた回数", ("method", "route"))
+http_retry_after = registry.counter(
+    "jinro_discord_http_retry_after_seconds_total", "429で指示された待機時間の合計", ("method", "route"))
+
+# JSONストア
+json_store_duration = registry.histogram(
+    "jinro_json_store_duration_seconds", "JSONファイルの読み書き時間", ("operation", "store"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
+
+# タイマー
+timer_backlog = registry.gauge(
+    "jinro_timer_backlog", "動作中のフェーズタイマー数")
+timer_backlog_seconds = registry.gauge(
+    "jinro_timer_backlog_seconds", "動作中のフェーズタイマーの残り秒数の合計")
+pending_tasks = registry.gauge(
+    "jinro_asyncio_pending_tasks", "未完了のasyncioタスク数")
+
+loop_stalls = registry.gauge(
+    "jinro_event_loop_stalls", "ウォッチドッグが検出したイベントループ停止回数")
+loop_stall_seconds = registry.gauge(
+    "jinro_event_loop_stall_seconds", "ウォッチドッグが検出した停止時間の合計")
+
+# メモリ
+live_objects = registry.gauge(
+    "jinro_live_objects", "生存しているGame/Player/Viewの数", ("kind",))
+leaked_games = registry.gauge(
+    "jinro_leaked_games", "直近のメモリ計測で検出された終了済みなのに残っているゲーム数")
+
+# ミドルウェア
+pipeline_stage_calls = registry.gauge(
+    "jinro_pipeline_stage_calls", "ミドルウェアステージの実行回数", ("direction", "stage"))
+pipeline_stage_dropped = registry.gauge(
+    "jinro_pipeline_stage_dropped", "ミドルウェアステージが中断した回数", ("direction", "stage"))
+pipeline_stage_seconds = registry.gauge(
+    "jinro_pipeline_stage_seconds", "ミドルウェアステージの累計実行時間", ("direction", "stage"))
+
+# ロギング
+log_queue_depth = registry.gauge(
+    "jinro_log_queue_depth", "出力スレッドへの書き込み待ちのログレコード数")
+log_records_suppressed = registry.gauge(
+    "jinro_log_records_suppressed", "間引きで出力しなかったログレコード数の累計")
+
+
+def observe_json(operation, store):
+    """JSONストアの読み書き時間を計測するコンテキストマネージャ"""
+    return json_store_duration.time(operation, store)
+
+
+def record_dm(success):
+    """DM送信の成否を記録"""
+    dm_sends.inc("success" if success else "failure")
+
+
+def normalize_route(path):
+    """URLパスからIDを除いたルート名を作成"""
+    path = path.split("/api/v", 1)[-1]
+    path = path.split("/", 1)[-1] if path[:1].isdigit() else path
+    path = _ID_PATTERN.sub("/{id}", "/" + path.lstrip("/"))
+    return _TOKEN_PATTERN.sub(r"\1/{token}", path)
+
+
+def create_trace_config():
+    """Discord HTTPの呼び出しを記録するaiohttpのTraceConfigを作成"""
+    import aiohttp
+
+    async def on_request_end(session, context, params):
+        route = normalize_route(params.url.path)
+        status = params.response.status
+        http_requests.inc(params.method, route, str(status))
+        if status == 429:
+            http_rate_limited.inc(params.method, route)
+            headers = params.response.headers
+            retry_after = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+            try:
+                http_retry_after.inc(params.method, route, amount=float(retry_after))
+            except (TypeError, ValueError):
+                pass
+
+    async def on_request_exception(session, context, params):
+        http_requests.inc(params.method, normalize_route(params.url.path), "exception")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class MetricsCog(commands.Cog):
+    """メトリクスのHTTPエンドポイントとイベントループ遅延計測を管理するコグ"""
+
+    def __init__(self, bot, host=METRICS_HOST, port=METRICS_PORT, lag_interval=1.0):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.lag_interval = lag_interval
+        self.runner = None
+        self.lag_task = None
+        registry.add_collector(self.collect)
+
+    async def cog_load(self):
+        """HTTPサーバーと遅延計測を開始"""
+        self.lag_task = asyncio.create_task(self._measure_loop_lag())
+        try:
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get("/metrics", self.handle_metrics)
+            self.runner = web.AppRunner(app)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.host, self.port).start()
+            logger.info("Serving metrics", url=f"http://{self.host}:{self.port}/metrics")
+        except Exception as e:
+            logger.error("Failed to start metrics server", error=str(e))
+            self.runner = None
+
+    async def cog_unload(self):
+        """HTTPサーバーと遅延計測を停止"""
+        if self.lag_task:
+            self.lag_task.cancel()
+        if self.runner:
+            await self.runner.cleanup()
+        registry.collectors = [c for c in registry.collectors if c != self.collect]
+
+    async def handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def _measure_loop_lag(self):
+        """一定間隔でsleepし、予定時刻からの遅れを記録"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - start - self.lag_interval)
+            event_loop_lag.set(value=lag)
+            event_loop_lag_histogram.observe(lag)
+
+    def collect(self):
+        """スクレイプ時にゲームとタイマーの状態を集計"""
+        phases = {}
+        players = {"alive": 0, "dead": 0}
+        timers = 0
+        timer_seconds = 0
+        queued_events = 0
+
+        game_cog = self.bot.get_cog("GameManagementCog")
+        for game in (game_cog.games.values() if game_cog else []):
+            phases[(game.phase,)] = phases.get((game.phase,), 0) + 1
+            for player in game.players.values():
+                players["alive" if player.is_alive else "dead"] += 1
+            if getattr(game, "remaining_time", 0) > 0:
+                timers += 1
+                timer_seconds += game.remaining_time
+            actor = getattr(game, "actor", None)
+            if actor:
+                queued_events += actor.queue.qsize()
+
+        active_games.replace(phases)
+        players_in_games.replace({(state,): count for state, count in players.items()})
+        timer_backlog.set(value=timers)
+        timer_backlog_seconds.set(value=timer_seconds)
+        game_event_queue_depth.set(value=queued_events)
+        pending_tasks.set(value=len([t for t in asyncio.all_tasks() if not t.done()]))
+
+        from utils.watchdog import get_watchdog
+        watchdog = get_watchdog()
+        loop_stalls.set(value=watchdog.stall_count)
+        loop_stall_seconds.set(value=watchdog.total_stall_time)
+
+        from utils.memory_tracker import get_memory_tracker, live_counts
+        live_objects.replace({(kind,): count for kind, count in live_counts().items()})
+        last_report = get_memory_tracker().last_report
+        if last_report:
+            leaked_games.set(value=last_report["leaked_count"])
+
+        from utils.middleware import get_pipeline
+        for stats in get_pipeline().get_stats():
+            labels = (stats["direction"], stats["name"])
+            pipeline_stage_calls.set(*labels, value=stats["calls"])
+            pipeline_stage_dropped.set(*labels, value=stats["dropped"])
+            pipeline_stage_seconds.set(*labels, value=stats["total_ms"] / 1000)
+
+        from utils.logger import get_logging_stats
+        logging_stats = get_logging_stats()
+        log_queue_depth.set(value=logging_stats["queued"])
+        log_records_suppressed.set(value=logging_stats["suppressed"])
+
+
+async def setup(bot):
+    await bot.add_cog(MetricsCog(bot))
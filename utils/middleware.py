@@ -0,0 +1,254 @@
+"""
+ミドルウェアパイプラインモジュール
+受信コマンドと送信メッセージを単一の順序付きステージチェーンで処理する
+"""
+import time
+import threading
+
+from utils.logger import get_logger
+
+logger = get_logger("middleware")
+
+# パイプラインの方向
+INBOUND = "inbound"
+OUTBOUND = "outbound"
+
+
+class Stage:
+    """パイプラインの1ステージ"""
+
+    def __init__(self, name, direction, process, routes=None, order=100, finish=None):
+        """
+        Parameters:
+        -----------
+        name: str
+            ステージ名（計測値の表示に使用）
+        direction: str
+            INBOUND または OUTBOUND
+        process: callable
+            process(payload) -> bool。Falseを返すと以降の処理を中断する
+        routes: iterable or None
+            適用するルートキーの集合。Noneの場合は全ルートに適用
+        order: int
+            実行順（小さいほど先に実行）
+        finish: callable or None
+            finish(payload)。後続処理の完了後に逆順で呼ばれる
+        """
+        self.name = name
+        self.direction = direction
+        self.process = process
+        self.routes = frozenset(routes) if routes is not None else None
+        self.order = order
+        self.finish = finish
+
+        # 計測値
+        self.calls = 0
+        self.dropped = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def applies_to(self, route_key):
+        """指定ルートに適用されるか"""
+        return self.routes is None or route_key in self.routes
+
+    def record(self, elapsed_ns, passed):
+        """実行時間を記録"""
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if not passed:
+            self.dropped += 1
+
+    def get_stats(self):
+        """計測値を辞書で取得"""
+        return {
+            "name": self.name,
+            "direction": self.direction,
+            "calls": self.calls,
+            "dropped": self.dropped,
+            "total_ms": self.total_ns / 1_000_000,
+            "avg_us": (self.total_ns / self.calls / 1000) if self.calls else 0.0,
+            "max_us": self.max_ns / 1000
+        }
+
+
+class MiddlewarePipeline:
+    """受信・送信の順序付きミドルウェアチェーン"""
+
+    def __init__(self):
+        self.stages = {INBOUND: [], OUTBOUND: []}
+        # ルートキーごとのステージ列キャッシュ {(direction, route_key): [Stage]}
+        self._chains = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage):
+        """ステージを追加（同名のステージは置き換え）"""
+        with self._lock:
+            stages = [s for s in self.stages[stage.direction] if s.name != stage.name]
+            stages.append(stage)
+            stages.sort(key=lambda s: s.order)
+            self.stages[stage.direction] = stages
+            self._chains = {}
+        return stage
+
+    def remove_stage(self, name):
+        """ステージを名前で削除"""
+        removed = False
+        with self._lock:
+            for direction, stages in self.stages.items():
+                remaining = [s for s in stages if s.name != name]
+                if len(remaining) != len(stages):
+                    self.stages[direction] = remaining
+                    removed = True
+            self._chains = {}
+        return removed
+
+    def get_stage(self, name):
+        """ステージを名前で取得"""
+        for stages in self.stages.values():
+            for stage in stages:
+                if stage.name == name:
+                    return stage
+        return None
+
+    def chain_for(self, direction, route_key):
+        """ルートに適用されるステージ列を取得（キャッシュ付き）"""
+        cache_key = (direction, route_key)
+        chain = self._chains.get(cache_key)
+        if chain is None:
+            chain = [s for s in self.stages[direction] if s.applies_to(route_key)]
+            self._chains[cache_key] = chain
+        return chain
+
+    def run(self, direction, route_key, payload):
+        """
+        ステージを順に実行
+
+        Returns:
+        --------
+        list or None
+            実行したステージ列（finishに渡す）。中断された場合はNone
+        """
+        chain = self.chain_for(direction, route_key)
+        if not chain:
+            return chain
+
+        executed = []
+        for stage in chain:
+            start = time.perf_counter_ns()
+            try:
+                passed = stage.process(payload) is not False
+            except Exception as e:
+                logger.error("Stage failed", stage=stage.name, error=str(e))
+                passed = True
+            stage.record(time.perf_counter_ns() - start, passed)
+
+            if not passed:
+                self.finish(executed, payload)
+                return None
+            executed.append(stage)
+
+        return executed
+
+    def finish(self, executed, payload):
+        """実行済みステージの後処理を逆順に呼ぶ"""
+        for stage in reversed(executed or ()):
+            if stage.finish is None:
+                continue
+            try:
+                stage.finish(payload)
+            except Exception as e:
+                logger.error("Stage finish failed", stage=stage.name, error=str(e))
+
+    def get_stats(self):
+        """全ステージの計測値を取得"""
+        return [stage.get_stats() for direction in (INBOUND, OUTBOUND) for stage in self.stages[direction]]
+
+    def format_stats(self):
+        """計測値をテキストで取得"""
+        lines = []
+        for stats in self.get_stats():
+            lines.append(
+                f"{stats['direction']:<8} {stats['name']:<20} calls={stats['calls']} "
+                f"dropped={stats['dropped']} avg={stats['avg_us']:.1f}us max={stats['max_us']:.1f}us"
+            )
+        return "\n".join(lines) or "ステージが登録されていません"
+
+    def reset_stats(self):
+        """計測値をリセット"""
+        for stages in self.stages.values():
+            for stage in stages:
+                stage.calls = 0
+                stage.dropped = 0
+                stage.total_ns = 0
+                stage.max_ns = 0
+
+
+# グローバルなパイプラインインスタンス
+_pipeline = MiddlewarePipeline()
+
+# パッチ前のHTTPClient.request
+ORIGINAL_HTTP_REQUEST = None
+
+
+def get_pipeline():
+    """グローバルなパイプラインを取得"""
+    return _pipeline
+
+
+def route_key(route):
+    """discord.http.Routeからルートキーを作成（例: "POST /channels/{channel_id}/messages"）"""
+    return f"{route.method} {route.path}"
+
+
+def install_pipeline():
+    """HTTPClient.requestに送信パイプラインを一度だけ組み込む"""
+    global ORIGINAL_HTTP_REQUEST
+
+    if ORIGINAL_HTTP_REQUEST is not None:
+        return True
+
+    try:
+        import discord
+
+        original_request = discord.http.HTTPClient.request
+
+        async def pipeline_request(self, route, **kwargs):
+            key = route_key(route)
+            chain = _pipeline.chain_for(OUTBOUND, key)
+            if not chain:
+                # メッセージ以外のルートは素通り
+                return await original_request(self, route, **kwargs)
+
+            payload = {"route": route, "key": key, "kwargs": kwargs, "response": None}
+            executed = _pipeline.run(OUTBOUND, key, payload)
+            if executed is None:
+                # ステージが送信を中断した場合は代替レスポンスを返す
+                return payload["response"]
+
+            try:
+                return await original_request(self, route, **kwargs)
+            finally:
+                _pipeline.finish(executed, payload)
+
+        discord.http.HTTPClient.request = pipeline_request
+        ORIGINAL_HTTP_REQUEST = original_request
+        logger.info("Successfully installed middleware pipeline")
+        return True
+    except Exception:
+        logger.exception("Failed to install middleware pipeline")
+        return False
+
+
+def uninstall_pipeline():
+    """パイプラインを取り外す"""
+    global ORIGINAL_HTTP_REQUEST
+
+    if ORIGINAL_HTTP_REQUEST is None:
+        return
+
+    import discord
+    discord.http.HTTPClient.request = ORIGINAL_HTTP_REQUEST
+    ORIGINAL_HTTP_REQUEST = None
+    logger.info("Middleware pipeline removed")
@@ -0,0 +1,158 @@
+"""
+コマンドプロファイラモジュール
+指定したコマンドの実行をcProfileで計測し、コマンドごとにpstatsとして集計する
+"""
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import random
+
+from utils.config import GameConfig
+
+# pstatsファイルの出力先
+PROFILE_DIR = os.path.join(GameConfig.LOG_DIR, "profiles")
+
+
+class _ProfiledCoroutine:
+    """コルーチンの各ステップ実行中だけプロファイラを有効にするラッパー
+
+    awaitで中断している間は無効になるため、同時に動く他のタスクの処理は計測に混ざらない
+    """
+
+    def __init__(self, coro, profile):
+        self.coro = coro
+        self.profile = profile
+
+    def __await__(self):
+        value = None
+        error = None
+        while True:
+            self.profile.enable()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as e:
+                return e.value
+            finally:
+                self.profile.disable()
+
+            try:
+                value = yield yielded
+                error = None
+            except BaseException as e:
+                value = None
+                error = e
+
+
+class CommandProfiler:
+    """コマンド実行のサンプリングプロファイラ"""
+
+    def __init__(self):
+        self.active = False
+        self.target = "all"
+        self.sample_rate = 1.0
+        self.started_at = None
+        # {command: pstats.Stats}
+        self.stats = {}
+        # {command: 計測回数}
+        self.counts = {}
+
+    def start(self, target="all", sample_rate=1.0):
+        """計測を開始"""
+        self.active = True
+        self.target = target or "all"
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.started_at = datetime.datetime.now()
+        self.stats = {}
+        self.counts = {}
+
+    def should_profile(self, command_name):
+        """この実行を計測するか判定"""
+        if not self.active or command_name is None:
+            return False
+        # サブコマンドは親コマンド名の指定でも計測する（例: "stats" で "stats leaderboard"）
+        if self.target != "all" and command_name != self.target and not command_name.startswith(self.target + " "):
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    async def run(self, command_name, coro):
+        """コルーチンを計測しながら実行"""
+        profile = cProfile.Profile()
+        try:
+            return await _ProfiledCoroutine(coro, profile)
+        finally:
+            self._add(command_name, profile)
+
+    def _add(self, command_name, profile):
+        """計測結果をコマンドごとに集計"""
+        try:
+            if command_name in self.stats:
+                self.stats[command_name].add(profile)
+            else:
+                self.stats[command_name] = pstats.Stats(profile)
+            self.counts[command_name] = self.counts.get(command_name, 0) + 1
+        except TypeError:
+            # 何も計測されなかった場合
+            pass
+
+    def stop(self, limit=15):
+        """
+        計測を停止して結果を書き出す
+
+        Returns:
+        --------
+        list
+            [{"command", "count", "path", "summary", "summary_path"}] のリスト
+        """
+        self.active = False
+        if not self.stats:
+            return []
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        timestamp = self.started_at.strftime("%Y%m%d_%H%M%S")
+
+        results = []
+        for command_name, stats in self.stats.items():
+            base_name = f"{timestamp}_{command_name.replace(' ', '_')}"
+            path = os.path.join(PROFILE_DIR, f"{base_name}.pstats")
+            stats.dump_stats(path)
+
+            summary = self.summarize(stats, limit)
+            summary_path = os.path.join(PROFILE_DIR, f"{base_name}.txt")
+            with open(summary_path, "w", encoding="utf-8") as f:
+                f.write(summary)
+
+            results.append({
+                "command": command_name,
+                "count": self.counts.get(command_name, 0),
+                "path": path,
+                "summary": summary,
+                "summary_path": summary_path
+            })
+
+        results.sort(key=lambda r: r["count"], reverse=True)
+        self.stats = {}
+        self.counts = {}
+        return results
+
+    @staticmethod
+    def summarize(stats, limit=15):
+        """累積時間の上位関数をテキストで取得"""
+        stream = io.StringIO()
+        summary = pstats.Stats(stream=stream)
+        summary.add(stats)
+        summary.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+# グローバルなプロファイラインスタンス
+_profiler = CommandProfiler()
+
+
+def get_profiler():
+    """グローバルなプロファイラを取得"""
+    return _profiler
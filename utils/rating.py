@@ -0,0 +1,339 @@
+"""
+プレイヤーレーティングモジュール
+陣営ごと（村人・人狼・妖狐）のEloレーティングをゲーム終了時に更新し、ランキング用の索引を保持する
+
+複数陣営のEloとして、各陣営を「所属プレイヤーの該当陣営レーティングの平均」を持つ1人のプレイヤーとみなし、
+他の全陣営との1対1の結果（勝利陣営は勝ち、負けた陣営同士は引き分け）から増減を求める
+"""
+import bisect
+import os
+
+from utils import json_codec
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 陣営
+TEAMS = ("village", "wolf", "fox")
+_TEAM_INDEX = {team: i for i, team in enumerate(TEAMS)}
+
+# ゲームデータ中の陣営名・勝者名の表記ゆれ
+_TEAM_ALIASES = {
+    "village": "village", "villager": "village", "村人": "village", "村人陣営": "village",
+    "werewolf": "wolf", "wolf": "wolf", "人狼": "wolf", "人狼陣営": "wolf",
+    "fox": "fox", "妖狐": "fox", "妖狐陣営": "fox",
+}
+
+INITIAL_RATING = 1500.0
+DEFAULT_K = 24.0
+# Eloの尺度
+ELO_SCALE = 400.0
+
+
+def normalize_team(team):
+    """陣営名を village / wolf / fox に統一（不明な場合はNone）"""
+    if team is None:
+        return None
+    return _TEAM_ALIASES.get(str(team).lower(), _TEAM_ALIASES.get(str(team)))
+
+
+def _seats(game_data):
+    """ゲームデータから (プレイヤーID, 名前, 陣営) のリストを作成"""
+    seats = []
+    for player in game_data.get("players", []):
+        team = normalize_team(player.get("team"))
+        if team is not None:
+            seats.append((str(player["id"]), player.get("name", ""), team))
+    return seats
+
+
+def team_deltas(team_ratings, winner, k=DEFAULT_K):
+    """
+    陣営ごとのレーティング増減を計算
+
+    Parameters:
+    -----------
+    team_ratings : dict
+        {陣営: 陣営の平均レーティング}（参加している陣営のみ）
+    winner : str
+        勝利陣営
+
+    Returns:
+    --------
+    dict
+        {陣営: 増減}
+    """
+    teams = list(team_ratings)
+    if len(teams) < 2:
+        return {team: 0.0 for team in teams}
+
+    deltas = {}
+    for team in teams:
+        total = 0.0
+        for other in teams:
+            if other == team:
+                continue
+            expected = 1.0 / (1.0 + 10 ** ((team_ratings[other] - team_ratings[team]) / ELO_SCALE))
+            if team == winner:
+                actual = 1.0
+            elif other == winner:
+                actual = 0.0
+            else:
+                actual = 0.5
+            total += actual - expected
+        deltas[team] = k * total / (len(teams) - 1)
+    return deltas
+
+
+class RatingIndex:
+    """総合レーティングの降順索引（プレイヤーの更新は O(log n) の探索 + 挿入）"""
+
+    def __init__(self):
+        self._keys = []
+        self._current = {}
+
+    def update(self, player_id, rating):
+        old = self._current.get(player_id)
+        if old is not None:
+            position = bisect.bisect_left(self._keys, (-old, player_id))
+            if position < len(self._keys) and self._keys[position] == (-old, player_id):
+                del self._keys[position]
+        self._current[player_id] = rating
+        bisect.insort(self._keys, (-rating, player_id))
+
+    def top(self, limit=10, allowed=None):
+        """上位のプレイヤーを [(player_id, rating)] で取得（allowedで絞り込み）"""
+        result = []
+        for negative, player_id in self._keys:
+            if allowed is not None and player_id not in allowed:
+                continue
+            result.append((player_id, -negative))
+            if len(result) >= limit:
+                break
+        return result
+
+    def rank_of(self, player_id, allowed=None):
+        """順位を取得（1始まり、未登録ならNone）"""
+        if player_id not in self._current:
+            return None
+        rank = 0
+        for _, other in self._keys:
+            if allowed is not None and other not in allowed:
+                continue
+            rank += 1
+            if other == player_id:
+                return rank
+        return None
+
+    def clear(self):
+        self._keys = []
+        self._current = {}
+
+
+class RatingBook:
+    """プレイヤーごとの陣営別レーティング"""
+
+    def __init__(self, path="data/stats/ratings.json", k=DEFAULT_K, initial=INITIAL_RATING):
+        self.path = path
+        self.k = k
+        self.initial = initial
+        # {player_id: {"name", "ratings": {陣営: r}, "games": {陣営: n}}}
+        self.players = {}
+        self.index = RatingIndex()
+        self.load()
+
+    # =================== 永続化 ===================
+
+    def load(self):
+        try:
+            data = json_codec.load_file(self.path)
+        except (FileNotFoundError, json_codec.JSONDecodeError):
+            data = {}
+        self.players = data.get("players", {})
+        self._rebuild_index()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        json_codec.dump_file(tmp_path, {"k": self.k, "initial": self.initial, "players": self.players})
+        os.replace(tmp_path, self.path)
+
+    def _rebuild_index(self):
+        self.index.clear()
+        for player_id in self.players:
+            self.index.update(player_id, self.overall(player_id))
+
+    # =================== 参照 ===================
+
+    def _entry(self, player_id, name=""):
+        entry = self.players.get(player_id)
+        if entry is None:
+            entry = self.players[player_id] = {
+                "name": name,
+                "ratings": {team: self.initial for team in TEAMS},
+                "games": {team: 0 for team in TEAMS}
+            }
+        elif name:
+            entry["name"] = name
+        return entry
+
+    def overall(self, player_id):
+        """総合レーティング（陣営ごとのレーティングをプレイ回数で加重平均）"""
+        entry = self.players.get(player_id)
+        if entry is None:
+            return self.initial
+        games = sum(entry["games"].values())
+        if games == 0:
+            return self.initial
+        return sum(entry["ratings"][team] * entry["games"][team] for team in TEAMS) / games
+
+    def get(self, player_id):
+        """プレイヤーのレーティング情報"""
+        entry = self.players.get(str(player_id))
+        if entry is None:
+            return None
+        return {"name": entry["name"], "overall": self.overall(str(player_id)),
+                "ratings": dict(entry["ratings"]), "games": dict(entry["games"])}
+
+    # =================== 更新 ===================
+
+    def record_game(self, game_data):
+        """
+        1ゲーム分の結果でレーティングを更新（O(参加人数)）
+
+        Returns:
+        --------
+        dict
+            {player_id: 増減}
+        """
+        winner = normalize_team(game_data.get("winner"))
+        seats = _seats(game_data)
+        if winner is None or not seats:
+            return {}
+
+        totals = {}
+        counts = {}
+        for player_id, name, team in seats:
+            entry = self._entry(player_id, name)
+            totals[team] = totals.get(team, 0.0) + entry["ratings"][team]
+            counts[team] = counts.get(team, 0) + 1
+        team_ratings = {team: totals[team] / counts[team] for team in totals}
+        deltas = team_deltas(team_ratings, winner, self.k)
+
+        changes = {}
+        for player_id, _, team in seats:
+            entry = self.players[player_id]
+            entry["ratings"][team] += deltas[team]
+            entry["games"][team] += 1
+            changes[player_id] = deltas[team]
+            self.index.update(player_id, self.overall(player_id))
+        return changes
+
+    def recompute(self, games, k=None, initial=None):
+        """履歴全体からレーティングを再計算して置き換える"""
+        if k is not None:
+            self.k = k
+        if initial is not None:
+            self.initial = initial
+        player_ids, names, ratings, games_played = batch_recompute(games, [self.k], self.initial)
+        self.players = {}
+        for i, player_id in enumerate(player_ids):
+            self.players[player_id] = {
+                "name": names[i],
+                "ratings": {team: float(ratings[0][i][j]) for j, team in enumerate(TEAMS)},
+                "games": {team: int(games_played[i][j]) for j, team in enumerate(TEAMS)}
+            }
+        self._rebuild_index()
+
+
+def _encode_history(games):
+    """ゲーム履歴を (プレイヤー索引, 陣営索引) の配列と勝者の列に変換"""
+    player_index = {}
+    names = []
+    encoded = []
+    for game_data in games:
+        winner = normalize_team(game_data.get("winner"))
+        seats = _seats(game_data)
+        if winner is None or not seats:
+            continue
+        players = []
+        teams = []
+        for player_id, name, team in seats:
+            if player_id not in player_index:
+                player_index[player_id] = len(names)
+                names.append(name)
+            else:
+                names[player_index[player_id]] = name or names[player_index[player_id]]
+            players.append(player_index[player_id])
+            teams.append(_TEAM_INDEX[team])
+        encoded.append((players, teams, _TEAM_INDEX[winner]))
+    return list(player_index), names, encoded
+
+
+def batch_recompute(games, k_values=(DEFAULT_K,), initial=INITIAL_RATING):
+    """
+    ゲーム履歴（古い順）からレーティングを一括で再計算
+
+    複数のK値をまとめて計算できるため、パラメータ調整時の比較にも使える。
+    NumPyがある場合は (K値, プレイヤー, 陣営) の配列で全パラメータを同時に更新する
+
+    Returns:
+    --------
+    tuple
+        (player_ids, names, ratings[K値][プレイヤー][陣営], games_played[プレイヤー][陣営])
+    """
+    player_ids, names, encoded = _encode_history(games)
+    n_players = len(player_ids)
+    n_teams = len(TEAMS)
+
+    if not NUMPY_AVAILABLE:
+        # NumPyがない場合はK値ごとに逐次計算
+        ratings = [[[initial] * n_teams for _ in range(n_players)] for _ in k_values]
+        played = [[0] * n_teams for _ in range(n_players)]
+        for players, teams, winner in encoded:
+            for p, t in zip(players, teams):
+                played[p][t] += 1
+            for table, k in zip(ratings, k_values):
+                totals = {}
+                for p, t in zip(players, teams):
+                    totals.setdefault(TEAMS[t], []).append(table[p][t])
+                team_ratings = {team: sum(values) / len(values) for team, values in totals.items()}
+                deltas = team_deltas(team_ratings, TEAMS[winner], k)
+                for p, t in zip(players, teams):
+                    table[p][t] += deltas[TEAMS[t]]
+        return player_ids, names, ratings, played
+
+    k_array = np.asarray(k_values, dtype=np.float64)[:, None]
+    ratings = np.full((len(k_values), n_players, n_teams), initial, dtype=np.float64)
+    played = np.zeros((n_players, n_teams), dtype=np.int64)
+    team_ids = np.arange(n_teams)
+
+    for players, teams, winner in encoded:
+        players = np.asarray(players)
+        teams = np.asarray(teams)
+        np.add.at(played, (players, teams), 1)
+
+        # 陣営ごとの平均レーティング (K値, 陣営)
+        onehot = (teams[:, None] == team_ids[None, :]).astype(np.float64)
+        counts = onehot.sum(axis=0)
+        present = counts > 0
+        if present.sum() < 2:
+            continue
+        seat_ratings = ratings[:, players, teams]
+        means = (seat_ratings @ onehot) / np.where(present, counts, 1.0)
+
+        # 陣営同士の期待勝率と実際の結果 (K値, 陣営, 相手陣営)
+        expected = 1.0 / (1.0 + 10 ** ((means[:, None, :] - means[:, :, None]) / ELO_SCALE))
+        actual = np.full((n_teams, n_teams), 0.5)
+        actual[winner, :] = 1.0
+        actual[:, winner] = 0.0
+        mask = present[:, None] & present[None, :] & ~np.eye(n_teams, dtype=bool)
+        delta = k_array * ((actual - expected) * mask).sum(axis=2) / (present.sum() - 1)
+
+        ratings[:, players, teams] += delta[:, teams]
+
+    return player_ids, names, ratings.tolist(), played.tolist()
@@ -0,0 +1,192 @@
+"""
+起動処理モジュール
+setup_hook から1度だけ実行する起動パイプラインと、ゲームコマンドの受付を制御する準備完了ゲートを提供する
+
+拡張機能は依存関係の段ごとに読み込み、同じ段の（互いに依存しない）ものは並行して読み込む。
+on_ready は再接続のたびに呼ばれるため、ここでは読み込みを行わない
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+from utils import metrics
+from utils.logger import get_logger
+
+logger = get_logger("startup")
+
+Extension = namedtuple("Extension", ["name", "depends_on"])
+
+# 読み込む拡張機能と依存関係（依存先の読み込みに失敗した場合は読み込まない）
+EXTENSIONS = (
+    # 基本的なユーティリティ
+    Extension("utils.database_manager", ()),    # データベース管理
+    Extension("utils.role_balancer", ()),       # 役職バランサー
+    Extension("utils.metrics", ()),             # メトリクス
+    # コア機能
+    Extension("cogs.game_management", ()),                          # ゲーム管理
+    Extension("cogs.night_actions", ("cogs.game_management",)),     # 夜のアクション
+    Extension("cogs.day_actions", ("cogs.game_management",)),       # 昼のアクション
+    Extension("cogs.voting", ("cogs.game_management",)),            # 投票システム
+    # 管理系
+    Extension("cogs.admin", ("cogs.game_management",)),             # 管理者コマンド
+    # 統計情報とフィードバック
+    Extension("cogs.stats", ()),                                    # 統計情報
+    Extension("cogs.feedback", ()),                                 # フィードバック
+    # 追加機能
+    Extension("cogs.rules_manager", ("utils.database_manager",)),   # ルール管理
+    Extension("cogs.community", ()),                                # コミュニティ提案システム
+    Extension("cogs.balance", ("cogs.stats",)),                     # ゲームバランス調整システム
+    Extension("cogs.documentation", ()),                            # ドキュメント管理
+)
+
+# 準備完了ゲート
+GATE_EXTENSIONS = "extensions"  # 拡張機能の読み込みが完了した
+GATE_GATEWAY = "gateway"        # ゲートウェイに接続し、サーバー情報のキャッシュが揃った
+GATE_GAMES = "games"            # ゲームを開始できる（ゲーム系の拡張機能とゲートウェイの両方）
+
+# ゲームの進行に必要な拡張機能
+GAME_EXTENSIONS = ("cogs.game_management", "cogs.night_actions", "cogs.day_actions", "cogs.voting")
+# 準備完了前は受け付けないCog
+GAME_COGS = ("GameManagementCog", "NightActionsCog", "DayActionsCog", "VotingCog")
+
+
+def dependency_layers(extensions):
+    """
+    依存関係から読み込みの段を求める（各段の拡張機能は前の段にだけ依存する）
+
+    Raises:
+    -------
+    ValueError
+        依存先が存在しない、または循環している場合
+    """
+    names = {extension.name for extension in extensions}
+    remaining = {}
+    for extension in extensions:
+        missing = [name for name in extension.depends_on if name not in names]
+        if missing:
+            raise ValueError(f"{extension.name} depends on unknown extensions: {', '.join(missing)}")
+        remaining[extension.name] = set(extension.depends_on)
+
+    layers = []
+    done = set()
+    while remaining:
+        layer = [name for name, depends_on in remaining.items() if depends_on <= done]
+        if not layer:
+            raise ValueError(f"Circular extension dependencies: {', '.join(sorted(remaining))}")
+        layers.append(layer)
+        done.update(layer)
+        for name in layer:
+            del remaining[name]
+    return layers
+
+
+class StartupPipeline:
+    """起動パイプラインと準備完了ゲート"""
+
+    def __init__(self, bot, extensions=EXTENSIONS):
+        self.bot = bot
+        self.extensions = extensions
+        self.gates = {
+            GATE_EXTENSIONS: asyncio.Event(),
+            GATE_GATEWAY: asyncio.Event(),
+            GATE_GAMES: asyncio.Event(),
+        }
+        self.loaded = []
+        self.failed = {}  # {拡張機能名: 理由}
+        self.timings = {}  # {段階名: 秒}
+        self.started = False
+
+    # =================== 段階 ===================
+
+    async def stage(self, name, func, *args):
+        """段階を実行して所要時間を記録（同期関数も可）"""
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = elapsed
+            metrics.startup_stage_seconds.set(name, value=elapsed)
+            logger.info("Startup stage finished", stage=name, ms=round(elapsed * 1000))
+
+    async def _load(self, name, depends_on):
+        failed_dependencies = [dependency for dependency in depends_on if dependency in self.failed]
+        if failed_dependencies:
+            self.failed[name] = f"dependency failed: {', '.join(failed_dependencies)}"
+            logger.warning("Skipped extension", extension=name, reason=self.failed[name])
+            return
+        start = time.perf_counter()
+        try:
+            await self.bot.load_extension(name)
+            self.loaded.append(name)
+            logger.info("Loaded extension", extension=name, ms=round((time.perf_counter() - start) * 1000))
+        except Exception as e:
+            self.failed[name] = str(e)
+            logger.error("Failed to load extension", extension=name, error=str(e))
+
+    async def load_extensions(self):
+        """依存関係の段ごとに、同じ段の拡張機能を並行して読み込む"""
+        depends_on = {extension.name: extension.depends_on for extension in self.extensions}
+        for layer in dependency_layers(self.extensions):
+            await asyncio.gather(*(self._load(name, depends_on[name]) for name in layer))
+
+        self.mark_ready(GATE_EXTENSIONS)
+        if all(name in self.loaded for name in GAME_EXTENSIONS):
+            self._update_games_gate()
+        else:
+            logger.error("Game extensions failed to load; game commands stay disabled")
+
+    async def run(self, *stages):
+        """
+        起動パイプラインを実行（2回目以降の呼び出しは何もしない）
+
+        Parameters:
+        -----------
+        stages : tuple
+            拡張機能の読み込み後に実行する (段階名, 関数) の組
+        """
+        if self.started:
+            return False
+        self.started = True
+
+        total = time.perf_counter()
+        await self.stage("load_extensions", self.load_extensions)
+        for name, func in stages:
+            try:
+                await self.stage(name, func)
+            except Exception as e:
+                logger.error("Startup stage failed", stage=name, error=str(e))
+        self.timings["total"] = time.perf_counter() - total
+        logger.info("Startup finished", ms=round(self.timings["total"] * 1000),
+                    loaded=len(self.loaded), failed=len(self.failed))
+        return True
+
+    # =================== ゲート ===================
+
+    def mark_ready(self, gate):
+        """ゲートを開く（何度呼んでもよい）"""
+        if not self.gates[gate].is_set():
+            self.gates[gate].set()
+            logger.info("Gate opened", gate=gate)
+        if gate == GATE_GATEWAY:
+            self._update_games_gate()
+
+    def _update_games_gate(self):
+        loaded = all(name in self.loaded for name in GAME_EXTENSIONS)
+        if loaded and self.gates[GATE_GATEWAY].is_set() and not self.gates[GATE_GAMES].is_set():
+            self.gates[GATE_GAMES].set()
+            logger.info("Gate opened", gate=GATE_GAMES)
+
+    def is_ready(self, gate):
+        return self.gates[gate].is_set()
+
+    async def wait_ready(self, gate, timeout=None):
+        """ゲートが開くまで待つ（タイムアウトした場合はFalse）"""
+        try:
+            await asyncio.wait_for(self.gates[gate].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -1,9 +1,15 @@
 import os
-import json
 import datetime
+import threading
 from typing import Dict, Any, List, Optional, Tuple
 import discord
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
+from utils import metrics, game_archive, json_codec
+from utils.rating import RatingBook
+from utils.decayed_stats import DecayedStats
+from utils.logger import get_logger
+
+logger = get_logger("stats")
 
 class StatsManager:
     """
@@ -13,9 +19,28 @@ class StatsManager:
         self.stats_directory = "data/stats"
         self.player_stats_file = f"{self.stats_directory}/player_stats.json"
         self.server_stats_file = f"{self.stats_directory}/server_stats.json"
+        self.ratings_file = f"{self.stats_directory}/ratings.json"
+        self.decayed_stats_file = f"{self.stats_directory}/decayed_stats.json"
         self.ensure_stats_directory()
         self.ensure_stats_files()
         
+        # 陣営別レーティング（メモリ上に保持し、ゲームごとに差分更新）
+        with metrics.observe_json("read", "ratings"):
+            self.ratings = RatingBook(self.ratings_file)
+        
+        # 最近の傾向（指数減衰カウンタ）
+        with metrics.observe_json("read", "decayed_stats"):
+            self.recent = DecayedStats(self.decayed_stats_file)
+        
+        # 列指向のゲーム履歴（最初の分析時にゲームログから構築）
+        self.logs_directory = "data/logs"
+        self._history = None
+        # 構築中に記録されたゲーム（構築していないときはNone）
+        self._history_pending = None
+        # _history_lock は参照・追加の短い区間だけ、構築は _history_build_lock で1つに制限する
+        self._history_lock = threading.Lock()
+        self._history_build_lock = threading.Lock()
+        
         # matplotlibが利用可能かチェック
         self.matplotlib_available = False
         try:
@@ -25,7 +50,7 @@ class StatsManager:
             self.io = io
             self.matplotlib_available = True
         except ImportError:
-            print("matplotlib is not available. Charts will not be generated.")
+            logger.info("matplotlib is not available. Charts will not be generated.")
     
     def ensure_stats_directory(self):
         """統計ディレクトリが存在することを確認"""
@@ -36,39 +61,39 @@ class StatsManager:
         """統計ファイルが存在することを確認"""
         # プレイヤー統計ファイル
         if not os.path.exists(self.player_stats_file):
-            with open(self.player_stats_file, "w", encoding="utf-8") as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
+            with metrics.observe_json("write", "player_stats"):
+                json_codec.dump_file(self.player_stats_file, {})
         
         # サーバー統計ファイル
         if not os.path.exists(self.server_stats_file):
-            with open(self.server_stats_file, "w", encoding="utf-8") as f:
-                json.dump({}, f, ensure_ascii=False, indent=2)
+            with metrics.observe_json("write", "server_stats"):
+                json_codec.dump_file(self.server_stats_file, {})
     
     def _load_player_stats(self) -> Dict[str, Any]:
         """プレイヤー統計ファイルを読み込む"""
         try:
-            with open(self.player_stats_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            with metrics.observe_json("read", "player_stats"):
+                return json_codec.load_file(self.player_stats_file)
+        except (json_codec.JSONDecodeError, FileNotFoundError):
             return {}
     
     def _save_player_stats(self, stats: Dict[str, Any]):
         """プレイヤー統計ファイルを保存する"""
-        with open(self.player_stats_file, "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        with metrics.observe_json("write", "player_stats"):
+            json_codec.dump_file(self.player_stats_file, stats)
     
     def _load_server_stats(self) -> Dict[str, Any]:
         """サーバー統計ファイルを読み込む"""
         try:
-            with open(self.server_stats_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            with metrics.observe_json("read", "server_stats"):
+                return json_codec.load_file(self.server_stats_file)
+        except (json_codec.JSONDecodeError, FileNotFoundError):
             return {}
     
     def _save_server_stats(self, stats: Dict[str, Any]):
         """サーバー統計ファイルを保存する"""
-        with open(self.server_stats_file, "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        with metrics.observe_json("write", "server_stats"):
+            json_codec.dump_file(self.server_stats_file, stats)
     
     def record_game_result(self, game_data: Dict[str, Any]):
         """
@@ -85,14 +110,14 @@ class StatsManager:
                 "start_time": str - ゲーム開始時間,
                 "end_time": str - ゲーム終了時間,
                 "duration": int - ゲーム時間（秒）,
-                "winner": str - 勝者チーム（"werewolf" or "village"）,
+                "winner": str - 勝者チーム（"werewolf", "village" or "fox"）,
                 "players": list - プレイヤー情報のリスト
                     [
                         {
                             "id": int - プレイヤーID,
                             "name": str - プレイヤー名,
                             "role": str - 役職名,
-                            "team": str - チーム（"werewolf" or "village"）,
+                            "team": str - チーム（"werewolf", "village" or "fox"）,
                             "is_alive": bool - 生存状態,
                             "death_reason": str or None - 死亡理由,
                             "death_day": int or None - 死亡日
@@ -100,11 +125,148 @@ class StatsManager:
                     ]
             }
         """
+        # 最近の傾向の更新（サーバー統計の平均ゲーム時間に使うため先に更新）
+        self._update_recent_stats(game_data)
+        
         # サーバー統計の更新
         self._update_server_stats(game_data)
         
         # プレイヤー統計の更新
         self._update_player_stats(game_data)
+        
+        # レーティングの更新
+        self._update_ratings(game_data)
+        
+        # 構築済みのゲーム履歴に追加（構築中なら構築後に反映、未構築なら初回の分析時にログから読み込まれる）
+        with self._history_lock:
+            if self._history is not None:
+                self._history.append(game_data)
+            elif self._history_pending is not None:
+                self._history_pending.append(game_data)
+    
+    def get_history(self):
+        """
+        列指向のゲーム履歴を取得する（初回はゲームログ全体を読み込むブロッキング処理）
+        
+        Returns:
+        --------
+        GameHistory
+            NumPyが利用できない場合はNone
+        """
+        with self._history_build_lock:
+            if self._history is not None:
+                return self._history
+            try:
+                from utils.game_history import GameHistory
+            except ImportError:
+                logger.info("numpy is not available. Game history analytics are disabled.")
+                return None
+
+            # ログの走査中に終了したゲームは走査済みの位置に保存されることがあるため、別に貯めておく
+            with self._history_lock:
+                self._history_pending = []
+            history = None
+            try:
+                history = GameHistory(game_archive.iter_all_logs(self.logs_directory))
+            finally:
+                with self._history_lock:
+                    pending, self._history_pending = self._history_pending, None
+                    if history is not None:
+                        # 貯めたゲームを反映してから公開する（ログから読み込み済みのゲームはIDで除外される）
+                        history.extend(pending)
+                        self._history = history
+            logger.info("Loaded games into history table", games=len(history))
+            return history
+    
+    def get_role_stats(self, guild_id: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        役職ごとのプレイ回数と勝利数を取得する
+        
+        Returns:
+        --------
+        Dict[str, Dict[str, int]]
+            {役職: {"times_played": int, "times_won": int}}
+        """
+        history = self.get_history()
+        if history is None:
+            return {}
+        return {role: {"times_played": data["games"], "times_won": data["wins"]}
+                for role, data in history.role_win_rates(guild_id=guild_id).items()}
+    
+    def get_game_logs(self, guild_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """保存済みのゲームログを古い順に取得する（limit指定時は新しいものからlimit件）"""
+        if guild_id is not None:
+            logs = game_archive.iter_guild_logs(f"{self.logs_directory}/{guild_id}")
+        else:
+            logs = game_archive.iter_all_logs(self.logs_directory)
+        if limit is None:
+            return list(logs)
+        return list(deque(logs, maxlen=limit))
+    
+    def _update_recent_stats(self, game_data: Dict[str, Any]):
+        """減衰付きの陣営・役職カウンタを更新する"""
+        self.recent.record_game(game_data)
+        with metrics.observe_json("write", "decayed_stats"):
+            self.recent.save()
+    
+    def get_recent_stats(self, guild_id: Optional[int] = None) -> Dict[str, Any]:
+        """最近の傾向を取得する（guild_id省略時は全体）"""
+        return self.recent.snapshot(guild_id)
+    
+    def format_recent_team_rates(self, recent: Dict[str, Any]) -> str:
+        """最近の傾向の陣営勝率を表示用の文字列にする"""
+        team_names = {"village": "村人陣営", "wolf": "人狼陣営", "fox": "妖狐陣営"}
+        lines = [f"{team_names.get(team, team)}: {rate * 100:.1f}%"
+                 for team, rate in sorted(recent["team_win_rates"].items(), key=lambda x: x[1], reverse=True)]
+        lines.append(f"（実効ゲーム数 {recent['games']:.1f}、半減期 {self.recent.half_life // 86400}日）")
+        return "\n".join(lines)
+    
+    def _update_ratings(self, game_data: Dict[str, Any]):
+        """参加プレイヤーの陣営別レーティングを更新する"""
+        self.ratings.record_game(game_data)
+        with metrics.observe_json("write", "ratings"):
+            self.ratings.save()
+    
+    def recompute_ratings(self, logs_dir: str = "data/logs") -> RatingBook:
+        """
+        保存済みの全ゲームログからレーティングを再計算した新しいRatingBookを作る
+        （ブロッキング処理。使用中のself.ratingsには触れないのでエグゼキュータで実行できる）
+        
+        Returns:
+        --------
+        RatingBook
+            install_ratings でイベントループ上から差し替える
+        """
+        ratings = RatingBook(self.ratings_file, k=self.ratings.k, initial=self.ratings.initial)
+        ratings.recompute(game_archive.iter_all_logs(logs_dir))
+        return ratings
+    
+    def install_ratings(self, ratings: RatingBook) -> int:
+        """
+        再計算したRatingBookに1回の代入で差し替えて保存する（イベントループ上で呼ぶ）
+        
+        Returns:
+        --------
+        int
+            差し替え後のレーティング登録プレイヤー数
+        """
+        self.ratings = ratings
+        with metrics.observe_json("write", "ratings"):
+            self.ratings.save()
+        return len(self.ratings.players)
+    
+    def get_rating_leaderboard(self, member_ids: List[str], limit: int = 10) -> List[Tuple[str, str, float]]:
+        """
+        指定メンバーのレーティング上位を取得する
+        
+        Returns:
+        --------
+        List[Tuple[str, str, float]]
+            [(プレイヤーID, 名前, 総合レーティング), ...]
+        """
+        allowed = set(member_ids)
+        return [(player_id, self.ratings.players[player_id]["name"], rating)
+                for player_id, rating in self.ratings.index.top(limit, allowed)]
     
     def _update_server_stats(self, game_data: Dict[str, Any]):
         """サーバー統計を更新する"""
@@ -173,9 +335,8 @@ class StatsManager:
         if len(server_stats[guild_id]["game_history"]) > 10:
             server_stats[guild_id]["game_history"] = server_stats[guild_id]["game_history"][-10:]
         
-        # 平均ゲーム時間を更新
-        total_duration = sum(game["duration"] for game in server_stats[guild_id]["game_history"])
-        server_stats[guild_id]["average_duration"] = total_duration / len(server_stats[guild_id]["game_history"])
+        # 平均ゲーム時間を更新（減衰付きの平均）
+        server_stats[guild_id]["average_duration"] = self.recent.snapshot(guild_id)["average_duration"]
         
         # 最終更新日時
         server_stats[guild_id]["last_updated"] = datetime.datetime.now().isoformat()
@@ -334,6 +495,11 @@ class StatsManager:
             
             embed.add_field(name="平均ゲーム時間", value=duration_str, inline=True)
         
+        # 最近の傾向（減衰付き）
+        recent = self.get_recent_stats(guild_id)
+        if recent["games"] >= 1:
+            embed.add_field(name="最近の傾向", value=self.format_recent_team_rates(recent), inline=False)
+        
         # 最近のゲーム
         if stats["game_history"]:
             recent_games = []
@@ -514,6 +680,10 @@ class StatsManager:
         server_stats = self._load_server_stats()
         guild_id_str = str(guild_id)
         
+        if self.recent.reset(guild_id):
+            with metrics.observe_json("write", "decayed_stats"):
+                self.recent.save()
+        
         if guild_id_str in server_stats:
             del server_stats[guild_id_str]
             self._save_server_stats(server_stats)
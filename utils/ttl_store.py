@@ -0,0 +1,180 @@
+"""
+TTLストアモジュール
+有効期限付きのキーを時間バケットで管理し、上限件数を超えないように少しずつ削除する
+
+各キーはちょうど1つのバケットに属する（期限を更新したキーは元のバケットから外す）ため、
+バケットが保持する参照の数は常に生存中のキー数と等しい。バケットIDは最小ヒープで管理する
+"""
+import heapq
+import time
+from collections import OrderedDict
+
+
+class TTLStore:
+    """時間バケット方式の有効期限付きストア（挿入・参照・削除O(1)、期限切れ削除は償却O(log バケット数)）"""
+
+    def __init__(self, ttl, max_entries=10000, bucket_seconds=1.0, sweep_limit=64):
+        """
+        Parameters:
+        -----------
+        ttl: float
+            デフォルトの有効期間（秒）
+        max_entries: int
+            保持する最大件数。超えた場合は期限の近いものから削除
+        bucket_seconds: float
+            期限を丸めるバケットの幅（秒）
+        sweep_limit: int
+            1回の操作で削除する期限切れエントリの最大数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self.sweep_limit = sweep_limit
+
+        # {key: (value, expiry, bucket_id)}
+        self._entries = {}
+        # {bucket_id: OrderedDict({key: None})}（挿入順。空になったバケットはすぐ削除）
+        self._buckets = {}
+        # バケットIDの最小ヒープ（削除済みのバケットIDは先頭に来たときに捨てる）
+        self._heap = []
+
+        # 統計
+        self.evicted = 0
+        self.expired = 0
+
+    def _bucket_id(self, expiry):
+        return int(expiry // self.bucket_seconds)
+
+    def _unlink(self, key, bucket_id):
+        """キーをバケットから外す（空になったバケットは削除）"""
+        keys = self._buckets[bucket_id]
+        del keys[key]
+        if not keys:
+            del self._buckets[bucket_id]
+
+    def _link(self, key, bucket_id):
+        """キーをバケットに追加"""
+        keys = self._buckets.get(bucket_id)
+        if keys is None:
+            keys = self._buckets[bucket_id] = OrderedDict()
+            heapq.heappush(self._heap, bucket_id)
+            # 削除済みのバケットIDがヒープに溜まりすぎたら作り直す
+            if len(self._heap) > 2 * len(self._buckets) + 16:
+                self._heap = list(self._buckets)
+                heapq.heapify(self._heap)
+        keys[key] = None
+
+    def _oldest_bucket(self):
+        """期限の最も近いバケットのID（バケットがなければNone）"""
+        heap = self._heap
+        while heap and heap[0] not in self._buckets:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _remove_oldest(self, bucket_id):
+        """バケットの先頭のキーを削除"""
+        keys = self._buckets[bucket_id]
+        key, _ = keys.popitem(last=False)
+        if not keys:
+            del self._buckets[bucket_id]
+        del self._entries[key]
+
+    def _advance(self, now):
+        """期限切れのバケットを少しずつ処理"""
+        current = self._bucket_id(now)
+        for _ in range(self.sweep_limit):
+            bucket_id = self._oldest_bucket()
+            if bucket_id is None or bucket_id >= current:
+                return
+            self._remove_oldest(bucket_id)
+            self.expired += 1
+
+    def _evict_one(self):
+        """上限超過時に期限の最も近いエントリを1件削除"""
+        bucket_id = self._oldest_bucket()
+        if bucket_id is not None:
+            self._remove_oldest(bucket_id)
+            self.evicted += 1
+
+    def set(self, key, value=True, ttl=None):
+        """キーを追加（既存のキーは値と期限を更新）"""
+        now = time.monotonic()
+        self._advance(now)
+
+        expiry = now + (self.ttl if ttl is None else ttl)
+        bucket_id = self._bucket_id(expiry)
+        entry = self._entries.get(key)
+        if entry is None or entry[2] != bucket_id:
+            if entry is not None:
+                self._unlink(key, entry[2])
+            self._link(key, bucket_id)
+        self._entries[key] = (value, expiry, bucket_id)
+
+        while len(self._entries) > self.max_entries:
+            self._evict_one()
+
+    def add(self, key, ttl=None):
+        """集合として使う場合のエイリアス"""
+        self.set(key, True, ttl)
+
+    def get(self, key, default=None):
+        """値を取得（期限切れの場合はdefault）"""
+        now = time.monotonic()
+        self._advance(now)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            return default
+        return entry[0]
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def expires_in(self, key):
+        """残りの有効期間（秒）を取得。存在しない場合はNone"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry[1] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def shorten(self, key, ttl):
+        """残りの有効期間がttlより長い場合だけttlに短縮"""
+        remaining = self.expires_in(key)
+        if remaining is not None and remaining > ttl:
+            self.set(key, self._entries[key][0], ttl)
+
+    def pop(self, key, default=None):
+        """キーを削除して値を返す"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self._unlink(key, entry[2])
+        return entry[0]
+
+    def discard(self, key):
+        """キーを削除"""
+        self.pop(key)
+
+    def expire(self):
+        """期限切れエントリの削除を進める"""
+        self._advance(time.monotonic())
+
+    def clear(self):
+        """全エントリを削除"""
+        self._entries.clear()
+        self._buckets.clear()
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """統計を取得"""
+        return {
+            "entries": len(self._entries),
+            "buckets": len(self._buckets),
+            "heap": len(self._heap),
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
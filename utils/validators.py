@@ -14,12 +14,11 @@ def is_game_owner(ctx, game_manager):
     if not is_guild_channel(ctx):
         return False, "このコマンドはサーバーのチャンネルでのみ使用できます。"
     
-    # ゲームが存在するかチェック
-    if not game_manager.is_game_active(ctx.guild.id):
+    # ゲームが存在するかチェック（チャンネル、または実行者の参加中のゲーム）
+    game = game_manager.resolve_game(ctx)
+    if not game:
         return False, "現在進行中のゲームがありません。"
     
-    game = game_manager.get_game(ctx.guild.id)
-    
     # 開始者のみが実行可能
     if ctx.author.id != int(game.owner_id):
         return False, "このコマンドはゲーム開始者のみが使用できます。"
@@ -36,6 +35,13 @@ def is_admin(ctx):
     
     return False, "このコマンドは管理者のみが使用できます。"
 
+def _find_player(ctx, game_manager):
+    """実行者が参加中のゲームのプレイヤー（参加していない場合はNone）"""
+    game = game_manager.get_player_game(ctx.author.id)
+    if game is None:
+        return None
+    return game.players.get(str(ctx.author.id))
+
 def can_perform_night_action(ctx, game_manager):
     """夜のアクションを実行できるかどうか確認"""
     # DMチャンネルでのみ実行可能
@@ -43,17 +49,7 @@ def can_perform_night_action(ctx, game_manager):
         return False, "このコマンドはDMでのみ使用できます。"
     
     # プレイヤーを特定
-    player = None
-    
-    for guild in game_manager.bot.guilds:
-        if not game_manager.is_game_active(guild.id):
-            continue
-        
-        game = game_manager.get_game(guild.id)
-        
-        if str(ctx.author.id) in game.players:
-            player = game.players[str(ctx.author.id)]
-            break
+    player = _find_player(ctx, game_manager)
     
     if not player:
         return False, "あなたは現在進行中のゲームに参加していません。"
@@ -79,17 +75,7 @@ def can_perform_night_action(ctx, game_manager):
 def is_valid_target(ctx, game_manager, target_id):
     """対象が有効かどうか確認"""
     # プレイヤーを特定
-    player = None
-    
-    for guild in game_manager.bot.guilds:
-        if not game_manager.is_game_active(guild.id):
-            continue
-        
-        game = game_manager.get_game(guild.id)
-        
-        if str(ctx.author.id) in game.players:
-            player = game.players[str(ctx.author.id)]
-            break
+    player = _find_player(ctx, game_manager)
     
     if not player:
         return False, "あなたは現在進行中のゲームに参加していません。"
@@ -0,0 +1,184 @@
+"""
+イベントループ監視モジュール
+別スレッドからイベントループの応答性を測定し、停止中のメインスレッドのスタックを収集する
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from utils.config import GameConfig
+from utils.logger import get_logger
+
+logger = get_logger("watchdog")
+
+# 停止とみなす遅延（秒）
+DEFAULT_THRESHOLD = 0.25
+# ハートビートとサンプリングの間隔（秒）
+DEFAULT_INTERVAL = 0.05
+# 折りたたみスタックの出力先
+DEFAULT_REPORT_PATH = os.path.join(GameConfig.LOG_DIR, "loop_stalls.folded")
+# 保持する停止履歴の件数
+MAX_STALL_HISTORY = 50
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _format_frame(frame):
+    """フレームを "関数 (ファイル:行)" 形式にする"""
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_ROOT_DIR):
+        filename = os.path.relpath(filename, _ROOT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})".replace(";", ":")
+
+
+def collapse_stack(frame):
+    """フレームからルート→リーフ順の折りたたみスタック文字列を作成"""
+    frames = []
+    while frame is not None:
+        frames.append(_format_frame(frame))
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class LoopWatchdog:
+    """イベントループの停止を検出してスタックを集計するウォッチドッグ"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, interval=DEFAULT_INTERVAL, report_path=DEFAULT_REPORT_PATH):
+        self.threshold = threshold
+        self.interval = interval
+        self.report_path = report_path
+
+        self.loop = None
+        self.loop_thread_id = None
+        self._thread = None
+        self._running = False
+        self._handle = None
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+
+        # 集計値
+        self.stack_counts = Counter()
+        self.stall_count = 0
+        self.total_stall_time = 0.0
+        self.max_stall = 0.0
+        self.stalls = []
+        self._stall_start = None
+        self._stall_top = None
+
+    def start(self, loop):
+        """ループのスレッドから呼び出して監視を開始"""
+        if self._running:
+            return
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self._running = True
+        self._last_beat = time.monotonic()
+        self._handle = loop.call_later(self.interval, self._beat)
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("Watchdog started", threshold=self.threshold)
+
+    def stop(self):
+        """監視を停止"""
+        self._running = False
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    def _beat(self):
+        """イベントループ上で定期的に呼ばれるハートビート"""
+        self._last_beat = time.monotonic()
+        if self._running:
+            self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _run(self):
+        """監視スレッド本体"""
+        while self._running:
+            time.sleep(self.interval)
+            # 次のハートビート予定時刻からの遅れ
+            lag = time.monotonic() - self._last_beat - self.interval
+
+            if lag > self.threshold:
+                self._sample()
+            elif self._stall_start is not None:
+                self._finish_stall()
+
+    def _sample(self):
+        """停止中のメインスレッドのスタックを1回採取"""
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        stack = collapse_stack(frame)
+
+        with self._lock:
+            self.stack_counts[stack] += 1
+            if self._stall_start is None:
+                self._stall_start = self._last_beat + self.interval
+                self._stall_top = stack.rsplit(";", 1)[-1]
+
+    def _finish_stall(self):
+        """停止の終了を記録"""
+        duration = self._last_beat - self._stall_start
+        with self._lock:
+            self.stall_count += 1
+            self.total_stall_time += duration
+            self.max_stall = max(self.max_stall, duration)
+            self.stalls.append({
+                "time": time.time(),
+                "duration": duration,
+                "top": self._stall_top
+            })
+            del self.stalls[:-MAX_STALL_HISTORY]
+            self._stall_start = None
+        logger.warning("Event loop stalled", duration=round(duration, 3), top=self._stall_top)
+
+    def get_report(self, limit=5):
+        """集計結果を取得"""
+        with self._lock:
+            top_stacks = self.stack_counts.most_common(limit)
+            total_samples = sum(self.stack_counts.values())
+            top_frames = Counter()
+            for stack, count in self.stack_counts.items():
+                top_frames[stack.rsplit(";", 1)[-1]] += count
+            return {
+                "stall_count": self.stall_count,
+                "total_stall_time": self.total_stall_time,
+                "max_stall": self.max_stall,
+                "total_samples": total_samples,
+                "top_frames": top_frames.most_common(limit),
+                "top_stacks": top_stacks,
+                "recent_stalls": list(self.stalls[-limit:])
+            }
+
+    def write_collapsed(self, path=None):
+        """flamegraph.pl / speedscope 用の折りたたみスタックファイルを書き出す"""
+        path = path or self.report_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self.stack_counts.most_common()]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + ("\n" if lines else ""))
+        return path
+
+    def reset(self):
+        """集計をリセット"""
+        with self._lock:
+            self.stack_counts.clear()
+            self.stall_count = 0
+            self.total_stall_time = 0.0
+            self.max_stall = 0.0
+            self.stalls = []
+
+
+# グローバルなウォッチドッグインスタンス
+_watchdog = LoopWatchdog()
+
+
+def get_watchdog():
+    """グローバルなウォッチドッグを取得"""
+    return _watchdog
@@ -3,12 +3,14 @@
 """
 import discord
 from discord.ui import View, Button
+from utils.memory_tracker import track
 
 class GameControlView(View):
     """ゲーム操作用の基本Viewクラス"""
     def __init__(self, game_manager, timeout=180):
         super().__init__(timeout=timeout)
         self.game_manager = game_manager
+        track(self, "view")
         
     async def on_timeout(self):
         """タイムアウト時の処理"""
@@ -5,8 +5,8 @@ import discord
 from discord.ui import Button
 from typing import Dict, Optional
 from .base_view import GameControlView
-from utils.embed_creator import create_base_embed
-from utils.config import EmbedColors
+from utils.embed_creator import create_vote_embed
+from utils.game_actor import VOTE
 
 class VoteView(GameControlView):
     """投票用のViewクラス"""
@@ -91,18 +91,8 @@ class VoteView(GameControlView):
         # 投票状況を更新して表示
         await self.update_vote_status()
         
-        # 全員が投票したかチェック
-        alive_count = len(self.game.get_alive_players())
-        vote_count = len(self.game.votes)
-        
-        if vote_count >= alive_count:
-            # 全員が投票した場合、タイマーを終了して結果処理
-            self.game.cancel_timer()
-            
-            # 投票Cogを取得して結果処理を呼び出す
-            voting_cog = self.game.bot.get_cog("VotingCog")
-            if voting_cog:
-                await voting_cog.process_voting_results(self.channel, self.game)
+        # 全員が投票したかの判定と結果処理はゲームのアクターが行う
+        self.game.actor.post(VOTE)
     
     async def update_vote_status(self):
         """投票状況の埋め込みメッセージを更新"""
@@ -114,17 +104,7 @@ class VoteView(GameControlView):
         vote_count = len(self.game.votes)
         
         # 埋め込みメッセージを作成
-        embed = create_base_embed(
-            title="🗳️ 投票",
-            description=f"処刑する人を決めるための投票です。\n"
-                       f"投票時間: {self.timeout}秒\n\n"
-                       f"**ボタンをクリックして投票してください**",
-            color=EmbedColors.PRIMARY
-        )
-        
-        # 生存プレイヤーリストを追加
-        player_list = "\n".join([f"- {p.name}" for p in alive_players])
-        embed.add_field(name="生存者", value=player_list, inline=False)
+        embed = create_vote_embed(self.game, self.timeout)
         
         # 投票状況フィールド
         vote_status = ""
@@ -165,7 +145,4 @@ class VoteView(GameControlView):
             except discord.NotFound:
                 pass
         
-        # VotingCogを取得して結果処理
-        voting_cog = self.game.bot.get_cog("VotingCog")
-        if voting_cog and self.game.phase == "voting":
-            await voting_cog.process_voting_results(self.channel, self.game)
+        # 結果処理はフェーズタイマーの期限切れでアクターが行う